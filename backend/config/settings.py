@@ -67,7 +67,10 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "workorder.middleware.db_routing.ReplicaRoutingMiddleware",
+    "workorder.middleware.authz.AuthzProfileMiddleware",
     "workorder.middleware.audit_log.AuditLogMiddleware",
+    "workorder.middleware.notification_outbox.NotificationOutboxMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django_prometheus.middleware.PrometheusAfterMiddleware",
@@ -151,15 +154,15 @@ DATABASES = {
     }
 }
 
-# 优先支持 DATABASE_URL（与 docker-compose/CI 一致）
-DATABASE_URL = os.environ.get("DATABASE_URL")
-if DATABASE_URL:
-    parsed = urlparse(DATABASE_URL)
+
+def _database_from_url(url):
+    """把 DATABASE_URL 形式的地址解析为 Django 数据库配置，无法识别时返回 None"""
+    parsed = urlparse(url)
     scheme = (parsed.scheme or "").lower()
 
     if scheme in ("postgres", "postgresql"):
         query = dict(parse_qsl(parsed.query or ""))
-        DATABASES["default"] = {
+        return {
             "ENGINE": "django.db.backends.postgresql",
             "NAME": (parsed.path or "/").lstrip("/")
             or os.environ.get("POSTGRES_DB", ""),
@@ -172,16 +175,23 @@ if DATABASE_URL:
                 **({"sslmode": query["sslmode"]} if "sslmode" in query else {}),
             },
         }
-    elif scheme in ("sqlite", "sqlite3"):
+    if scheme in ("sqlite", "sqlite3"):
         # Examples:
         # - sqlite:////absolute/path/db.sqlite3
         # - sqlite:///relative/path/db.sqlite3
         sqlite_path = parsed.path or ""
         if sqlite_path:
-            DATABASES["default"] = {
+            return {
                 "ENGINE": "django.db.backends.sqlite3",
                 "NAME": sqlite_path,
             }
+    return None
+
+
+# 优先支持 DATABASE_URL（与 docker-compose/CI 一致）
+DATABASE_URL = os.environ.get("DATABASE_URL")
+if DATABASE_URL:
+    DATABASES["default"] = _database_from_url(DATABASE_URL) or DATABASES["default"]
 
 # 兼容旧的 POSTGRES_* 变量（未设置 DATABASE_URL 时生效）
 elif os.environ.get("POSTGRES_DB"):
@@ -198,6 +208,35 @@ elif os.environ.get("POSTGRES_DB"):
     }
 
 
+# 只读副本（可选）：统计、看板指标、导出、审计日志列表等只读接口读取副本，
+# 写入及读己之写仍走主库（见 workorder/db_router.py）。
+# 本地可用两个 SQLite 文件模拟：
+#   DATABASE_URL=sqlite:////path/to/db.sqlite3
+#   DATABASE_REPLICA_URL=sqlite:////path/to/db_replica.sqlite3
+# 再用 python manage.py sync_sqlite_replica 把主库复制到副本文件（模拟复制延迟）
+DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+if DATABASE_REPLICA_URL:
+    _replica = _database_from_url(DATABASE_REPLICA_URL)
+    if _replica:
+        # 测试时副本指向主库的测试库
+        _replica["TEST"] = {"MIRROR": "default"}
+        DATABASES["replica"] = _replica
+DATABASE_REPLICA_ALIAS = "replica" if "replica" in DATABASES else None
+# 写入后该用户的请求读主库的秒数（不小于副本的复制延迟）
+DATABASE_REPLICA_STICKY_SECONDS = int(
+    os.environ.get("DATABASE_REPLICA_STICKY_SECONDS", "10")
+)
+DATABASE_ROUTERS = ["workorder.db_router.ReplicaRouter"]
+
+# 持久连接：连接在 DB_CONN_MAX_AGE 秒内跨请求复用，不再每个请求重新连接；
+# 健康检查在复用前确认连接可用（数据库重启后自动重连）
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", "60"))
+DB_CONN_HEALTH_CHECKS = os.environ.get("DB_CONN_HEALTH_CHECKS", "True") == "True"
+for _database in DATABASES.values():
+    _database.setdefault("CONN_MAX_AGE", DB_CONN_MAX_AGE)
+    _database.setdefault("CONN_HEALTH_CHECKS", DB_CONN_HEALTH_CHECKS)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -498,6 +537,39 @@ CACHE_TIMEOUTS = {
     "DAY": 86400,  # 1天
 }
 
+# 审计日志写入配置
+# 审计日志在事务提交/请求结束时批量写入；BACKGROUND 开启（且审计配置 async_write 为真）时
+# 由后台线程从有界队列排空，队列满时回退为同步写入
+AUDIT_LOG_WRITER = {
+    "BACKGROUND": os.environ.get("AUDIT_LOG_BACKGROUND_WRITER", "False") == "True",
+    "QUEUE_SIZE": int(os.environ.get("AUDIT_LOG_QUEUE_SIZE", "10000")),
+    "BATCH_SIZE": 500,
+}
+
+# WebSocket 通知批量推送：一批消息在同一异步上下文中并发 group_send（并发数 CONCURRENCY）；
+# BACKGROUND 开启时整批进入有界队列由后台线程发送，队列满时回退为同步发送
+REALTIME_NOTIFICATION_FANOUT = {
+    "BACKGROUND": os.environ.get("NOTIFICATION_FANOUT_BACKGROUND", "False") == "True",
+    "CONCURRENCY": int(os.environ.get("NOTIFICATION_FANOUT_CONCURRENCY", "50")),
+    "QUEUE_SIZE": 1000,
+}
+
+# 通知发件箱：同一接收人在一批（一个事务或一次请求）中收到超过 DIGEST_THRESHOLD 条
+# 通知时合并为一条摘要通知（0 表示不合并）
+NOTIFICATION_OUTBOX = {
+    "DIGEST_THRESHOLD": int(os.environ.get("NOTIFICATION_DIGEST_THRESHOLD", "5")),
+}
+
+# Excel 导出：超过该行数时转为后台任务写入 EXPORT_FILE_DIR，返回下载句柄
+EXCEL_EXPORT_BACKGROUND_THRESHOLD = int(
+    os.environ.get("EXCEL_EXPORT_BACKGROUND_THRESHOLD", "50000")
+)
+EXPORT_FILE_DIR = os.environ.get("EXPORT_FILE_DIR", str(BASE_DIR / "exports"))
+
+# 单据编号号段预分配：单号前缀 -> 每个进程一次领取的序号数量（未配置为 1，不预分配）
+# 例如 {"RK": 20, "CK": 20}；预分配会产生空号，且多进程下单号不再严格按时间递增
+DOCUMENT_SEQUENCE_BLOCK_SIZES = {}
+
 # 会话配置（使用Redis存储）
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
 SESSION_CACHE_ALIAS = "default"
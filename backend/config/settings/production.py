@@ -26,6 +26,7 @@ DATABASES = {
             'sslmode': 'require',
         },
         'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -13,6 +13,15 @@ class WorkorderConfig(AppConfig):
         import workorder.signals
         # 导入缓存失效信号处理器
         import workorder.performance.cache_invalidation  # noqa
+        # 导入操作员绩效统计信号处理器
+        import workorder.services.operator_performance  # noqa
+        # 导入工序/施工单完成计数信号处理器
+        import workorder.services.completion_progress  # noqa
+        # 导入部门层级快照失效信号处理器
+        import workorder.services.department_tree  # noqa
+        # 注册授权画像失效信号
+        from workorder.permission_utils import register_authz_signals
+        register_authz_signals()
         # 注册审计日志信号
         from workorder.services.audit_log_service import register_audit_signals
         register_audit_signals(self)
@@ -9,6 +9,7 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User, Group, Permission
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_exempt
 from django.utils.decorators import method_decorator
+from .permission_utils import AuthzProfile
 from .serializers import UserSerializer
 from workorder.response import APIResponse
 from workorder.schema import standard_error_response, standard_success_response
@@ -171,15 +172,8 @@ class LoginView(APIView):
 
             refresh = RefreshToken.for_user(user)
 
-            # 获取用户所属的组
-            groups = list(user.groups.values_list('name', flat=True))
-
-            # 获取用户权限（用于前端权限控制）
-            permissions = []
-            if user.is_superuser:
-                permissions = ['*']
-            else:
-                permissions = list(user.get_all_permissions())
+            # 用户所属的组和权限（用于前端权限控制），构建后缓存供后续请求使用
+            authz = AuthzProfile.for_user(user)
 
             return APIResponse.success(data={
                 'id': user.id,
@@ -189,9 +183,9 @@ class LoginView(APIView):
                 'last_name': user.last_name,
                 'is_staff': user.is_staff,
                 'is_superuser': user.is_superuser,
-                'groups': groups,
-                'is_salesperson': '业务员' in groups,
-                'permissions': permissions,  # 添加权限列表
+                'groups': list(authz.groups),
+                'is_salesperson': authz.is_salesperson,
+                'permissions': authz.permission_list(),  # 添加权限列表
                 'access': str(refresh.access_token),
                 'refresh': str(refresh),
             })
@@ -262,19 +256,10 @@ class TokenRefreshViewWithDocs(TokenRefreshView):
 def get_current_user(request):
     """获取当前登录用户信息"""
     if request.user.is_authenticated:
-        # 获取用户所属的组
-        groups = list(request.user.groups.values_list('name', flat=True))
-        
-        # 获取用户权限（用于前端权限控制）
-        permissions = []
-        if request.user.is_superuser:
-            # 超级用户拥有所有权限
-            permissions = ['*']
-        else:
-            # 获取用户的所有权限（包括通过组获得的权限）
-            # 使用 get_all_permissions() 获取所有权限字符串（格式：app_label.codename）
-            permissions = list(request.user.get_all_permissions())
-        
+        # 用户所属的组和权限（含组权限，格式：app_label.codename；超级用户为 ['*']），
+        # 来自缓存的授权画像，前端每次导航调用本接口时不再查询数据库
+        authz = AuthzProfile.for_request(request)
+
         return APIResponse.success(data={
             'id': request.user.id,
             'username': request.user.username,
@@ -283,9 +268,9 @@ def get_current_user(request):
             'last_name': request.user.last_name,
             'is_staff': request.user.is_staff,
             'is_superuser': request.user.is_superuser,
-            'groups': groups,
-            'is_salesperson': '业务员' in groups,
-            'permissions': permissions,  # 添加权限列表
+            'groups': list(authz.groups),
+            'is_salesperson': authz.is_salesperson,
+            'permissions': authz.permission_list(),  # 添加权限列表
         })
     else:
         return APIResponse.error('未登录', code=status.HTTP_401_UNAUTHORIZED)
@@ -512,8 +497,7 @@ def update_profile(request):
         request.user.save()
 
         # 返回更新后的用户信息
-        groups = list(request.user.groups.values_list('name', flat=True))
-        permissions = ['*'] if request.user.is_superuser else list(request.user.get_all_permissions())
+        authz = AuthzProfile.for_user(request.user)
 
         return APIResponse.success(
             data={
@@ -524,8 +508,8 @@ def update_profile(request):
                 'last_name': request.user.last_name,
                 'is_staff': request.user.is_staff,
                 'is_superuser': request.user.is_superuser,
-                'groups': groups,
-                'permissions': permissions,
+                'groups': list(authz.groups),
+                'permissions': authz.permission_list(),
             },
             message='个人信息更新成功',
         )
@@ -0,0 +1,151 @@
+"""
+数据库路由：只读副本
+
+配置了只读副本（settings.DATABASE_REPLICA_ALIAS）时，统计、看板指标、导出、
+审计日志列表等只读接口的查询发往副本，减轻主库压力；其他查询一律走主库。
+
+- 副本读取只在显式开启的范围内生效：视图集通过 ReplicaReadMixin 声明的动作，
+  或 ReplicaRouter.replica_reads() 上下文
+- 读己之写：同一请求（或线程）内写过主库、或处于事务中时，读取改走主库；
+  请求写过主库后，该用户在 DATABASE_REPLICA_STICKY_SECONDS 秒内的请求也全部走主库，
+  避免副本延迟导致刚保存的数据"消失"
+- 写入、迁移只发往主库
+
+本地可用两个 SQLite 文件模拟副本（见 settings.py 与 sync_sqlite_replica 命令）。
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaRouter:
+    """只读副本路由"""
+
+    STICKY_KEY = 'db_router:primary_pin:{}'
+
+    _local = threading.local()
+
+    # ==================== 配置 ====================
+
+    @staticmethod
+    def replica_alias() -> Optional[str]:
+        """副本数据库别名，未配置副本时为 None"""
+        return getattr(settings, 'DATABASE_REPLICA_ALIAS', None)
+
+    @classmethod
+    def read_alias(cls) -> str:
+        """
+        可容忍延迟的后台读取使用的数据库（显式 .using()，不受读己之写约束）
+
+        未配置副本时为主库
+        """
+        return cls.replica_alias() or DEFAULT_DB_ALIAS
+
+    @staticmethod
+    def sticky_seconds() -> int:
+        return getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 10)
+
+    # ==================== 线程状态 ====================
+
+    @classmethod
+    def start_request(cls):
+        """请求开始：清空上一个请求遗留的状态"""
+        cls._local.replica_depth = 0
+        cls._local.request_reads = False
+        cls._local.wrote = False
+
+    @classmethod
+    def finish_request(cls) -> bool:
+        """
+        请求结束：清空状态
+
+        Returns:
+            bool: 本次请求是否写过主库
+        """
+        wrote = cls.has_written()
+        cls.start_request()
+        return wrote
+
+    @classmethod
+    def has_written(cls) -> bool:
+        return getattr(cls._local, 'wrote', False)
+
+    @classmethod
+    @contextmanager
+    def replica_reads(cls):
+        """在此范围内的读取发往副本（写入后、事务中仍走主库）"""
+        cls._local.replica_depth = getattr(cls._local, 'replica_depth', 0) + 1
+        try:
+            yield
+        finally:
+            cls._local.replica_depth -= 1
+
+    @classmethod
+    def enable_request_reads(cls, user=None) -> bool:
+        """
+        当前请求剩余的读取发往副本（由 ReplicaReadMixin 在认证之后调用）
+
+        Returns:
+            bool: 是否已开启；未配置副本或用户刚写过主库时不开启
+        """
+        if cls.replica_alias() is None or cls.is_pinned(user):
+            return False
+        cls._local.request_reads = True
+        return True
+
+    @classmethod
+    def disable_request_reads(cls):
+        cls._local.request_reads = False
+
+    # ==================== 跨请求粘滞 ====================
+
+    @classmethod
+    def pin_to_primary(cls, user):
+        """用户刚写过主库：粘滞期内的请求都读主库"""
+        if user is None or not user.is_authenticated or cls.replica_alias() is None:
+            return
+        cache.set(cls.STICKY_KEY.format(user.pk), True, cls.sticky_seconds())
+
+    @classmethod
+    def is_pinned(cls, user) -> bool:
+        if user is None or not user.is_authenticated:
+            return False
+        return bool(cache.get(cls.STICKY_KEY.format(user.pk)))
+
+    # ==================== Django 路由接口 ====================
+
+    def db_for_read(self, model, **hints):
+        alias = self.replica_alias()
+        if alias is None:
+            return None
+        local = self._local
+        if not (getattr(local, 'replica_depth', 0) or getattr(local, 'request_reads', False)):
+            return None
+        if getattr(local, 'wrote', False) or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # 读己之写：写过主库或在事务中，读取主库
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        self._local.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 副本与主库是同一份数据
+        aliases = {DEFAULT_DB_ALIAS, self.replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # 副本的表结构来自主库复制，不在副本上执行迁移
+        if db == self.replica_alias():
+            return False
+        return None
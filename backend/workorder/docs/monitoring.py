@@ -2,7 +2,13 @@
 监控与统计相关视图集的 OpenAPI 文档定义。
 """
 
-from drf_spectacular.utils import OpenApiExample, OpenApiResponse, extend_schema
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (
+    OpenApiExample,
+    OpenApiParameter,
+    OpenApiResponse,
+    extend_schema,
+)
 
 from workorder.schema import standard_success_response
 
@@ -94,6 +100,14 @@ task_metrics_docs = extend_schema(
 user_performance_docs = extend_schema(
     tags=["统计"],
     summary="获取用户绩效指标",
+    parameters=[
+        OpenApiParameter(
+            name="days",
+            type=OpenApiTypes.INT,
+            required=False,
+            description="统计最近多少天（默认 30，最多 366）",
+        ),
+    ],
     responses={
         200: OpenApiResponse(
             response=standard_success_response("UserPerformanceMetricsResponse"),
@@ -105,6 +119,28 @@ user_performance_docs = extend_schema(
 productivity_trends_docs = extend_schema(
     tags=["统计"],
     summary="获取生产力趋势",
+    description="按天统计时已结束的日期读取日汇总表，只有当天实时统计；按小时统计为实时分组查询。",
+    parameters=[
+        OpenApiParameter(
+            name="granularity",
+            type=OpenApiTypes.STR,
+            required=False,
+            enum=["day", "hour"],
+            description="统计粒度（默认 day）",
+        ),
+        OpenApiParameter(
+            name="days",
+            type=OpenApiTypes.INT,
+            required=False,
+            description="统计最近多少天（默认 7，最多 366）",
+        ),
+        OpenApiParameter(
+            name="hours",
+            type=OpenApiTypes.INT,
+            required=False,
+            description="按小时统计时的小时数（默认 24，最多 168）",
+        ),
+    ],
     responses={
         200: OpenApiResponse(
             response=standard_success_response("ProductivityTrendsResponse"),
@@ -116,6 +152,14 @@ productivity_trends_docs = extend_schema(
 quality_metrics_docs = extend_schema(
     tags=["统计"],
     summary="获取质量指标",
+    parameters=[
+        OpenApiParameter(
+            name="days",
+            type=OpenApiTypes.INT,
+            required=False,
+            description="统计最近多少天（默认 30，最多 366）",
+        ),
+    ],
     responses={
         200: OpenApiResponse(
             response=standard_success_response("QualityMetricsResponse"),
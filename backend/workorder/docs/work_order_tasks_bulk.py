@@ -22,6 +22,9 @@ batch_update_quantity_docs = extend_schema(
             "task_ids": serializers.ListField(child=serializers.IntegerField()),
             "quantity_increment": serializers.JSONField(),
             "quantity_defective": serializers.JSONField(required=False),
+            "versions": serializers.DictField(
+                child=serializers.IntegerField(), required=False
+            ),
             "notes": serializers.CharField(required=False, allow_blank=True),
         },
     ),
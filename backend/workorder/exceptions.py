@@ -32,6 +32,26 @@ class BusinessLogicError(APIException):
     default_code = 'business_logic_error'
 
 
+class InsufficientStockError(BusinessLogicError):
+    """
+    库存不足错误
+
+    用于扣减库存后数量将小于0的情况，整批库存变动不生效。
+    """
+
+    default_detail = _('库存不足')
+    default_code = 'insufficient_stock'
+
+    def __init__(self, detail=None, shortages=None):
+        """
+        Args:
+            detail: 错误详情
+            shortages: 库存不足的项目：ID -> (当前库存, 需要扣减的数量)
+        """
+        super().__init__(detail)
+        self.shortages = shortages or {}
+
+
 class PermissionDeniedError(APIException):
     """
     权限错误
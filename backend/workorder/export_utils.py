@@ -1,238 +1,438 @@
 """
 数据导出工具
 支持 Excel 格式导出
+
+导出使用 openpyxl 的只写（write-only）模式：
+- 行数据通过 values_list(...).iterator() 分块读取，只取导出需要的列
+- 单元格样式使用工作簿级命名样式，不再为每个单元格新建 Border/Font
+- 文件先写入临时文件，再通过 FileResponse（StreamingHttpResponse）分块返回
+- 超过 EXCEL_EXPORT_BACKGROUND_THRESHOLD 行时转为后台任务写入磁盘，
+  返回导出任务句柄，完成后通过 /api/v1/export-jobs/{job_id}/download/ 下载；
+  任务状态过期后文件无法再下载，提交新任务时（或 cleanup_export_files 命令）删除
 """
 try:
     from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
     from openpyxl.utils import get_column_letter
     OPENPYXL_AVAILABLE = True
 except ImportError:
     OPENPYXL_AVAILABLE = False
 
-from django.http import HttpResponse
+import logging
+import os
+import tempfile
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.http import FileResponse, HttpResponse
 from django.utils import timezone
-from datetime import datetime
+from rest_framework import status
 
+from .response import APIResponse
 
-def create_excel_response(filename):
-    """创建 Excel HTTP 响应"""
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    return response
+logger = logging.getLogger(__name__)
 
+HEADER_STYLE_NAME = 'export_header'
+DATA_STYLE_NAME = 'export_data'
 
-def style_header_cell(cell):
-    """设置表头单元格样式"""
-    if not OPENPYXL_AVAILABLE:
-        return
-    cell.font = Font(bold=True, color="FFFFFF", size=11)
-    cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    cell.alignment = Alignment(horizontal="center", vertical="center")
-    cell.border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
+# 分块读取的行数
+EXPORT_CHUNK_SIZE = 2000
 
+EXCEL_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def _thin_border():
+    side = Side(style='thin')
+    return Border(left=side, right=side, top=side, bottom=side)
+
+
+def register_named_styles(wb):
+    """在工作簿上注册导出使用的命名样式（每个工作簿一次）"""
+    header = NamedStyle(name=HEADER_STYLE_NAME)
+    header.font = Font(bold=True, color="FFFFFF", size=11)
+    header.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header.alignment = Alignment(horizontal="center", vertical="center")
+    header.border = _thin_border()
+    wb.add_named_style(header)
+
+    data = NamedStyle(name=DATA_STYLE_NAME)
+    data.alignment = Alignment(horizontal="left", vertical="center")
+    data.border = _thin_border()
+    wb.add_named_style(data)
+
+
+def _format_datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
 
-def style_data_cell(cell):
-    """设置数据单元格样式"""
-    if not OPENPYXL_AVAILABLE:
-        return
-    cell.alignment = Alignment(horizontal="left", vertical="center")
-    cell.border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
 
+def _format_date(value):
+    return value.strftime('%Y-%m-%d') if value else ''
 
-def export_work_orders(queryset, filename=None):
+
+class ExcelExportSpec:
     """
-    导出施工单列表到 Excel
-    
+    Excel 导出定义
+
     Args:
-        queryset: 施工单查询集
-        filename: 文件名（可选）
-    
-    Returns:
-        HttpResponse: Excel 文件响应
+        sheet_title: 工作表名称
+        headers: 表头
+        column_widths: 列宽
+        fields: values_list 读取的字段（含跨表字段）
+        build_row: 将 values_list 元组转换为单元格值列表的函数
     """
+
+    def __init__(self, sheet_title, headers, column_widths, fields, build_row):
+        self.sheet_title = sheet_title
+        self.headers = headers
+        self.column_widths = column_widths
+        self.fields = fields
+        self.build_row = build_row
+
+    def iter_rows(self, queryset):
+        """分块读取导出需要的列"""
+        values = queryset.prefetch_related(None).values_list(*self.fields)
+        for values_row in values.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield self.build_row(values_row)
+
+    def write(self, queryset, target):
+        """以只写模式生成工作簿并保存到 target（路径或文件对象）"""
+        wb = Workbook(write_only=True)
+        register_named_styles(wb)
+        ws = wb.create_sheet(self.sheet_title)
+
+        # 列宽和冻结首行需在写入行之前设置
+        for col_num, width in enumerate(self.column_widths, 1):
+            ws.column_dimensions[get_column_letter(col_num)].width = width
+        ws.freeze_panes = 'A2'
+
+        def styled_row(values, style_name):
+            row = []
+            for value in values:
+                cell = WriteOnlyCell(ws, value=value)
+                cell.style = style_name
+                row.append(cell)
+            return row
+
+        ws.append(styled_row(self.headers, HEADER_STYLE_NAME))
+        for values in self.iter_rows(queryset):
+            ws.append(styled_row(values, DATA_STYLE_NAME))
+
+        wb.save(target)
+
+
+# 状态映射
+WORK_ORDER_STATUS_MAP = {
+    'pending': '待开始',
+    'in_progress': '进行中',
+    'paused': '已暂停',
+    'completed': '已完成',
+    'cancelled': '已取消'
+}
+
+APPROVAL_STATUS_MAP = {
+    'pending': '待审核',
+    'approved': '已审核',
+    'rejected': '已拒绝'
+}
+
+PRIORITY_MAP = {
+    'low': '低',
+    'normal': '普通',
+    'high': '高',
+    'urgent': '紧急'
+}
+
+TASK_STATUS_MAP = {
+    'pending': '待开始',
+    'in_progress': '进行中',
+    'completed': '已完成',
+    'cancelled': '已取消',
+    'skipped': '已跳过'
+}
+
+TASK_TYPE_MAP = {
+    'general': '通用',
+    'artwork': '制版',
+    'cutting': '开料',
+    'printing': '印刷',
+    'foiling': '烫金',
+    'embossing': '压凸',
+    'die_cutting': '模切',
+    'packaging': '包装'
+}
+
+
+def _build_work_order_row(values):
+    (order_number, customer_name, salesperson, created_by, created_at, order_date,
+     delivery_date, order_status, approval_status, priority, notes) = values
+    return [
+        order_number,
+        customer_name or '',
+        salesperson or '',
+        created_by or '',
+        _format_datetime(created_at),
+        _format_date(order_date),
+        _format_date(delivery_date),
+        WORK_ORDER_STATUS_MAP.get(order_status, order_status),
+        APPROVAL_STATUS_MAP.get(approval_status, approval_status),
+        PRIORITY_MAP.get(priority, priority),
+        notes or '',
+    ]
+
+
+def _build_task_row(values):
+    (order_number, process_name, task_type, work_content, department_name, operator_name,
+     production_quantity, quantity_completed, quantity_defective, task_status,
+     created_at, updated_at, production_requirements) = values
+    return [
+        order_number,
+        process_name or '',
+        TASK_TYPE_MAP.get(task_type, task_type),
+        work_content or '',
+        department_name or '',
+        operator_name or '',
+        production_quantity or '',
+        quantity_completed or 0,
+        quantity_defective or 0,
+        TASK_STATUS_MAP.get(task_status, task_status),
+        _format_datetime(created_at),
+        _format_datetime(updated_at),
+        production_requirements or '',
+    ]
+
+
+WORK_ORDER_EXPORT = ExcelExportSpec(
+    sheet_title="施工单列表",
+    headers=[
+        '施工单号', '客户名称', '业务员', '创建人', '创建时间', '订单日期',
+        '交货日期', '状态', '审核状态', '优先级', '备注'
+    ],
+    column_widths=[18, 20, 12, 12, 20, 12, 12, 10, 10, 10, 30],
+    fields=(
+        'order_number', 'customer__name', 'customer__salesperson__username',
+        'created_by__username', 'created_at', 'order_date', 'delivery_date',
+        'status', 'approval_status', 'priority', 'notes',
+    ),
+    build_row=_build_work_order_row,
+)
+
+TASK_EXPORT = ExcelExportSpec(
+    sheet_title="任务列表",
+    headers=[
+        '施工单号', '工序', '任务类型', '工作内容', '分派部门', '分派操作员',
+        '生产数量', '完成数量', '不良品数量', '状态', '创建时间', '更新时间', '备注'
+    ],
+    column_widths=[18, 15, 10, 30, 15, 12, 12, 12, 12, 10, 20, 20, 30],
+    fields=(
+        'work_order_process__work_order__order_number', 'work_order_process__process__name',
+        'task_type', 'work_content', 'assigned_department__name',
+        'assigned_operator__username', 'production_quantity', 'quantity_completed',
+        'quantity_defective', 'status', 'created_at', 'updated_at',
+        'production_requirements',
+    ),
+    build_row=_build_task_row,
+)
+
+
+class ExcelExportJob:
+    """
+    后台 Excel 导出任务
+
+    任务状态保存在缓存中（export_job:{job_id}），文件写入 EXPORT_FILE_DIR；
+    状态过期（TIMEOUT）后文件无法再下载，由 cleanup_expired_files 删除。
+    """
+
+    CACHE_PREFIX = 'export_job'
+    TIMEOUT = settings.CACHE_TIMEOUTS['DAY']
+
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    SPECS = {
+        'work_orders': WORK_ORDER_EXPORT,
+        'tasks': TASK_EXPORT,
+    }
+
+    def __init__(self, job_id, spec_name, queryset, filename, user_id):
+        self.job_id = job_id
+        self.spec_name = spec_name
+        self.queryset = queryset
+        self.filename = filename
+        self.user_id = user_id
+
+    @classmethod
+    def _key(cls, job_id):
+        return f'{cls.CACHE_PREFIX}:{job_id}'
+
+    @staticmethod
+    def export_dir():
+        export_dir = getattr(
+            settings,
+            'EXPORT_FILE_DIR',
+            os.path.join(tempfile.gettempdir(), 'workorder_exports'),
+        )
+        os.makedirs(export_dir, exist_ok=True)
+        return export_dir
+
+    @classmethod
+    def cleanup_expired_files(cls, max_age=None):
+        """
+        删除超过保留时间的导出文件
+
+        Args:
+            max_age: 保留秒数，默认与任务状态的缓存时间相同
+
+        Returns:
+            int: 删除的文件数
+        """
+        max_age = cls.TIMEOUT if max_age is None else max_age
+        cutoff = timezone.now().timestamp() - max_age
+        removed = 0
+        with os.scandir(cls.export_dir()) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.xlsx') or not entry.is_file():
+                    continue
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    # 并发清理已删除
+                    continue
+        if removed:
+            logger.info(f"已清理过期导出文件: {removed} 个")
+        return removed
+
+    @classmethod
+    def get_status(cls, job_id):
+        return cache.get(cls._key(job_id))
+
+    def _set_status(self, job_status, **extra):
+        state = {
+            'job_id': self.job_id,
+            'status': job_status,
+            'filename': self.filename,
+            'user_id': self.user_id,
+            'updated_at': timezone.now().isoformat(),
+        }
+        state.update(extra)
+        cache.set(self._key(self.job_id), state, self.TIMEOUT)
+        return state
+
+    @classmethod
+    def submit(cls, spec_name, queryset, filename, user):
+        """创建后台导出任务，事务提交后在后台线程执行"""
+        job = cls(
+            job_id=uuid.uuid4().hex,
+            spec_name=spec_name,
+            queryset=queryset,
+            filename=filename,
+            user_id=getattr(user, 'id', None),
+        )
+        state = job._set_status(cls.STATUS_PENDING)
+        try:
+            cls.cleanup_expired_files()
+        except OSError as exc:
+            logger.warning(f"清理过期导出文件失败: {exc}")
+        thread = threading.Thread(
+            target=job._run_in_thread, name=f'excel-export-{job.job_id}', daemon=True
+        )
+        transaction.on_commit(thread.start)
+        return state
+
+    def run(self):
+        """写入导出文件（在后台线程中执行）"""
+        file_path = os.path.join(self.export_dir(), f'{self.job_id}.xlsx')
+        self._set_status(self.STATUS_PROCESSING)
+        try:
+            self.SPECS[self.spec_name].write(self.queryset, file_path)
+            self._set_status(
+                self.STATUS_COMPLETED,
+                file_path=file_path,
+                file_size=os.path.getsize(file_path),
+            )
+            logger.info(f"后台导出完成: {self.job_id} ({self.filename})")
+        except Exception as exc:
+            self._set_status(self.STATUS_FAILED, error=str(exc))
+            logger.error(f"后台导出失败: {self.job_id}, 错误: {exc}", exc_info=True)
+
+    def _run_in_thread(self):
+        try:
+            self.run()
+        finally:
+            # 后台线程持有独立的数据库连接，结束时释放
+            connections.close_all()
+
+
+def _export_excel(spec_name, queryset, filename, user=None):
+    """导出入口：小数据量直接流式返回，大数据量转为后台任务"""
     if not OPENPYXL_AVAILABLE:
-        from django.http import HttpResponse
         return HttpResponse(
             'Excel 导出功能需要安装 openpyxl 库。请运行: pip install openpyxl',
             status=500,
             content_type='text/plain; charset=utf-8'
         )
-    
+
+    threshold = getattr(settings, 'EXCEL_EXPORT_BACKGROUND_THRESHOLD', None)
+    if threshold and user is not None and queryset.count() > threshold:
+        state = ExcelExportJob.submit(spec_name, queryset, filename, user)
+        return APIResponse.success(
+            data={
+                'job_id': state['job_id'],
+                'status': state['status'],
+                'download_url': f"/api/v1/export-jobs/{state['job_id']}/download/",
+            },
+            message='导出数据量较大，已转为后台任务',
+            code=status.HTTP_202_ACCEPTED,
+        )
+
+    # 只写模式生成到临时文件（匿名文件，关闭即删除），再分块流式返回
+    temp_file = tempfile.TemporaryFile()
+    ExcelExportJob.SPECS[spec_name].write(queryset, temp_file)
+    temp_file.seek(0)
+    return FileResponse(
+        temp_file,
+        as_attachment=True,
+        filename=filename,
+        content_type=EXCEL_CONTENT_TYPE,
+    )
+
+
+def export_work_orders(queryset, filename=None, user=None):
+    """
+    导出施工单列表到 Excel
+
+    Args:
+        queryset: 施工单查询集
+        filename: 文件名（可选）
+        user: 当前用户；传入时超过阈值的导出转为后台任务
+
+    Returns:
+        FileResponse: Excel 文件流式响应（后台任务时返回任务句柄）
+    """
     if filename is None:
         filename = f'施工单列表_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "施工单列表"
-    
-    # 表头
-    headers = [
-        '施工单号', '客户名称', '业务员', '创建人', '创建时间', '订单日期', 
-        '交货日期', '状态', '审核状态', '优先级', '备注'
-    ]
-    
-    # 写入表头
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        style_header_cell(cell)
-    
-    # 状态映射
-    status_map = {
-        'pending': '待开始',
-        'in_progress': '进行中',
-        'paused': '已暂停',
-        'completed': '已完成',
-        'cancelled': '已取消'
-    }
-    
-    approval_status_map = {
-        'pending': '待审核',
-        'approved': '已审核',
-        'rejected': '已拒绝'
-    }
-    
-    priority_map = {
-        'low': '低',
-        'normal': '普通',
-        'high': '高',
-        'urgent': '紧急'
-    }
-    
-    # 写入数据
-    for row_num, work_order in enumerate(queryset, 2):
-        ws.cell(row=row_num, column=1, value=work_order.order_number)
-        ws.cell(row=row_num, column=2, value=work_order.customer.name if work_order.customer else '')
-        ws.cell(row=row_num, column=3, value=work_order.customer.salesperson.username if work_order.customer and work_order.customer.salesperson else '')
-        ws.cell(row=row_num, column=4, value=work_order.created_by.username if work_order.created_by else '')
-        ws.cell(row=row_num, column=5, value=work_order.created_at.strftime('%Y-%m-%d %H:%M:%S') if work_order.created_at else '')
-        ws.cell(row=row_num, column=6, value=work_order.order_date.strftime('%Y-%m-%d') if work_order.order_date else '')
-        ws.cell(row=row_num, column=7, value=work_order.delivery_date.strftime('%Y-%m-%d') if work_order.delivery_date else '')
-        ws.cell(row=row_num, column=8, value=status_map.get(work_order.status, work_order.status))
-        ws.cell(row=row_num, column=9, value=approval_status_map.get(work_order.approval_status, work_order.approval_status))
-        ws.cell(row=row_num, column=10, value=priority_map.get(work_order.priority, work_order.priority))
-        ws.cell(row=row_num, column=11, value=work_order.notes or '')
-        
-        # 设置数据单元格样式
-        for col_num in range(1, len(headers) + 1):
-            style_data_cell(ws.cell(row=row_num, column=col_num))
-    
-    # 调整列宽
-    column_widths = [18, 20, 12, 12, 20, 12, 12, 10, 10, 10, 30]
-    for col_num, width in enumerate(column_widths, 1):
-        ws.column_dimensions[get_column_letter(col_num)].width = width
-    
-    # 冻结首行
-    ws.freeze_panes = 'A2'
-    
-    # 创建响应
-    response = create_excel_response(filename)
-    wb.save(response)
-    return response
-
-
-def export_tasks(queryset, filename=None):
+    return _export_excel('work_orders', queryset, filename, user)
+
+
+def export_tasks(queryset, filename=None, user=None):
     """
     导出任务列表到 Excel
-    
+
     Args:
         queryset: 任务查询集
         filename: 文件名（可选）
-    
+        user: 当前用户；传入时超过阈值的导出转为后台任务
+
     Returns:
-        HttpResponse: Excel 文件响应
+        FileResponse: Excel 文件流式响应（后台任务时返回任务句柄）
     """
-    if not OPENPYXL_AVAILABLE:
-        from django.http import HttpResponse
-        return HttpResponse(
-            'Excel 导出功能需要安装 openpyxl 库。请运行: pip install openpyxl',
-            status=500,
-            content_type='text/plain; charset=utf-8'
-        )
-    
     if filename is None:
         filename = f'任务列表_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "任务列表"
-    
-    # 表头
-    headers = [
-        '施工单号', '工序', '任务类型', '工作内容', '分派部门', '分派操作员',
-        '生产数量', '完成数量', '不良品数量', '状态', '创建时间', '更新时间', '备注'
-    ]
-    
-    # 写入表头
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        style_header_cell(cell)
-    
-    # 状态映射
-    status_map = {
-        'pending': '待开始',
-        'in_progress': '进行中',
-        'completed': '已完成',
-        'cancelled': '已取消',
-        'skipped': '已跳过'
-    }
-    
-    task_type_map = {
-        'general': '通用',
-        'artwork': '制版',
-        'cutting': '开料',
-        'printing': '印刷',
-        'foiling': '烫金',
-        'embossing': '压凸',
-        'die_cutting': '模切',
-        'packaging': '包装'
-    }
-    
-    # 写入数据
-    for row_num, task in enumerate(queryset, 2):
-        work_order = task.work_order_process.work_order
-        process = task.work_order_process.process
-        
-        ws.cell(row=row_num, column=1, value=work_order.order_number)
-        ws.cell(row=row_num, column=2, value=process.name if process else '')
-        ws.cell(row=row_num, column=3, value=task_type_map.get(task.task_type, task.task_type))
-        ws.cell(row=row_num, column=4, value=task.work_content or '')
-        ws.cell(row=row_num, column=5, value=task.assigned_department.name if task.assigned_department else '')
-        ws.cell(row=row_num, column=6, value=task.assigned_operator.username if task.assigned_operator else '')
-        ws.cell(row=row_num, column=7, value=task.production_quantity or '')
-        ws.cell(row=row_num, column=8, value=task.quantity_completed or 0)
-        ws.cell(row=row_num, column=9, value=task.quantity_defective or 0)
-        ws.cell(row=row_num, column=10, value=status_map.get(task.status, task.status))
-        ws.cell(row=row_num, column=11, value=task.created_at.strftime('%Y-%m-%d %H:%M:%S') if task.created_at else '')
-        ws.cell(row=row_num, column=12, value=task.updated_at.strftime('%Y-%m-%d %H:%M:%S') if task.updated_at else '')
-        ws.cell(row=row_num, column=13, value=task.production_requirements or '')
-        
-        # 设置数据单元格样式
-        for col_num in range(1, len(headers) + 1):
-            style_data_cell(ws.cell(row=row_num, column=col_num))
-    
-    # 调整列宽
-    column_widths = [18, 15, 10, 30, 15, 12, 12, 12, 12, 10, 20, 20, 30]
-    for col_num, width in enumerate(column_widths, 1):
-        ws.column_dimensions[get_column_letter(col_num)].width = width
-    
-    # 冻结首行
-    ws.freeze_panes = 'A2'
-    
-    # 创建响应
-    response = create_excel_response(filename)
-    wb.save(response)
-    return response
-
+    return _export_excel('tasks', queryset, filename, user)
@@ -58,6 +58,11 @@ class Command(BaseCommand):
             dest='process_exports',
             help='处理待导出的审计日志任务'
         )
+        parser.add_argument(
+            '--resume-export',
+            dest='resume_export',
+            help='从断点继续执行中断的导出任务（导出任务ID）'
+        )
         parser.add_argument(
             '--limit',
             type=int,
@@ -85,6 +90,9 @@ class Command(BaseCommand):
         if options['process_exports']:
             self.process_exports(limit=options.get('limit') or 10)
 
+        if options['resume_export']:
+            self.resume_export(options['resume_export'])
+
     def cleanup_logs(self):
         """清理过期的审计日志"""
         settings = AuditLogSettings.get_settings()
@@ -160,3 +168,12 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.SUCCESS(f'✓ 已处理导出任务（最多 {limit} 条）')
         )
+
+    def resume_export(self, export_id):
+        """从断点继续导出任务"""
+        from workorder.services.audit_export_service import AuditExportService
+
+        AuditExportService().perform_export(export_id, resume=True)
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ 已继续导出任务 {export_id}')
+        )
@@ -0,0 +1,113 @@
+"""
+分页性能基准
+
+对比页码分页（CustomPagination）与游标分页（KeysetCursorPagination）在深分页
+（默认第 500 页）上的耗时和查询数：页码分页执行 COUNT(*) + OFFSET，
+游标分页直接从目标页前一条记录的 (created_at, id) 开始读取。
+
+用法：
+    python manage.py benchmark_pagination --model task --page 500 --page-size 20
+    python manage.py benchmark_pagination --model auditlog --repeat 10 --format json
+"""
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+
+from workorder.models.audit import AuditLog
+from workorder.models.core import WorkOrder, WorkOrderTask
+from workorder.models.system import Notification
+from workorder.pagination import CustomPagination
+
+MODELS = {
+    'task': WorkOrderTask,
+    'workorder': WorkOrder,
+    'notification': Notification,
+    'auditlog': AuditLog,
+}
+
+
+class Command(BaseCommand):
+    help = '对比页码分页与游标分页的深分页耗时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(MODELS), default='task', help='测试的数据表')
+        parser.add_argument('--page', type=int, default=500, help='目标页码')
+        parser.add_argument('--page-size', type=int, default=20, help='每页数量')
+        parser.add_argument('--repeat', type=int, default=5, help='每种分页重复次数（取中位数）')
+        parser.add_argument('--format', choices=['table', 'json'], default='table', help='输出格式')
+
+    def handle(self, *args, **options):
+        model = MODELS[options['model']]
+        page = options['page']
+        page_size = options['page_size']
+        repeat = max(options['repeat'], 1)
+        if page < 1 or page_size < 1:
+            raise CommandError('页码和每页数量必须大于 0')
+
+        queryset = model.objects.all()
+        offset = (page - 1) * page_size
+        # 游标取目标页前一条记录（不计入耗时），等价于从第 1 页逐页翻到目标页
+        anchor = None
+        if offset:
+            anchor = queryset.order_by('-created_at', '-pk')[offset - 1:offset].first()
+        if offset and anchor is None:
+            raise CommandError(f'数据不足：{model.__name__} 少于 {offset + 1} 条，无法测试第 {page} 页')
+
+        page_params = {'page': page, 'page_size': page_size}
+        cursor_params = {'pagination': 'cursor', 'page_size': page_size}
+        if anchor is not None:
+            cursor_params['cursor'] = CustomPagination.cursor_pagination_class().encode_cursor(
+                anchor, reverse=False
+            )
+
+        results = {
+            'model': model.__name__,
+            'page': page,
+            'page_size': page_size,
+            'page_number': self.measure(queryset, page_params, repeat),
+            'cursor': self.measure(queryset, cursor_params, repeat),
+        }
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"=== {results['model']} 第 {page} 页（每页 {page_size} 条，重复 {repeat} 次）==="
+        ))
+        for label, key in (('页码分页', 'page_number'), ('游标分页', 'cursor')):
+            item = results[key]
+            self.stdout.write(
+                f"{label}: 中位数 {item['median_ms']:.2f}ms，最大 {item['max_ms']:.2f}ms，"
+                f"查询 {item['query_count']} 次，返回 {item['row_count']} 条"
+            )
+        if results['cursor']['median_ms'] > 0:
+            speedup = results['page_number']['median_ms'] / results['cursor']['median_ms']
+            self.stdout.write(f'游标分页提速: {speedup:.1f}x')
+
+    def measure(self, queryset, params, repeat):
+        """执行分页 repeat 次，返回耗时中位数、最大值、查询数和返回行数"""
+        factory = RequestFactory()
+        timings = []
+        query_count = row_count = 0
+        for _ in range(repeat):
+            request = Request(factory.get('/benchmark/', params))
+            paginator = CustomPagination()
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                rows = paginator.paginate_queryset(queryset, request)
+                timings.append((time.perf_counter() - start) * 1000)
+            query_count = len(ctx.captured_queries)
+            row_count = len(rows)
+        return {
+            'median_ms': round(statistics.median(timings), 3),
+            'max_ms': round(max(timings), 3),
+            'query_count': query_count,
+            'row_count': row_count,
+        }
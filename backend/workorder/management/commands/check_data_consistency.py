@@ -14,6 +14,18 @@ class Command(BaseCommand):
             help='检查类型: stock(库存), quantity(数量), material(物料), all(全部)'
         )
         
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='只检查上次运行之后有变动的对象'
+        )
+        
+        parser.add_argument(
+            '--take-snapshots',
+            action='store_true',
+            help='库存检查后把较早的库存日志汇总进台账快照'
+        )
+        
         parser.add_argument(
             '--fix',
             action='store_true',
@@ -30,13 +42,18 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         check_type = options['check_type']
+        incremental = options['incremental']
+        take_snapshots = options['take_snapshots']
         auto_fix = options['fix']
         fix_type = options['fix_type']
         
-        self.stdout.write(f"开始数据一致性检查，类型: {check_type}")
+        mode = '增量' if incremental else '全量'
+        self.stdout.write(f"开始数据一致性检查，类型: {check_type}，模式: {mode}")
         
         # 执行检查
-        check_results = DataConsistencyManager.run_consistency_check(check_type)
+        check_results = DataConsistencyManager.run_consistency_check(
+            check_type, incremental=incremental, take_snapshots=take_snapshots
+        )
         
         # 显示检查结果
         self._display_check_results(check_results)
@@ -56,6 +73,11 @@ class Command(BaseCommand):
         
         for check_type, data in results['results'].items():
             self.stdout.write(f"\n=== {check_type.upper()} 检查结果 ===")
+            since = data.get('since')
+            self.stdout.write(
+                f"耗时: {data['duration_ms']} ms"
+                + (f"（检查 {since} 之后的变动）" if since else "")
+            )
             
             if check_type == 'stock':
                 self.stdout.write(f"总产品数: {data['total_products']}")
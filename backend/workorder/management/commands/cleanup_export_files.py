@@ -0,0 +1,32 @@
+"""
+过期导出文件清理命令
+
+删除 EXPORT_FILE_DIR 中超过保留时间的后台导出文件，适合放在定时任务中执行。
+提交新的后台导出任务时也会顺带清理，本命令用于长时间没有新导出的情况。
+
+用法:
+    python manage.py cleanup_export_files
+    python manage.py cleanup_export_files --hours 6
+"""
+
+from django.core.management.base import BaseCommand
+
+from workorder.export_utils import ExcelExportJob
+
+
+class Command(BaseCommand):
+    help = '删除过期的后台导出文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=float,
+            default=None,
+            help='保留最近多少小时的文件（默认与导出任务状态的有效期相同）'
+        )
+
+    def handle(self, *args, **options):
+        hours = options['hours']
+        max_age = None if hours is None else hours * 3600
+        removed = ExcelExportJob.cleanup_expired_files(max_age)
+        self.stdout.write(self.style.SUCCESS(f'已删除过期导出文件 {removed} 个'))
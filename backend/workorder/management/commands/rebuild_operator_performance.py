@@ -0,0 +1,21 @@
+"""
+操作员绩效统计重建命令
+
+按历史已完成任务重建操作员绩效统计（OperatorPerformance）。统计在任务完成时增量维护，
+本命令只在首次上线或历史数据被修正后执行。
+
+用法:
+    python manage.py rebuild_operator_performance
+"""
+
+from django.core.management.base import BaseCommand
+
+from workorder.services.operator_performance import OperatorPerformanceStore
+
+
+class Command(BaseCommand):
+    help = '按历史已完成任务重建操作员绩效统计'
+
+    def handle(self, *args, **options):
+        rows = OperatorPerformanceStore.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'操作员绩效统计已重建：共 {rows} 行'))
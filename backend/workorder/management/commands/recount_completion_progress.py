@@ -0,0 +1,23 @@
+"""
+完成计数重建命令
+
+按任务表重建工序 / 施工单完成计数。计数在任务变化时增量维护，缺失的计数行会在
+读取时自动补齐；本命令只在计数与任务数据不一致（如直接修改数据库）时用于修复。
+
+用法:
+    python manage.py recount_completion_progress
+"""
+
+from django.core.management.base import BaseCommand
+
+from workorder.services.completion_progress import CompletionProgress
+
+
+class Command(BaseCommand):
+    help = '按任务表重建工序和施工单完成计数'
+
+    def handle(self, *args, **options):
+        processes, orders = CompletionProgress.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'完成计数已重建：工序 {processes} 行，施工单 {orders} 行')
+        )
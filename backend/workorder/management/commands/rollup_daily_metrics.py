@@ -0,0 +1,48 @@
+"""
+业务指标日汇总命令
+
+预先补齐（或重建）已结束自然日的业务指标日汇总，适合放在每日凌晨的定时任务中执行。
+趋势接口会在查询时自动补齐缺失的日期，本命令不是必需的。
+
+用法:
+    python manage.py rollup_daily_metrics --days 365
+    python manage.py rollup_daily_metrics --days 30 --rebuild
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from workorder.services.metrics_timeseries import TimeSeriesMetrics
+
+
+class Command(BaseCommand):
+    help = '补齐或重建业务指标日汇总'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=1,
+            help='汇总截至昨天的最近多少天（默认 1，即只汇总昨天）'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='重新统计并覆盖已有的汇总行（历史数据被修正后使用）'
+        )
+
+    def handle(self, *args, **options):
+        end_date = timezone.localdate() - timedelta(days=1)
+        start_date = end_date - timedelta(days=max(options['days'], 1) - 1)
+
+        if options['rebuild']:
+            rollups = TimeSeriesMetrics.fill_rollups(start_date, end_date, rebuild=True)
+        else:
+            # 只补齐缺失的日期
+            rollups = TimeSeriesMetrics.daily(start_date, end_date)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'业务指标日汇总：{start_date} ~ {end_date}，共 {len(rollups)} 天')
+        )
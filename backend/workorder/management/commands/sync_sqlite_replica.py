@@ -0,0 +1,61 @@
+"""
+SQLite 副本同步命令
+
+本地用两个 SQLite 文件模拟主库和只读副本时（见 settings.py 中的 DATABASE_REPLICA_URL），
+用 SQLite 在线备份把主库复制到副本文件。两次同步之间写入的数据在副本上不可见，
+相当于复制延迟，可用于验证读己之写。
+
+用法:
+    python manage.py sync_sqlite_replica
+    python manage.py sync_sqlite_replica --interval 5   # 每 5 秒同步一次
+"""
+
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = '把 SQLite 主库复制到 SQLite 只读副本文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='持续同步的间隔秒数，为 0 时只同步一次'
+        )
+
+    def handle(self, *args, **options):
+        alias = settings.DATABASE_REPLICA_ALIAS
+        if alias is None:
+            raise CommandError('未配置只读副本（DATABASE_REPLICA_URL）')
+
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        replica = settings.DATABASES[alias]
+        for name, database in (('主库', primary), ('副本', replica)):
+            if database['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError(f'{name}不是 SQLite 数据库，请使用数据库自身的复制')
+        if str(primary['NAME']) == str(replica['NAME']):
+            raise CommandError('主库和副本是同一个文件')
+
+        interval = options['interval']
+        while True:
+            self._copy(primary['NAME'], replica['NAME'])
+            self.stdout.write(self.style.SUCCESS(f"已同步 {primary['NAME']} -> {replica['NAME']}"))
+            if interval <= 0:
+                break
+            time.sleep(interval)
+
+    @staticmethod
+    def _copy(source_path, target_path):
+        source = sqlite3.connect(str(source_path))
+        target = sqlite3.connect(str(target_path))
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
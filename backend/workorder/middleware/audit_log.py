@@ -22,16 +22,23 @@ class AuditLogMiddleware(MiddlewareMixin):
     """
     审计日志中间件
 
-    将当前请求存储在线程本地存储中，供信号处理器访问
+    将当前请求存储在线程本地存储中，供信号处理器访问；
+    事务外产生的审计日志按请求收集，在响应时批量写入
     """
 
     def process_request(self, request):
         """存储当前请求"""
+        from workorder.services.audit_writer import AuditLogWriter
+
         _thread_locals.request = request
+        AuditLogWriter.start_request()
         return None
 
     def process_response(self, request, response):
         """清理请求"""
+        from workorder.services.audit_writer import AuditLogWriter
+
+        AuditLogWriter.finish_request()
         if hasattr(_thread_locals, 'request'):
             delattr(_thread_locals, 'request')
         return response
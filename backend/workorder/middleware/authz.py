@@ -0,0 +1,22 @@
+"""
+授权画像中间件
+
+为请求提供 request.authz（当前用户的授权画像，见 AuthzProfile），首次访问时才加载
+"""
+
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+
+class AuthzProfileMiddleware(MiddlewareMixin):
+    """授权画像中间件"""
+
+    def process_request(self, request):
+        from workorder.permission_utils import AuthzProfile
+
+        # DRF 在视图中完成 JWT 认证后才设置 request.user，因此延迟到首次访问时加载，
+        # 应在认证之后（视图、权限类中）访问
+        request.authz = SimpleLazyObject(
+            lambda: AuthzProfile.for_user(getattr(request, 'user', None))
+        )
+        return None
@@ -0,0 +1,25 @@
+"""
+只读副本路由中间件
+
+按请求重置副本路由状态；请求写过主库时，让该用户在粘滞期内的后续请求读主库
+"""
+
+from django.utils.deprecation import MiddlewareMixin
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """只读副本路由中间件"""
+
+    def process_request(self, request):
+        from workorder.db_router import ReplicaRouter
+
+        ReplicaRouter.start_request()
+        return None
+
+    def process_response(self, request, response):
+        from workorder.db_router import ReplicaRouter
+
+        if ReplicaRouter.finish_request():
+            # DRF 认证后的用户会同步到 Django 请求上
+            ReplicaRouter.pin_to_primary(getattr(request, 'user', None))
+        return response
@@ -0,0 +1,23 @@
+"""
+通知发件箱中间件
+
+事务外产生的通知按请求收集，在响应时去重合并后一次写入并推送
+"""
+
+from django.utils.deprecation import MiddlewareMixin
+
+
+class NotificationOutboxMiddleware(MiddlewareMixin):
+    """通知发件箱中间件"""
+
+    def process_request(self, request):
+        from workorder.services.notification_outbox import NotificationOutbox
+
+        NotificationOutbox.start_request()
+        return None
+
+    def process_response(self, request, response):
+        from workorder.services.notification_outbox import NotificationOutbox
+
+        NotificationOutbox.finish_request()
+        return response
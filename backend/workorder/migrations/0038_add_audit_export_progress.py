@@ -0,0 +1,33 @@
+# Generated by Django 4.2.11 on 2026-10-18 02:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workorder', '0037_add_audit_log_models'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlogexport',
+            name='compressed',
+            field=models.BooleanField(default=False, verbose_name='gzip 压缩'),
+        ),
+        migrations.AddField(
+            model_name='auditlogexport',
+            name='cursor',
+            field=models.JSONField(blank=True, default=dict, verbose_name='导出游标'),
+        ),
+        migrations.AddField(
+            model_name='auditlogexport',
+            name='file_format',
+            field=models.CharField(choices=[('csv', 'CSV'), ('ndjson', 'NDJSON')], default='csv', max_length=10, verbose_name='导出格式'),
+        ),
+        migrations.AddField(
+            model_name='auditlogexport',
+            name='processed_count',
+            field=models.IntegerField(default=0, verbose_name='已导出记录数'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.11 on 2026-10-18 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workorder', '0038_add_audit_export_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(blank=True, max_length=20, verbose_name='单号前缀')),
+                ('period', models.CharField(help_text='如 yyyymm 或 yyyymmdd', max_length=20, verbose_name='周期')),
+                ('last_value', models.BigIntegerField(default=0, verbose_name='已分配序号')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '单据编号计数器',
+                'verbose_name_plural': '单据编号计数器管理',
+                'unique_together': {('prefix', 'period')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.11 on 2026-10-18 03:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workorder', '0039_add_document_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMetricsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='日期')),
+                ('completed_orders', models.IntegerField(default=0, verbose_name='完成施工单数')),
+                ('completed_tasks', models.IntegerField(default=0, verbose_name='完成任务数')),
+                ('completed_quantity', models.IntegerField(default=0, verbose_name='报工完成数量')),
+                ('defective_quantity', models.IntegerField(default=0, verbose_name='报工不良品数量')),
+                ('defect_tasks', models.IntegerField(default=0, verbose_name='有不良品的任务数')),
+                ('completed_processes', models.IntegerField(default=0, verbose_name='完成工序数')),
+                ('process_hours', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='工序耗时合计(小时)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '业务指标日汇总',
+                'verbose_name_plural': '业务指标日汇总',
+                'ordering': ['date'],
+            },
+        ),
+    ]
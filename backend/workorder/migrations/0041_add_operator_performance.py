@@ -0,0 +1,37 @@
+# Generated by Django 4.2.11 on 2026-10-18 03:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('workorder', '0040_add_daily_metrics_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperatorPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_type', models.CharField(blank=True, max_length=20, verbose_name='任务类型')),
+                ('task_count', models.IntegerField(default=0, verbose_name='完成任务数')),
+                ('success_count', models.IntegerField(default=0, verbose_name='无不良品完成数')),
+                ('duration_count', models.IntegerField(default=0, verbose_name='耗时样本数')),
+                ('duration_mean', models.FloatField(default=0, verbose_name='平均耗时(小时)')),
+                ('duration_m2', models.FloatField(default=0, help_text='方差 = 离差平方和 / 耗时样本数', verbose_name='耗时离差平方和')),
+                ('quantity_completed', models.BigIntegerField(default=0, verbose_name='累计完成数量')),
+                ('quantity_defective', models.BigIntegerField(default=0, verbose_name='累计不良品数量')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('operator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performance_stats', to=settings.AUTH_USER_MODEL, verbose_name='操作员')),
+            ],
+            options={
+                'verbose_name': '操作员绩效统计',
+                'verbose_name_plural': '操作员绩效统计',
+                'unique_together': {('operator', 'task_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.11 on 2026-10-18 03:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workorder', '0041_add_operator_performance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkOrderProcessProgress',
+            fields=[
+                ('work_order_process', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='progress', serialize=False, to='workorder.workorderprocess', verbose_name='工序')),
+                ('tasks_total', models.IntegerField(default=0, verbose_name='任务总数')),
+                ('tasks_done', models.IntegerField(default=0, help_text='状态为已完成且完成数量达到生产数量的任务', verbose_name='已完成任务数')),
+            ],
+            options={
+                'verbose_name': '工序完成计数',
+                'verbose_name_plural': '工序完成计数',
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkOrderProgress',
+            fields=[
+                ('work_order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='progress', serialize=False, to='workorder.workorder', verbose_name='施工单')),
+                ('tasks_total', models.IntegerField(default=0, verbose_name='任务总数')),
+                ('tasks_completed', models.IntegerField(default=0, verbose_name='已完成任务数')),
+            ],
+            options={
+                'verbose_name': '施工单完成计数',
+                'verbose_name_plural': '施工单完成计数',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.11 on 2026-10-18 04:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workorder', '0042_add_completion_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStockSnapshot',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stock_snapshot', serialize=False, to='workorder.product', verbose_name='产品')),
+                ('balance', models.IntegerField(default=0, verbose_name='台账余额')),
+                ('log_count', models.IntegerField(default=0, verbose_name='已汇总日志数')),
+                ('last_log_id', models.BigIntegerField(default=0, verbose_name='最后汇总的日志ID')),
+                ('taken_at', models.DateTimeField(auto_now=True, verbose_name='快照时间')),
+            ],
+            options={
+                'verbose_name': '产品库存快照',
+                'verbose_name_plural': '产品库存快照',
+            },
+        ),
+    ]
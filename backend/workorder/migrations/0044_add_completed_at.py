@@ -0,0 +1,43 @@
+# Generated by Django 4.2.11 on 2026-10-18 04:49
+
+from django.db import migrations, models
+from django.db.models import F, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_completed_at(apps, schema_editor):
+    """已完成的记录：任务取首条完成日志的时间，没有日志时与施工单一样取最后更新时间"""
+    WorkOrder = apps.get_model('workorder', 'WorkOrder')
+    WorkOrderTask = apps.get_model('workorder', 'WorkOrderTask')
+    TaskLog = apps.get_model('workorder', 'TaskLog')
+
+    WorkOrder.objects.filter(status='completed', completed_at__isnull=True).update(
+        completed_at=F('updated_at')
+    )
+    first_completed_log = TaskLog.objects.filter(
+        task=OuterRef('pk'), status_after='completed'
+    ).order_by().values('task').annotate(first=Min('created_at')).values('first')
+    WorkOrderTask.objects.filter(status='completed', completed_at__isnull=True).update(
+        completed_at=Coalesce(Subquery(first_completed_log), F('updated_at'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workorder', '0043_add_product_stock_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workorder',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='完成时间'),
+        ),
+        migrations.AddField(
+            model_name='workordertask',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='完成时间'),
+        ),
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.11 on 2026-10-18 05:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workorder', '0044_add_completed_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsistencyCheckRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('check_type', models.CharField(max_length=20, unique=True, verbose_name='检查类型')),
+                ('last_started_at', models.DateTimeField(verbose_name='上次开始时间')),
+                ('last_duration_ms', models.FloatField(default=0, verbose_name='上次耗时(毫秒)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '数据一致性检查记录',
+                'verbose_name_plural': '数据一致性检查记录',
+            },
+        ),
+    ]
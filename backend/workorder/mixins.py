@@ -167,3 +167,24 @@ class InventoryOperationMixin:
         except Exception as e:
             logger.error(f"库存调整失败: {str(e)}", exc_info=True)
             return False, f"库存调整失败: {str(e)}"
+
+
+class ReplicaReadMixin:
+    """只读副本混入类 - replica_actions 中的动作读取只读副本（见 workorder/db_router.py）"""
+
+    # 读取可发往副本的动作（统计、导出等只读接口）
+    replica_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        from workorder.db_router import ReplicaRouter
+
+        super().initial(request, *args, **kwargs)
+        # 认证之后开启，刚写过主库的用户在粘滞期内仍读主库
+        if self.action in self.replica_actions:
+            ReplicaRouter.enable_request_reads(request.user)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        from workorder.db_router import ReplicaRouter
+
+        ReplicaRouter.disable_request_reads()
+        return super().finalize_response(request, response, *args, **kwargs)
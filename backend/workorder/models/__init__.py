@@ -9,7 +9,7 @@ Models 模块
 - materials: 物料管理模型 (Material, Supplier, MaterialSupplier, etc.)
 - assets: 资产管理模型 (Artwork, Die, FoilingPlate, EmbossingPlate, etc.)
 - core: 核心业务模型 (WorkOrder, WorkOrderProcess, WorkOrderTask, etc.)
-- system: 系统管理模型 (WorkOrderApprovalLog, Notification, TaskAssignmentRule)
+- system: 系统管理模型 (WorkOrderApprovalLog, Notification, TaskAssignmentRule, DocumentSequence, DailyMetricsRollup, ConsistencyCheckRun, OperatorPerformance, WorkOrderProcessProgress, WorkOrderProgress)
 - sales: 销售管理模型 (SalesOrder, SalesOrderItem)
 """
 
@@ -77,9 +77,21 @@ from .products import (
     ProductGroupItem,
     ProductMaterial,
     ProductStockLog,
+    ProductStockSnapshot,
 )
 from .sales import SalesOrder, SalesOrderItem
-from .system import Notification, TaskAssignmentRule, UserProfile, WorkOrderApprovalLog
+from .system import (
+    ConsistencyCheckRun,
+    DailyMetricsRollup,
+    DocumentSequence,
+    Notification,
+    OperatorPerformance,
+    TaskAssignmentRule,
+    UserProfile,
+    WorkOrderApprovalLog,
+    WorkOrderProcessProgress,
+    WorkOrderProgress,
+)
 
 __all__ = [
     # 基础模型
@@ -94,6 +106,7 @@ __all__ = [
     "ProductGroupItem",
     "ProductMaterial",
     "ProductStockLog",
+    "ProductStockSnapshot",
     # 物料模型
     "Material",
     "Supplier",
@@ -123,6 +136,12 @@ __all__ = [
     "WorkOrderApprovalLog",
     "Notification",
     "TaskAssignmentRule",
+    "DocumentSequence",
+    "DailyMetricsRollup",
+    "ConsistencyCheckRun",
+    "OperatorPerformance",
+    "WorkOrderProcessProgress",
+    "WorkOrderProgress",
     # 销售模型
     "SalesOrder",
     "SalesOrderItem",
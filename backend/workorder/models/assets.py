@@ -13,10 +13,12 @@
 """
 
 from django.contrib.auth.models import User
-from django.db import models, transaction
+from django.db import models
 from django.db.models import Max
 from django.utils import timezone
 
+from .field_tracking import FieldTrackingMixin
+
 
 class _SignalSafeQuerySet(models.QuerySet):
     """禁止使用 update() 绕过 signals 的 QuerySet。"""
@@ -27,7 +29,7 @@ class _SignalSafeQuerySet(models.QuerySet):
         )
 
 
-class Artwork(models.Model):
+class Artwork(FieldTrackingMixin, models.Model):
     """图稿信息"""
 
     base_code = models.CharField(
@@ -121,32 +123,10 @@ class Artwork(models.Model):
     @classmethod
     def generate_base_code(cls):
         """生成图稿主编码：格式 ART + yyyymm + 3位自增序号"""
-        now = timezone.now()
-        prefix = f"ART{now.strftime('%Y%m')}"
-
-        with transaction.atomic():
-            # 查找该前缀下的最大序号（不考虑版本号）
-            last_artwork = (
-                cls.objects.filter(base_code__startswith=prefix)
-                .order_by("-base_code")
-                .select_for_update()
-                .first()
-            )
-
-            if (
-                last_artwork
-                and last_artwork.base_code
-                and len(last_artwork.base_code) >= 12
-            ):
-                try:
-                    last_number = int(last_artwork.base_code[9:])  # ART + yyyymm = 9位
-                    new_number = last_number + 1
-                except (ValueError, IndexError):
-                    new_number = 1
-            else:
-                new_number = 1
-
-            return f"{prefix}{new_number:03d}"
+        from ..services.sequence_service import SequenceService
+
+        period = timezone.now().strftime("%Y%m")
+        return SequenceService.next_number("ART", period, 3, cls, "base_code")
 
     @classmethod
     def get_next_version(cls, base_code):
@@ -192,7 +172,7 @@ class ArtworkProduct(models.Model):
         )
 
 
-class Die(models.Model):
+class Die(FieldTrackingMixin, models.Model):
     """刀模信息"""
 
     DIE_TYPE_CHOICES = [
@@ -277,27 +257,10 @@ class Die(models.Model):
     @classmethod
     def generate_code(cls):
         """生成刀模编码：格式 DIE + yyyymm + 3位自增序号"""
-        now = timezone.now()
-        prefix = f"DIE{now.strftime('%Y%m')}"
-
-        with transaction.atomic():
-            last_die = (
-                cls.objects.filter(code__startswith=prefix)
-                .order_by("-code")
-                .select_for_update()
-                .first()
-            )
-
-            if last_die and len(last_die.code) >= 12:
-                try:
-                    last_number = int(last_die.code[9:])  # DIE + yyyymm = 9位
-                    new_number = last_number + 1
-                except (ValueError, IndexError):
-                    new_number = 1
-            else:
-                new_number = 1
-
-            return f"{prefix}{new_number:03d}"
+        from ..services.sequence_service import SequenceService
+
+        period = timezone.now().strftime("%Y%m")
+        return SequenceService.next_number("DIE", period, 3, cls, "code")
 
     def save(self, *args, **kwargs):
         """保存时自动生成刀模编码"""
@@ -343,7 +306,7 @@ class DieProduct(models.Model):
         return f"{self.die.name} - {self.product.name} ({self.quantity}个)"
 
 
-class FoilingPlate(models.Model):
+class FoilingPlate(FieldTrackingMixin, models.Model):
     """烫金版信息"""
 
     FOILING_TYPE_CHOICES = [
@@ -407,27 +370,10 @@ class FoilingPlate(models.Model):
     @classmethod
     def generate_code(cls):
         """生成烫金版编码：格式 FP + yyyymm + 3位自增序号"""
-        now = timezone.now()
-        prefix = f"FP{now.strftime('%Y%m')}"
-
-        with transaction.atomic():
-            last_plate = (
-                cls.objects.filter(code__startswith=prefix)
-                .order_by("-code")
-                .select_for_update()
-                .first()
-            )
-
-            if last_plate and len(last_plate.code) >= 11:
-                try:
-                    last_number = int(last_plate.code[8:])  # FP + yyyymm = 8位
-                    new_number = last_number + 1
-                except (ValueError, IndexError):
-                    new_number = 1
-            else:
-                new_number = 1
-
-            return f"{prefix}{new_number:03d}"
+        from ..services.sequence_service import SequenceService
+
+        period = timezone.now().strftime("%Y%m")
+        return SequenceService.next_number("FP", period, 3, cls, "code")
 
     def save(self, *args, **kwargs):
         """保存时自动生成烫金版编码"""
@@ -464,7 +410,7 @@ class FoilingPlateProduct(models.Model):
         return f"{self.foiling_plate.name} - {self.product.name} ({self.quantity}个)"
 
 
-class EmbossingPlate(models.Model):
+class EmbossingPlate(FieldTrackingMixin, models.Model):
     """压凸版信息"""
 
     code = models.CharField("压凸版编码", max_length=50, unique=True, blank=True)
@@ -516,27 +462,10 @@ class EmbossingPlate(models.Model):
     @classmethod
     def generate_code(cls):
         """生成压凸版编码：格式 EP + yyyymm + 3位自增序号"""
-        now = timezone.now()
-        prefix = f"EP{now.strftime('%Y%m')}"
-
-        with transaction.atomic():
-            last_plate = (
-                cls.objects.filter(code__startswith=prefix)
-                .order_by("-code")
-                .select_for_update()
-                .first()
-            )
-
-            if last_plate and len(last_plate.code) >= 11:
-                try:
-                    last_number = int(last_plate.code[8:])  # EP + yyyymm = 8位
-                    new_number = last_number + 1
-                except (ValueError, IndexError):
-                    new_number = 1
-            else:
-                new_number = 1
-
-            return f"{prefix}{new_number:03d}"
+        from ..services.sequence_service import SequenceService
+
+        period = timezone.now().strftime("%Y%m")
+        return SequenceService.next_number("EP", period, 3, cls, "code")
 
     def save(self, *args, **kwargs):
         """保存时自动生成压凸版编码"""
@@ -19,6 +19,8 @@ from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.utils import timezone
 
+from .field_tracking import FieldTrackingMixin
+
 
 class AuditLog(models.Model):
     """
@@ -189,11 +191,12 @@ class AuditLog(models.Model):
         super().save(*args, **kwargs)
 
 
-class AuditMixin(models.Model):
+class AuditMixin(FieldTrackingMixin, models.Model):
     """
     审计混入类
 
-    将此混入类添加到需要审计的模型中，自动启用审计功能
+    将此混入类添加到需要审计的模型中，自动启用审计功能；
+    变更前的数据取自字段追踪快照，保存时无需重新查询
     """
 
     def get_audit_log_repr(self):
@@ -261,6 +264,27 @@ class AuditLogExport(models.Model):
 
     error_message = models.TextField(blank=True)
 
+    # 导出格式
+    FORMAT_CSV = 'csv'
+    FORMAT_NDJSON = 'ndjson'
+
+    FORMAT_CHOICES = [
+        (FORMAT_CSV, 'CSV'),
+        (FORMAT_NDJSON, 'NDJSON'),
+    ]
+
+    file_format = models.CharField(
+        max_length=10,
+        choices=FORMAT_CHOICES,
+        default=FORMAT_CSV,
+        verbose_name='导出格式'
+    )
+    compressed = models.BooleanField(default=False, verbose_name='gzip 压缩')
+
+    # 断点续传进度：已写入记录数与最后一条记录的 (created_at, id)
+    processed_count = models.IntegerField(default=0, verbose_name='已导出记录数')
+    cursor = models.JSONField(default=dict, blank=True, verbose_name='导出游标')
+
     # 时间戳
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
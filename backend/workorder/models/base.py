@@ -133,40 +133,49 @@ class Department(models.Model):
     def get_ancestors(self):
         """获取所有祖先部门（从直接上级到顶级）
 
+        层级关系取自部门树快照（services/department_tree.py），只查询一次祖先部门。
+
         Returns:
             list: 祖先部门列表，按层级从近到远排序
         """
-        ancestors = []
-        current = self.parent
-        while current:
-            ancestors.append(current)
-            current = current.parent
-        return ancestors
+        from ..services.department_tree import DepartmentTree
+
+        if self.parent_id is None:
+            return []
+        tree = DepartmentTree.get()
+        ancestor_ids = (self.parent_id,) + tree.ancestor_ids(self.parent_id)
+        departments = Department.objects.in_bulk(ancestor_ids)
+        return [departments[pk] for pk in ancestor_ids if pk in departments]
 
     def get_descendants(self):
-        """获取所有子孙部门（递归）
+        """获取所有子孙部门
+
+        子孙部门ID取自部门树快照，一次查询加载。
 
         Returns:
-            list: 子孙部门列表
+            list: 子孙部门列表（先序）
         """
-        descendants = []
-        for child in self.children.all():
-            descendants.append(child)
-            descendants.extend(child.get_descendants())
-        return descendants
+        from ..services.department_tree import DepartmentTree
+
+        if self.pk is None:
+            return []
+        descendant_ids = DepartmentTree.get().descendant_ids(self.pk)
+        if not descendant_ids:
+            return []
+        departments = Department.objects.in_bulk(descendant_ids)
+        return [departments[pk] for pk in descendant_ids if pk in departments]
 
     def get_level(self):
-        """获取部门层级（顶级为0）
+        """获取部门层级（顶级为0），不查询数据库
 
         Returns:
             int: 层级深度
         """
-        level = 0
-        current = self.parent
-        while current:
-            level += 1
-            current = current.parent
-        return level
+        from ..services.department_tree import DepartmentTree
+
+        if self.parent_id is None:
+            return 0
+        return DepartmentTree.get().level(self.parent_id) + 1
 
 
 class Process(models.Model):
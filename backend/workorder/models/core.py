@@ -31,6 +31,7 @@ from django.db import models, transaction
 from django.db.models import Max
 from django.utils import timezone
 from workorder.models.audit import AuditMixin
+from workorder.models.field_tracking import FieldTrackingMixin
 
 # 配置日志记录器
 logger = logging.getLogger(__name__)
@@ -44,6 +45,27 @@ class _SignalSafeQuerySet(models.QuerySet):
             "禁止使用 update() 绕过 signals，请改用 save() 或业务服务方法。"
         )
 
+def stamp_completed_at(instance, now=None) -> bool:
+    """状态为已完成且尚未记录完成时间时，记录首次完成时间（只写一次）
+
+    完成时间用于按天统计完成数，之后的保存不会改变它。
+
+    Returns:
+        bool: 是否本次写入了完成时间
+    """
+    if instance.status != "completed" or instance.completed_at is not None:
+        return False
+    instance.completed_at = now or timezone.now()
+    return True
+
+
+def _stamp_completed_at_on_save(instance, kwargs):
+    """save() 前记录完成时间；指定了 update_fields 时一并保存"""
+    update_fields = kwargs.get("update_fields")
+    if stamp_completed_at(instance) and update_fields is not None:
+        kwargs["update_fields"] = [*update_fields, "completed_at"]
+
+
 # 导入 Process 和 Department 模型用于验证和分派
 try:
     from workorder.models.base import Department, Process
@@ -184,6 +206,7 @@ class WorkOrder(AuditMixin, models.Model):
     order_date = models.DateField("下单日期", default=date.today)
     delivery_date = models.DateField("交货日期")
     actual_delivery_date = models.DateField("实际交货日期", null=True, blank=True)
+    completed_at = models.DateTimeField("完成时间", null=True, blank=True, db_index=True)
 
     production_quantity = models.IntegerField(
         "生产数量", null=True, blank=True, help_text="单位：车"
@@ -397,10 +420,14 @@ class WorkOrder(AuditMixin, models.Model):
                 task.status = "pending"
 
             # Auto-dispatch tasks to departments based on priority rules
+            # One selector for the whole batch keeps operator loads balanced
+            from ..services.operator_selection import OperatorSelector
+
+            operator_selector = OperatorSelector()
             for task in draft_tasks:
                 work_order_process = task.work_order_process
                 if work_order_process:
-                    work_order_process._auto_assign_task(task)
+                    work_order_process._auto_assign_task(task, operator_selector)
 
             # Bulk update for performance (status, assigned_department, assigned_operator)
             # Note: _auto_assign_task already calls task.save(), so bulk_update is redundant
@@ -449,68 +476,18 @@ class WorkOrder(AuditMixin, models.Model):
     def generate_order_number(cls):
         """生成施工单号：格式 yyyymm + 3位自增序号
 
-        使用数据库事务和行锁确保并发安全，避免生成重复单号
+        序号由 SequenceService 的计数器原子分配，并发创建不会生成重复单号
         """
-        from django.core.cache import cache
-        from django.db import DatabaseError
-
-        now = datetime.now()
-        prefix = now.strftime("%Y%m")
-        cache_key = f"order_number_{prefix}"
+        from ..services.sequence_service import SequenceService
 
-        # 使用数据库事务和行锁确保并发安全
-        # 每次都从数据库获取最新序号，确保在高并发情况下也不会生成重复单号
-        max_retries = 3  # 最大重试次数
-        retry_count = 0
-
-        while retry_count < max_retries:
-            try:
-                with transaction.atomic():
-                    # 使用 select_for_update() 锁定查询结果，防止并发读取
-                    last_order = (
-                        cls.objects.filter(order_number__startswith=prefix)
-                        .order_by("-order_number")
-                        .select_for_update()
-                        .first()
-                    )
-
-                    if last_order:
-                        # 提取序号部分
-                        last_number = int(last_order.order_number[6:])
-                    else:
-                        # 当月第一单
-                        last_number = 0
-
-                    # 生成新序号
-                    new_number = last_number + 1
-                    order_number = f"{prefix}{new_number:03d}"
-
-                    # 更新缓存以减少数据库查询（缓存仅作为优化，不依赖它保证并发安全）
-                    cache.set(cache_key, new_number, 1800)
-
-                    return order_number
-
-            except DatabaseError as e:
-                # 数据库错误（如死锁），进行重试
-                retry_count += 1
-                if retry_count >= max_retries:
-                    logger.error(f"生成施工单号失败，已重试{max_retries}次: {str(e)}")
-                    raise
-                logger.warning(
-                    f"生成施工单号时发生数据库错误，正在重试 ({retry_count}/{max_retries}): {str(e)}"
-                )
-                continue
-            except Exception as e:
-                logger.error(f"生成施工单号时发生未知错误: {str(e)}")
-                raise
-
-        # 理论上不会到达这里
-        raise Exception("生成施工单号失败：超过最大重试次数")
+        period = datetime.now().strftime("%Y%m")
+        return SequenceService.next_number("", period, 3, cls, "order_number")
 
     def save(self, *args, **kwargs):
         """保存时自动生成施工单号"""
         if not self.order_number:
             self.order_number = self.generate_order_number()
+        _stamp_completed_at_on_save(self, kwargs)
         super().save(*args, **kwargs)
 
 
@@ -647,55 +624,23 @@ class WorkOrderProcess(AuditMixin, models.Model):
         - 若任务有生产数量，需 quantity_completed >= production_quantity
         - 增加业务条件检查：制版任务需图稿确认，开料任务需物料状态满足条件
         - 注意：采购不属于施工单工序，采购任务通过其他系统管理
+
+        任务数和已完成数读取 CompletionProgress 维护的计数，不再逐个加载任务。
         """
-        tasks = self.tasks.all()
-        if not tasks.exists():
-            return False
+        from ..services.completion_progress import CompletionProgress
 
-        from .process_codes import ProcessCodes
+        # 完成计数：每次只读取一行，任务未全部完成时到此为止
+        if not CompletionProgress.process_tasks_done(self):
+            return False
 
-        process_code = self.process.code
-
-        for task in tasks:
-            if task.status != "completed":
-                return False
-            if (
-                task.production_quantity
-                and task.quantity_completed < task.production_quantity
-            ):
-                return False
-
-            # 业务条件检查：制版任务需图稿/刀模等已确认
-            if task.task_type == "plate_making":
-                # 检查图稿确认状态
-                if task.artwork and not task.artwork.confirmed:
-                    return False
-                # 检查刀模确认状态
-                if task.die and not task.die.confirmed:
-                    return False
-                # 检查烫金版确认状态
-                if task.foiling_plate and not task.foiling_plate.confirmed:
-                    return False
-                # 检查压凸版确认状态
-                if task.embossing_plate and not task.embossing_plate.confirmed:
-                    return False
-
-            # 业务条件检查：开料任务需物料状态满足条件
-            # 注意：只有CUT工序生成cutting类型任务
-            # 采购不属于施工单工序，采购任务通过其他系统管理，物料采购状态在WorkOrderMaterial中记录
-            if task.task_type == "cutting" and task.material:
-                work_order_material = self.work_order.materials.filter(
-                    material=task.material
-                ).first()
-                if work_order_material:
-                    # 使用编码判断：开料工序（CUT）物料必须已开料
-                    if ProcessCodes.requires_material_cut_status(process_code):
-                        if work_order_material.purchase_status != "cut":
-                            return False
+        # 前置条件（图稿/刀模/版已确认、物料已开料）一次集合查询检查
+        if CompletionProgress.count_blocking_prerequisites(self):
+            return False
 
         # 汇总任务的完成数量和不良品数量
-        total_quantity_completed = sum(task.quantity_completed or 0 for task in tasks)
-        total_quantity_defective = sum(task.quantity_defective or 0 for task in tasks)
+        totals = CompletionProgress.summarize_quantities(self)
+        total_quantity_completed = totals["quantity_completed"]
+        total_quantity_defective = totals["quantity_defective"]
 
         # 获取施工单对象
         work_order = self.work_order
@@ -714,12 +659,12 @@ class WorkOrderProcess(AuditMixin, models.Model):
         if self.process.code == "PACK":
             self._update_product_stock_on_packaging()
 
-        # 创建工序完成通知
-        from .system import Notification
+        # 创建工序完成通知（记入发件箱，提交后批量写入）
+        from ..services.notification_outbox import NotificationOutbox
 
         # 通知施工单创建人
         if work_order.created_by:
-            Notification.create_notification(
+            NotificationOutbox.add(
                 recipient=work_order.created_by,
                 notification_type="process_completed",
                 title=f"工序完成：{self.process.name}",
@@ -741,7 +686,7 @@ class WorkOrderProcess(AuditMixin, models.Model):
 
             # 创建施工单完成通知
             if work_order.created_by:
-                Notification.create_notification(
+                NotificationOutbox.add(
                     recipient=work_order.created_by,
                     notification_type="workorder_completed",
                     title=f"施工单完成：{work_order.order_number}",
@@ -752,7 +697,7 @@ class WorkOrderProcess(AuditMixin, models.Model):
 
         return True
 
-    def _auto_assign_task(self, task):
+    def _auto_assign_task(self, task, operator_selector=None):
         """自动分派任务到部门和操作员
 
         分派规则：
@@ -760,6 +705,11 @@ class WorkOrderProcess(AuditMixin, models.Model):
         2. 如果工序未指定部门，使用 AutoDispatchService 根据优先级规则自动分派
         3. 如果 AutoDispatchService 返回 None（未启用或无规则匹配），使用兜底逻辑选择第一个可用部门
         4. 如果工序未指定操作员，从分派部门中选择操作员
+
+        Args:
+            task: 待分派的任务
+            operator_selector: 批量分派时共用的 OperatorSelector，
+                操作员负载只加载一次并随分派累加；为空时为本次分派单独创建
         """
         # 优先使用工序级别的分派
         if self.department:
@@ -787,34 +737,27 @@ class WorkOrderProcess(AuditMixin, models.Model):
             task.assigned_operator = self.operator
         elif task.assigned_department:
             # 如果已分派部门但未分派操作员，从部门中选择操作员
-            # 优先使用配置规则中的操作员选择策略
-            from .system import TaskAssignmentRule
-
-            assignment_rule = (
-                TaskAssignmentRule.objects.filter(
-                    process=self.process,
-                    department=task.assigned_department,
-                    is_active=True,
-                )
-                .order_by("-priority")
-                .first()
-            )
+            # 优先使用配置规则中的操作员选择策略（无规则时默认 least_tasks）
+            if operator_selector is None:
+                from ..services.operator_selection import OperatorSelector
 
-            strategy = "least_tasks"  # 默认策略
-            if assignment_rule:
-                strategy = assignment_rule.operator_selection_strategy
+                operator_selector = OperatorSelector()
 
-            task.assigned_operator = self._select_operator_by_strategy(
+            strategy = operator_selector.get_strategy(
+                self.process, task.assigned_department
+            )
+            task.assigned_operator = operator_selector.select(
                 task.assigned_department, strategy
             )
+            operator_selector.record_assignment(task.assigned_operator)
 
         task.save()
 
-        # 创建任务分派通知
+        # 创建任务分派通知（记入发件箱，与分派信号的通知按任务去重）
         if task.assigned_operator:
-            from .system import Notification
+            from ..services.notification_outbox import NotificationOutbox
 
-            Notification.create_notification(
+            NotificationOutbox.add(
                 recipient=task.assigned_operator,
                 notification_type="task_assigned",
                 title=f"新任务分派：{task.work_content}",
@@ -830,14 +773,12 @@ class WorkOrderProcess(AuditMixin, models.Model):
 
         优化规则：
         - 使用事务确保库存更新的原子性
-        - 批量锁定产品记录，避免并发冲突
         - 避免重复计算已入库的数量
-        - 记录详细的库存变更日志
+        - 库存通过 StockLedger 按产品汇总后一条 UPDATE 原子加减，并批量写入库存日志
         """
         from django.db import transaction
 
-        from .products import Product
-        from .services.data_consistency import StockConsistencyService
+        from ..services.stock_ledger import StockLedger, StockMovement
 
         with transaction.atomic():
             # 获取所有未计入库存的包装任务，使用 select_related 优化查询
@@ -849,13 +790,13 @@ class WorkOrderProcess(AuditMixin, models.Model):
 
             # 按产品分组汇总需要入库的数量
             product_quantities = {}
+            products = {}
             task_updates = []
 
             for task in packaging_tasks:
                 if not task.product:
                     continue
 
-                product_id = task.product.id
                 # 计算实际需要入库的数量
                 # 新增数量 = 当前总完成数量 - 上次已计入库存的数量
                 actual_quantity_to_stock = task.quantity_completed - (
@@ -863,9 +804,11 @@ class WorkOrderProcess(AuditMixin, models.Model):
                 )
 
                 if actual_quantity_to_stock > 0:
-                    if product_id not in product_quantities:
-                        product_quantities[product_id] = 0
-                    product_quantities[product_id] += actual_quantity_to_stock
+                    product_id = task.product_id
+                    products[product_id] = task.product
+                    product_quantities[product_id] = (
+                        product_quantities.get(product_id, 0) + actual_quantity_to_stock
+                    )
 
                     # 准备任务更新
                     task.stock_accounted_quantity = task.quantity_completed
@@ -877,105 +820,24 @@ class WorkOrderProcess(AuditMixin, models.Model):
                     task_updates, ["stock_accounted_quantity"]
                 )
 
-            # 批量更新产品库存 - 优化：一次性锁定所有需要更新的产品
-            stock_updates = []
-            if product_quantities:
-                # 使用 select_for_update() 批量锁定所有相关产品，避免并发冲突
-                products = Product.objects.select_for_update().filter(
-                    id__in=product_quantities.keys()
+            # 批量更新产品库存（已删除的产品被跳过；库存预警由台账检查）
+            StockLedger.apply_product_movements(
+                StockMovement(
+                    product_id,
+                    quantity,
+                    f"施工单{self.work_order.order_number}包装工序完成，"
+                    f"入库{quantity}{products[product_id].unit}",
                 )
+                for product_id, quantity in product_quantities.items()
+            )
 
-                # 创建产品ID到产品对象的映射
-                product_map = {p.id: p for p in products}
-
-                for product_id, quantity in product_quantities.items():
-                    if product_id not in product_map:
-                        # 产品已被删除，记录日志但继续处理
-                        logger.warning(f"产品ID {product_id} 不存在，跳过库存更新")
-                        continue
-
-                    product = product_map[product_id]
-                    old_quantity = product.stock_quantity
-                    new_quantity = old_quantity + quantity
-                    product.stock_quantity = new_quantity
-                    stock_updates.append(
-                        (product, old_quantity, new_quantity, quantity)
-                    )
-
-            # 批量保存产品库存
-            if stock_updates:
-                products_to_update = [item[0] for item in stock_updates]
-                Product.objects.bulk_update(products_to_update, ["stock_quantity"])
-
-                # 创建库存变更日志
-                from .products import ProductStockLog
-
-                log_entries = []
-                for product, old_quantity, new_quantity, quantity in stock_updates:
-                    log_entries.append(
-                        ProductStockLog(
-                            product=product,
-                            change_type="add",
-                            quantity=quantity,
-                            old_quantity=old_quantity,
-                            new_quantity=new_quantity,
-                            reason=f"施工单{self.work_order.order_number}包装工序完成，入库{quantity}{product.unit}",
-                            created_by=None,
-                        )
-                    )
-
-                ProductStockLog.objects.bulk_create(log_entries)
-
-                # 检查库存预警
-                for product, _, new_quantity, _ in stock_updates:
-                    if product.is_low_stock():
-                        product._send_low_stock_warning()
-
-    def _select_operator_by_strategy(self, department, strategy):
-        """根据策略从部门中选择操作员"""
-        import random
-
-        from django.contrib.auth.models import User
-        from django.db.models import Count, Q
-
-        department_users = User.objects.filter(
-            profile__departments=department, is_active=True
-        ).exclude(
-            is_superuser=True  # 排除超级管理员
-        )
-
-        if not department_users.exists():
-            return None
-
-        if strategy == "least_tasks":
-            # 优先选择任务数量较少的操作员（工作量均衡）
-            users_with_task_count = []
-            for user in department_users:
-                task_count = WorkOrderTask.objects.filter(
-                    assigned_operator=user, status__in=["pending", "in_progress"]
-                ).count()
-                users_with_task_count.append((user, task_count))
-
-            # 按任务数量排序，优先选择任务数量最少的操作员
-            users_with_task_count.sort(key=lambda x: x[1])
-            return users_with_task_count[0][0]
-
-        elif strategy == "random":
-            # 随机选择
-            return random.choice(list(department_users))
-
-        elif strategy == "round_robin":
-            # 轮询分配（简单实现：按ID排序后选择）
-            # TODO: 可以实现更复杂的轮询逻辑（记录上次分配的操作员）
-            return department_users.order_by("id").first()
-
-        elif strategy == "first_available":
-            # 选择第一个可用操作员
-            return department_users.first()
+    def _select_operator_by_strategy(self, department, strategy, operator_selector=None):
+        """根据策略从部门中选择操作员（见 OperatorSelector）"""
+        from ..services.operator_selection import OperatorSelector
 
-        else:
-            # 默认使用least_tasks策略
-            return self._select_operator_by_strategy(department, "least_tasks")
+        if operator_selector is None:
+            operator_selector = OperatorSelector()
+        return operator_selector.select(department, strategy)
 
     def generate_tasks(self):
         """为工序生成任务（在工序开始时调用）
@@ -989,187 +851,21 @@ class WorkOrderProcess(AuditMixin, models.Model):
         - DIE（模切）：为每个刀模生成一个任务
         - PACK（包装）：为每个产品生成一个任务
         - 其他工序：生成通用任务
+
+        生成规则与草稿任务相同（DraftTaskGenerationService.build_task_objects），
+        分派规则与 _auto_assign_task 相同（见 TaskGenerationService）。
+
+        Returns:
+            list: 创建的任务列表
         """
-        from .process_codes import ProcessCodes
+        from ..services.task_generation import TaskGenerationService
 
         # 如果已经有任务，不再生成
         if self.tasks.exists():
-            return
-
-        process = self.process
-        work_order = self.work_order
-        process_code = process.code
-        order_number = work_order.order_number
-        production_quantity = work_order.production_quantity or 0
-
-        # 使用 code 字段精确匹配工序
-        if process_code == ProcessCodes.CTP:
-            # 制版工序：为图稿、刀模、烫金版、压凸版每个生成一个任务
-            # 任务内容：{施工单号}制版审核，生产数量：1
-            # 图稿任务
-            for artwork in work_order.artworks.all():
-                task = WorkOrderTask.objects.create(
-                    work_order_process=self,
-                    task_type="plate_making",
-                    artwork=artwork,
-                    work_content=f"{order_number}制版审核",
-                    production_quantity=1,
-                    quantity_completed=0,
-                    status="pending",
-                    auto_calculate_quantity=True,  # 启用自动计算：图稿确认后自动更新
-                )
-                self._auto_assign_task(task)
-            # 刀模任务
-            for die in work_order.dies.all():
-                task = WorkOrderTask.objects.create(
-                    work_order_process=self,
-                    task_type="plate_making",
-                    die=die,
-                    work_content=f"{order_number}制版审核",
-                    production_quantity=1,
-                    quantity_completed=0,
-                    status="pending",
-                    auto_calculate_quantity=True,  # 启用自动计算：刀模确认后自动更新
-                )
-                self._auto_assign_task(task)
-            # 烫金版任务
-            for foiling_plate in work_order.foiling_plates.all():
-                task = WorkOrderTask.objects.create(
-                    work_order_process=self,
-                    task_type="plate_making",
-                    foiling_plate=foiling_plate,
-                    work_content=f"{order_number}制版审核",
-                    production_quantity=1,
-                    quantity_completed=0,
-                    status="pending",
-                    auto_calculate_quantity=True,  # 启用自动计算：烫金版确认后自动更新
-                )
-                self._auto_assign_task(task)
-            # 压凸版任务
-            for embossing_plate in work_order.embossing_plates.all():
-                task = WorkOrderTask.objects.create(
-                    work_order_process=self,
-                    task_type="plate_making",
-                    embossing_plate=embossing_plate,
-                    work_content=f"{order_number}制版审核",
-                    production_quantity=1,
-                    quantity_completed=0,
-                    status="pending",
-                    auto_calculate_quantity=True,  # 启用自动计算：压凸版确认后自动更新
-                )
-                self._auto_assign_task(task)
-
-        elif process_code == ProcessCodes.CUT:
-            # 开料工序：为需要开料的物料每个生成一个任务
-            # 任务内容：{施工单号}开料，生产数量：物料用量
-            for material_item in work_order.materials.all():
-                if material_item.need_cutting:
-                    quantity = self._parse_material_usage(material_item.material_usage)
-                    task = WorkOrderTask.objects.create(
-                        work_order_process=self,
-                        task_type="cutting",
-                        material=material_item.material,
-                        work_content=f"{order_number}开料",
-                        production_quantity=quantity,
-                        quantity_completed=0,
-                        status="pending",
-                        auto_calculate_quantity=True,  # 开料任务启用自动计算
-                    )
-                    self._auto_assign_task(task)
-
-        elif process_code == ProcessCodes.PRT:
-            # 印刷工序：为每个图稿生成一个任务
-            # 任务内容：{施工单号}印刷，生产数量：施工单的生产数量
-            for artwork in work_order.artworks.all():
-                task = WorkOrderTask.objects.create(
-                    work_order_process=self,
-                    task_type="printing",
-                    artwork=artwork,
-                    work_content=f"{order_number}印刷",
-                    production_quantity=production_quantity,
-                    quantity_completed=0,
-                    status="pending",
-                    auto_calculate_quantity=False,
-                )
-                self._auto_assign_task(task)
-
-        elif process_code == ProcessCodes.FOIL_G:
-            # 烫金工序：为每个烫金版生成一个任务（参考印刷任务）
-            # 任务内容：{施工单号}烫金，生产数量：施工单的生产数量
-            for foiling_plate in work_order.foiling_plates.all():
-                task = WorkOrderTask.objects.create(
-                    work_order_process=self,
-                    task_type="foiling",
-                    foiling_plate=foiling_plate,
-                    work_content=f"{order_number}烫金",
-                    production_quantity=production_quantity,
-                    quantity_completed=0,
-                    status="pending",
-                    auto_calculate_quantity=False,
-                )
-                self._auto_assign_task(task)
-
-        elif process_code == ProcessCodes.EMB:
-            # 压凸工序：为每个压凸版生成一个任务（参考印刷任务）
-            # 任务内容：{施工单号}压凸，生产数量：施工单的生产数量
-            for embossing_plate in work_order.embossing_plates.all():
-                task = WorkOrderTask.objects.create(
-                    work_order_process=self,
-                    task_type="embossing",
-                    embossing_plate=embossing_plate,
-                    work_content=f"{order_number}压凸",
-                    production_quantity=production_quantity,
-                    quantity_completed=0,
-                    status="pending",
-                    auto_calculate_quantity=False,
-                )
-                self._auto_assign_task(task)
-
-        elif process_code == ProcessCodes.DIE:
-            # 模切工序：为每个刀模生成一个任务（参考印刷任务）
-            # 任务内容：{施工单号}模切，生产数量：施工单的生产数量
-            for die in work_order.dies.all():
-                task = WorkOrderTask.objects.create(
-                    work_order_process=self,
-                    task_type="die_cutting",
-                    die=die,
-                    work_content=f"{order_number}模切",
-                    production_quantity=production_quantity,
-                    quantity_completed=0,
-                    status="pending",
-                    auto_calculate_quantity=False,
-                )
-                self._auto_assign_task(task)
-
-        elif process_code == ProcessCodes.PACK:
-            # 包装工序：为每个产品生成一个任务
-            # 任务内容：{产品名称}包装，生产数量：产品数量
-            for product_item in work_order.products.all():
-                task = WorkOrderTask.objects.create(
-                    work_order_process=self,
-                    task_type="packaging",
-                    product=product_item.product,
-                    work_content=f"{product_item.product.name}包装",
-                    production_quantity=product_item.quantity,
-                    quantity_completed=0,
-                    status="pending",
-                    auto_calculate_quantity=False,
-                )
-                self._auto_assign_task(task)
+            return []
 
-        else:
-            # 其他工序：生成通用任务
-            # 任务内容：{工序名称}：{施工单号}，生产数量：施工单的生产数量
-            task = WorkOrderTask.objects.create(
-                work_order_process=self,
-                task_type="general",
-                work_content=f"{process.name}：{order_number}",
-                production_quantity=production_quantity,
-                quantity_completed=0,
-                status="pending",
-                auto_calculate_quantity=False,
-            )
-            self._auto_assign_task(task)
+        # 整批构建任务、整批分派部门和操作员，一次 bulk_create 写入
+        return TaskGenerationService.generate_tasks(self)
 
     def generate_draft_tasks(self):
         """生成草稿任务（用于施工单创建时）
@@ -1188,6 +884,7 @@ class WorkOrderProcess(AuditMixin, models.Model):
             return []
 
         # 使用草稿任务生成服务
+        from ..services.completion_progress import CompletionProgress
         from ..services.task_generation import DraftTaskGenerationService
 
         # 构建草稿任务对象
@@ -1198,26 +895,11 @@ class WorkOrderProcess(AuditMixin, models.Model):
             created_tasks = WorkOrderTask.objects.bulk_create(
                 task_objects, batch_size=100, ignore_conflicts=False
             )
+            CompletionProgress.record_created(created_tasks)
             return list(created_tasks)
 
         return []
 
-    def _parse_material_usage(self, usage_str):
-        """解析物料用量字符串，提取数字部分"""
-        if not usage_str:
-            return 0
-
-        import re
-
-        # 尝试提取数字（支持整数和小数）
-        numbers = re.findall(r"\d+\.?\d*", usage_str)
-        if numbers:
-            try:
-                return int(float(numbers[0]))
-            except (ValueError, IndexError):
-                return 0
-        return 0
-
     def calculate_duration(self):
         """计算工序耗时"""
         if self.actual_start_time and self.actual_end_time:
@@ -1254,7 +936,7 @@ class WorkOrderProduct(models.Model):
         return f"{self.work_order.order_number} - {self.product.name} ({self.quantity}{self.unit})"
 
 
-class WorkOrderMaterial(models.Model):
+class WorkOrderMaterial(FieldTrackingMixin, models.Model):
     """施工单物料使用记录"""
 
     PURCHASE_STATUS_CHOICES = [
@@ -1543,6 +1225,7 @@ class WorkOrderTask(AuditMixin, models.Model):
         ],
         default="pending",
     )
+    completed_at = models.DateTimeField("完成时间", null=True, blank=True, db_index=True)
     created_at = models.DateTimeField("创建时间", auto_now_add=True)
     updated_at = models.DateTimeField("更新时间", auto_now=True)
 
@@ -1778,5 +1461,8 @@ class WorkOrderTask(AuditMixin, models.Model):
 
             # 更新成功，递增版本号
             self.version += 1
+            # 数据库中的版本号已由 update() 递增，同步字段追踪快照，版本号不计为字段变更
+            self.reset_field_tracking(["version"])
 
+        _stamp_completed_at_on_save(self, kwargs)
         super().save(*args, **kwargs)
@@ -0,0 +1,105 @@
+"""
+字段变更追踪
+
+从数据库加载实例时（from_db）记录已加载字段的值，保存信号处理器通过
+has_changed() / previous() 判断字段是否变化，不再为了比较新旧值重新查询数据库。
+
+- 快照在 save() 返回后才刷新，pre_save / post_save 处理器都能读到保存前的值
+- 新建（未从数据库加载）实例和延迟加载（only/defer）未加载的字段没有快照，
+  has_changed() 视为已变化，previous() 返回默认值
+"""
+
+import copy
+
+from django.db import models
+
+_UNKNOWN = object()
+
+
+class FieldTrackingMixin(models.Model):
+    """
+    字段变更追踪混入类
+
+    用法：
+        if instance.has_changed("status"):
+            old_status = instance.previous("status")
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.reset_field_tracking()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # 保存信号已在 super().save() 中处理完毕，此后以保存后的值作为新快照
+        self.reset_field_tracking(kwargs.get("update_fields"))
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self.reset_field_tracking(fields)
+
+    def reset_field_tracking(self, field_names=None):
+        """
+        以字段当前值作为快照（field_names 为空时重置全部字段）
+
+        bulk_update 等不经过 save() 的写入完成后由调用方调用
+        """
+        if field_names is None:
+            fields = self._meta.concrete_fields
+            snapshot = {}
+        else:
+            fields = [self._meta.get_field(name) for name in field_names]
+            snapshot = dict(self.__dict__.get("_loaded_values") or {})
+
+        values = self.__dict__
+        for field in fields:
+            # 读取 __dict__ 而不是属性，避免触发延迟字段查询
+            if field.attname in values:
+                value = values[field.attname]
+                # JSONField 等可变值需要复制，原地修改后才能比较出差异
+                if isinstance(value, (dict, list)):
+                    value = copy.deepcopy(value)
+                snapshot[field.attname] = value
+        self._loaded_values = snapshot
+
+    def _get_loaded_value(self, field_name):
+        loaded_values = self.__dict__.get("_loaded_values")
+        if loaded_values is None:
+            return _UNKNOWN
+        attname = self._meta.get_field(field_name).attname
+        return loaded_values.get(attname, _UNKNOWN)
+
+    def is_tracked(self, field_name) -> bool:
+        """字段是否有加载时的快照"""
+        return self._get_loaded_value(field_name) is not _UNKNOWN
+
+    def has_changed(self, field_name) -> bool:
+        """字段值是否与加载（或上次保存）时不同；没有快照时视为已变化"""
+        loaded = self._get_loaded_value(field_name)
+        if loaded is _UNKNOWN:
+            return True
+        attname = self._meta.get_field(field_name).attname
+        return self.__dict__.get(attname, loaded) != loaded
+
+    def previous(self, field_name, default=None):
+        """字段加载（或上次保存）时的值；外键返回主键值，没有快照时返回 default"""
+        loaded = self._get_loaded_value(field_name)
+        return default if loaded is _UNKNOWN else loaded
+
+    def get_loaded_values(self):
+        """
+        全部具体字段的快照 {attname: 值}
+
+        任一字段没有快照（新建实例或延迟加载）时返回 None，由调用方回退到查询数据库
+        """
+        loaded_values = self.__dict__.get("_loaded_values")
+        if loaded_values is None:
+            return None
+        if any(field.attname not in loaded_values for field in self._meta.concrete_fields):
+            return None
+        return loaded_values
@@ -12,7 +12,7 @@
 """
 
 from django.contrib.auth.models import User
-from django.db import models, transaction
+from django.db import models
 from django.db.models import Sum
 from django.utils import timezone
 
@@ -225,21 +225,10 @@ class Invoice(models.Model):
     @staticmethod
     def generate_invoice_number():
         """生成发票号码：FP + yyyymmdd + 4位序号"""
+        from ..services.sequence_service import SequenceService
+
         today = timezone.now().strftime("%Y%m%d")
-        prefix = f"FP{today}"
-        with transaction.atomic():
-            latest = (
-                Invoice.objects.filter(invoice_number__startswith=prefix)
-                .select_for_update()
-                .order_by("-invoice_number")
-                .first()
-            )
-            if latest:
-                last_number = int(latest.invoice_number[-4:])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            return f"{prefix}{new_number:04d}"
+        return SequenceService.next_number("FP", today, 4, Invoice, "invoice_number")
 
     invoice_number = models.CharField(
         "发票号码", max_length=50, unique=True, editable=False
@@ -363,21 +352,10 @@ class Payment(models.Model):
     @staticmethod
     def generate_payment_number():
         """生成收款单号：SK + yyyymmdd + 4位序号"""
+        from ..services.sequence_service import SequenceService
+
         today = timezone.now().strftime("%Y%m%d")
-        prefix = f"SK{today}"
-        with transaction.atomic():
-            latest = (
-                Payment.objects.filter(payment_number__startswith=prefix)
-                .select_for_update()
-                .order_by("-payment_number")
-                .first()
-            )
-            if latest:
-                last_number = int(latest.payment_number[-4:])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            return f"{prefix}{new_number:04d}"
+        return SequenceService.next_number("SK", today, 4, Payment, "payment_number")
 
     payment_number = models.CharField(
         "收款单号", max_length=50, unique=True, editable=False
@@ -515,21 +493,12 @@ class Statement(models.Model):
     @staticmethod
     def generate_statement_number():
         """生成对账单号：DZ + yyyymmdd + 4位序号"""
+        from ..services.sequence_service import SequenceService
+
         today = timezone.now().strftime("%Y%m%d")
-        prefix = f"DZ{today}"
-        with transaction.atomic():
-            latest = (
-                Statement.objects.filter(statement_number__startswith=prefix)
-                .select_for_update()
-                .order_by("-statement_number")
-                .first()
-            )
-            if latest:
-                last_number = int(latest.statement_number[-4:])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            return f"{prefix}{new_number:04d}"
+        return SequenceService.next_number(
+            "DZ", today, 4, Statement, "statement_number"
+        )
 
     statement_number = models.CharField(
         "对账单号", max_length=50, unique=True, editable=False
@@ -11,7 +11,7 @@
 """
 
 from django.contrib.auth.models import User
-from django.db import models, transaction
+from django.db import models
 from django.utils import timezone
 
 
@@ -105,13 +105,24 @@ class ProductStock(models.Model):
         return False
 
     def reserve(self, quantity):
-        """预留库存"""
-        if self.quantity >= quantity:
-            self.quantity -= quantity
-            self.status = "reserved"
-            self.save()
-            return True
-        return False
+        """预留库存（带非负条件的原子扣减，见 StockLedger）"""
+        from ..exceptions import InsufficientStockError
+        from ..services.stock_ledger import StockLedger
+
+        try:
+            rows = StockLedger.apply_deltas(
+                ProductStock,
+                "quantity",
+                {self.pk: -quantity},
+                status="reserved",
+                updated_at=timezone.now(),
+            )
+        except InsufficientStockError:
+            return False
+        if not rows:
+            return False
+        self.refresh_from_db(fields=["quantity", "status", "updated_at"])
+        return True
 
 
 class StockIn(models.Model):
@@ -128,21 +139,10 @@ class StockIn(models.Model):
     @staticmethod
     def generate_order_number():
         """生成入库单号：RK + yyyymmdd + 4位序号"""
+        from ..services.sequence_service import SequenceService
+
         today = timezone.now().strftime("%Y%m%d")
-        prefix = f"RK{today}"
-        with transaction.atomic():
-            latest = (
-                StockIn.objects.filter(order_number__startswith=prefix)
-                .select_for_update()
-                .order_by("-order_number")
-                .first()
-            )
-            if latest:
-                last_number = int(latest.order_number[-4:])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            return f"{prefix}{new_number:04d}"
+        return SequenceService.next_number("RK", today, 4, StockIn, "order_number")
 
     order_number = models.CharField(
         "入库单号", max_length=50, unique=True, editable=False
@@ -224,21 +224,10 @@ class StockOut(models.Model):
     @staticmethod
     def generate_order_number():
         """生成出库单号：CK + yyyymmdd + 4位序号"""
+        from ..services.sequence_service import SequenceService
+
         today = timezone.now().strftime("%Y%m%d")
-        prefix = f"CK{today}"
-        with transaction.atomic():
-            latest = (
-                StockOut.objects.filter(order_number__startswith=prefix)
-                .select_for_update()
-                .order_by("-order_number")
-                .first()
-            )
-            if latest:
-                last_number = int(latest.order_number[-4:])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            return f"{prefix}{new_number:04d}"
+        return SequenceService.next_number("CK", today, 4, StockOut, "order_number")
 
     order_number = models.CharField(
         "出库单号", max_length=50, unique=True, editable=False
@@ -314,21 +303,12 @@ class DeliveryOrder(models.Model):
     @staticmethod
     def generate_order_number():
         """生成发货单号：FH + yyyymmdd + 4位序号"""
+        from ..services.sequence_service import SequenceService
+
         today = timezone.now().strftime("%Y%m%d")
-        prefix = f"FH{today}"
-        with transaction.atomic():
-            latest = (
-                DeliveryOrder.objects.filter(order_number__startswith=prefix)
-                .select_for_update()
-                .order_by("-order_number")
-                .first()
-            )
-            if latest:
-                last_number = int(latest.order_number[-4:])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            return f"{prefix}{new_number:04d}"
+        return SequenceService.next_number(
+            "FH", today, 4, DeliveryOrder, "order_number"
+        )
 
     order_number = models.CharField(
         "发货单号", max_length=50, unique=True, editable=False
@@ -466,21 +446,12 @@ class QualityInspection(models.Model):
     @staticmethod
     def generate_inspection_number():
         """生成质检单号：ZJ + yyyymmdd + 4位序号"""
+        from ..services.sequence_service import SequenceService
+
         today = timezone.now().strftime("%Y%m%d")
-        prefix = f"ZJ{today}"
-        with transaction.atomic():
-            latest = (
-                QualityInspection.objects.filter(inspection_number__startswith=prefix)
-                .select_for_update()
-                .order_by("-inspection_number")
-                .first()
-            )
-            if latest:
-                last_number = int(latest.inspection_number[-4:])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            return f"{prefix}{new_number:04d}"
+        return SequenceService.next_number(
+            "ZJ", today, 4, QualityInspection, "inspection_number"
+        )
 
     inspection_number = models.CharField(
         "质检单号", max_length=50, unique=True, editable=False
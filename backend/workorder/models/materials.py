@@ -184,21 +184,12 @@ class PurchaseOrder(models.Model):
     @staticmethod
     def generate_order_number():
         """生成采购单号：PO + yyyymmdd + 4位序号"""
+        from ..services.sequence_service import SequenceService
+
         today = timezone.now().strftime("%Y%m%d")
-        prefix = f"PO{today}"
-        with transaction.atomic():
-            latest = (
-                PurchaseOrder.objects.filter(order_number__startswith=prefix)
-                .select_for_update()
-                .order_by("-order_number")
-                .first()
-            )
-            if latest:
-                last_number = int(latest.order_number[-4:])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            return f"{prefix}{new_number:04d}"
+        return SequenceService.next_number(
+            "PO", today, 4, PurchaseOrder, "order_number"
+        )
 
     order_number = models.CharField("采购单号", max_length=50, unique=True)
     supplier = models.ForeignKey(
@@ -542,13 +533,20 @@ class PurchaseReceiveRecord(models.Model):
         if not self.qualified_quantity or self.qualified_quantity <= 0:
             return False
 
+        from ..services.stock_ledger import StockLedger, StockMovement
+
         with transaction.atomic():
-            # 更新物料库存
-            material = self.material
-            material.stock_quantity = (
-                material.stock_quantity or 0
-            ) + self.qualified_quantity
-            material.save(update_fields=["stock_quantity"])
+            # 先标记已入库：同一收货记录并发入库时只有一个请求继续
+            claimed = PurchaseReceiveRecord.objects.filter(
+                pk=self.pk, is_stocked=False
+            ).update(is_stocked=True)
+            if not claimed:
+                return False
+
+            # 更新物料库存（原子加减，并发入库不丢失更新）
+            StockLedger.apply_material_movements(
+                [StockMovement(self.material.pk, self.qualified_quantity)]
+            )
 
             # 更新收货记录
             self.is_stocked = True
@@ -7,10 +7,11 @@
 - ProductGroupItem: 产品组子项
 - ProductMaterial: 产品默认物料配置
 - ProductStockLog: 产品库存变更日志
+- ProductStockSnapshot: 产品库存台账快照
 """
 
 from django.contrib.auth.models import User
-from django.db import models, transaction
+from django.db import models
 from workorder.models.audit import AuditMixin
 
 
@@ -169,64 +170,46 @@ class Product(AuditMixin, models.Model):
         """检查库存是否不足"""
         return self.stock_quantity < self.min_stock_quantity
 
-    @transaction.atomic
     def add_stock(self, quantity, user=None, reason=""):
-        """增加库存数量（带事务保护）"""
+        """增加库存数量（原子加减并写入库存日志，见 StockLedger）"""
+        from ..services.stock_ledger import StockLedger, StockMovement
+
         if quantity <= 0:
             return False
 
-        old_quantity = self.stock_quantity
-        self.stock_quantity += quantity
-        self.save(update_fields=["stock_quantity"])
-
-        # 创建库存变更日志
-        ProductStockLog.objects.create(
-            product=self,
-            change_type="add",
-            quantity=quantity,
-            old_quantity=old_quantity,
-            new_quantity=self.stock_quantity,
-            reason=reason,
-            created_by=user,
+        products = StockLedger.apply_product_movements(
+            [StockMovement(self.pk, quantity, reason)], user=user
         )
-
-        # 检查是否需要预警
-        if self.is_low_stock():
-            self._send_low_stock_warning()
-
+        self._sync_stock_quantity(products)
         return True
 
-    @transaction.atomic
     def reduce_stock(self, quantity, user=None, reason=""):
-        """减少库存数量（带事务保护）"""
+        """减少库存数量（带非负条件的原子扣减，见 StockLedger）"""
+        from ..exceptions import InsufficientStockError
+        from ..services.stock_ledger import StockLedger, StockMovement
+
         if quantity <= 0:
             return False
 
-        if self.stock_quantity < quantity:
+        try:
+            products = StockLedger.apply_product_movements(
+                [StockMovement(self.pk, -quantity, reason)], user=user
+            )
+        except InsufficientStockError as exc:
             # 库存不足
-            raise ValueError(f"库存不足：当前库存{self.stock_quantity}，需要{quantity}")
-
-        old_quantity = self.stock_quantity
-        self.stock_quantity -= quantity
-        self.save(update_fields=["stock_quantity"])
-
-        # 创建库存变更日志
-        ProductStockLog.objects.create(
-            product=self,
-            change_type="reduce",
-            quantity=-quantity,
-            old_quantity=old_quantity,
-            new_quantity=self.stock_quantity,
-            reason=reason,
-            created_by=user,
-        )
-
-        # 检查是否需要预警
-        if self.is_low_stock():
-            self._send_low_stock_warning()
+            current, _ = exc.shortages.get(self.pk, (self.stock_quantity, quantity))
+            raise ValueError(f"库存不足：当前库存{current}，需要{quantity}")
 
+        self._sync_stock_quantity(products)
         return True
 
+    def _sync_stock_quantity(self, products):
+        """以台账更新后的数量刷新当前实例"""
+        product = products.get(self.pk)
+        if product is not None:
+            self.stock_quantity = product.stock_quantity
+            self.reset_field_tracking(["stock_quantity"])
+
     def _send_low_stock_warning(self):
         """发送库存预警通知"""
         # 向所有具有库存预警权限的用户发送通知
@@ -288,6 +271,33 @@ class ProductStockLog(models.Model):
         )
 
 
+class ProductStockSnapshot(models.Model):
+    """产品库存台账快照
+
+    截至某条库存日志的台账余额（日志数量之和）。一致性检查按"快照余额 + 之后的日志"
+    计算预期库存，不再每次汇总全部日志（见 services/stock_ledger.py）。
+    """
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stock_snapshot",
+        verbose_name="产品",
+    )
+    balance = models.IntegerField("台账余额", default=0)
+    log_count = models.IntegerField("已汇总日志数", default=0)
+    last_log_id = models.BigIntegerField("最后汇总的日志ID", default=0)
+    taken_at = models.DateTimeField("快照时间", auto_now=True)
+
+    class Meta:
+        verbose_name = "产品库存快照"
+        verbose_name_plural = "产品库存快照"
+
+    def __str__(self):
+        return f"{self.product_id} - {self.balance} (#{self.last_log_id})"
+
+
 class ProductMaterial(models.Model):
     """产品默认物料配置"""
 
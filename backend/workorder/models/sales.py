@@ -7,7 +7,7 @@
 """
 
 from django.contrib.auth.models import User
-from django.db import models, transaction
+from django.db import models
 from django.utils import timezone
 
 
@@ -32,25 +32,11 @@ class SalesOrder(models.Model):
 
     @staticmethod
     def generate_order_number():
-        """生成销售订单号：SO + yyyymmdd + 4位序号
+        """生成销售订单号：SO + yyyymmdd + 4位序号"""
+        from ..services.sequence_service import SequenceService
 
-        使用事务和行级锁确保并发安全
-        """
         today = timezone.now().strftime("%Y%m%d")
-        prefix = f"SO{today}"
-        with transaction.atomic():
-            latest = (
-                SalesOrder.objects.filter(order_number__startswith=prefix)
-                .select_for_update()
-                .order_by("-order_number")
-                .first()
-            )
-            if latest:
-                last_number = int(latest.order_number[-4:])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            return f"{prefix}{new_number:04d}"
+        return SequenceService.next_number("SO", today, 4, SalesOrder, "order_number")
 
     order_number = models.CharField("销售订单号", max_length=50, unique=True)
     customer = models.ForeignKey(
@@ -6,6 +6,9 @@
 - WorkOrderApprovalLog: 施工单审核历史记录
 - Notification: 系统通知
 - TaskAssignmentRule: 任务分派规则配置
+- DailyMetricsRollup: 业务指标日汇总
+- ConsistencyCheckRun: 数据一致性检查运行记录
+- OperatorPerformance: 操作员绩效累计统计
 """
 
 from django.contrib.auth.models import User
@@ -13,7 +16,7 @@ from django.db import models
 from django.utils import timezone
 
 from .base import Department
-from .core import WorkOrder
+from .core import WorkOrder, WorkOrderProcess
 
 
 class UserProfile(models.Model):
@@ -267,3 +270,157 @@ class TaskAssignmentRule(models.Model):
 
     def __str__(self):
         return f"{self.process.name} -> {self.department.name} (优先级:{self.priority})"
+
+
+class DocumentSequence(models.Model):
+    """单据编号计数器
+
+    每个单号前缀 + 周期（如 RK + 20260303）一行，由 SequenceService 原子递增，
+    替代各单据按前缀扫描最大单号并加行锁的做法。
+    """
+
+    prefix = models.CharField("单号前缀", max_length=20, blank=True)
+    period = models.CharField("周期", max_length=20, help_text="如 yyyymm 或 yyyymmdd")
+    last_value = models.BigIntegerField("已分配序号", default=0)
+    updated_at = models.DateTimeField("更新时间", auto_now=True)
+
+    class Meta:
+        verbose_name = "单据编号计数器"
+        verbose_name_plural = "单据编号计数器管理"
+        unique_together = [["prefix", "period"]]
+
+    def __str__(self):
+        return f"{self.prefix}{self.period}: {self.last_value}"
+
+
+class DailyMetricsRollup(models.Model):
+    """业务指标日汇总
+
+    每个已结束的自然日一行，由 TimeSeriesMetrics 按需增量补齐；
+    长时间窗口的趋势直接读取汇总行，不再扫描原始施工单、任务和日志。
+    """
+
+    date = models.DateField("日期", unique=True)
+    completed_orders = models.IntegerField("完成施工单数", default=0)
+    completed_tasks = models.IntegerField("完成任务数", default=0)
+    completed_quantity = models.IntegerField("报工完成数量", default=0)
+    defective_quantity = models.IntegerField("报工不良品数量", default=0)
+    defect_tasks = models.IntegerField("有不良品的任务数", default=0)
+    completed_processes = models.IntegerField("完成工序数", default=0)
+    process_hours = models.DecimalField(
+        "工序耗时合计(小时)", max_digits=12, decimal_places=2, default=0
+    )
+    updated_at = models.DateTimeField("更新时间", auto_now=True)
+
+    class Meta:
+        verbose_name = "业务指标日汇总"
+        verbose_name_plural = "业务指标日汇总"
+        ordering = ["date"]
+
+    def __str__(self):
+        return f"{self.date}: 完成施工单 {self.completed_orders}，完成任务 {self.completed_tasks}"
+
+
+class ConsistencyCheckRun(models.Model):
+    """数据一致性检查运行记录
+
+    每种检查一行，记录上次运行的开始时间，作为增量检查的起点
+    （见 DataConsistencyManager.run_consistency_check）。
+    """
+
+    check_type = models.CharField("检查类型", max_length=20, unique=True)
+    last_started_at = models.DateTimeField("上次开始时间")
+    last_duration_ms = models.FloatField("上次耗时(毫秒)", default=0)
+    updated_at = models.DateTimeField("更新时间", auto_now=True)
+
+    class Meta:
+        verbose_name = "数据一致性检查记录"
+        verbose_name_plural = "数据一致性检查记录"
+
+    def __str__(self):
+        return f"{self.check_type}: {self.last_started_at}"
+
+
+class OperatorPerformance(models.Model):
+    """操作员绩效累计统计
+
+    每个操作员 + 任务类型一行，任务完成时由 OperatorPerformanceStore 原子累加（O(1)），
+    完成耗时的均值和方差按 Welford 算法增量维护，各进程共享同一份数据。
+    """
+
+    operator = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="performance_stats",
+        verbose_name="操作员",
+    )
+    task_type = models.CharField("任务类型", max_length=20, blank=True)
+    task_count = models.IntegerField("完成任务数", default=0)
+    success_count = models.IntegerField("无不良品完成数", default=0)
+    duration_count = models.IntegerField("耗时样本数", default=0)
+    duration_mean = models.FloatField("平均耗时(小时)", default=0)
+    duration_m2 = models.FloatField(
+        "耗时离差平方和", default=0, help_text="方差 = 离差平方和 / 耗时样本数"
+    )
+    quantity_completed = models.BigIntegerField("累计完成数量", default=0)
+    quantity_defective = models.BigIntegerField("累计不良品数量", default=0)
+    updated_at = models.DateTimeField("更新时间", auto_now=True)
+
+    class Meta:
+        verbose_name = "操作员绩效统计"
+        verbose_name_plural = "操作员绩效统计"
+        unique_together = [["operator", "task_type"]]
+
+    def __str__(self):
+        return f"{self.operator_id} - {self.task_type}: {self.task_count}"
+
+
+class WorkOrderProcessProgress(models.Model):
+    """工序任务完成计数
+
+    任务创建、删除和状态变化时由 CompletionProgress 原子增减，
+    判断工序是否完成只需读取一行，不再逐个加载工序的全部任务。
+    """
+
+    work_order_process = models.OneToOneField(
+        WorkOrderProcess,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="progress",
+        verbose_name="工序",
+    )
+    tasks_total = models.IntegerField("任务总数", default=0)
+    tasks_done = models.IntegerField(
+        "已完成任务数", default=0, help_text="状态为已完成且完成数量达到生产数量的任务"
+    )
+
+    class Meta:
+        verbose_name = "工序完成计数"
+        verbose_name_plural = "工序完成计数"
+
+    def __str__(self):
+        return f"{self.work_order_process_id}: {self.tasks_done}/{self.tasks_total}"
+
+
+class WorkOrderProgress(models.Model):
+    """施工单任务完成计数
+
+    与工序完成计数同步维护，判断施工单全部任务是否完成时不再执行两次全量 COUNT。
+    """
+
+    work_order = models.OneToOneField(
+        WorkOrder,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="progress",
+        verbose_name="施工单",
+    )
+    tasks_total = models.IntegerField("任务总数", default=0)
+    tasks_completed = models.IntegerField("已完成任务数", default=0)
+
+    class Meta:
+        verbose_name = "施工单完成计数"
+        verbose_name_plural = "施工单完成计数"
+
+    def __str__(self):
+        return f"{self.work_order_id}: {self.tasks_completed}/{self.tasks_total}"
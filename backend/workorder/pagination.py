@@ -1,9 +1,216 @@
 """
 自定义分页类
 
-解决默认 PageNumberPagination 不支持前端自定义 page_size 的问题
+解决默认 PageNumberPagination 不支持前端自定义 page_size 的问题，
+并为大数据量列表（任务、施工单、通知、审计日志）提供可选的游标分页：
+页码分页每页都要执行 COUNT(*) 并 OFFSET 扫描前面所有行，深分页越翻越慢；
+游标分页按 (created_at, id) 复合键定位，任意深度的翻页代价相同。
 """
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_count(queryset) -> Optional[int]:
+    """
+    根据数据库统计信息估算查询集的行数
+
+    PostgreSQL 读取查询计划（EXPLAIN）中的估计行数，不扫描数据；
+    其他数据库没有可用的估计值，返回 None。
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.warning(f"估算行数失败，改为精确计数: {str(e)}")
+        return None
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    复合键游标分页
+
+    按 (created_at, id) 排序并以上一页最后一条记录的这两个值作为游标，
+    下一页查询为 created_at < c OR (created_at = c AND id < i)，走 created_at 索引，
+    不执行 COUNT(*) 和 OFFSET。id 作为第二排序键保证同一时间创建的记录不会
+    在翻页时重复或遗漏。
+
+    查询参数：
+    - cursor: 上一次响应中 next / previous 链接携带的游标
+    - page_size: 每页数量（同页码分页，最大 1000）
+    - ordering=created_at: 按创建时间升序（默认降序，最新的在前）
+    - count=approx: 返回数据库统计信息中的估计总数（非 PostgreSQL 为精确计数）
+    - count=exact: 返回精确总数（执行 COUNT(*)）
+
+    游标模式下忽略其他 ordering 取值；默认不返回总数（count 为 None）。
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    ordering_field = "created_at"
+    invalid_cursor_message = "无效的游标"
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def is_ascending(self, request) -> bool:
+        return request.query_params.get("ordering") == self.ordering_field
+
+    # ==================== 游标编解码 ====================
+
+    def encode_cursor(self, instance, reverse: bool) -> str:
+        position = {
+            "c": getattr(instance, self.ordering_field).isoformat(),
+            "i": str(instance.pk),
+        }
+        if reverse:
+            position["r"] = 1
+        raw = json.dumps(position, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, request, model):
+        """解析游标：返回 (created_at, 主键, 是否向前翻页)，无游标时返回 None"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+            position = json.loads(raw)
+            created_at = parse_datetime(position["c"])
+            # 主键可能是整数或 UUID（审计日志）
+            pk = model._meta.pk.to_python(position["i"])
+            reverse = bool(position.get("r"))
+        except (TypeError, ValueError, KeyError, AttributeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk, reverse
+
+    # ==================== 分页 ====================
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ascending = self.is_ascending(request)
+        self.count = None
+        self.count_is_approximate = False
+
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode == "approx":
+            self.count = estimate_count(queryset)
+            self.count_is_approximate = self.count is not None
+        if count_mode == "exact" or (count_mode == "approx" and self.count is None):
+            self.count = queryset.count()
+
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = bool(cursor and cursor[2])
+        # 向前翻页时反转排序方向，取到结果后再翻转回来
+        descending = self.ascending == reverse
+        field = self.ordering_field
+        if descending:
+            queryset = queryset.order_by(f"-{field}", "-pk")
+        else:
+            queryset = queryset.order_by(field, "pk")
+
+        if cursor:
+            created_at, pk = cursor[0], cursor[1]
+            if descending:
+                queryset = queryset.filter(
+                    Q(**{f"{field}__lt": created_at})
+                    | Q(**{field: created_at, "pk__lt": pk})
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(**{f"{field}__gt": created_at})
+                    | Q(**{field: created_at, "pk__gt": pk})
+                )
+
+        # 多取一条判断是否还有下一页
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next = cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = results
+        return results
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        cursor = self.encode_cursor(self.page[-1], reverse=False)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        cursor = self.encode_cursor(self.page[0], reverse=True)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("count", self.count),
+                    ("count_is_approximate", self.count_is_approximate),
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "count": {"type": "integer", "nullable": True},
+                "count_is_approximate": {"type": "boolean"},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
 
 
 class CustomPagination(PageNumberPagination):
@@ -14,11 +221,68 @@ class CustomPagination(PageNumberPagination):
     - 默认每页 20 条
     - 前端可通过 ?page_size=100 指定每页数量
     - 最大限制 1000 条，防止一次性请求过多数据
+    - ?pagination=cursor 切换为游标分页（见 KeysetCursorPagination），
+      仅对有 created_at 字段的模型生效
 
     示例：
     - /api/processes/?page=1&page_size=100  # 获取第1页，每页100条
     - /api/processes/?page_size=1000        # 获取全部数据（最多1000条）
+    - /api/v1/workorder-tasks/?pagination=cursor&page_size=50  # 游标分页第一页
     """
     page_size = 20                        # 默认每页数量
     page_size_query_param = 'page_size'   # 允许前端指定每页数量的参数名
     max_page_size = 1000                  # 最大每页数量限制
+    mode_query_param = 'pagination'       # 分页模式参数名
+    cursor_pagination_class = KeysetCursorPagination
+
+    cursor_paginator = None
+
+    def use_cursor(self, queryset, request) -> bool:
+        if request.query_params.get(self.mode_query_param) != 'cursor':
+            return False
+        try:
+            queryset.model._meta.get_field(self.cursor_pagination_class.ordering_field)
+        except FieldDoesNotExist:
+            return False
+        return True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(queryset, request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            self.cursor_paginator.page_size = self.page_size
+            self.cursor_paginator.max_page_size = self.max_page_size
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters += [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': '分页模式：cursor 为游标分页（按创建时间倒序，不返回总数）',
+                'schema': {'type': 'string', 'enum': ['page', 'cursor']},
+            },
+            {
+                'name': KeysetCursorPagination.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': '游标分页的游标（取自上一次响应的 next / previous）',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': KeysetCursorPagination.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': '游标分页的总数：approx 为统计信息估计值，exact 为精确计数',
+                'schema': {'type': 'string', 'enum': ['approx', 'exact']},
+            },
+        ]
+        return parameters
@@ -1,20 +1,25 @@
 """
 Cache invalidation service using Django signals
 
-Automatically invalidates task statistics cache when tasks change.
+Automatically invalidates task statistics cache when tasks change,
+keeps the work order visibility index and department load counters
+up to date, and expires work order statistics snapshots.
 """
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.core.cache import cache
 import logging
 
+from ..services.namespaced_cache import dashboard_cache, department_cache, user_cache
+
 logger = logging.getLogger(__name__)
 
-# Cache key patterns
-TASK_STATS_KEY_PATTERN = 'task_stats:{dept_id}'
-DEPT_WORKLOAD_KEY_PATTERN = 'dept_workload:{dept_id}'
-OPERATOR_STATS_KEY_PATTERN = 'operator_stats:{operator_id}'
-DASHBOARD_PATTERN = 'dashboard:*'
+# Task statistics live in cache namespaces (see services/namespaced_cache.py):
+# - department_cache.scope(dept_id): per-department stats and workload
+# - user_cache.scope(operator_id): OPERATOR_STATS_SUFFIX
+# - dashboard_cache: cross-department dashboard / collaboration stats
+# Invalidating a namespace is a single atomic increment on every cache backend.
+OPERATOR_STATS_SUFFIX = 'operator_stats'
 
 
 @receiver(post_save, sender='workorder.WorkOrderTask')
@@ -26,48 +31,165 @@ def invalidate_task_cache_on_change(sender, instance, **kwargs):
     Invalidates:
     - Department statistics cache
     - Operator statistics cache (if task has operator)
-    - Dashboard cache pattern
+    - Dashboard cache namespace
     """
     try:
-        # Invalidate department stats
         if instance.assigned_department_id:
-            dept_key = TASK_STATS_KEY_PATTERN.format(dept_id=instance.assigned_department_id)
-            cache.delete(dept_key)
-            logger.debug(f"Invalidated dept stats cache: {dept_key}")
-
-            dept_workload_key = DEPT_WORKLOAD_KEY_PATTERN.format(dept_id=instance.assigned_department_id)
-            cache.delete(dept_workload_key)
-            logger.debug(f"Invalidated dept workload cache: {dept_workload_key}")
+            department_cache.scope(instance.assigned_department_id).invalidate()
+            logger.debug(f"Invalidated dept stats cache: {instance.assigned_department_id}")
 
-        # Invalidate operator stats
         if instance.assigned_operator_id:
-            operator_key = OPERATOR_STATS_KEY_PATTERN.format(operator_id=instance.assigned_operator_id)
-            cache.delete(operator_key)
-            logger.debug(f"Invalidated operator stats cache: {operator_key}")
-
-        # Invalidate dashboard cache (pattern deletion)
-        try:
-            # For Redis backend
-            cache._cache.get_client().delete_pattern(DASHBOARD_PATTERN)
-            logger.debug(f"Invalidated dashboard cache pattern: {DASHBOARD_PATTERN}")
-        except AttributeError:
-            # Fallback for non-Redis backends
-            pass
+            user_cache.scope(instance.assigned_operator_id).delete(OPERATOR_STATS_SUFFIX)
+            logger.debug(f"Invalidated operator stats cache: {instance.assigned_operator_id}")
+
+        dashboard_cache.invalidate()
 
     except Exception as e:
         logger.error(f"Error invalidating cache for task {instance.id}: {e}")
 
 
 def invalidate_department_stats(department_id: int) -> None:
-    """Manually invalidate department statistics cache"""
-    dept_key = TASK_STATS_KEY_PATTERN.format(dept_id=department_id)
-    workload_key = DEPT_WORKLOAD_KEY_PATTERN.format(dept_id=department_id)
-    cache.delete_many([dept_key, workload_key])
+    """Manually invalidate department statistics cache (and the dashboard built from it)"""
+    department_cache.scope(department_id).invalidate()
+    dashboard_cache.invalidate()
     logger.info(f"Manually invalidated cache for department {department_id}")
 
 
 def invalidate_operator_stats(operator_id: int) -> None:
     """Manually invalidate operator statistics cache"""
-    operator_key = OPERATOR_STATS_KEY_PATTERN.format(operator_id=operator_id)
-    cache.delete(operator_key)
+    user_cache.scope(operator_id).delete(OPERATOR_STATS_SUFFIX)
     logger.info(f"Manually invalidated cache for operator {operator_id}")
+
+
+# ==================== 施工单可见性索引维护 ====================
+# 保存前的关键外键取自字段追踪快照（FieldTrackingMixin，快照在 post_save 之后才刷新），
+# 不额外查询数据库，也不在每次实例化时复制字段
+
+
+_UNLOADED = object()
+
+
+@receiver(post_save, sender='workorder.WorkOrder')
+def update_visibility_on_workorder_save(sender, instance, created, **kwargs):
+    from ..services.visibility_index import WorkOrderVisibilityIndex
+
+    old_customer_id = instance.previous('customer')
+    try:
+        if created:
+            transaction.on_commit(
+                lambda: WorkOrderVisibilityIndex.on_work_order_created(instance)
+            )
+        elif instance.has_changed('customer'):
+            transaction.on_commit(
+                lambda: WorkOrderVisibilityIndex.on_work_order_customer_changed(
+                    instance, old_customer_id
+                )
+            )
+    except Exception as e:
+        logger.error(f"Error updating visibility index for work order {instance.id}: {e}")
+
+
+@receiver(post_save, sender='workorder.WorkOrderTask')
+def update_visibility_on_task_save(sender, instance, created, **kwargs):
+    from ..services.visibility_index import WorkOrderVisibilityIndex
+
+    # 新建任务视为从“未分派”变化
+    if created:
+        old_department_id = None
+    elif instance.has_changed('assigned_department'):
+        old_department_id = instance.previous('assigned_department')
+    else:
+        return
+    if old_department_id == instance.assigned_department_id:
+        return
+    try:
+        transaction.on_commit(
+            lambda: WorkOrderVisibilityIndex.on_task_department_changed(
+                instance, old_department_id
+            )
+        )
+    except Exception as e:
+        logger.error(f"Error updating visibility index for task {instance.id}: {e}")
+
+
+@receiver(post_delete, sender='workorder.WorkOrderTask')
+def update_visibility_on_task_delete(sender, instance, **kwargs):
+    from ..services.visibility_index import WorkOrderVisibilityIndex
+
+    department_id = instance.assigned_department_id
+    transaction.on_commit(
+        lambda: WorkOrderVisibilityIndex.invalidate(
+            WorkOrderVisibilityIndex.SCOPE_DEPARTMENT, department_id
+        )
+    )
+
+
+@receiver(post_save, sender='workorder.Customer')
+def update_visibility_on_salesperson_change(sender, instance, created, **kwargs):
+    from ..services.visibility_index import WorkOrderVisibilityIndex
+
+    if created or not instance.has_changed('salesperson'):
+        return
+    old_salesperson_id = instance.previous('salesperson')
+    try:
+        transaction.on_commit(
+            lambda: WorkOrderVisibilityIndex.on_salesperson_changed(
+                instance, old_salesperson_id
+            )
+        )
+    except Exception as e:
+        logger.error(f"Error updating visibility index for customer {instance.id}: {e}")
+
+
+# ==================== 部门负载计数 ====================
+
+
+def _track_department_load(old, new):
+    from ..services.department_load import DepartmentLoadStore
+
+    old_department_id, old_status = old
+    if old_status is _UNLOADED:
+        # 无法判断原状态是否计入负载，提交后让相关部门重新统计
+        department_ids = {old_department_id, new[0]} - {None}
+        transaction.on_commit(lambda: DepartmentLoadStore.invalidate(department_ids))
+        return
+    DepartmentLoadStore.track_change(old_department_id, old_status, *new)
+
+
+def _loaded_load_state(task):
+    """任务保存前（或加载时）的 (分派部门, 状态)；状态没有快照时记为未知"""
+    return (
+        task.previous('assigned_department'),
+        task.previous('status', _UNLOADED),
+    )
+
+
+@receiver(post_save, sender='workorder.WorkOrderTask')
+def update_department_load_on_task_save(sender, instance, created, **kwargs):
+    old = (None, None) if created else _loaded_load_state(instance)
+    new = (instance.assigned_department_id, instance.status)
+    if old != new:
+        _track_department_load(old, new)
+
+
+@receiver(post_delete, sender='workorder.WorkOrderTask')
+def update_department_load_on_task_delete(sender, instance, **kwargs):
+    _track_department_load(_loaded_load_state(instance), (None, None))
+
+
+# ==================== 施工单统计快照 ====================
+
+@receiver(post_save, sender='workorder.WorkOrder')
+@receiver(post_delete, sender='workorder.WorkOrder')
+@receiver(post_save, sender='workorder.WorkOrderProcess')
+@receiver(post_delete, sender='workorder.WorkOrderProcess')
+@receiver(post_save, sender='workorder.WorkOrderTask')
+@receiver(post_delete, sender='workorder.WorkOrderTask')
+@receiver(post_save, sender='workorder.WorkOrderProduct')
+@receiver(post_delete, sender='workorder.WorkOrderProduct')
+@receiver(post_save, sender='workorder.Customer')
+def expire_work_order_statistics(sender, **kwargs):
+    """统计相关数据变更提交后，使统计快照过期"""
+    from ..services.work_order_statistics import WorkOrderStatisticsService
+
+    transaction.on_commit(WorkOrderStatisticsService.bump_generation)
@@ -3,8 +3,147 @@
 
 提供缓存和优化的权限检查方法，减少数据库查询
 """
-from django.core.cache import cache
-from django.contrib.auth.models import Permission
+from django.contrib.auth.models import Group, Permission, User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from workorder.services.namespaced_cache import user_cache
+
+
+class AuthzProfile:
+    """用户授权画像
+
+    用户的组、权限（含组权限）、所属部门和业务员标记，构建一次后缓存，供登录、
+    当前用户接口、视图和权限类使用（请求中通过 request.authz 访问，见
+    AuthzProfileMiddleware），不再每次请求查询 groups / get_all_permissions。
+
+    画像缓存在 user 命名空间下：用户的组、权限、部门变化时使该用户的作用域失效，
+    组权限变化、组或部门删除时使整个 user 命名空间失效，不需要逐个删除缓存。
+    """
+
+    SALESPERSON_GROUP = '业务员'
+    CACHE_SUFFIX = 'authz'
+    TIMEOUT = 1800
+
+    def __init__(self, user_id=None, is_superuser=False, is_staff=False,
+                 groups=(), permissions=(), department_ids=()):
+        self.user_id = user_id
+        self.is_superuser = is_superuser
+        self.is_staff = is_staff
+        self.groups = tuple(groups)
+        self.permissions = frozenset(permissions)
+        self.department_ids = tuple(department_ids)
+
+    def __repr__(self):
+        return f"<AuthzProfile user={self.user_id} groups={list(self.groups)}>"
+
+    # ==================== 检查 ====================
+
+    @property
+    def is_authenticated(self):
+        return self.user_id is not None
+
+    @property
+    def is_salesperson(self):
+        return self.SALESPERSON_GROUP in self.groups
+
+    def has_perm(self, perm):
+        """与 User.has_perm 一致：启用的超级用户拥有全部权限"""
+        return self.is_superuser or perm in self.permissions
+
+    def has_perms(self, perms):
+        return all(self.has_perm(perm) for perm in perms)
+
+    def in_group(self, name):
+        return name in self.groups
+
+    def in_department(self, department_id):
+        return department_id in self.department_ids
+
+    def permission_list(self):
+        """前端权限列表：超级用户为 ['*']"""
+        return ['*'] if self.is_superuser else sorted(self.permissions)
+
+    # ==================== 构建与缓存 ====================
+
+    @classmethod
+    def anonymous(cls):
+        return cls()
+
+    @classmethod
+    def build(cls, user):
+        """从数据库构建画像（组、权限、部门各一次查询；超级用户不查询权限）"""
+        from .models.system import UserProfile
+
+        is_superuser = user.is_active and user.is_superuser
+        department_ids = UserProfile.departments.through.objects.filter(
+            userprofile__user_id=user.pk
+        ).values_list('department_id', flat=True)
+        return cls(
+            user_id=user.pk,
+            is_superuser=is_superuser,
+            is_staff=user.is_staff,
+            groups=user.groups.values_list('name', flat=True),
+            permissions=() if is_superuser else user.get_all_permissions(),
+            department_ids=sorted(department_ids),
+        )
+
+    @classmethod
+    def for_user(cls, user):
+        """获取用户画像（缓存命中时不查询数据库）"""
+        if user is None or not user.is_authenticated:
+            return cls.anonymous()
+
+        scope = user_cache.scope(user.pk)
+        cached = scope.get(cls.CACHE_SUFFIX)
+        if cached is not None:
+            return cls(**cached)
+
+        profile = cls.build(user)
+        scope.set(cls.CACHE_SUFFIX, profile._to_cache(), cls.TIMEOUT)
+        return profile
+
+    @classmethod
+    def for_request(cls, request):
+        """请求的用户画像：优先使用中间件提供的 request.authz"""
+        profile = getattr(request, 'authz', None)
+        if profile is None:
+            profile = cls.for_user(getattr(request, 'user', None))
+        return profile
+
+    def _to_cache(self):
+        return {
+            'user_id': self.user_id,
+            'is_superuser': self.is_superuser,
+            'is_staff': self.is_staff,
+            'groups': self.groups,
+            'permissions': tuple(self.permissions),
+            'department_ids': self.department_ids,
+        }
+
+    # ==================== 失效 ====================
+
+    # 失效在变更时和事务提交后各执行一次：提交前并发请求可能按旧数据重建画像，
+    # 只在变更时失效会让已撤销的权限在缓存超时前继续生效
+
+    @classmethod
+    def invalidate(cls, user_ids):
+        """使指定用户的画像失效"""
+        scopes = [user_cache.scope(user_id) for user_id in set(user_ids)]
+
+        def invalidate_scopes():
+            for scope in scopes:
+                scope.invalidate()
+
+        invalidate_scopes()
+        transaction.on_commit(invalidate_scopes)
+
+    @classmethod
+    def invalidate_all(cls):
+        """使所有用户的画像失效"""
+        user_cache.invalidate()
+        transaction.on_commit(user_cache.invalidate)
 
 
 class PermissionCache:
@@ -24,20 +163,8 @@ class PermissionCache:
         if not user.is_authenticated:
             return []
 
-        cache_key = f'user_departments_{user.id}'
-        departments = cache.get(cache_key)
-
-        if departments is None:
-            # 缓存未命中，从数据库获取
-            if hasattr(user, 'profile') and user.profile:
-                departments = list(user.profile.departments.values_list('id', flat=True))
-            else:
-                departments = []
-
-            # 缓存 30 分钟
-            cache.set(cache_key, departments, timeout)
-
-        return departments
+        # 部门随授权画像缓存，部门变化时画像随之失效
+        return list(AuthzProfile.for_user(user).department_ids)
 
     @staticmethod
     def is_user_in_department(user, department_id, timeout=1800):
@@ -61,15 +188,15 @@ class PermissionCache:
         Args:
             user: 用户对象
         """
-        cache_key = f'user_departments_{user.id}'
-        cache.delete(cache_key)
+        AuthzProfile.invalidate([user.id])
 
     @staticmethod
     def clear_all_user_cache():
-        """清除所有用户权限缓存（谨慎使用）"""
-        # 在用户部门变更时调用
-        # 例如：用户被添加到新部门或从部门移除
-        cache.delete_many([key for key in cache.keys('user_departments_*')])
+        """清除所有用户权限缓存
+
+        一次原子递增使 user 命名空间失效，LocMemCache 与 Redis 上行为一致
+        """
+        AuthzProfile.invalidate_all()
 
 
 class PermissionUtils:
@@ -132,3 +259,90 @@ class PermissionUtils:
             return True
 
         return all(user.has_perm(perm) for perm in permission_codenames)
+
+
+# ==================== 授权画像失效 ====================
+
+
+def _invalidate_from_m2m(action, instance, reverse, pk_set, user_ids_for):
+    """按 m2m 变更使画像失效：正向按实例所属用户，反向按 pk_set，无法确定时全部失效"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        AuthzProfile.invalidate(user_ids_for([instance.pk]))
+    elif pk_set:
+        AuthzProfile.invalidate(user_ids_for(pk_set))
+    else:
+        AuthzProfile.invalidate_all()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def _on_user_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    _invalidate_from_m2m(action, instance, reverse, pk_set, lambda ids: ids)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def _on_group_permissions_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        AuthzProfile.invalidate_all()
+
+
+def _profile_user_ids(profile_ids):
+    from .models.system import UserProfile
+
+    return UserProfile.objects.filter(pk__in=profile_ids).values_list('user_id', flat=True)
+
+
+def _on_departments_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        # 正向：instance 是 UserProfile
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            AuthzProfile.invalidate([instance.user_id])
+        return
+    _invalidate_from_m2m(action, instance, reverse, pk_set, _profile_user_ids)
+
+
+@receiver(post_save, sender=User)
+def _on_user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # 登录只更新 last_login，不影响授权
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    AuthzProfile.invalidate([instance.pk])
+
+
+@receiver(post_save, sender=Group)
+def _on_group_saved(sender, created, **kwargs):
+    # 改名会改变组名列表和业务员标记；新建的组还没有成员
+    if not created:
+        AuthzProfile.invalidate_all()
+
+
+@receiver(post_delete, sender=Group)
+def _on_group_deleted(sender, **kwargs):
+    AuthzProfile.invalidate_all()
+
+
+def _on_department_deleted(sender, **kwargs):
+    AuthzProfile.invalidate_all()
+
+
+def _on_profile_deleted(sender, instance, **kwargs):
+    AuthzProfile.invalidate([instance.user_id])
+
+
+def register_authz_signals():
+    """注册依赖 workorder 模型的失效信号（在 apps.ready 中调用）"""
+    from .models.base import Department
+    from .models.system import UserProfile
+
+    m2m_changed.connect(
+        _on_departments_changed, sender=UserProfile.departments.through,
+        dispatch_uid='authz_profile_departments',
+    )
+    post_delete.connect(
+        _on_department_deleted, sender=Department, dispatch_uid='authz_profile_department_deleted'
+    )
+    post_delete.connect(
+        _on_profile_deleted, sender=UserProfile, dispatch_uid='authz_profile_deleted'
+    )
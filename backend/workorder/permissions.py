@@ -5,7 +5,7 @@
 P1 优化：使用缓存减少权限检查的数据库查询
 """
 from rest_framework import permissions
-from .permission_utils import PermissionCache
+from .permission_utils import AuthzProfile, PermissionCache
 
 
 class SuperuserFriendlyModelPermissions(permissions.DjangoModelPermissions):
@@ -20,8 +20,19 @@ class SuperuserFriendlyModelPermissions(permissions.DjangoModelPermissions):
         if request.user and request.user.is_superuser:
             return True
 
-        # 其他用户使用 Django 模型权限检查
-        return super().has_permission(request, view)
+        # 其他用户使用 Django 模型权限检查（权限取自缓存的授权画像，
+        # 与 DjangoModelPermissions.has_permission 的流程一致）
+        if getattr(view, '_ignore_model_permissions', False):
+            return True
+
+        if not request.user or (
+            not request.user.is_authenticated and self.authenticated_users_only
+        ):
+            return False
+
+        queryset = self._queryset(view)
+        perms = self.get_required_permissions(request.method, queryset.model)
+        return AuthzProfile.for_request(request).has_perms(perms)
 
     def has_object_permission(self, request, view, obj):
         # 超级用户拥有所有权限
@@ -78,11 +89,11 @@ class WorkOrderProcessPermission(permissions.BasePermission):
 
         # 读取操作：检查是否有查看施工单的权限
         if request.method in permissions.SAFE_METHODS:
-            return request.user.has_perm('workorder.view_workorder')
+            return AuthzProfile.for_request(request).has_perm('workorder.view_workorder')
 
         # 写入操作：检查是否有编辑施工单的权限
         # 如果有编辑施工单的权限，就可以编辑其工序
-        return request.user.has_perm('workorder.change_workorder')
+        return AuthzProfile.for_request(request).has_perm('workorder.change_workorder')
 
     def has_object_permission(self, request, view, obj):
         """
@@ -98,15 +109,15 @@ class WorkOrderProcessPermission(permissions.BasePermission):
 
         # 读取操作：检查是否有查看施工单的权限
         if request.method in permissions.SAFE_METHODS:
-            return request.user.has_perm('workorder.view_workorder')
+            return AuthzProfile.for_request(request).has_perm('workorder.view_workorder')
 
         # 写入操作：检查是否有编辑该工序所属施工单的权限
         if hasattr(obj, 'work_order') and obj.work_order:
             # 检查是否有编辑该施工单的权限
-            return request.user.has_perm('workorder.change_workorder')
+            return AuthzProfile.for_request(request).has_perm('workorder.change_workorder')
 
         # 如果没有关联的施工单，检查是否有编辑施工单的权限
-        return request.user.has_perm('workorder.change_workorder')
+        return AuthzProfile.for_request(request).has_perm('workorder.change_workorder')
 
 
 class WorkOrderMaterialPermission(permissions.BasePermission):
@@ -125,11 +136,11 @@ class WorkOrderMaterialPermission(permissions.BasePermission):
 
         # 读取操作：检查是否有查看施工单的权限
         if request.method in permissions.SAFE_METHODS:
-            return request.user.has_perm('workorder.view_workorder')
+            return AuthzProfile.for_request(request).has_perm('workorder.view_workorder')
 
         # 写入操作：检查是否有编辑施工单的权限
         # 如果有编辑施工单的权限，就可以编辑其物料
-        return request.user.has_perm('workorder.change_workorder')
+        return AuthzProfile.for_request(request).has_perm('workorder.change_workorder')
 
     def has_object_permission(self, request, view, obj):
         """
@@ -145,15 +156,15 @@ class WorkOrderMaterialPermission(permissions.BasePermission):
 
         # 读取操作：检查是否有查看施工单的权限
         if request.method in permissions.SAFE_METHODS:
-            return request.user.has_perm('workorder.view_workorder')
+            return AuthzProfile.for_request(request).has_perm('workorder.view_workorder')
 
         # 写入操作：检查是否有编辑该物料所属施工单的权限
         if hasattr(obj, 'work_order') and obj.work_order:
             # 检查是否有编辑该施工单的权限
-            return request.user.has_perm('workorder.change_workorder')
+            return AuthzProfile.for_request(request).has_perm('workorder.change_workorder')
 
         # 如果没有关联的施工单，检查是否有编辑施工单的权限
-        return request.user.has_perm('workorder.change_workorder')
+        return AuthzProfile.for_request(request).has_perm('workorder.change_workorder')
 
 
 class WorkOrderTaskPermission(permissions.BasePermission):
@@ -177,11 +188,11 @@ class WorkOrderTaskPermission(permissions.BasePermission):
 
         # 读取操作：检查是否有查看施工单的权限
         if request.method in permissions.SAFE_METHODS:
-            return request.user.has_perm('workorder.view_workorder')
+            return AuthzProfile.for_request(request).has_perm('workorder.view_workorder')
 
         # 写入操作：允许有查看权限的用户访问，具体权限由 has_object_permission 检查
         # 这样可以让操作员通过 update_quantity 等操作更新自己的任务
-        return request.user.has_perm('workorder.view_workorder')
+        return AuthzProfile.for_request(request).has_perm('workorder.view_workorder')
     
     def has_object_permission(self, request, view, obj):
         """
@@ -194,7 +205,7 @@ class WorkOrderTaskPermission(permissions.BasePermission):
         # 读取操作：检查数据权限
         if request.method in permissions.SAFE_METHODS:
             # 管理员可以查看所有任务
-            if request.user.is_superuser or request.user.has_perm('workorder.view_workorder'):
+            if request.user.is_superuser or AuthzProfile.for_request(request).has_perm('workorder.view_workorder'):
                 return True
             
             # 操作员只能查看自己分派的任务
@@ -227,7 +238,7 @@ class WorkOrderTaskPermission(permissions.BasePermission):
             # P1 优化: 使用缓存检查用户是否属于该部门
             if PermissionCache.is_user_in_department(request.user, obj.assigned_department.id):
                 # 检查是否有 change_workorder 权限（生产主管）
-                if request.user.has_perm('workorder.change_workorder'):
+                if AuthzProfile.for_request(request).has_perm('workorder.change_workorder'):
                     return True
         
         # 施工单创建人可以操作自己创建的施工单的任务
@@ -235,7 +246,7 @@ class WorkOrderTaskPermission(permissions.BasePermission):
             return True
         
         # 跨部门操作需要特殊权限
-        if request.user.has_perm('workorder.change_workorder'):
+        if AuthzProfile.for_request(request).has_perm('workorder.change_workorder'):
             # 检查是否是跨部门操作
             if obj.assigned_department:
                 # P1 优化: 使用缓存检查跨部门操作
@@ -267,10 +278,10 @@ class WorkOrderDataPermission(permissions.BasePermission):
 
         # 读取操作：检查是否有查看施工单的权限
         if request.method in permissions.SAFE_METHODS:
-            return request.user.has_perm('workorder.view_workorder')
+            return AuthzProfile.for_request(request).has_perm('workorder.view_workorder')
 
         # 写入操作：检查是否有编辑施工单的权限
-        return request.user.has_perm('workorder.change_workorder')
+        return AuthzProfile.for_request(request).has_perm('workorder.change_workorder')
     
     def has_object_permission(self, request, view, obj):
         """
@@ -296,7 +307,7 @@ class WorkOrderDataPermission(permissions.BasePermission):
                     return True
             
             # 生产主管可以查看本部门有任务的施工单
-            if request.user.has_perm('workorder.change_workorder'):
+            if AuthzProfile.for_request(request).has_perm('workorder.change_workorder'):
                 # 检查是否有本部门的任务
                 user_departments = request.user.profile.departments.all() if hasattr(request.user, 'profile') else []
                 if user_departments:
@@ -310,7 +321,7 @@ class WorkOrderDataPermission(permissions.BasePermission):
                         return True
             
             # 有 view_workorder 权限的用户可以查看所有施工单（管理员等）
-            if request.user.has_perm('workorder.view_workorder'):
+            if AuthzProfile.for_request(request).has_perm('workorder.view_workorder'):
                 return True
             
             return False
@@ -320,11 +331,11 @@ class WorkOrderDataPermission(permissions.BasePermission):
         if obj.created_by == request.user:
             # 如果已审核，需要特殊权限
             if obj.approval_status == 'approved':
-                return request.user.has_perm('workorder.change_workorder')
+                return AuthzProfile.for_request(request).has_perm('workorder.change_workorder')
             return True
         
         # 有 change_workorder 权限的用户可以编辑
-        if request.user.has_perm('workorder.change_workorder'):
+        if AuthzProfile.for_request(request).has_perm('workorder.change_workorder'):
             return True
         
         return False
@@ -129,8 +129,11 @@ class AuditLogExportSerializer(serializers.ModelSerializer):
             'start_date',
             'end_date',
             'filters',
+            'file_format',
+            'compressed',
             'file_path',
             'record_count',
+            'processed_count',
             'file_size',
             'status',
             'status_display',
@@ -11,6 +11,7 @@ from django.utils import timezone
 from rest_framework import serializers
 
 from ..models.base import Customer, Department, Process
+from ..services.department_tree import DepartmentTree
 
 
 class BaseModelSerializer(serializers.ModelSerializer):
@@ -233,9 +234,7 @@ class DepartmentSerializer(serializers.ModelSerializer):
                     )
 
                 # 不能将自己的子孙设为上级
-                descendants = self.instance.get_descendants()
-                descendant_ids = [d.id for d in descendants]
-                if parent.id in descendant_ids:
+                if DepartmentTree.get().is_descendant(parent.id, self.instance.id):
                     raise serializers.ValidationError(
                         {"parent": "不能将子部门设为上级部门，这会造成循环引用"}
                     )
@@ -571,34 +571,44 @@ class WorkOrderListSerializer(serializers.ModelSerializer):
         ]
 
     def get_progress_percentage(self, obj) -> int:
+        # 列表模式下使用查询集注解（见 QueryOptimizer.optimize_workorder_list_queryset）
+        if hasattr(obj, "list_total_processes"):
+            if not obj.list_total_processes:
+                return 0
+            return int(obj.list_completed_processes / obj.list_total_processes * 100)
         return obj.get_progress_percentage()
 
+    def _get_products(self, obj):
+        """返回施工单产品列表，优先使用 prefetch 缓存"""
+        return list(obj.products.all())
+
     def get_product_name(self, obj) -> Optional[str]:
         """如果有多个产品，显示为 'xx款拼版'，否则显示单个产品名称"""
-        products = obj.products.all()
-        if products.count() > 1:
-            return f"{products.count()}款拼版"
-        elif products.count() == 1:
-            first_product = products.first()
+        products = self._get_products(obj)
+        if len(products) > 1:
+            return f"{len(products)}款拼版"
+        elif len(products) == 1:
+            first_product = products[0]
             return first_product.product.name if first_product.product else None
         return None
 
     def get_quantity(self, obj) -> float:
         """返回所有产品的数量总和"""
-        products = obj.products.all()
-        if products.exists():
-            return sum(p.quantity for p in products)
-        return 0
+        if hasattr(obj, "list_product_quantity"):
+            return obj.list_product_quantity
+        return sum(p.quantity for p in self._get_products(obj))
 
     def get_unit(self, obj) -> str:
         """返回第一个产品的单位"""
-        products = obj.products.all()
-        if products.exists():
-            return products.first().unit
+        products = self._get_products(obj)
+        if products:
+            return products[0].unit
         return "件"
 
     def get_draft_task_count(self, obj) -> int:
         """获取草稿任务数量"""
+        if hasattr(obj, "list_draft_tasks"):
+            return obj.list_draft_tasks
         from ..models import WorkOrderTask
 
         return WorkOrderTask.objects.filter(
@@ -607,6 +617,8 @@ class WorkOrderListSerializer(serializers.ModelSerializer):
 
     def get_total_task_count(self, obj) -> int:
         """获取总任务数量"""
+        if hasattr(obj, "list_total_tasks"):
+            return obj.list_total_tasks
         from ..models import WorkOrderTask
 
         return WorkOrderTask.objects.filter(work_order_process__work_order=obj).count()
@@ -7,12 +7,18 @@ Author: 小可 AI Assistant
 Date: 2026-03-04
 """
 
-import logging
 import csv
+import gzip
+import io
+import json
+import logging
 import os
-from datetime import datetime
+import uuid
+
 from django.conf import settings
+from django.db.models import Q
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from ..models.audit import AuditLog, AuditLogExport
 
@@ -24,7 +30,15 @@ class AuditExportService:
     审计日志导出服务
     """
 
-    def create_export_task(self, user, start_date, end_date, filters=None):
+    def create_export_task(
+        self,
+        user,
+        start_date,
+        end_date,
+        filters=None,
+        file_format=AuditLogExport.FORMAT_CSV,
+        compressed=False,
+    ):
         """
         创建导出任务
 
@@ -33,6 +47,8 @@ class AuditExportService:
             start_date: 开始日期
             end_date: 结束日期
             filters: 过滤条件
+            file_format: 导出格式（csv / ndjson）
+            compressed: 是否 gzip 压缩
 
         Returns:
             AuditLogExport: 导出任务对象
@@ -42,6 +58,8 @@ class AuditExportService:
             start_date=start_date,
             end_date=end_date,
             filters=filters or {},
+            file_format=file_format,
+            compressed=compressed,
             status=AuditLogExport.STATUS_PENDING
         )
 
@@ -61,95 +79,139 @@ class AuditExportService:
             return
         # 异步模式下，由定时任务或队列处理 pending 导出
 
-    def perform_export(self, export_id):
+    def perform_export(self, export_id, resume=False):
         """
         执行导出任务
 
+        按 (created_at, id) 键集分页逐块读取，每块写入后在导出记录上保存进度，
+        内存占用与总记录数无关。失败（或进程中断后以 resume=True 重新执行）时
+        从最后一个完整写入的块继续。
+
         Args:
             export_id: 导出任务ID
+            resume: 是否允许接管处理中（上次中断）的任务
         """
         export = AuditLogExport.objects.get(id=export_id)
-        if export.status not in [AuditLogExport.STATUS_PENDING, AuditLogExport.STATUS_FAILED]:
+        allowed_statuses = [AuditLogExport.STATUS_PENDING, AuditLogExport.STATUS_FAILED]
+        if resume:
+            allowed_statuses.append(AuditLogExport.STATUS_PROCESSING)
+        if export.status not in allowed_statuses:
             return
         export.status = AuditLogExport.STATUS_PROCESSING
-        export.save()
+        export.error_message = ''
+        export.save(update_fields=['status', 'error_message'])
 
         try:
-            # 构建查询
-            queryset = AuditLog.objects.all()
-
-            # 时间范围
-            if export.start_date:
-                queryset = queryset.filter(created_at__gte=export.start_date)
-            if export.end_date:
-                queryset = queryset.filter(created_at__lte=export.end_date)
-
-            # 应用过滤条件
-            filters = export.filters
-            if filters.get('action_type'):
-                queryset = queryset.filter(action_type=filters['action_type'])
-            if filters.get('user_id'):
-                queryset = queryset.filter(user_id=filters['user_id'])
-            if filters.get('model'):
-                queryset = queryset.filter(content_type__model=filters['model'])
-
-            # 统计
-            export.record_count = queryset.count()
-
-            # 生成文件路径
-            filename = f"audit_log_{export.id}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            export_dir = getattr(settings, 'AUDIT_LOG_EXPORT_DIR', '/tmp/audit_logs')
-            os.makedirs(export_dir, exist_ok=True)
-            file_path = os.path.join(export_dir, filename)
-
-            # 导出为CSV
-            with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-
-                # 写入表头
-                writer.writerow([
-                    'ID',
-                    '操作类型',
-                    '用户',
-                    '对象类型',
-                    '对象ID',
-                    '对象表示',
-                    '变更字段',
-                    'IP地址',
-                    '创建时间',
-                ])
-
-                # 写入数据
-                for log in queryset:
-                    writer.writerow([
-                        str(log.id),
-                        log.get_action_type_display(),
-                        log.username,
-                        log.content_type.model if log.content_type else '',
-                        log.object_id,
-                        log.object_repr,
-                        ','.join(log.changed_fields),
-                        log.ip_address or '',
-                        log.created_at.isoformat(),
-                    ])
-
-            # 获取文件大小
-            export.file_size = os.path.getsize(file_path)
-            export.file_path = file_path
+            queryset = self.build_queryset(export)
+            writer = AuditLogExportWriter(export)
+            writer.open()
+            try:
+                if not export.processed_count:
+                    # 首次执行时统计总数；续传沿用已有统计
+                    export.record_count = queryset.count()
+                    export.save(update_fields=['record_count'])
+                    writer.write_header()
+
+                for rows in self.iter_chunks(queryset, export.cursor):
+                    writer.write_rows(rows)
+                    last = rows[-1]
+                    export.processed_count += len(rows)
+                    export.cursor = {
+                        'created_at': last[self.CREATED_AT_INDEX].isoformat(),
+                        'id': str(last[self.ID_INDEX]),
+                    }
+                    export.file_size = writer.checkpoint()
+                    export.save(update_fields=['processed_count', 'cursor', 'file_size'])
+            finally:
+                writer.close()
+
+            export.file_size = os.path.getsize(export.file_path)
             export.status = AuditLogExport.STATUS_COMPLETED
             export.completed_at = timezone.now()
             export.save()
 
-            logger.info(f"审计日志导出完成: {export_id}, 记录数: {export.record_count}")
+            logger.info(f"审计日志导出完成: {export_id}, 记录数: {export.processed_count}")
 
         except Exception as exc:
             export.status = AuditLogExport.STATUS_FAILED
             export.error_message = str(exc)
             export.completed_at = timezone.now()
-            export.save()
+            export.save(update_fields=['status', 'error_message', 'completed_at'])
 
             logger.error(f"审计日志导出失败: {export_id}, 错误: {exc}", exc_info=True)
 
+    # 导出列（values_list 投影，避免实例化模型和逐行访问 content_type）
+    EXPORT_FIELDS = (
+        'id',
+        'action_type',
+        'username',
+        'content_type__model',
+        'object_id',
+        'object_repr',
+        'changed_fields',
+        'ip_address',
+        'created_at',
+    )
+    ID_INDEX = 0
+    CREATED_AT_INDEX = 8
+    CHUNK_SIZE = 2000
+
+    def build_queryset(self, export):
+        """根据导出任务构建查询（读取只读副本：导出进度写主库，不影响读取路由）"""
+        from ..db_router import ReplicaRouter
+
+        queryset = AuditLog.objects.using(ReplicaRouter.read_alias())
+
+        # 时间范围
+        if export.start_date:
+            queryset = queryset.filter(created_at__gte=export.start_date)
+        if export.end_date:
+            queryset = queryset.filter(created_at__lte=export.end_date)
+
+        # 应用过滤条件
+        filters = export.filters or {}
+        if filters.get('action_type'):
+            queryset = queryset.filter(action_type=filters['action_type'])
+        if filters.get('user_id'):
+            queryset = queryset.filter(user_id=filters['user_id'])
+        if filters.get('model'):
+            queryset = queryset.filter(content_type__model=filters['model'])
+
+        return queryset
+
+    def iter_chunks(self, queryset, cursor=None, chunk_size=None):
+        """
+        按 (created_at, id) 键集分页逐块产出记录元组
+
+        Args:
+            queryset: 审计日志查询集
+            cursor: 从该位置之后开始（{'created_at': iso 字符串, 'id': 字符串}）
+            chunk_size: 每块记录数
+        """
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        queryset = queryset.order_by('created_at', 'id').values_list(*self.EXPORT_FIELDS)
+
+        last_created_at = last_id = None
+        if cursor:
+            last_created_at = parse_datetime(cursor['created_at'])
+            last_id = uuid.UUID(cursor['id'])
+
+        while True:
+            page = queryset
+            if last_created_at is not None:
+                page = page.filter(
+                    Q(created_at__gt=last_created_at)
+                    | Q(created_at=last_created_at, id__gt=last_id)
+                )
+            rows = list(page[:chunk_size])
+            if not rows:
+                return
+            yield rows
+            if len(rows) < chunk_size:
+                return
+            last_created_at = rows[-1][self.CREATED_AT_INDEX]
+            last_id = rows[-1][self.ID_INDEX]
+
     def process_pending_exports(self, limit=10):
         """
         处理待导出的任务
@@ -162,3 +224,119 @@ class AuditExportService:
 
         for export in pending_exports:
             self.perform_export(export.id)
+
+
+class AuditLogExportWriter:
+    """
+    审计日志导出文件写入器
+
+    每个块编码后整体追加到文件（压缩时每块是一个独立的 gzip member，
+    多 member 拼接仍是合法的 gzip 文件）。checkpoint() 返回的偏移始终落在块边界，
+    续传时先截断到该偏移，丢弃中断时写了一半的块。
+    """
+
+    CSV_HEADER = [
+        'ID',
+        '操作类型',
+        '用户',
+        '对象类型',
+        '对象ID',
+        '对象表示',
+        '变更字段',
+        'IP地址',
+        '创建时间',
+    ]
+
+    ACTION_DISPLAY = dict(AuditLog.ACTION_CHOICES)
+
+    def __init__(self, export):
+        self.export = export
+        self.file = None
+
+    def _build_file_path(self):
+        extension = self.export.file_format
+        if self.export.compressed:
+            extension += '.gz'
+        filename = f"audit_log_{self.export.id}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+        export_dir = getattr(settings, 'AUDIT_LOG_EXPORT_DIR', '/tmp/audit_logs')
+        os.makedirs(export_dir, exist_ok=True)
+        return os.path.join(export_dir, filename)
+
+    def open(self):
+        """打开导出文件；有进度时截断到上次的块边界继续写入"""
+        export = self.export
+        if export.processed_count and export.file_path and os.path.exists(export.file_path):
+            self.file = open(export.file_path, 'r+b')
+            self.file.truncate(export.file_size)
+            self.file.seek(export.file_size)
+            return
+
+        # 无可续传的文件，从头开始
+        export.processed_count = 0
+        export.cursor = {}
+        export.file_size = 0
+        export.file_path = self._build_file_path()
+        export.save(update_fields=['processed_count', 'cursor', 'file_size', 'file_path'])
+        self.file = open(export.file_path, 'wb')
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def checkpoint(self):
+        """刷盘并返回当前文件偏移"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def _write(self, text):
+        data = text.encode('utf-8')
+        if self.export.compressed:
+            data = gzip.compress(data)
+        self.file.write(data)
+
+    def write_header(self):
+        if self.export.file_format == AuditLogExport.FORMAT_CSV:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(self.CSV_HEADER)
+            self._write(buffer.getvalue())
+        self.export.file_size = self.checkpoint()
+
+    def write_rows(self, rows):
+        if self.export.file_format == AuditLogExport.FORMAT_NDJSON:
+            self._write(''.join(self._to_json_line(row) for row in rows))
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for (log_id, action_type, username, model, object_id, object_repr,
+             changed_fields, ip_address, created_at) in rows:
+            writer.writerow([
+                str(log_id),
+                self.ACTION_DISPLAY.get(action_type, action_type),
+                username,
+                model or '',
+                object_id,
+                object_repr,
+                ','.join(changed_fields or []),
+                ip_address or '',
+                created_at.isoformat(),
+            ])
+        self._write(buffer.getvalue())
+
+    def _to_json_line(self, row):
+        (log_id, action_type, username, model, object_id, object_repr,
+         changed_fields, ip_address, created_at) = row
+        return json.dumps({
+            'id': str(log_id),
+            'action_type': action_type,
+            'action_display': self.ACTION_DISPLAY.get(action_type, action_type),
+            'username': username,
+            'model': model or '',
+            'object_id': object_id,
+            'object_repr': object_repr,
+            'changed_fields': changed_fields or [],
+            'ip_address': ip_address or '',
+            'created_at': created_at.isoformat(),
+        }, ensure_ascii=False) + '\n'
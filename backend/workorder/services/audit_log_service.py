@@ -21,8 +21,9 @@ from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
 from django.db.models.fields.files import FieldFile
 
-from ..models.audit import AuditLog, AuditLogSettings, AuditMixin
+from ..models.audit import AuditLog, AuditMixin
 from ..middleware.audit_log import get_current_request, get_client_ip as middleware_get_client_ip
+from .audit_writer import AuditLogWriter, AuditSettingsCache
 
 logger = logging.getLogger(__name__)
 
@@ -51,42 +52,69 @@ def get_client_ip(request):
     return middleware_get_client_ip(request)
 
 
-def capture_changes(instance, created=False):
+def get_audit_settings(instance):
     """
-    捕获模型变更
+    获取适用于该实例的审计配置
 
-    Args:
-        instance: 模型实例
-        created: 是否为新建操作
+    Returns:
+        AuditLogSettings: 审计启用且实例在审计模型列表中时返回配置，否则返回 None
     """
-    # 检查审计日志是否启用
-    settings = AuditLogSettings.get_settings()
+    settings = AuditSettingsCache.get()
     if not settings.enabled:
-        return
+        return None
 
-    # 检查是否在审计模型列表中
-    model_label = instance._meta.label_lower
+    # 检查是否在审计模型列表中（为空表示审计全部模型）
     audited_models = {
         str(item).lower()
         for item in (settings.audited_models or [])
     }
     if audited_models:
-        if model_label not in audited_models and instance._meta.label.lower() not in audited_models:
-            return
-        return
+        if instance._meta.label_lower not in audited_models and instance._meta.label.lower() not in audited_models:
+            return None
 
-    try:
-        # 获取请求上下文
-        context = get_request_context()
-        user = context.get('user')
+    return settings
 
-        # 获取 Content Type
-        content_type = ContentType.objects.get_for_model(instance)
 
-        # 获取对象ID和表示
-        object_id = str(instance.pk)
-        object_repr = get_object_repr(instance)
+def build_audit_log(instance, action_type, changes, changed_fields):
+    """
+    构建审计日志（不写库，交由 AuditLogWriter 批量写入）
+    """
+    context = get_request_context()
+    user = context.get('user')
+    if user is not None and not getattr(user, 'is_authenticated', False):
+        user = None
+
+    return AuditLog(
+        action_type=action_type,
+        user=user,
+        # ContentType 查询由 Django 在进程内缓存
+        content_type=ContentType.objects.get_for_model(instance),
+        object_id=str(instance.pk),
+        object_repr=get_object_repr(instance)[:255],
+        changes=changes,
+        changed_fields=changed_fields,
+        ip_address=context.get('ip_address'),
+        user_agent=context.get('user_agent') or '',
+        request_method=context.get('request_method') or '',
+        request_path=context.get('request_path') or '',
+    )
+
+
+def capture_changes(instance, created=False):
+    """
+    捕获模型变更
+
+    变更记录交由 AuditLogWriter 缓冲，在事务提交（或请求结束）时批量写入。
+
+    Args:
+        instance: 模型实例
+        created: 是否为新建操作
+    """
+    settings = get_audit_settings(instance)
+    if settings is None:
+        return
 
+    try:
         # 确定操作类型
         if created:
             action_type = AuditLog.ACTION_CREATE
@@ -105,33 +133,89 @@ def capture_changes(instance, created=False):
             if not changed_fields:
                 return
 
-        # 创建审计日志
-        audit_log = AuditLog.objects.create(
-            action_type=action_type,
-            user=user,
-            content_type=content_type,
-            object_id=object_id,
-            object_repr=object_repr,
-            changes=changes,
-            changed_fields=changed_fields,
-            ip_address=context.get('ip_address'),
-            user_agent=context.get('user_agent') or '',
-            request_method=context.get('request_method') or '',
-            request_path=context.get('request_path') or '',
+        AuditLogWriter.add(
+            build_audit_log(instance, action_type, changes, changed_fields)
         )
 
-        logger.info(f"审计日志已创建: {audit_log}")
+    except Exception as exc:
+        logger.error(f"创建审计日志失败: {exc}", exc_info=True)
+
+
+def capture_bulk_created(instances):
+    """
+    记录批量新建的实例（bulk_create 不触发保存信号的场景）
+
+    Args:
+        instances: 同一模型的已写入实例列表
+    """
+    if not instances:
+        return
+    settings = get_audit_settings(instances[0])
+    if settings is None:
+        return
 
+    try:
+        for instance in instances:
+            changes = {'new': model_to_dict(instance, settings=settings)}
+            AuditLogWriter.add(
+                build_audit_log(instance, AuditLog.ACTION_CREATE, changes, list(changes['new'].keys()))
+            )
     except Exception as exc:
         logger.error(f"创建审计日志失败: {exc}", exc_info=True)
 
 
-def model_to_dict(instance, settings=None):
+def capture_bulk_changes(instances, old_values):
+    """
+    记录批量更新的已知字段变更（bulk_update 等不触发保存信号的场景）
+
+    Args:
+        instances: 同一模型的已更新实例列表
+        old_values: 主键 -> {字段名: 更新前的值}
+    """
+    if not instances:
+        return
+    settings = get_audit_settings(instances[0])
+    if settings is None:
+        return
+
+    excluded_fields = set(settings.excluded_fields or [])
+    meta = instances[0]._meta
+    try:
+        for instance in instances:
+            changes = {'old': {}, 'new': {}}
+            for name, old_value in old_values.get(instance.pk, {}).items():
+                if name in excluded_fields:
+                    continue
+                old_value = normalize_for_json(old_value)
+                new_value = normalize_for_json(meta.get_field(name).value_from_object(instance))
+                if old_value != new_value:
+                    changes['old'][name] = old_value
+                    changes['new'][name] = new_value
+
+            changed_fields = list(changes['new'].keys())
+            if changed_fields:
+                AuditLogWriter.add(
+                    build_audit_log(instance, AuditLog.ACTION_UPDATE, changes, changed_fields)
+                )
+    except Exception as exc:
+        logger.error(f"创建审计日志失败: {exc}", exc_info=True)
+
+
+def get_excluded_fields(settings=None):
+    """不需要审计的字段"""
+    excluded_fields = {'last_login', 'updated_at', 'created_at'}
+    if settings:
+        excluded_fields.update(settings.excluded_fields or [])
+    return excluded_fields
+
+
+def model_to_dict(instance, settings=None, include_m2m=True):
     """
     将模型实例转换为字典
 
     Args:
         instance: 模型实例
+        include_m2m: 是否包含多对多字段（每个字段一次查询）
 
     Returns:
         dict: 模型数据字典
@@ -139,19 +223,40 @@ def model_to_dict(instance, settings=None):
     from django.forms.models import model_to_dict as django_model_to_dict
 
     # 排除不需要审计的字段
-    excluded_fields = {'last_login', 'updated_at', 'created_at'}
-    if settings:
-        excluded_fields.update(settings.excluded_fields or [])
+    excluded_fields = get_excluded_fields(settings)
     data = django_model_to_dict(instance, exclude=list(excluded_fields))
 
     # 添加多对多字段
-    for field in instance._meta.many_to_many:
-        if field.name not in excluded_fields:
-            try:
-                data[field.name] = list(getattr(instance, field.name).values_list('pk', flat=True))
-            except Exception:
-                pass
+    if include_m2m:
+        for field in instance._meta.many_to_many:
+            if field.name not in excluded_fields:
+                try:
+                    data[field.name] = list(getattr(instance, field.name).values_list('pk', flat=True))
+                except Exception:
+                    pass
+
+    return normalize_for_json(data)
+
 
+def loaded_values_to_dict(instance, settings=None):
+    """
+    由字段追踪快照构建变更前的数据（与 model_to_dict 的字段一致，不含多对多字段）
+
+    多对多字段不经 save() 修改，保存前后的值相同，无需比较。
+
+    Returns:
+        dict: 模型数据字典；实例没有完整快照（新建实例、延迟加载）时返回 None
+    """
+    loaded_values = instance.get_loaded_values()
+    if loaded_values is None:
+        return None
+
+    excluded_fields = get_excluded_fields(settings)
+    data = {
+        field.name: loaded_values[field.attname]
+        for field in instance._meta.concrete_fields
+        if field.editable and field.name not in excluded_fields
+    }
     return normalize_for_json(data)
 
 
@@ -192,7 +297,9 @@ def get_model_changes(instance, settings=None, old_data=None):
             return {}, []
 
         old_data = model_to_dict(original, settings=settings)
-    new_data = model_to_dict(instance, settings=settings)
+    # 变更前数据来自快照时不含多对多字段，新数据也无需查询
+    include_m2m = any(field.name in old_data for field in instance._meta.many_to_many)
+    new_data = model_to_dict(instance, settings=settings, include_m2m=include_m2m)
 
     # 找出变更的字段
     changed_fields = []
@@ -232,7 +339,7 @@ def audit_log_pre_save(sender, instance, **kwargs):
     """
     pre_save 信号处理器
 
-    保存更新前的数据快照，供 post_save 对比
+    保存更新前的数据快照，供 post_save 对比（优先使用字段追踪快照，不查询数据库）
     """
     # 只审计继承自 AuditMixin 的模型
     if not isinstance(instance, AuditMixin):
@@ -246,21 +353,16 @@ def audit_log_pre_save(sender, instance, **kwargs):
     if not instance.pk:
         return
 
-    # 检查审计日志是否启用
-    settings = AuditLogSettings.get_settings()
-    if not settings.enabled:
+    settings = get_audit_settings(instance)
+    if settings is None:
         return
 
-    # 检查是否在审计模型列表中
-    model_label = instance._meta.label_lower
-    audited_models = {
-        str(item).lower()
-        for item in (settings.audited_models or [])
-    }
-    if audited_models:
-        if model_label not in audited_models and instance._meta.label.lower() not in audited_models:
-            return
+    old_data = loaded_values_to_dict(instance, settings=settings)
+    if old_data is not None:
+        instance._audit_old_data = old_data
+        return
 
+    # 没有完整快照（手动构造的实例、延迟加载）时回退到查询数据库
     try:
         original = instance.__class__.objects.get(pk=instance.pk)
         instance._audit_old_data = model_to_dict(original, settings=settings)
@@ -282,54 +384,23 @@ def audit_log_delete(sender, instance, **kwargs):
     if sender == AuditLog:
         return
 
-    # 检查审计日志是否启用
-    settings = AuditLogSettings.get_settings()
-    if not settings.enabled:
-        return
-
-    # 检查是否在审计模型列表中
-    model_label = instance._meta.label_lower
-    audited_models = {
-        str(item).lower()
-        for item in (settings.audited_models or [])
-    }
-    if audited_models:
-        if model_label not in audited_models and instance._meta.label.lower() not in audited_models:
-            return
+    settings = get_audit_settings(instance)
+    if settings is None:
         return
 
     try:
-        # 获取请求上下文
-        context = get_request_context()
-        user = context.get('user')
-
-        # 获取 Content Type
-        content_type = ContentType.objects.get_for_model(instance)
-
-        # 获取对象ID和表示
-        object_id = str(instance.pk)
-        object_repr = get_object_repr(instance)
-
         # 记录删除前的数据
         changes = {'old': model_to_dict(instance, settings=settings)}
 
-        # 创建审计日志
-        audit_log = AuditLog.objects.create(
-            action_type=AuditLog.ACTION_DELETE,
-            user=user,
-            content_type=content_type,
-            object_id=object_id,
-            object_repr=object_repr,
-            changes=changes,
-            changed_fields=list(changes['old'].keys()),
-            ip_address=context.get('ip_address'),
-            user_agent=context.get('user_agent') or '',
-            request_method=context.get('request_method') or '',
-            request_path=context.get('request_path') or '',
+        AuditLogWriter.add(
+            build_audit_log(
+                instance,
+                AuditLog.ACTION_DELETE,
+                changes,
+                list(changes['old'].keys()),
+            )
         )
 
-        logger.info(f"删除审计日志已创建: {audit_log}")
-
     except Exception as exc:
         logger.error(f"创建删除审计日志失败: {exc}", exc_info=True)
 
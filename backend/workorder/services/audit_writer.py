@@ -0,0 +1,232 @@
+"""
+审计日志批量写入
+
+将审计信号处理器产生的日志缓冲后批量写入，避免每次模型保存都同步 INSERT：
+- 事务内：按事务（保存点）收集，提交时通过 transaction.on_commit 一次 bulk_create；
+  事务回滚时缓冲随回调一起丢弃
+- 事务外、请求内：按请求收集，由 AuditLogMiddleware 在响应时一次写入
+- 其他情况（管理命令、脚本）：立即写入
+
+可选的后台线程模式（settings.AUDIT_LOG_WRITER['BACKGROUND'] 且配置项 async_write
+开启）下，提交后的日志进入有界队列，由后台线程批量排空，写入完全脱离请求路径；
+队列满时溢出的日志回退为同步写入并计入 overflow 指标，不会丢弃。
+
+审计配置（AuditLogSettings）缓存在进程内存中，配置保存/删除时通过信号失效。
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings as django_settings
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ..models.audit import AuditLog, AuditLogSettings
+from .transaction_buffer import PendingBatch, get_transaction_batch
+
+logger = logging.getLogger(__name__)
+
+
+class AuditSettingsCache:
+    """审计配置的进程内缓存
+
+    配置变更通过信号失效；多进程部署下其他进程最多在 TTL 后读到新配置。
+    事务内不写入缓存，避免把未提交（可能回滚）的配置发布给其他请求。
+    """
+
+    TTL = 60
+
+    _settings: Optional[AuditLogSettings] = None
+    _loaded_at = 0.0
+
+    @classmethod
+    def get(cls) -> AuditLogSettings:
+        cached = cls._settings
+        if cached is not None and time.monotonic() - cls._loaded_at < cls.TTL:
+            return cached
+
+        audit_settings = AuditLogSettings.get_settings()
+        if not transaction.get_connection().in_atomic_block:
+            cls._settings = audit_settings
+            cls._loaded_at = time.monotonic()
+        return audit_settings
+
+    @classmethod
+    def invalidate(cls):
+        cls._settings = None
+
+
+@receiver(post_save, sender=AuditLogSettings)
+@receiver(post_delete, sender=AuditLogSettings)
+def invalidate_audit_settings_cache(sender, **kwargs):
+    AuditSettingsCache.invalidate()
+    # 提交后再失效一次：事务内其他请求可能已按旧配置重新填充缓存
+    transaction.on_commit(AuditSettingsCache.invalidate)
+
+
+class AuditLogWriter:
+    """审计日志批量写入器"""
+
+    _local = threading.local()
+
+    _queue: Optional[queue.Queue] = None
+    _worker: Optional[threading.Thread] = None
+    _worker_lock = threading.Lock()
+    _stats_lock = threading.Lock()
+    _stats = {
+        'written': 0,  # 已写入
+        'enqueued': 0,  # 进入后台队列
+        'overflow': 0,  # 队列满回退同步写入
+        'failed': 0,  # 写入失败
+    }
+
+    # ==================== 配置 ====================
+
+    @staticmethod
+    def _config() -> Dict:
+        return getattr(django_settings, 'AUDIT_LOG_WRITER', {})
+
+    @classmethod
+    def batch_size(cls) -> int:
+        return cls._config().get('BATCH_SIZE', 500)
+
+    @classmethod
+    def background_enabled(cls) -> bool:
+        if not cls._config().get('BACKGROUND', False):
+            return False
+        return AuditSettingsCache.get().async_write
+
+    # ==================== 收集 ====================
+
+    @classmethod
+    def add(cls, audit_log: AuditLog):
+        """加入一条审计日志，按当前上下文决定缓冲方式"""
+        # bulk_create 不调用 AuditLog.save()，这里补上用户名快照
+        if audit_log.user is not None and not audit_log.username:
+            audit_log.username = audit_log.user.username
+
+        connection = transaction.get_connection()
+        if connection.in_atomic_block:
+            cls._get_transaction_batch(connection).records.append(audit_log)
+            return
+
+        request_buffer = getattr(cls._local, 'request_buffer', None)
+        if request_buffer is not None:
+            request_buffer.append(audit_log)
+            return
+
+        cls.dispatch([audit_log])
+
+    @classmethod
+    def _get_transaction_batch(cls, connection) -> PendingBatch:
+        return get_transaction_batch(cls._local, connection, cls.dispatch)
+
+    @classmethod
+    def start_request(cls):
+        """开始按请求收集（由 AuditLogMiddleware 调用）"""
+        cls._local.request_buffer = []
+
+    @classmethod
+    def finish_request(cls):
+        """写入本次请求收集的审计日志"""
+        records = getattr(cls._local, 'request_buffer', None)
+        cls._local.request_buffer = None
+        if records:
+            cls.dispatch(records)
+
+    # ==================== 写入 ====================
+
+    @classmethod
+    def dispatch(cls, records: List[AuditLog]):
+        """写入已确认的审计日志：后台模式入队，否则同步批量写入"""
+        if not records:
+            return
+        if cls.background_enabled():
+            records = cls._enqueue(records)
+        if records:
+            cls._write(records)
+
+    @classmethod
+    def _write(cls, records: List[AuditLog]):
+        try:
+            AuditLog.objects.bulk_create(records, batch_size=cls.batch_size())
+        except Exception as exc:
+            cls._incr('failed', len(records))
+            logger.error(f"批量写入审计日志失败（{len(records)} 条）: {exc}", exc_info=True)
+            return
+        cls._incr('written', len(records))
+        logger.info(f"审计日志已写入 {len(records)} 条")
+
+    @classmethod
+    def _incr(cls, name: str, amount: int = 1):
+        with cls._stats_lock:
+            cls._stats[name] += amount
+
+    @classmethod
+    def get_stats(cls) -> Dict:
+        """写入指标（含后台队列深度）"""
+        with cls._stats_lock:
+            stats = dict(cls._stats)
+        stats['queue_size'] = cls._queue.qsize() if cls._queue is not None else 0
+        return stats
+
+    # ==================== 后台线程 ====================
+
+    @classmethod
+    def _enqueue(cls, records: List[AuditLog]) -> List[AuditLog]:
+        """放入后台队列，返回因队列已满需要同步写入的日志"""
+        log_queue = cls._ensure_worker()
+        overflow = []
+        for record in records:
+            try:
+                log_queue.put_nowait(record)
+            except queue.Full:
+                overflow.append(record)
+
+        cls._incr('enqueued', len(records) - len(overflow))
+        if overflow:
+            cls._incr('overflow', len(overflow))
+            logger.warning(f"审计日志队列已满，{len(overflow)} 条回退为同步写入")
+        return overflow
+
+    @classmethod
+    def _ensure_worker(cls) -> queue.Queue:
+        with cls._worker_lock:
+            if cls._worker is None or not cls._worker.is_alive():
+                cls._queue = queue.Queue(maxsize=cls._config().get('QUEUE_SIZE', 10000))
+                cls._worker = threading.Thread(
+                    target=cls._drain_forever,
+                    name='audit-log-writer',
+                    daemon=True,
+                )
+                cls._worker.start()
+                atexit.register(cls.drain)
+        return cls._queue
+
+    @classmethod
+    def _drain_forever(cls):
+        log_queue = cls._queue
+        batch_size = cls.batch_size()
+        while True:
+            records = [log_queue.get()]
+            while len(records) < batch_size:
+                try:
+                    records.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                close_old_connections()
+                cls._write(records)
+            finally:
+                for _ in records:
+                    log_queue.task_done()
+
+    @classmethod
+    def drain(cls):
+        """等待后台队列写完（进程退出或测试时使用）"""
+        if cls._queue is not None and cls._worker is not None and cls._worker.is_alive():
+            cls._queue.join()
@@ -10,6 +10,8 @@ from functools import wraps
 from typing import Any, Callable, Optional
 import logging
 
+from .namespaced_cache import user_cache, work_order_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -109,17 +111,20 @@ def cache_queryset(timeout: int = None, key_prefix: str = '') -> Callable:
 def invalidate_cache_pattern(pattern: str) -> None:
     """
     根据模式使缓存失效
-    
+
+    只有提供 delete_pattern 的后端（django-redis）支持，其他后端上记录警告后跳过；
+    需要整组失效的缓存请放在 CacheNamespace 下，用 invalidate() 使其失效。
+
     Args:
         pattern: 缓存键模式（支持通配符）
     """
+    delete_pattern = getattr(cache, 'delete_pattern', None)
+    if delete_pattern is None:
+        logger.warning(f"当前缓存后端不支持按模式删除，已跳过: {pattern}")
+        return
     try:
-        # 获取所有缓存键
-        cache_keys = cache._cache.get_client().keys(f"*{pattern}*")
-        if cache_keys:
-            # 删除匹配的键
-            cache.delete_many(cache_keys)
-            logger.info(f"Invalidated {len(cache_keys)} cache keys matching pattern: {pattern}")
+        deleted = delete_pattern(f"*{pattern}*")
+        logger.info(f"Invalidated {deleted} cache keys matching pattern: {pattern}")
     except Exception as e:
         logger.error(f"Error invalidating cache pattern {pattern}: {e}")
 
@@ -228,56 +233,53 @@ def _get_model_from_func(func: Callable) -> Optional[Any]:
 class CacheManager:
     """
     缓存管理器，提供更高级的缓存操作
+
+    用户数据和权限在 user 命名空间、施工单数据在 work_order 命名空间的对象作用域下，
+    使某个用户或施工单的缓存失效只需一次原子递增。
     """
     
     @staticmethod
     def cache_user_data(user_id: int, data_key: str, data: Any, timeout: int = None) -> None:
         """缓存用户相关数据"""
-        cache_key = f"user_data:{user_id}:{data_key}"
         if timeout is None:
             timeout = settings.CACHE_TIMEOUTS['HOUR']
-        cache.set(cache_key, data, timeout)
+        user_cache.scope(user_id).set(f"data:{data_key}", data, timeout)
     
     @staticmethod
     def get_user_data(user_id: int, data_key: str, default: Any = None) -> Any:
         """获取用户缓存数据"""
-        cache_key = f"user_data:{user_id}:{data_key}"
-        return get_cached_or_none(cache_key, default)
+        return user_cache.scope(user_id).get(f"data:{data_key}", default)
     
     @staticmethod
     def invalidate_user_cache(user_id: int) -> None:
         """使用户缓存失效"""
-        invalidate_cache_pattern(f"user_data:{user_id}:")
+        user_cache.scope(user_id).invalidate()
     
     @staticmethod
     def cache_workorder_data(workorder_id: int, data_key: str, data: Any, timeout: int = None) -> None:
         """缓存施工单相关数据"""
-        cache_key = f"workorder_data:{workorder_id}:{data_key}"
         if timeout is None:
             timeout = settings.CACHE_TIMEOUTS['MEDIUM']
-        cache.set(cache_key, data, timeout)
+        work_order_cache.scope(workorder_id).set(f"data:{data_key}", data, timeout)
     
     @staticmethod
     def get_workorder_data(workorder_id: int, data_key: str, default: Any = None) -> Any:
         """获取施工单缓存数据"""
-        cache_key = f"workorder_data:{workorder_id}:{data_key}"
-        return get_cached_or_none(cache_key, default)
+        return work_order_cache.scope(workorder_id).get(f"data:{data_key}", default)
     
     @staticmethod
     def invalidate_workorder_cache(workorder_id: int) -> None:
         """使施工单缓存失效"""
-        invalidate_cache_pattern(f"workorder_data:{workorder_id}:")
+        work_order_cache.scope(workorder_id).invalidate()
     
     @staticmethod
     def cache_permissions(user_id: int, permissions: list, timeout: int = None) -> None:
         """缓存用户权限"""
-        cache_key = f"user_permissions:{user_id}"
         if timeout is None:
             timeout = settings.CACHE_TIMEOUTS['HOUR']
-        cache.set(cache_key, permissions, timeout)
+        user_cache.scope(user_id).set("permissions", permissions, timeout)
     
     @staticmethod
     def get_permissions(user_id: int, default: list = None) -> Any:
         """获取用户权限缓存"""
-        cache_key = f"user_permissions:{user_id}"
-        return get_cached_or_none(cache_key, default or [])
+        return user_cache.scope(user_id).get("permissions", default or [])
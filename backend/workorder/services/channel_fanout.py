@@ -0,0 +1,178 @@
+"""
+Channel layer 批量推送
+
+通知按用户推送时每个接收者对应一个 group_send。逐个 async_to_sync 调用时每次都要
+切换一次事件循环并等待 channel layer 往返，500 个接收者就是 500 次串行阻塞。
+ChannelFanout 把整批消息放在同一个异步上下文中并发发送：
+- 并发数由信号量限制（settings.REALTIME_NOTIFICATION_FANOUT['CONCURRENCY']），
+  避免一次打开过多 Redis 连接
+- 单条发送失败只记录并计数，不影响同批其他消息
+- 可选的后台线程模式（settings.REALTIME_NOTIFICATION_FANOUT['BACKGROUND']）下，
+  整批消息进入有界队列由后台线程发送，推送完全脱离请求路径；队列满时回退为同步发送
+
+面向所有在线用户的消息（系统公告）应发送到广播组 BROADCAST_GROUP，只需一次 group_send。
+"""
+import asyncio
+import atexit
+import logging
+import queue
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 所有 WebSocket 连接都会加入的广播组
+BROADCAST_GROUP = 'broadcast_notifications'
+
+# (组名, 消息)
+GroupMessage = Tuple[str, Dict]
+
+
+def user_group_name(user_id: int) -> str:
+    """用户通知组名"""
+    return f'user_{user_id}_notifications'
+
+
+class ChannelFanout:
+    """Channel layer 批量推送"""
+
+    _queue: Optional[queue.Queue] = None
+    _worker: Optional[threading.Thread] = None
+    _worker_lock = threading.Lock()
+    _stats_lock = threading.Lock()
+    _stats = {
+        'sent': 0,  # 已发送
+        'failed': 0,  # 发送失败
+        'enqueued': 0,  # 进入后台队列的批次
+        'overflow': 0,  # 队列满回退同步发送的批次
+    }
+
+    # ==================== 配置 ====================
+
+    @staticmethod
+    def _config() -> Dict:
+        return getattr(settings, 'REALTIME_NOTIFICATION_FANOUT', {})
+
+    @classmethod
+    def concurrency(cls) -> int:
+        return max(int(cls._config().get('CONCURRENCY', 50)), 1)
+
+    @classmethod
+    def background_enabled(cls) -> bool:
+        return bool(cls._config().get('BACKGROUND', False))
+
+    # ==================== 发送 ====================
+
+    @classmethod
+    def send(cls, messages: List[GroupMessage], channel_layer=None):
+        """
+        发送一批组消息：后台模式入队，否则在当前线程并发发送
+
+        Args:
+            messages: (组名, 消息) 列表
+            channel_layer: 使用的 channel layer，默认取 get_channel_layer()
+        """
+        if not messages:
+            return
+        if channel_layer is None:
+            channel_layer = get_channel_layer()
+        if channel_layer is None:
+            logger.warning("未配置 channel layer，跳过 WebSocket 推送")
+            return
+
+        if cls.background_enabled() and cls._enqueue(messages, channel_layer):
+            return
+        cls.send_now(messages, channel_layer)
+
+    @classmethod
+    def send_now(cls, messages: List[GroupMessage], channel_layer):
+        """同步发送：一次事件循环切换内并发完成整批 group_send"""
+        async_to_sync(cls.send_many)(messages, channel_layer)
+
+    @classmethod
+    async def send_many(cls, messages: List[GroupMessage], channel_layer) -> int:
+        """并发发送整批消息（并发数受限），返回成功条数"""
+        semaphore = asyncio.Semaphore(cls.concurrency())
+
+        async def send_one(group_name: str, message: Dict):
+            async with semaphore:
+                await channel_layer.group_send(group_name, message)
+
+        results = await asyncio.gather(
+            *(send_one(group_name, message) for group_name, message in messages),
+            return_exceptions=True,
+        )
+        failures = [result for result in results if isinstance(result, Exception)]
+        sent = len(results) - len(failures)
+        cls._incr('sent', sent)
+        if failures:
+            cls._incr('failed', len(failures))
+            logger.error(
+                f"WebSocket 推送失败 {len(failures)}/{len(results)} 条: {failures[0]}"
+            )
+        return sent
+
+    @classmethod
+    def _incr(cls, name: str, amount: int = 1):
+        with cls._stats_lock:
+            cls._stats[name] += amount
+
+    @classmethod
+    def get_stats(cls) -> Dict:
+        """推送指标（含后台队列深度）"""
+        with cls._stats_lock:
+            stats = dict(cls._stats)
+        stats['queue_size'] = cls._queue.qsize() if cls._queue is not None else 0
+        return stats
+
+    # ==================== 后台线程 ====================
+
+    @classmethod
+    def _enqueue(cls, messages: List[GroupMessage], channel_layer) -> bool:
+        """放入后台队列，队列已满时返回 False（由调用方同步发送）"""
+        fanout_queue = cls._ensure_worker()
+        try:
+            fanout_queue.put_nowait((messages, channel_layer))
+        except queue.Full:
+            cls._incr('overflow')
+            logger.warning(f"WebSocket 推送队列已满，{len(messages)} 条消息回退为同步发送")
+            return False
+        cls._incr('enqueued')
+        return True
+
+    @classmethod
+    def _ensure_worker(cls) -> queue.Queue:
+        with cls._worker_lock:
+            if cls._worker is None or not cls._worker.is_alive():
+                cls._queue = queue.Queue(maxsize=cls._config().get('QUEUE_SIZE', 1000))
+                cls._worker = threading.Thread(
+                    target=cls._drain_forever,
+                    name='channel-fanout',
+                    daemon=True,
+                )
+                cls._worker.start()
+                atexit.register(cls.drain)
+        return cls._queue
+
+    @classmethod
+    def _drain_forever(cls):
+        fanout_queue = cls._queue
+        while True:
+            messages, channel_layer = fanout_queue.get()
+            try:
+                cls.send_now(messages, channel_layer)
+            except Exception as exc:
+                cls._incr('failed', len(messages))
+                logger.error(f"后台 WebSocket 推送失败（{len(messages)} 条）: {exc}", exc_info=True)
+            finally:
+                fanout_queue.task_done()
+
+    @classmethod
+    def drain(cls):
+        """等待后台队列发送完（进程退出或测试时使用）"""
+        if cls._queue is not None and cls._worker is not None and cls._worker.is_alive():
+            cls._queue.join()
@@ -0,0 +1,390 @@
+"""
+工序 / 施工单完成计数
+
+每完成一个任务都要判断工序和施工单是否随之完成。原实现每次加载工序的全部任务
+（开料任务逐个查询施工单物料，制版任务逐个加载图稿、刀模、版），施工单级别再执行
+两次全量 COUNT。本模块改为维护计数：
+- WorkOrderProcessProgress：工序的任务总数、已完成任务数（状态已完成且数量达标）
+- WorkOrderProgress：施工单的任务总数、状态为已完成的任务数
+- 任务创建、删除、状态或数量变化时（保存信号；批量创建、批量更新由调用方显式调用）
+  按变化量执行带 F 表达式的 UPDATE，在数据库事务中原子增减，随业务数据一起提交或回滚
+- 判断是否完成只读取一行计数；只有计数行不存在（历史数据）、手动检查施工单完成
+  和 recount_completion_progress 命令会用聚合查询重新统计，作为修复路径
+
+前置条件（制版任务的图稿/刀模/版已确认、开料任务的物料已开料）取决于其他表的数据，
+只在计数显示全部任务已完成时用一次集合查询检查，不逐个任务加载关联对象。
+"""
+import logging
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ..models.core import WorkOrder, WorkOrderMaterial, WorkOrderProcess, WorkOrderTask
+from ..models.system import WorkOrderProcessProgress, WorkOrderProgress
+
+logger = logging.getLogger(__name__)
+
+# 工序级"已完成"：状态已完成，且有生产数量时完成数量达到生产数量
+DONE_Q = Q(status="completed") & (
+    Q(production_quantity=0) | Q(quantity_completed__gte=F("production_quantity"))
+)
+
+
+def task_state(status: Optional[str], quantity_completed: Optional[int],
+               production_quantity: Optional[int]) -> Tuple[bool, bool]:
+    """任务对计数的贡献：(状态已完成, 工序级已完成)"""
+    completed = status == "completed"
+    done = completed and not (
+        production_quantity and (quantity_completed or 0) < production_quantity
+    )
+    return completed, done
+
+
+class CompletionProgress:
+    """工序 / 施工单完成计数"""
+
+    # ==================== 维护 ====================
+
+    @classmethod
+    def apply(cls, process_id: int, total: int = 0, done: int = 0, completed: int = 0,
+              work_order_id: Optional[int] = None, recount_missing: bool = True):
+        """
+        按变化量增减工序及所属施工单的计数
+
+        计数行不存在时重新统计并创建（统计结果已包含本次变化）；
+        recount_missing=False 时跳过缺失的计数行（删除路径，工序可能正被级联删除）。
+        """
+        if not process_id or not (total or done or completed):
+            return
+
+        process_rows = WorkOrderProcessProgress.objects.filter(work_order_process_id=process_id)
+        process_updates = {
+            "tasks_total": F("tasks_total") + total,
+            "tasks_done": F("tasks_done") + done,
+        }
+        if not process_rows.update(**process_updates) and recount_missing:
+            cls._create_or_update(
+                lambda: cls.recount_process(process_id), process_rows, process_updates
+            )
+
+        if total or completed:
+            if work_order_id is None:
+                order_rows = WorkOrderProgress.objects.filter(
+                    work_order__order_processes=process_id
+                )
+            else:
+                order_rows = WorkOrderProgress.objects.filter(work_order_id=work_order_id)
+            order_updates = {
+                "tasks_total": F("tasks_total") + total,
+                "tasks_completed": F("tasks_completed") + completed,
+            }
+            if not order_rows.update(**order_updates) and recount_missing:
+                if work_order_id is None:
+                    work_order_id = (
+                        WorkOrderProcess.objects.filter(pk=process_id)
+                        .values_list("work_order_id", flat=True)
+                        .first()
+                    )
+                if work_order_id:
+                    cls._create_or_update(
+                        lambda: cls.recount_work_order(work_order_id),
+                        WorkOrderProgress.objects.filter(work_order_id=work_order_id),
+                        order_updates,
+                    )
+
+    @staticmethod
+    def _create_or_update(create, rows, updates):
+        try:
+            with transaction.atomic():
+                create()
+        except IntegrityError:
+            # 并发请求已创建计数行，其统计不包含本事务未提交的变化，按变化量补上
+            rows.update(**updates)
+
+    @classmethod
+    def track_change(cls, old_process_id: Optional[int], old_state: Tuple,
+                     new_process_id: Optional[int], new_state: Tuple):
+        """
+        单个任务所属工序或状态变化后调整计数
+
+        Args:
+            old_state / new_state: (status, quantity_completed, production_quantity)，
+                任务不存在时为 None
+        """
+        old_completed, old_done = task_state(*old_state) if old_state else (False, False)
+        new_completed, new_done = task_state(*new_state) if new_state else (False, False)
+
+        if old_process_id == new_process_id:
+            cls.apply(
+                new_process_id,
+                total=bool(new_state) - bool(old_state),
+                done=new_done - old_done,
+                completed=new_completed - old_completed,
+                recount_missing=bool(new_state),
+            )
+            return
+
+        if old_state:
+            cls.apply(old_process_id, total=-1, done=-old_done, completed=-old_completed)
+        if new_state:
+            cls.apply(new_process_id, total=1, done=new_done, completed=new_completed)
+
+    @classmethod
+    def record_created(cls, tasks: Iterable[WorkOrderTask]):
+        """批量创建任务后增加计数（bulk_create 不触发保存信号），每个工序一次"""
+        deltas: Dict[int, Counter] = {}
+        for task in tasks:
+            completed, done = task_state(
+                task.status, task.quantity_completed, task.production_quantity
+            )
+            delta = deltas.setdefault(task.work_order_process_id, Counter())
+            delta["total"] += 1
+            delta["done"] += done
+            delta["completed"] += completed
+
+        for process_id, delta in deltas.items():
+            cls.apply(process_id, **delta)
+
+    @classmethod
+    def record_updates(cls, tasks: Iterable[WorkOrderTask], old_values: Dict[int, Dict]):
+        """
+        批量更新任务后调整计数（bulk_update 不触发保存信号），每个工序一次
+
+        Args:
+            old_values: 任务ID -> 更新前的 status / quantity_completed / production_quantity
+        """
+        deltas: Dict[int, Counter] = {}
+        for task in tasks:
+            old = old_values[task.id]
+            old_completed, old_done = task_state(
+                old["status"],
+                old["quantity_completed"],
+                old.get("production_quantity", task.production_quantity),
+            )
+            new_completed, new_done = task_state(
+                task.status, task.quantity_completed, task.production_quantity
+            )
+            delta = deltas.setdefault(task.work_order_process_id, Counter())
+            delta["done"] += new_done - old_done
+            delta["completed"] += new_completed - old_completed
+
+        for process_id, delta in deltas.items():
+            cls.apply(process_id, **delta)
+
+    @staticmethod
+    def invalidate(process_ids: Iterable[int]):
+        """删除计数行，下次读取时重新统计（无法确定变化量时使用）"""
+        process_ids = [process_id for process_id in process_ids if process_id]
+        if not process_ids:
+            return
+        WorkOrderProcessProgress.objects.filter(work_order_process_id__in=process_ids).delete()
+        WorkOrderProgress.objects.filter(work_order__order_processes__in=process_ids).delete()
+
+    # ==================== 读取 ====================
+
+    @classmethod
+    def get_process_progress(cls, process_id: int) -> WorkOrderProcessProgress:
+        """读取工序计数（一次查询），不存在时重新统计"""
+        progress = WorkOrderProcessProgress.objects.filter(work_order_process_id=process_id).first()
+        if progress is None:
+            progress = cls._get_or_recount(
+                lambda: cls.recount_process(process_id),
+                WorkOrderProcessProgress.objects.filter(work_order_process_id=process_id),
+            )
+        return progress
+
+    @classmethod
+    def get_work_order_progress(cls, work_order_id: int) -> WorkOrderProgress:
+        """读取施工单计数（一次查询），不存在时重新统计"""
+        progress = WorkOrderProgress.objects.filter(work_order_id=work_order_id).first()
+        if progress is None:
+            progress = cls._get_or_recount(
+                lambda: cls.recount_work_order(work_order_id),
+                WorkOrderProgress.objects.filter(work_order_id=work_order_id),
+            )
+        return progress
+
+    @staticmethod
+    def _get_or_recount(recount, rows):
+        try:
+            with transaction.atomic():
+                return recount()
+        except IntegrityError:
+            return rows.get()
+
+    @classmethod
+    def process_tasks_done(cls, process: WorkOrderProcess) -> bool:
+        """工序是否有任务且全部已完成"""
+        progress = cls.get_process_progress(process.pk)
+        return 0 < progress.tasks_total == progress.tasks_done
+
+    @classmethod
+    def work_order_tasks_completed(cls, work_order: WorkOrder, recount: bool = False) -> bool:
+        """
+        施工单是否有任务且全部为已完成状态
+
+        Args:
+            recount: 计数显示未完成时重新统计一次并修正计数行
+                （手动检查入口使用，纠正绕过信号的批量修改造成的偏差）
+        """
+        progress = cls.get_work_order_progress(work_order.pk)
+        if recount and not 0 < progress.tasks_total == progress.tasks_completed:
+            with transaction.atomic():
+                progress = cls.recount_work_order(work_order.pk)
+        return 0 < progress.tasks_total == progress.tasks_completed
+
+    @staticmethod
+    def count_blocking_prerequisites(process: WorkOrderProcess) -> int:
+        """
+        统计前置条件未满足的任务数（一次集合查询）
+
+        - 制版任务：关联的图稿、刀模、烫金版、压凸版须已确认
+        - 开料任务（仅开料工序）：施工单中对应物料须已开料
+        """
+        from ..models.process_codes import ProcessCodes
+
+        blocking = Q(task_type="plate_making") & (
+            Q(artwork__confirmed=False)
+            | Q(die__confirmed=False)
+            | Q(foiling_plate__confirmed=False)
+            | Q(embossing_plate__confirmed=False)
+        )
+        tasks = process.tasks.all()
+        if ProcessCodes.requires_material_cut_status(process.process.code):
+            material_status = (
+                WorkOrderMaterial.objects.filter(
+                    work_order_id=process.work_order_id, material_id=OuterRef("material_id")
+                )
+                .order_by("pk")
+                .values("purchase_status")[:1]
+            )
+            tasks = tasks.annotate(material_status=Subquery(material_status))
+            blocking |= (
+                Q(task_type="cutting", material_status__isnull=False)
+                & ~Q(material_status="cut")
+            )
+        return tasks.filter(blocking).count()
+
+    # ==================== 重新统计 ====================
+
+    @staticmethod
+    def recount_process(process_id: int) -> WorkOrderProcessProgress:
+        """按任务表重新统计工序计数（创建或覆盖计数行）"""
+        counts = WorkOrderTask.objects.filter(work_order_process_id=process_id).aggregate(
+            total=Count("id"), done=Count("id", filter=DONE_Q)
+        )
+        progress, _ = WorkOrderProcessProgress.objects.update_or_create(
+            work_order_process_id=process_id,
+            defaults={"tasks_total": counts["total"], "tasks_done": counts["done"]},
+        )
+        return progress
+
+    @staticmethod
+    def recount_work_order(work_order_id: int) -> WorkOrderProgress:
+        """按任务表重新统计施工单计数（创建或覆盖计数行）"""
+        counts = WorkOrderTask.objects.filter(
+            work_order_process__work_order_id=work_order_id
+        ).aggregate(total=Count("id"), completed=Count("id", filter=Q(status="completed")))
+        progress, _ = WorkOrderProgress.objects.update_or_create(
+            work_order_id=work_order_id,
+            defaults={"tasks_total": counts["total"], "tasks_completed": counts["completed"]},
+        )
+        return progress
+
+    @staticmethod
+    def rebuild() -> Tuple[int, int]:
+        """
+        按任务表重建全部计数（修复路径，两次分组查询）
+
+        Returns:
+            tuple: (工序计数行数, 施工单计数行数)
+        """
+        process_counts = (
+            WorkOrderTask.objects.order_by()
+            .values_list("work_order_process_id")
+            .annotate(total=Count("id"), done=Count("id", filter=DONE_Q))
+        )
+        order_counts = (
+            WorkOrderTask.objects.order_by()
+            .values_list("work_order_process__work_order_id")
+            .annotate(total=Count("id"), completed=Count("id", filter=Q(status="completed")))
+        )
+        with transaction.atomic():
+            WorkOrderProcessProgress.objects.all().delete()
+            WorkOrderProgress.objects.all().delete()
+            processes = WorkOrderProcessProgress.objects.bulk_create(
+                [
+                    WorkOrderProcessProgress(
+                        work_order_process_id=process_id, tasks_total=total, tasks_done=done
+                    )
+                    for process_id, total, done in process_counts
+                ],
+                batch_size=500,
+            )
+            orders = WorkOrderProgress.objects.bulk_create(
+                [
+                    WorkOrderProgress(
+                        work_order_id=work_order_id, tasks_total=total, tasks_completed=completed
+                    )
+                    for work_order_id, total, completed in order_counts
+                ],
+                batch_size=500,
+            )
+        logger.info(f"完成计数已重建：工序 {len(processes)} 行，施工单 {len(orders)} 行")
+        return len(processes), len(orders)
+
+    @staticmethod
+    def summarize_quantities(process: WorkOrderProcess) -> Dict[str, int]:
+        """汇总工序任务的完成数量和不良品数量（一次聚合查询）"""
+        return process.tasks.aggregate(
+            quantity_completed=Coalesce(Sum("quantity_completed"), 0, output_field=IntegerField()),
+            quantity_defective=Coalesce(Sum("quantity_defective"), 0, output_field=IntegerField()),
+        )
+
+
+def _tracked_state(instance: WorkOrderTask) -> Optional[Tuple]:
+    return (
+        instance.previous("status"),
+        instance.previous("quantity_completed"),
+        instance.previous("production_quantity"),
+    )
+
+
+@receiver(post_save, sender=WorkOrderTask)
+def track_task_progress(sender, instance, created, **kwargs):
+    """任务创建或状态、数量、所属工序变化时调整完成计数（字段追踪快照，不额外查询）"""
+    new_state = (instance.status, instance.quantity_completed, instance.production_quantity)
+    if created:
+        CompletionProgress.track_change(None, None, instance.work_order_process_id, new_state)
+        return
+
+    fields = ("work_order_process", "status", "quantity_completed", "production_quantity")
+    if not all(instance.is_tracked(field) for field in fields):
+        # 无法确定变化前的状态，交由下次读取时重新统计
+        CompletionProgress.invalidate([instance.work_order_process_id])
+        return
+    if not any(instance.has_changed(field) for field in fields):
+        return
+
+    CompletionProgress.track_change(
+        instance.previous("work_order_process"),
+        _tracked_state(instance),
+        instance.work_order_process_id,
+        new_state,
+    )
+
+
+@receiver(post_delete, sender=WorkOrderTask)
+def untrack_deleted_task(sender, instance, **kwargs):
+    """任务删除后减少完成计数"""
+    CompletionProgress.track_change(
+        instance.work_order_process_id,
+        (instance.status, instance.quantity_completed, instance.production_quantity),
+        instance.work_order_process_id,
+        None,
+    )
@@ -12,8 +12,9 @@ from django.db import transaction
 from django.db.models import F, Sum, Q, Count
 from django.utils import timezone
 from decimal import Decimal
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -24,76 +25,72 @@ class StockConsistencyService:
     @staticmethod
     def calculate_work_order_production_quantity(work_order) -> Dict[int, int]:
         """
-        计算施工单的实际生产数量
+        计算施工单的实际生产数量（一次分组聚合）
         
         Returns:
             Dict[int, int]: {product_id: actual_quantity}
         """
-        product_quantities = {}
-        
-        # 获取所有已完成的任务
-        completed_tasks = work_order.order_processes.filter(
-            tasks__status='completed'
-        ).prefetch_related('tasks')
-        
-        for process in completed_tasks:
-            for task in process.tasks.filter(status='completed'):
-                if task.product and task.quantity_completed:
-                    product_id = task.product.id
-                    if product_id not in product_quantities:
-                        product_quantities[product_id] = 0
-                    product_quantities[product_id] += task.quantity_completed
-        
-        return product_quantities
+        from ..models.core import WorkOrderTask
+
+        rows = WorkOrderTask.objects.filter(
+            work_order_process__work_order=work_order,
+            status='completed',
+            product__isnull=False,
+        ).order_by().values('product_id').annotate(total=Sum('quantity_completed'))
+        return {row['product_id']: row['total'] for row in rows if row['total']}
     
     @staticmethod
-    def validate_stock_consistency(product) -> Dict[str, any]:
-        """
-        验证产品库存一致性
-        
-        Returns:
-            Dict: {
-                'is_consistent': bool,
-                'expected_quantity': int,
-                'actual_quantity': int,
-                'difference': int,
-                'issues': List[str]
-            }
-        """
-        from ..models.products import ProductStockLog
-        
-        # 获取当前库存数量
-        actual_quantity = product.stock_quantity
-        
-        # 计算预期库存数量
-        logs = ProductStockLog.objects.filter(product=product)
-        expected_quantity = 0
-        
-        for log in logs:
-            expected_quantity += log.quantity
-        
+    def build_stock_validation(actual_quantity, expected_quantity, log_count) -> Dict[str, any]:
+        """按实际库存、台账余额和日志数生成校验结果"""
         issues = []
         difference = actual_quantity - expected_quantity
-        
+
         if difference != 0:
             issues.append(f"库存数量不一致：实际{actual_quantity}，预期{expected_quantity}，差异{difference}")
-        
+
         # 检查库存日志完整性
-        if not logs.exists():
+        if not log_count:
             issues.append("缺少库存变更日志")
-        
+
         # 检查负库存
         if actual_quantity < 0:
             issues.append(f"库存为负数：{actual_quantity}")
-        
+
         return {
             'is_consistent': len(issues) == 0,
             'expected_quantity': expected_quantity,
             'actual_quantity': actual_quantity,
             'difference': difference,
             'issues': issues,
-            'last_log': logs.first() if logs.exists() else None
         }
+
+    @staticmethod
+    def validate_stock_consistency(product) -> Dict[str, any]:
+        """
+        验证产品库存一致性
+
+        预期库存为台账余额：快照余额加快照之后的库存日志（见 StockLedger.ledger_balances）。
+        
+        Returns:
+            Dict: {
+                'is_consistent': bool,
+                'expected_quantity': int,
+                'actual_quantity': int,
+                'difference': int,
+                'issues': List[str]
+            }
+        """
+        from ..models.products import ProductStockLog
+        from .stock_ledger import StockLedger
+
+        expected_quantity, log_count = StockLedger.ledger_balances([product.pk]).get(
+            product.pk, (0, 0)
+        )
+        validation = StockConsistencyService.build_stock_validation(
+            product.stock_quantity, expected_quantity, log_count
+        )
+        validation['last_log'] = ProductStockLog.objects.filter(product=product).first()
+        return validation
     
     @staticmethod
     @transaction.atomic
@@ -159,45 +156,39 @@ class WorkOrderQuantityService:
         Returns:
             Dict: 包含各种数量概念的汇总
         """
+        from ..models.core import WorkOrderTask
+
         # 施工单数量（原始订单数量）
         order_quantity = work_order.production_quantity or 0
         
         # 产品数量汇总
-        product_items = work_order.products.all()
-        total_product_quantity = sum(item.quantity or 0 for item in product_items)
-        
-        # 任务完成数量汇总
-        completed_tasks = work_order.order_processes.filter(
-            tasks__status='completed'
-        ).prefetch_related('tasks')
-        
+        total_product_quantity = work_order.products.aggregate(
+            total=Sum('quantity')
+        )['total'] or 0
+        
+        # 任务完成数量汇总（已完成任务按类型分组）
+        task_rows = WorkOrderTask.objects.filter(
+            work_order_process__work_order=work_order, status='completed'
+        ).order_by().values('task_type').annotate(
+            completed=Sum('quantity_completed'), defective=Sum('quantity_defective')
+        )
         task_quantities = {}
         total_task_quantity = 0
         total_defective_quantity = 0
-        
-        for process in completed_tasks:
-            for task in process.tasks.filter(status='completed'):
-                if task.quantity_completed:
-                    task_type = task.task_type
-                    if task_type not in task_quantities:
-                        task_quantities[task_type] = 0
-                    task_quantities[task_type] += task.quantity_completed
-                    total_task_quantity += task.quantity_completed
-                
-                if task.quantity_defective:
-                    total_defective_quantity += task.quantity_defective
+        for row in task_rows:
+            if row['completed']:
+                task_quantities[row['task_type']] = row['completed']
+                total_task_quantity += row['completed']
+            total_defective_quantity += row['defective'] or 0
         
         # 工序完成数量汇总
-        process_quantities = {}
-        total_process_quantity = 0
-        
-        for process in work_order.order_processes.all():
-            if process.quantity_completed:
-                process_code = process.process.code
-                if process_code not in process_quantities:
-                    process_quantities[process_code] = 0
-                process_quantities[process_code] += process.quantity_completed
-                total_process_quantity += process.quantity_completed
+        process_rows = work_order.order_processes.order_by().values('process__code').annotate(
+            total=Sum('quantity_completed')
+        )
+        process_quantities = {
+            row['process__code']: row['total'] for row in process_rows if row['total']
+        }
+        total_process_quantity = sum(process_quantities.values())
         
         return {
             'order_quantity': order_quantity,
@@ -223,6 +214,17 @@ class WorkOrderQuantityService:
             Dict: 验证结果
         """
         summary = WorkOrderQuantityService.get_quantity_summary(work_order)
+        issues = WorkOrderQuantityService.build_quantity_issues(summary)
+        
+        return {
+            'is_consistent': len(issues) == 0,
+            'summary': summary,
+            'issues': issues
+        }
+
+    @staticmethod
+    def build_quantity_issues(summary) -> List[str]:
+        """按数量汇总（order_quantity、total_*_quantity）生成不一致问题列表"""
         issues = []
         
         # 检查施工单数量与产品数量一致性
@@ -250,11 +252,7 @@ class WorkOrderQuantityService:
         if summary['total_defective_quantity'] < 0:
             issues.append(f"不良品数量为负数：{summary['total_defective_quantity']}")
         
-        return {
-            'is_consistent': len(issues) == 0,
-            'summary': summary,
-            'issues': issues
-        }
+        return issues
 
 
 class MaterialStockService:
@@ -268,37 +266,80 @@ class MaterialStockService:
         Returns:
             Dict[int, Dict]: {material_id: usage_info}
         """
+        actual_usage = MaterialStockService.cutting_usage(work_order_ids=[work_order.pk])
         material_usage = {}
         
         # 获取施工单中的物料配置
-        for material_item in work_order.materials.all():
-            material_id = material_item.material.id
-            usage_info = {
+        for material_item in work_order.materials.select_related('material'):
+            material_id = material_item.material_id
+            usage = actual_usage.get((work_order.pk, material_id), {})
+            material_usage[material_id] = {
                 'material': material_item.material,
                 'planned_usage': material_item.material_usage,
                 'need_cutting': material_item.need_cutting,
                 'purchase_status': material_item.purchase_status,
-                'actual_usage': 0,
-                'waste_quantity': 0
+                # 实际使用量（基于已完成的开料任务）
+                'actual_usage': usage.get('actual_usage', 0),
+                'waste_quantity': usage.get('waste_quantity', 0),
             }
-            
-            # 计算实际使用量（基于开料任务）
-            cutting_tasks = work_order.order_processes.filter(
-                process__code='CUT'
-            ).prefetch_related('tasks').first()
-            
-            if cutting_tasks:
-                for task in cutting_tasks.tasks.filter(
-                    material=material_item.material,
-                    status='completed'
-                ):
-                    usage_info['actual_usage'] += task.quantity_completed or 0
-                    if task.quantity_defective:
-                        usage_info['waste_quantity'] += task.quantity_defective
-            
-            material_usage[material_id] = usage_info
         
         return material_usage
+
+    @staticmethod
+    def cutting_usage(work_order_ids=None, work_orders=None) -> Dict[Tuple[int, int], Dict[str, int]]:
+        """
+        按施工单、物料汇总已完成开料任务的完成数量和不良数量（一次分组聚合）
+
+        Args:
+            work_order_ids: 施工单ID列表
+            work_orders: 施工单查询集（作为子查询），与 work_order_ids 二选一
+
+        Returns:
+            Dict: {(work_order_id, material_id): {'actual_usage', 'waste_quantity'}}
+        """
+        from ..models.core import WorkOrderTask
+
+        tasks = WorkOrderTask.objects.filter(
+            status='completed',
+            material__isnull=False,
+            work_order_process__process__code='CUT',
+        )
+        if work_order_ids is not None:
+            tasks = tasks.filter(work_order_process__work_order_id__in=work_order_ids)
+        if work_orders is not None:
+            tasks = tasks.filter(work_order_process__work_order__in=work_orders)
+        rows = tasks.order_by().values('work_order_process__work_order_id', 'material_id').annotate(
+            actual_usage=Sum('quantity_completed'), waste_quantity=Sum('quantity_defective')
+        )
+        return {
+            (row['work_order_process__work_order_id'], row['material_id']): {
+                'actual_usage': row['actual_usage'] or 0,
+                'waste_quantity': row['waste_quantity'] or 0,
+            }
+            for row in rows
+        }
+
+    @staticmethod
+    def build_material_issues(material, purchase_status, need_cutting, actual_usage) -> List[str]:
+        """单个施工单物料的可用性问题"""
+        issues = []
+
+        # 检查采购状态
+        if purchase_status in ['pending', 'ordered']:
+            issues.append(f"物料 {material.name} 尚未到货")
+        
+        # 检查开料状态
+        if need_cutting and purchase_status != 'cut':
+            issues.append(f"物料 {material.name} 需要开料但尚未开料")
+        
+        # 检查库存（如果有库存管理）
+        if hasattr(material, 'stock_quantity'):
+            if material.stock_quantity < actual_usage:
+                issues.append(
+                    f"物料 {material.name} 库存不足：需要{actual_usage}，库存{material.stock_quantity}"
+                )
+
+        return issues
     
     @staticmethod
     def check_material_availability(work_order) -> Dict[str, any]:
@@ -313,22 +354,12 @@ class MaterialStockService:
         warnings = []
         
         for material_id, usage_info in material_usage.items():
-            material = usage_info['material']
-            
-            # 检查采购状态
-            if usage_info['purchase_status'] in ['pending', 'ordered']:
-                issues.append(f"物料 {material.name} 尚未到货")
-            
-            # 检查开料状态
-            if usage_info['need_cutting'] and usage_info['purchase_status'] != 'cut':
-                issues.append(f"物料 {material.name} 需要开料但尚未开料")
-            
-            # 检查库存（如果有库存管理）
-            if hasattr(material, 'stock_quantity'):
-                if material.stock_quantity < usage_info['actual_usage']:
-                    issues.append(
-                        f"物料 {material.name} 库存不足：需要{usage_info['actual_usage']}，库存{material.stock_quantity}"
-                    )
+            issues.extend(MaterialStockService.build_material_issues(
+                usage_info['material'],
+                usage_info['purchase_status'],
+                usage_info['need_cutting'],
+                usage_info['actual_usage'],
+            ))
         
         return {
             'is_available': len(issues) == 0,
@@ -339,97 +370,270 @@ class MaterialStockService:
 
 
 class DataConsistencyManager:
-    """数据一致性管理器"""
+    """数据一致性管理器
+
+    检查以分组聚合计算全部产品、施工单、物料的预期值和实际值，查询次数与数据量无关：
+    - stock：产品库存 vs 台账余额（快照 + 之后的日志）
+    - quantity：施工单数量 vs 产品数量、已完成任务数量、工序完成数量
+    - material：进行中/待开始施工单的物料到货、开料、库存
+    增量模式只检查上次运行之后有变动的对象（按 updated_at / created_at 和库存日志判断），
+    上次运行时间记录在 ConsistencyCheckRun 表中；施工单产品、物料的修改和删除没有时间戳，
+    需定期全量检查。
+    """
+
+    CHECK_TYPES = ('stock', 'quantity', 'material')
+    ACTIVE_ORDER_STATUSES = ['in_progress', 'pending']
     
     @staticmethod
-    def run_consistency_check(check_type: str = 'all') -> Dict[str, any]:
+    def run_consistency_check(
+        check_type: str = 'all', incremental: bool = False, take_snapshots: bool = False
+    ) -> Dict[str, any]:
         """
         运行数据一致性检查
         
         Args:
             check_type: 检查类型 ('stock', 'quantity', 'material', 'all')
+            incremental: 只检查上次运行之后有变动的对象（没有上次运行记录时全量检查）
+            take_snapshots: 库存检查后把较早的库存日志汇总进台账快照（会写数据库）
         
         Returns:
-            Dict: 检查结果
+            Dict: 检查结果，timings 为每项检查的耗时（毫秒）
         """
+        from ..models.system import ConsistencyCheckRun
+
         results = {
             'check_time': timezone.now(),
-            'results': {}
+            'incremental': incremental,
+            'results': {},
+            'timings': {},
+        }
+        checks = {
+            'stock': DataConsistencyManager._check_stock_consistency,
+            'quantity': DataConsistencyManager._check_quantity_consistency,
+            'material': DataConsistencyManager._check_material_consistency,
         }
         
-        if check_type in ['stock', 'all']:
-            results['results']['stock'] = DataConsistencyManager._check_stock_consistency()
-        
-        if check_type in ['quantity', 'all']:
-            results['results']['quantity'] = DataConsistencyManager._check_quantity_consistency()
-        
-        if check_type in ['material', 'all']:
-            results['results']['material'] = DataConsistencyManager._check_material_consistency()
+        for name in DataConsistencyManager.CHECK_TYPES:
+            if check_type not in (name, 'all'):
+                continue
+            since = DataConsistencyManager.get_last_run(name) if incremental else None
+            options = {'since': since}
+            if name == 'stock':
+                options['take_snapshots'] = take_snapshots
+            # 记录开始时间：检查期间发生的变动留给下次增量检查
+            started_at = timezone.now()
+            start = time.perf_counter()
+            data = checks[name](**options)
+            duration_ms = round((time.perf_counter() - start) * 1000, 1)
+
+            data['since'] = since
+            data['duration_ms'] = duration_ms
+            results['results'][name] = data
+            results['timings'][name] = duration_ms
+            ConsistencyCheckRun.objects.update_or_create(
+                check_type=name,
+                defaults={'last_started_at': started_at, 'last_duration_ms': duration_ms},
+            )
         
         return results
+
+    @staticmethod
+    def get_last_run(check_type: str):
+        """上次检查的开始时间，没有记录时返回 None"""
+        from ..models.system import ConsistencyCheckRun
+
+        return (
+            ConsistencyCheckRun.objects.filter(check_type=check_type)
+            .values_list('last_started_at', flat=True).first()
+        )
+
+    # ==================== 增量范围 ====================
+
+    @staticmethod
+    def _touched_product_ids(since) -> Set[int]:
+        """上次检查之后修改过或有库存变动的产品"""
+        from ..models.products import Product, ProductStockLog
+
+        product_ids = set(
+            Product.objects.filter(updated_at__gte=since).values_list('id', flat=True)
+        )
+        product_ids.update(
+            ProductStockLog.objects.filter(created_at__gte=since)
+            .values_list('product_id', flat=True).distinct()
+        )
+        return product_ids
+
+    @staticmethod
+    def _touched_work_order_ids(since) -> Set[int]:
+        """上次检查之后本身、工序、任务有修改，或新增了产品、物料的施工单"""
+        from ..models.core import (
+            WorkOrder,
+            WorkOrderMaterial,
+            WorkOrderProcess,
+            WorkOrderProduct,
+            WorkOrderTask,
+        )
+
+        sources = [
+            WorkOrder.objects.filter(updated_at__gte=since).values_list('id', flat=True),
+            WorkOrderProcess.objects.filter(updated_at__gte=since)
+            .values_list('work_order_id', flat=True),
+            WorkOrderTask.objects.filter(updated_at__gte=since)
+            .values_list('work_order_process__work_order_id', flat=True),
+            WorkOrderProduct.objects.filter(created_at__gte=since)
+            .values_list('work_order_id', flat=True),
+            WorkOrderMaterial.objects.filter(created_at__gte=since)
+            .values_list('work_order_id', flat=True),
+        ]
+        work_order_ids = set()
+        for source in sources:
+            work_order_ids.update(source.order_by().distinct())
+        return work_order_ids
+
+    # ==================== 检查 ====================
     
     @staticmethod
-    def _check_stock_consistency() -> Dict[str, any]:
-        """检查库存一致性"""
+    def _check_stock_consistency(since=None, take_snapshots: bool = False) -> Dict[str, any]:
+        """检查库存一致性
+
+        台账余额用两次分组查询算出；take_snapshots 时检查后把较早的日志汇总进快照，
+        下次只需汇总之后的日志。
+        """
         from ..models.products import Product
-        
+        from .stock_ledger import StockLedger
+
         products = Product.objects.all()
+        product_ids = None
+        if since is not None:
+            product_ids = list(DataConsistencyManager._touched_product_ids(since))
+            products = products.filter(pk__in=product_ids)
+        
+        balances = StockLedger.ledger_balances(product_ids)
+        products = list(products)
         inconsistent_products = []
         
         for product in products:
-            validation = StockConsistencyService.validate_stock_consistency(product)
+            expected_quantity, log_count = balances.get(product.pk, (0, 0))
+            validation = StockConsistencyService.build_stock_validation(
+                product.stock_quantity, expected_quantity, log_count
+            )
             if not validation['is_consistent']:
                 inconsistent_products.append({
                     'product': product,
                     'validation': validation
                 })
+
+        if take_snapshots:
+            StockLedger.take_snapshots(product_ids)
         
         return {
-            'total_products': products.count(),
+            'total_products': len(products),
             'inconsistent_count': len(inconsistent_products),
             'inconsistent_products': inconsistent_products
         }
     
     @staticmethod
-    def _check_quantity_consistency() -> Dict[str, any]:
-        """检查数量一致性"""
-        from ..models.core import WorkOrder
+    def _check_quantity_consistency(since=None) -> Dict[str, any]:
+        """检查数量一致性（产品、任务、工序数量各一次分组聚合）"""
+        from ..models.core import WorkOrder, WorkOrderProcess, WorkOrderProduct, WorkOrderTask
         
         work_orders = WorkOrder.objects.all()
+        if since is not None:
+            work_orders = work_orders.filter(
+                pk__in=DataConsistencyManager._touched_work_order_ids(since)
+            )
+        work_orders = list(work_orders)
+
+        scope = {}
+        if since is not None:
+            scope = {'work_order_id__in': [work_order.pk for work_order in work_orders]}
+
+        product_totals = dict(
+            WorkOrderProduct.objects.filter(**scope).order_by()
+            .values('work_order_id').annotate(total=Sum('quantity'))
+            .values_list('work_order_id', 'total')
+        )
+        process_totals = dict(
+            WorkOrderProcess.objects.filter(**scope).order_by()
+            .values('work_order_id').annotate(total=Sum('quantity_completed'))
+            .values_list('work_order_id', 'total')
+        )
+        task_totals = {
+            row['work_order_id']: row
+            for row in WorkOrderTask.objects.filter(
+                status='completed',
+                **{f'work_order_process__{key}': value for key, value in scope.items()},
+            ).order_by().values(work_order_id=F('work_order_process__work_order_id')).annotate(
+                completed=Sum('quantity_completed'), defective=Sum('quantity_defective')
+            )
+        }
+
         inconsistent_orders = []
-        
         for work_order in work_orders:
-            validation = WorkOrderQuantityService.validate_quantity_consistency(work_order)
-            if not validation['is_consistent']:
+            tasks = task_totals.get(work_order.pk, {})
+            summary = {
+                'order_quantity': work_order.production_quantity or 0,
+                'total_product_quantity': product_totals.get(work_order.pk) or 0,
+                'total_task_quantity': tasks.get('completed') or 0,
+                'total_process_quantity': process_totals.get(work_order.pk) or 0,
+                'total_defective_quantity': tasks.get('defective') or 0,
+            }
+            issues = WorkOrderQuantityService.build_quantity_issues(summary)
+            if issues:
                 inconsistent_orders.append({
                     'work_order': work_order,
-                    'validation': validation
+                    'validation': {'is_consistent': False, 'summary': summary, 'issues': issues}
                 })
         
         return {
-            'total_orders': work_orders.count(),
+            'total_orders': len(work_orders),
             'inconsistent_count': len(inconsistent_orders),
             'inconsistent_orders': inconsistent_orders
         }
     
     @staticmethod
-    def _check_material_consistency() -> Dict[str, any]:
-        """检查物料一致性"""
-        from ..models.core import WorkOrder
+    def _check_material_consistency(since=None) -> Dict[str, any]:
+        """检查物料一致性（施工单物料一次查询，开料用量一次分组聚合）"""
+        from ..models.core import WorkOrder, WorkOrderMaterial
         
-        work_orders = WorkOrder.objects.filter(status__in=['in_progress', 'pending'])
+        work_orders = WorkOrder.objects.filter(
+            status__in=DataConsistencyManager.ACTIVE_ORDER_STATUSES
+        )
+        if since is not None:
+            work_orders = work_orders.filter(
+                pk__in=DataConsistencyManager._touched_work_order_ids(since)
+            )
+        orders = {work_order.pk: work_order for work_order in work_orders}
+
+        actual_usage = MaterialStockService.cutting_usage(work_orders=work_orders.values('pk'))
+        # 同一施工单重复配置的物料以最后一条为准（与逐单检查相同）
+        order_materials = {}
+        for item in WorkOrderMaterial.objects.filter(
+            work_order__in=work_orders.values('pk')
+        ).select_related('material').order_by('work_order_id', 'id'):
+            order_materials.setdefault(item.work_order_id, {})[item.material_id] = item
+
         material_issues = []
-        
-        for work_order in work_orders:
-            availability = MaterialStockService.check_material_availability(work_order)
-            if not availability['is_available']:
+        for work_order_id, items in order_materials.items():
+            if work_order_id not in orders:
+                continue
+            issues = []
+            for material_id, item in items.items():
+                usage = actual_usage.get((work_order_id, material_id), {})
+                issues.extend(MaterialStockService.build_material_issues(
+                    item.material,
+                    item.purchase_status,
+                    item.need_cutting,
+                    usage.get('actual_usage', 0),
+                ))
+            if issues:
                 material_issues.append({
-                    'work_order': work_order,
-                    'issues': availability['issues']
+                    'work_order': orders[work_order_id],
+                    'issues': issues
                 })
         
         return {
-            'active_orders': work_orders.count(),
+            'active_orders': len(orders),
             'orders_with_issues': len(material_issues),
             'material_issues': material_issues
         }
@@ -462,32 +666,29 @@ class DataConsistencyManager:
     @staticmethod
     def _fix_stock_issues(user=None) -> Dict[str, any]:
         """修复库存问题"""
-        from ..models.products import Product
-        
-        products = Product.objects.all()
+        check = DataConsistencyManager._check_stock_consistency()
         fixed_count = 0
         failed_count = 0
         fix_details = []
         
-        for product in products:
-            validation = StockConsistencyService.validate_stock_consistency(product)
-            if not validation['is_consistent']:
-                try:
-                    result = StockConsistencyService.fix_stock_consistency(product, user)
-                    if result['success']:
-                        fixed_count += 1
-                        fix_details.append({
-                            'product_code': product.code,
-                            'changes': result['changes']
-                        })
-                    else:
-                        failed_count += 1
-                except Exception as e:
-                    logger.error(f"修复产品 {product.code} 库存失败: {str(e)}")
+        for item in check['inconsistent_products']:
+            product = item['product']
+            try:
+                result = StockConsistencyService.fix_stock_consistency(product, user)
+                if result['success']:
+                    fixed_count += 1
+                    fix_details.append({
+                        'product_code': product.code,
+                        'changes': result['changes']
+                    })
+                else:
                     failed_count += 1
+            except Exception as e:
+                logger.error(f"修复产品 {product.code} 库存失败: {str(e)}")
+                failed_count += 1
         
         return {
-            'total_checked': products.count(),
+            'total_checked': check['total_products'],
             'fixed_count': fixed_count,
             'failed_count': failed_count,
             'fix_details': fix_details
@@ -496,22 +697,18 @@ class DataConsistencyManager:
     @staticmethod
     def _fix_quantity_issues(user=None) -> Dict[str, any]:
         """修复数量问题"""
-        from ..models.core import WorkOrder
-        
         # 数量一致性通常需要人工审核，这里只记录问题
-        work_orders = WorkOrder.objects.all()
-        inconsistent_orders = []
-        
-        for work_order in work_orders:
-            validation = WorkOrderQuantityService.validate_quantity_consistency(work_order)
-            if not validation['is_consistent']:
-                inconsistent_orders.append({
-                    'order_number': work_order.order_number,
-                    'issues': validation['issues']
-                })
+        check = DataConsistencyManager._check_quantity_consistency()
+        inconsistent_orders = [
+            {
+                'order_number': item['work_order'].order_number,
+                'issues': item['validation']['issues']
+            }
+            for item in check['inconsistent_orders']
+        ]
         
         return {
-            'total_checked': work_orders.count(),
+            'total_checked': check['total_orders'],
             'inconsistent_count': len(inconsistent_orders),
             'inconsistent_orders': inconsistent_orders,
             'requires_manual_review': True
@@ -0,0 +1,120 @@
+"""
+部门负载计数
+
+缓存每个部门当前的负载（分派到该部门且状态为 pending / in_progress 的任务数），
+供负载均衡分派读取，替代每次分派对每个候选部门执行一次 COUNT：
+- 读取：cache.get_many 批量读取，缺失的部门用一次分组聚合补齐
+- 维护：任务保存/删除信号（见 performance/cache_invalidation.py）按状态和分派部门
+  的变化在事务提交后增减计数；批量分派（bulk_update 不触发信号）由调用方显式调整
+- 计数只在事务外写入缓存，不发布未提交的数据；queryset.update() 等绕过信号的
+  批量修改可能造成偏差，计数设置较短的过期时间以自动纠正
+"""
+import logging
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+
+class DepartmentLoadStore:
+    """部门负载计数"""
+
+    KEY_PREFIX = 'dept_load'
+    TIMEOUT = settings.CACHE_TIMEOUTS['MEDIUM']
+    ACTIVE_STATUSES = ('pending', 'in_progress')
+
+    @classmethod
+    def _key(cls, department_id: int) -> str:
+        return f'{cls.KEY_PREFIX}:{department_id}'
+
+    @classmethod
+    def is_active(cls, status: Optional[str]) -> bool:
+        return status in cls.ACTIVE_STATUSES
+
+    # ==================== 读取 ====================
+
+    @classmethod
+    def get_loads(cls, department_ids: Iterable[int]) -> Dict[int, int]:
+        """批量获取部门负载：部门ID -> 待处理和进行中的任务数"""
+        from ..models.core import WorkOrderTask
+
+        department_ids = list(dict.fromkeys(department_ids))
+        if not department_ids:
+            return {}
+
+        cached = cache.get_many([cls._key(department_id) for department_id in department_ids])
+        loads = {}
+        missing = []
+        for department_id in department_ids:
+            value = cached.get(cls._key(department_id))
+            if value is None:
+                missing.append(department_id)
+            else:
+                loads[department_id] = value
+
+        if missing:
+            counted = dict(
+                WorkOrderTask.objects.filter(
+                    assigned_department_id__in=missing,
+                    status__in=cls.ACTIVE_STATUSES,
+                )
+                .order_by()
+                .values_list('assigned_department_id')
+                .annotate(load=Count('id'))
+            )
+            in_transaction = connection.in_atomic_block
+            for department_id in missing:
+                loads[department_id] = counted.get(department_id, 0)
+                # 事务内的计数可能包含未提交数据，不写入缓存
+                if not in_transaction:
+                    cache.add(cls._key(department_id), loads[department_id], cls.TIMEOUT)
+        return loads
+
+    @classmethod
+    def get_load(cls, department_id: int) -> int:
+        return cls.get_loads([department_id]).get(department_id, 0)
+
+    # ==================== 维护 ====================
+
+    @classmethod
+    def apply(cls, deltas: Dict[int, int]):
+        """增减已缓存的计数（未缓存的部门下次读取时重新统计）"""
+        for department_id, delta in deltas.items():
+            if not department_id or not delta:
+                continue
+            try:
+                cache.incr(cls._key(department_id), delta)
+            except ValueError:
+                pass
+
+    @classmethod
+    def apply_on_commit(cls, deltas: Dict[int, int]):
+        """事务提交后增减计数"""
+        deltas = {department_id: delta for department_id, delta in deltas.items() if delta}
+        if deltas:
+            transaction.on_commit(lambda: cls.apply(deltas))
+
+    @classmethod
+    def track_change(
+        cls,
+        old_department_id: Optional[int],
+        old_status: Optional[str],
+        new_department_id: Optional[int],
+        new_status: Optional[str],
+    ):
+        """任务分派部门或状态变化后调整计数"""
+        deltas = Counter()
+        if old_department_id and cls.is_active(old_status):
+            deltas[old_department_id] -= 1
+        if new_department_id and cls.is_active(new_status):
+            deltas[new_department_id] += 1
+        cls.apply_on_commit(deltas)
+
+    @classmethod
+    def invalidate(cls, department_ids: Iterable[int]):
+        cache.delete_many([cls._key(department_id) for department_id in department_ids])
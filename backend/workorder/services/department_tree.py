@@ -0,0 +1,178 @@
+"""
+部门层级快照
+
+Department.get_ancestors / get_descendants / get_level 原实现沿 parent 逐级查询、
+对 children.all() 递归查询，每个节点一次查询。部门数量少、变化少，本模块改为在进程内
+保存整棵部门树的快照：
+- 构建：一次查询读取全部 (id, parent_id)，先序遍历得到每个部门的进出序号（嵌套集合），
+  子孙部门即先序序列中的一段，祖先链和层级在遍历时一并记录
+- 查询：祖先、层级、是否为子孙均为字典查找；子孙部门为列表切片，均不查询数据库
+- 失效：部门保存/删除信号清除本进程快照并递增缓存中的代数，其他进程读取时发现代数变化后
+  重新构建；提交后再递增一次，覆盖事务内其他请求按未提交数据重建的快照
+- 本线程事务内修改过部门时，构建的快照只用于本次读取、不发布给其他线程，
+  事务回滚后不会留下已回滚的层级
+"""
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ..models.base import Department
+
+logger = logging.getLogger(__name__)
+
+
+class DepartmentHierarchy:
+    """部门树快照（只读）"""
+
+    __slots__ = ('generation', 'parents', 'ancestors', 'order', 'entry', 'exit')
+
+    def __init__(self, generation: int, edges: List[Tuple[int, Optional[int]]]):
+        """
+        Args:
+            generation: 构建时的缓存代数
+            edges: (部门ID, 上级部门ID) 列表，按同级排序顺序排列
+        """
+        self.generation = generation
+        self.parents: Dict[int, Optional[int]] = dict(edges)
+        children: Dict[Optional[int], List[int]] = {}
+        for department_id, parent_id in edges:
+            if parent_id is not None and parent_id not in self.parents:
+                parent_id = None
+            children.setdefault(parent_id, []).append(department_id)
+
+        # 先序遍历：entry 为部门在 order 中的位置，exit 为其子树之后的位置
+        self.ancestors: Dict[int, Tuple[int, ...]] = {}
+        self.order: List[int] = []
+        self.entry: Dict[int, int] = {}
+        self.exit: Dict[int, int] = {}
+        stack = [(department_id, (), False) for department_id in reversed(children.get(None, []))]
+        while stack:
+            department_id, ancestors, leaving = stack.pop()
+            if leaving:
+                self.exit[department_id] = len(self.order)
+                continue
+            self.entry[department_id] = len(self.order)
+            self.order.append(department_id)
+            self.ancestors[department_id] = ancestors
+            stack.append((department_id, ancestors, True))
+            # 祖先链从近到远
+            child_ancestors = (department_id,) + ancestors
+            for child_id in reversed(children.get(department_id, [])):
+                stack.append((child_id, child_ancestors, False))
+
+        # 循环引用中的部门无法从顶级部门到达，不纳入快照
+        unreachable = set(self.parents) - set(self.entry)
+        if unreachable:
+            logger.warning(f"部门层级存在循环引用，已忽略: {sorted(unreachable)}")
+
+    def __contains__(self, department_id) -> bool:
+        return department_id in self.entry
+
+    def ancestor_ids(self, department_id: int) -> Tuple[int, ...]:
+        """祖先部门ID，从直接上级到顶级"""
+        return self.ancestors.get(department_id, ())
+
+    def descendant_ids(self, department_id: int) -> List[int]:
+        """子孙部门ID（先序）"""
+        if department_id not in self.entry:
+            return []
+        return self.order[self.entry[department_id] + 1:self.exit[department_id]]
+
+    def subtree_ids(self, department_id: int) -> List[int]:
+        """部门自身及全部子孙部门ID"""
+        if department_id not in self.entry:
+            return []
+        return self.order[self.entry[department_id]:self.exit[department_id]]
+
+    def level(self, department_id: int) -> int:
+        """部门层级（顶级为0）"""
+        return len(self.ancestors.get(department_id, ()))
+
+    def is_descendant(self, department_id: int, ancestor_id: int) -> bool:
+        """department_id 是否为 ancestor_id 的子孙部门（不含自身）"""
+        if department_id not in self.entry or ancestor_id not in self.entry:
+            return False
+        return self.entry[ancestor_id] < self.entry[department_id] < self.exit[ancestor_id]
+
+
+class DepartmentTree:
+    """部门层级快照的读取与失效"""
+
+    GENERATION_KEY = 'department_tree:generation'
+
+    _lock = threading.Lock()
+    _snapshot: Optional[DepartmentHierarchy] = None
+    # 本线程当前事务是否修改过部门
+    _local = threading.local()
+
+    @classmethod
+    def get_generation(cls) -> int:
+        return cache.get(cls.GENERATION_KEY, 0)
+
+    @classmethod
+    def get(cls) -> DepartmentHierarchy:
+        """获取当前部门树快照，缓存代数变化时重新构建"""
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            cls._local.dirty = False
+        dirty = getattr(cls._local, 'dirty', False)
+
+        generation = cls.get_generation()
+        snapshot = cls._snapshot
+        if snapshot is not None and snapshot.generation == generation and not dirty:
+            return snapshot
+
+        snapshot = cls.build(generation)
+        if not dirty:
+            with cls._lock:
+                cls._snapshot = snapshot
+        return snapshot
+
+    @staticmethod
+    def build(generation: int = 0) -> DepartmentHierarchy:
+        """一次查询构建部门树"""
+        edges = list(
+            Department.objects.order_by('sort_order', 'code').values_list('id', 'parent_id')
+        )
+        return DepartmentHierarchy(generation, edges)
+
+    @classmethod
+    def invalidate(cls):
+        """部门变更：清除本进程快照并使其他进程的快照过期"""
+        cls._snapshot = None
+        cache.add(cls.GENERATION_KEY, 0, None)
+        try:
+            cache.incr(cls.GENERATION_KEY)
+        except ValueError:
+            cache.set(cls.GENERATION_KEY, 1, None)
+
+    @classmethod
+    def _on_commit(cls):
+        cls._local.dirty = False
+        cls.invalidate()
+
+    @classmethod
+    def mark_changed(cls):
+        """部门保存/删除后调用"""
+        cls.invalidate()
+        if transaction.get_connection().in_atomic_block:
+            cls._local.dirty = True
+            transaction.on_commit(cls._on_commit)
+
+    # ==================== 过滤 ====================
+
+    @classmethod
+    def filter_subtree(cls, queryset, department_id: int, field: str = 'assigned_department'):
+        """筛选属于该部门及其全部子孙部门的记录（一次 IN 查询）"""
+        return queryset.filter(**{f'{field}_id__in': cls.get().subtree_ids(department_id)})
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def invalidate_department_tree(sender, **kwargs):
+    DepartmentTree.mark_changed()
@@ -4,17 +4,21 @@
 提供任务分派预览和自动分派功能：
 - DispatchPreviewService: 提供分派规则预览
 - LoadBalancingService: 提供基于负载的部门选择
-- AutoDispatchService: 提供基于优先级规则的自动分派
+- AutoDispatchService: 提供基于优先级规则的自动分派（含批量分派 dispatch_batch）
+
+部门负载读取自 DepartmentLoadStore 的缓存计数，不再逐部门 COUNT。
 """
-from typing import Dict, List, Optional
-from django.db.models import Count, Q
+from typing import Dict, List, Optional, Set, Tuple
+from django.db import transaction
 from django.core.cache import cache
-from collections import defaultdict
+from django.utils import timezone
+from collections import Counter, defaultdict
 import random
 import logging
 from ..models.system import TaskAssignmentRule
 from ..models.base import Department
 from ..models.core import WorkOrderTask
+from .department_load import DepartmentLoadStore
 
 logger = logging.getLogger(__name__)
 
@@ -62,17 +66,8 @@ class DispatchPreviewService:
             # 获取优先级最高的规则
             top_rule = rules.first()
 
-            # 使用聚合查询批量计算所有部门的负载
-            dept_ids = [r.department_id for r in rules]
-            dept_loads = WorkOrderTask.objects.filter(
-                assigned_department_id__in=dept_ids,
-                status__in=['pending', 'in_progress']
-            ).values('assigned_department_id').annotate(
-                load=Count('id')
-            )
-
-            # 转换为字典：department_id -> load
-            load_dict = {item['assigned_department_id']: item['load'] for item in dept_loads}
+            # 批量读取所有部门的负载：department_id -> load
+            load_dict = DepartmentLoadStore.get_loads(r.department_id for r in rules)
 
             # 获取目标部门的负载
             target_load = load_dict.get(top_rule.department_id, 0)
@@ -145,18 +140,13 @@ class DispatchPreviewService:
 
         # 返回优先级最高的规则
         top_rule = rules.first()
-        dept_load = WorkOrderTask.objects.filter(
-            assigned_department=top_rule.department,
-            status__in=['pending', 'in_progress']
-        ).count()
+        load_dict = DepartmentLoadStore.get_loads(rule.department_id for rule in rules)
+        dept_load = load_dict.get(top_rule.department_id, 0)
 
         # 收集所有规则信息
         all_rules = []
         for rule in rules:
-            rule_load = WorkOrderTask.objects.filter(
-                assigned_department=rule.department,
-                status__in=['pending', 'in_progress']
-            ).count()
+            rule_load = load_dict.get(rule.department_id, 0)
             all_rules.append({
                 'department_id': rule.department.id,
                 'department_name': rule.department.name,
@@ -197,10 +187,7 @@ class LoadBalancingService:
         Returns:
             int: 待处理和进行中的任务数量
         """
-        return WorkOrderTask.objects.filter(
-            assigned_department=department,
-            status__in=['pending', 'in_progress']
-        ).count()
+        return DepartmentLoadStore.get_load(department.id)
 
     @staticmethod
     def select_department_by_load(process) -> Optional[Department]:
@@ -238,9 +225,10 @@ class LoadBalancingService:
             return highest_group[0].department
 
         # 多个部门在相同优先级，按负载选择
+        load_dict = DepartmentLoadStore.get_loads(rule.department_id for rule in highest_group)
         dept_loads = []
         for rule in highest_group:
-            load = LoadBalancingService.calculate_department_load(rule.department)
+            load = load_dict.get(rule.department_id, 0)
             dept_loads.append({
                 'department': rule.department,
                 'load': load,
@@ -347,23 +335,8 @@ class LoadBalancingService:
         if not rules:
             return {}
 
-        # 使用聚合查询统计每个部门的负载
-        dept_loads = WorkOrderTask.objects.filter(
-            assigned_department_id__in=list(rules),
-            status__in=['pending', 'in_progress']
-        ).values('assigned_department_id').annotate(
-            load=Count('id')
-        )
-
-        # 转换为字典
-        load_dict = {item['assigned_department_id']: item['load'] for item in dept_loads}
-
-        # 确保所有部门都有负载计数（至少为0）
-        for dept_id in rules:
-            if dept_id not in load_dict:
-                load_dict[dept_id] = 0
-
-        return load_dict
+        # 批量读取每个部门的负载（未统计到的部门为0）
+        return DepartmentLoadStore.get_loads(rules)
 
 
 class AutoDispatchService:
@@ -486,6 +459,161 @@ class AutoDispatchService:
         # 使用 LoadBalancingService 根据策略选择部门
         return LoadBalancingService.select_department_by_strategy(process, strategy)
 
+    @staticmethod
+    def dispatch_batch(tasks, strategy='least_tasks') -> Dict[int, Department]:
+        """批量自动分派任务到部门
+
+        规则与 dispatch_task 相同，但面向一批任务：
+        1. 所有涉及工序的分派规则和可用部门各只查询一次
+        2. 候选部门负载只读取一次，分派过程中在内存中累加，同一批任务也能均衡分摊
+        3. 分派结果用一次 bulk_update 写入
+
+        bulk_update 不触发保存信号，部门负载计数、可见性索引、统计缓存和审计日志
+        由本方法补充维护。已分派部门或没有工序的任务会被跳过。
+
+        Args:
+            tasks: WorkOrderTask 列表（建议 select_related('work_order_process')）
+            strategy: 同优先级多部门时的选择策略，同 select_department_by_strategy
+
+        Returns:
+            Dict[int, Department]: 任务ID -> 分派的部门
+        """
+        dispatched = AutoDispatchService.assign_departments(tasks, strategy)
+        if not dispatched:
+            return {}
+
+        now = timezone.now()
+        for task in dispatched:
+            task.updated_at = now
+        WorkOrderTask.objects.bulk_update(
+            dispatched, ['assigned_department', 'updated_at'], batch_size=500
+        )
+        AutoDispatchService._after_bulk_dispatch(dispatched)
+        return {task.id: task.assigned_department for task in dispatched}
+
+    @staticmethod
+    def assign_departments(tasks, strategy='least_tasks') -> List[WorkOrderTask]:
+        """
+        按分派规则为一批任务选择部门，只修改内存中的任务对象，不写入数据库
+
+        任务可以尚未保存（批量生成任务时先分派再 bulk_create）。
+
+        Returns:
+            list: 已分派部门的任务
+        """
+        if not AutoDispatchService.is_global_dispatch_enabled():
+            return []
+
+        tasks = [
+            task for task in tasks
+            if task.assigned_department_id is None and task.work_order_process_id
+        ]
+        if not tasks:
+            return []
+
+        process_ids = {task.work_order_process.process_id for task in tasks}
+        candidate_groups = AutoDispatchService._get_candidate_groups(process_ids)
+        loads = DepartmentLoadStore.get_loads(
+            department.id
+            for departments in candidate_groups.values()
+            for department in departments
+        )
+
+        round_robin_positions = {}
+        dispatched = []
+        for task in tasks:
+            process_id = task.work_order_process.process_id
+            departments = candidate_groups.get(process_id)
+            if not departments:
+                continue
+
+            if len(departments) == 1 or strategy == 'first_available':
+                department = departments[0]
+            elif strategy == 'random':
+                department = random.choice(departments)
+            elif strategy == 'round_robin':
+                if process_id not in round_robin_positions:
+                    round_robin_positions[process_id] = cache.get(f'dispatch_rr_{process_id}', 0)
+                index = (round_robin_positions[process_id] + 1) % len(departments)
+                round_robin_positions[process_id] = index
+                department = departments[index]
+            else:
+                # least_tasks：负载相同时取规则顺序靠前的部门
+                department = min(departments, key=lambda d: loads[d.id])
+
+            task.assigned_department = department
+            loads[department.id] += 1
+            dispatched.append(task)
+
+        for process_id, index in round_robin_positions.items():
+            cache.set(f'dispatch_rr_{process_id}', index, timeout=None)
+
+        if dispatched:
+            logger.info(
+                f"批量自动分派：{len(dispatched)}/{len(tasks)} 个任务，"
+                f"涉及 {len(process_ids)} 个工序，策略 {strategy}"
+            )
+        return dispatched
+
+    @staticmethod
+    def _get_candidate_groups(process_ids: Set[int]) -> Dict[int, List[Department]]:
+        """获取各工序最高优先级的候选部门（仅限工序可用的启用部门，按规则顺序）"""
+        available: Set[Tuple[int, int]] = set(
+            Department.processes.through.objects.filter(
+                process_id__in=process_ids,
+                department__is_active=True,
+            ).values_list('process_id', 'department_id')
+        )
+        rules = TaskAssignmentRule.objects.filter(
+            process_id__in=process_ids,
+            is_active=True
+        ).select_related('department').order_by('process_id', '-priority', 'id')
+
+        candidate_groups: Dict[int, List[Department]] = {}
+        highest_priorities: Dict[int, int] = {}
+        for rule in rules:
+            if (rule.process_id, rule.department_id) not in available:
+                logger.warning(
+                    f"分派规则跳过：工序 {rule.process_id} 的规则部门 "
+                    f"{rule.department.name} 不在该工序的可用部门列表中"
+                )
+                continue
+            highest = highest_priorities.setdefault(rule.process_id, rule.priority)
+            if rule.priority == highest:
+                candidate_groups.setdefault(rule.process_id, []).append(rule.department)
+        return candidate_groups
+
+    @staticmethod
+    def _after_bulk_dispatch(tasks: List[WorkOrderTask]):
+        """补充 bulk_update 跳过的保存信号副作用（新分派的任务原部门均为空）"""
+        from ..performance.cache_invalidation import invalidate_department_stats
+        from .audit_log_service import capture_bulk_changes
+        from .visibility_index import WorkOrderVisibilityIndex
+        from .work_order_statistics import WorkOrderStatisticsService
+
+        load_deltas = Counter()
+        department_ids = set()
+        for task in tasks:
+            department_id = task.assigned_department_id
+            if DepartmentLoadStore.is_active(task.status):
+                load_deltas[department_id] += 1
+            department_ids.add(department_id)
+            # 同步字段追踪快照，避免该实例之后再次保存时重复计数
+            task.reset_field_tracking(['assigned_department', 'updated_at'])
+
+        capture_bulk_changes(tasks, {task.pk: {'assigned_department': None} for task in tasks})
+        DepartmentLoadStore.apply_on_commit(load_deltas)
+
+        def on_commit():
+            for department_id in department_ids:
+                WorkOrderVisibilityIndex.invalidate(
+                    WorkOrderVisibilityIndex.SCOPE_DEPARTMENT, department_id
+                )
+                invalidate_department_stats(department_id)
+            WorkOrderStatisticsService.bump_generation()
+
+        transaction.on_commit(on_commit)
+
     @staticmethod
     def get_highest_priority_department(process) -> Optional[Department]:
         """获取工序的优先级最高的活跃规则对应的部门
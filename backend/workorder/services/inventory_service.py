@@ -4,7 +4,6 @@
 提供统一的库存管理接口，确保库存操作的安全性和一致性
 """
 
-from django.db import transaction
 from workorder.exceptions import InsufficientStockError, BusinessLogicError
 import logging
 
@@ -15,7 +14,26 @@ class InventoryService:
     """库存管理服务"""
 
     @staticmethod
-    @transaction.atomic
+    def _apply(item, quantity, user=None, reason=''):
+        """通过库存台账原子加减（Product 写入库存日志，Material 只更新数量）"""
+        from ..models.materials import Material
+        from ..models.products import Product
+        from .stock_ledger import StockLedger, StockMovement
+
+        movement = StockMovement(item.pk, quantity, reason)
+        if isinstance(item, Product):
+            updated = StockLedger.apply_product_movements([movement], user=user)
+        elif isinstance(item, Material):
+            updated = StockLedger.apply_material_movements([movement])
+        else:
+            raise ValueError(f"不支持的库存项目: {item.__class__.__name__}")
+
+        current = updated[item.pk]
+        item.stock_quantity = current.stock_quantity
+        item.reset_field_tracking(['stock_quantity'])
+        return item.stock_quantity
+
+    @staticmethod
     def add_stock(item, quantity, user=None, reason=''):
         """
         增加库存
@@ -36,15 +54,13 @@ class InventoryService:
             if quantity <= 0:
                 raise ValueError("增加数量必须大于0")
 
-            # 更新库存
-            item.current_stock += quantity
-            item.save()
+            new_quantity = InventoryService._apply(item, quantity, user, reason)
 
             # 记录日志
             user_info = f", 操作人: {user}" if user else ""
             logger.info(
                 f"库存增加: {item.__class__.__name__} - {item.name} "
-                f"+{quantity} -> {item.current_stock}, 原因: {reason}{user_info}"
+                f"+{quantity} -> {new_quantity}, 原因: {reason}{user_info}"
             )
 
             return True
@@ -57,11 +73,12 @@ class InventoryService:
             raise BusinessLogicError(f"库存增加失败: {str(e)}")
 
     @staticmethod
-    @transaction.atomic
     def reduce_stock(item, quantity, user=None, reason=''):
         """
         减少库存
 
+        库存是否充足由带非负条件的 UPDATE 判断，不再先读取再比较。
+
         Args:
             item: 库存项目（Product 或 Material）
             quantity: 减少数量
@@ -79,29 +96,24 @@ class InventoryService:
             if quantity <= 0:
                 raise ValueError("减少数量必须大于0")
 
-            # 检查库存是否充足
-            if item.current_stock < quantity:
-                raise InsufficientStockError(
-                    f"{item.name} 库存不足。"
-                    f"当前库存: {item.current_stock}, 需要: {quantity}"
-                )
-
-            # 更新库存
-            item.current_stock -= quantity
-            item.save()
+            new_quantity = InventoryService._apply(item, -quantity, user, reason)
 
             # 记录日志
             user_info = f", 操作人: {user}" if user else ""
             logger.info(
                 f"库存减少: {item.__class__.__name__} - {item.name} "
-                f"-{quantity} -> {item.current_stock}, 原因: {reason}{user_info}"
+                f"-{quantity} -> {new_quantity}, 原因: {reason}{user_info}"
             )
 
             return True
 
-        except InsufficientStockError:
+        except InsufficientStockError as e:
             # 重新抛出业务异常
-            raise
+            current, _ = e.shortages.get(item.pk, (item.stock_quantity, quantity))
+            raise InsufficientStockError(
+                f"{item.name} 库存不足。当前库存: {current}, 需要: {quantity}",
+                shortages=e.shortages,
+            )
         except Exception as e:
             logger.error(
                 f"库存减少失败: {item.__class__.__name__} - {item.name}, "
@@ -120,11 +132,13 @@ class InventoryService:
         Returns:
             dict: 库存状态信息
         """
+        current_stock = item.stock_quantity or 0
+        min_stock = item.min_stock_quantity or 0
         return {
-            'current_stock': item.current_stock,
-            'min_stock': item.min_stock if hasattr(item, 'min_stock') else 0,
-            'is_low_stock': item.current_stock < (item.min_stock if hasattr(item, 'min_stock') else 0),
-            'status': 'normal' if item.current_stock >= (item.min_stock if hasattr(item, 'min_stock') else 0) else 'low'
+            'current_stock': current_stock,
+            'min_stock': min_stock,
+            'is_low_stock': current_stock < min_stock,
+            'status': 'normal' if current_stock >= min_stock else 'low'
         }
 
     @staticmethod
@@ -141,7 +155,8 @@ class InventoryService:
         insufficient = {}
 
         for item, quantity in items_quantities:
-            if item.current_stock < quantity:
-                insufficient[item] = quantity - item.current_stock
+            current_stock = item.stock_quantity or 0
+            if current_stock < quantity:
+                insufficient[item] = quantity - current_stock
 
         return insufficient
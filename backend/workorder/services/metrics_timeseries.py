@@ -0,0 +1,223 @@
+"""
+业务指标时间序列
+
+按天 / 按小时统计完成施工单数、完成任务数、报工数量、不良品数量和工序耗时：
+- 每个数据源一次 TruncDate / TruncHour 分组查询，查询次数与时间窗口长度无关
+- 已结束的自然日写入 DailyMetricsRollup 日汇总表，之后直接读取；
+  缺失的日期在查询时增量补齐，只有当天的数据实时统计
+  因此 90 天、365 天的趋势与 7 天的开销相当
+
+各指标的时间口径：
+- 完成施工单 / 完成任务：按首次完成时间（completed_at，只写一次）归属，
+  完成后的再次保存不会把记录移到其他日期，已冻结的日汇总不会重复计数
+- 报工数量、不良品数量：任务操作日志（TaskLog）的增量，按日志时间归属
+- 完成工序数、工序耗时：按工序实际结束时间归属
+"""
+import logging
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+from ..models.core import TaskLog, WorkOrder, WorkOrderProcess, WorkOrderTask
+from ..models.system import DailyMetricsRollup
+
+logger = logging.getLogger(__name__)
+
+
+class TimeSeriesMetrics:
+    """业务指标时间序列"""
+
+    METRIC_FIELDS = (
+        'completed_orders',
+        'completed_tasks',
+        'completed_quantity',
+        'defective_quantity',
+        'defect_tasks',
+        'completed_processes',
+        'process_hours',
+    )
+
+    # 单次请求允许的最大窗口
+    MAX_DAYS = 366
+    MAX_HOURS = 24 * 7
+
+    # ==================== 分组查询 ====================
+
+    @classmethod
+    def empty_bucket(cls) -> Dict:
+        bucket = dict.fromkeys(cls.METRIC_FIELDS, 0)
+        bucket['process_hours'] = Decimal('0')
+        return bucket
+
+    @classmethod
+    def collect(cls, trunc, start: datetime, end: datetime) -> Dict:
+        """
+        统计 [start, end) 内的指标，按 trunc（TruncDate / TruncHour）分组
+
+        Returns:
+            dict: 时间桶（date 或 datetime）-> 指标字典；没有数据的时间桶不出现
+        """
+        tzinfo = timezone.get_current_timezone()
+        buckets = {}
+
+        def merge(rows):
+            for row in rows:
+                bucket = buckets.setdefault(row.pop('bucket'), cls.empty_bucket())
+                for name, value in row.items():
+                    bucket[name] = value or bucket[name]
+
+        merge(
+            WorkOrder.objects.filter(completed_at__gte=start, completed_at__lt=end)
+            .annotate(bucket=trunc('completed_at', tzinfo=tzinfo))
+            .values('bucket')
+            .annotate(completed_orders=Count('id'))
+            .order_by()
+        )
+        merge(
+            WorkOrderTask.objects.filter(completed_at__gte=start, completed_at__lt=end)
+            .annotate(bucket=trunc('completed_at', tzinfo=tzinfo))
+            .values('bucket')
+            .annotate(completed_tasks=Count('id'))
+            .order_by()
+        )
+        merge(
+            TaskLog.objects.filter(created_at__gte=start, created_at__lt=end)
+            .annotate(bucket=trunc('created_at', tzinfo=tzinfo))
+            .values('bucket')
+            .annotate(
+                completed_quantity=Sum('quantity_increment'),
+                defective_quantity=Sum('quantity_defective_increment'),
+                defect_tasks=Count(
+                    'task', distinct=True, filter=Q(quantity_defective_increment__gt=0)
+                ),
+            )
+            .order_by()
+        )
+        merge(
+            WorkOrderProcess.objects.filter(
+                status='completed', actual_end_time__gte=start, actual_end_time__lt=end
+            )
+            .annotate(bucket=trunc('actual_end_time', tzinfo=tzinfo))
+            .values('bucket')
+            .annotate(
+                completed_processes=Count('id'),
+                process_hours=Sum('duration_hours'),
+            )
+            .order_by()
+        )
+        return buckets
+
+    @staticmethod
+    def day_start(day: date) -> datetime:
+        """当前时区下某天 0 点"""
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    # ==================== 日汇总 ====================
+
+    @classmethod
+    def fill_rollups(cls, start_date: date, end_date: date, rebuild: bool = False) -> Dict:
+        """
+        统计 [start_date, end_date] 内已结束的自然日并写入日汇总表
+
+        Args:
+            rebuild: 为 True 时重新统计并覆盖已有汇总行
+
+        Returns:
+            dict: 日期 -> DailyMetricsRollup
+        """
+        end_date = min(end_date, timezone.localdate() - timedelta(days=1))
+        if start_date > end_date:
+            return {}
+
+        buckets = cls.collect(
+            TruncDate, cls.day_start(start_date), cls.day_start(end_date + timedelta(days=1))
+        )
+        rollups = {}
+        day = start_date
+        while day <= end_date:
+            rollups[day] = DailyMetricsRollup(date=day, **buckets.get(day, cls.empty_bucket()))
+            day += timedelta(days=1)
+
+        with transaction.atomic():
+            if rebuild:
+                DailyMetricsRollup.objects.filter(date__range=(start_date, end_date)).delete()
+            # 已有汇总行和并发补齐的同一天会冲突，忽略即可（数据相同）
+            DailyMetricsRollup.objects.bulk_create(rollups.values(), ignore_conflicts=True)
+        logger.info(f"业务指标日汇总已补齐：{start_date} ~ {end_date}")
+        return rollups
+
+    # ==================== 查询 ====================
+
+    @classmethod
+    def daily(cls, start_date: date, end_date: Optional[date] = None) -> List[Dict]:
+        """
+        按天的指标序列（含首尾两天，按日期升序，没有数据的日期补 0）
+
+        已结束的日期读取日汇总表（缺失的先补齐），当天实时统计
+        """
+        today = timezone.localdate()
+        end_date = min(end_date or today, today)
+
+        closed_end = min(end_date, today - timedelta(days=1))
+        rows = {}
+        if start_date <= closed_end:
+            rows = {
+                rollup.date: rollup
+                for rollup in DailyMetricsRollup.objects.filter(
+                    date__range=(start_date, closed_end)
+                )
+            }
+            missing = [
+                start_date + timedelta(days=offset)
+                for offset in range((closed_end - start_date).days + 1)
+                if start_date + timedelta(days=offset) not in rows
+            ]
+            if missing:
+                filled = cls.fill_rollups(missing[0], missing[-1])
+                rows.update({day: filled[day] for day in missing})
+
+        series = []
+        day = start_date
+        while day <= closed_end:
+            rollup = rows[day]
+            series.append(
+                {'date': day, **{name: getattr(rollup, name) for name in cls.METRIC_FIELDS}}
+            )
+            day += timedelta(days=1)
+
+        if end_date == today and start_date <= today:
+            live = cls.collect(
+                TruncDate, cls.day_start(today), cls.day_start(today + timedelta(days=1))
+            )
+            series.append({'date': today, **live.get(today, cls.empty_bucket())})
+
+        return series
+
+    @classmethod
+    def hourly(cls, start: datetime, end: Optional[datetime] = None) -> List[Dict]:
+        """按小时的指标序列（实时统计，没有数据的小时补 0）"""
+        tzinfo = timezone.get_current_timezone()
+        end = end or timezone.now()
+        start = timezone.localtime(start, tzinfo).replace(minute=0, second=0, microsecond=0)
+        buckets = cls.collect(TruncHour, start, end)
+
+        series = []
+        hour = start
+        while hour < end:
+            series.append({'hour': hour, **buckets.get(hour, cls.empty_bucket())})
+            hour += timedelta(hours=1)
+        return series
+
+    @classmethod
+    def summarize(cls, series: List[Dict]) -> Dict:
+        """汇总序列中各指标的合计"""
+        totals = cls.empty_bucket()
+        for point in series:
+            for name in cls.METRIC_FIELDS:
+                totals[name] += point[name]
+        return totals
@@ -19,6 +19,7 @@ from django.http import JsonResponse
 
 from ..models.core import WorkOrder, WorkOrderTask, WorkOrderProcess
 from ..models.system import Notification, WorkOrderApprovalLog
+from .namespaced_cache import CacheNamespace
 
 
 class PerformanceMonitor:
@@ -308,7 +309,9 @@ class BusinessMetrics:
         cache_info = {
             'redis_available': False,
             'hits': 0,
-            'misses': 0
+            'misses': 0,
+            # 各缓存命名空间在本进程内的命中 / 未命中 / 失效次数
+            'namespaces': CacheNamespace.all_stats(),
         }
         
         try:
@@ -586,16 +586,16 @@ class UrgentOrderService:
     @staticmethod
     def send_urgent_notification(work_order):
         """发送紧急订单通知"""
-        from ..models.system import Notification
+        from .notification_outbox import NotificationOutbox
         
-        # 通知所有主管和经理
+        # 通知所有主管和经理（记入发件箱，提交后一次写入）
         managers = User.objects.filter(
             groups__name__in=['主管', '经理'],
             is_active=True
-        )
+        ).distinct()
         
         for manager in managers:
-            Notification.objects.create(
+            NotificationOutbox.add(
                 recipient=manager,
                 notification_type='urgent_order',
                 title=f'紧急订单：{work_order.order_number}',
@@ -0,0 +1,156 @@
+"""
+命名空间缓存
+
+按模式删除缓存键（cache.keys / delete_pattern）只有 django-redis 支持，LocMemCache
+上直接报错或被静默跳过，在 Redis 上也是 O(N) 的 SCAN。本模块改为按命名空间管理缓存键：
+- 每个命名空间有一个代数，代数写入缓存键；使命名空间失效只需一次原子递增，
+  旧键不再被读取，随超时自然淘汰
+- 命名空间可按对象细分作用域（某个用户、某个施工单），作用域有自己的代数，
+  键同时包含命名空间和作用域的代数：失效作用域只影响该对象，失效命名空间影响全部对象
+- 代数被淘汰时以当前时间重新起始，不会与旧键重复
+- 每个命名空间记录本进程内的命中 / 未命中 / 失效次数（见系统指标）
+
+LocMemCache 与 Redis 上行为一致。已注册的命名空间：user、work_order、department、dashboard。
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class CacheNamespace:
+    """缓存命名空间"""
+
+    GENERATION_KEY = 'ns:{}:generation'
+
+    _registry: Dict[str, 'CacheNamespace'] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, name: str, timeout: int = 300, parent: Optional['CacheNamespace'] = None):
+        self.name = name
+        self.timeout = timeout
+        self.parent = parent
+        self._counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def __repr__(self):
+        return f"<CacheNamespace {self.name}>"
+
+    # ==================== 注册 ====================
+
+    @classmethod
+    def register(cls, name: str, timeout: int = 300) -> 'CacheNamespace':
+        """注册（或获取已注册的）命名空间"""
+        with cls._lock:
+            namespace = cls._registry.get(name)
+            if namespace is None:
+                namespace = cls._registry[name] = cls(name, timeout)
+            return namespace
+
+    @classmethod
+    def all_stats(cls) -> Dict[str, Dict[str, int]]:
+        """所有命名空间本进程内的命中统计"""
+        return {name: namespace.stats() for name, namespace in sorted(cls._registry.items())}
+
+    def scope(self, scope_id) -> 'CacheNamespace':
+        """对象作用域（统计计入所属命名空间）"""
+        return CacheNamespace(f'{self.name}:{scope_id}', self.timeout, parent=self)
+
+    # ==================== 统计 ====================
+
+    def _root(self) -> 'CacheNamespace':
+        namespace = self
+        while namespace.parent is not None:
+            namespace = namespace.parent
+        return namespace
+
+    def _record(self, counter: str):
+        root = self._root()
+        with self._lock:
+            root._counters[counter] += 1
+
+    def stats(self) -> Dict[str, int]:
+        counters = dict(self._root()._counters)
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_rate'] = round(counters['hits'] / lookups * 100, 2) if lookups else 0
+        return counters
+
+    def reset_stats(self):
+        with self._lock:
+            for counter in self._counters:
+                self._counters[counter] = 0
+
+    # ==================== 键 ====================
+
+    def _chain(self) -> List['CacheNamespace']:
+        chain, namespace = [], self
+        while namespace is not None:
+            chain.append(namespace)
+            namespace = namespace.parent
+        return chain[::-1]
+
+    def _generations(self) -> List[int]:
+        """命名空间链上的代数（一次 get_many）"""
+        keys = [self.GENERATION_KEY.format(namespace.name) for namespace in self._chain()]
+        values = cache.get_many(keys)
+        generations = []
+        for key in keys:
+            generation = values.get(key)
+            if generation is None:
+                # 首次使用或已被淘汰：以当前时间起始；并发初始化时以先写入的为准
+                cache.add(key, time.time_ns(), None)
+                generation = cache.get(key)
+            generations.append(generation)
+        return generations
+
+    def key(self, suffix: str) -> str:
+        """带代数的缓存键"""
+        generation = '.'.join(str(value) for value in self._generations())
+        return f'{self.name}:{generation}:{suffix}'
+
+    # ==================== 读写 ====================
+
+    def get(self, suffix: str, default: Any = None) -> Any:
+        value = cache.get(self.key(suffix))
+        if value is None:
+            self._record('misses')
+            return default
+        self._record('hits')
+        return value
+
+    def set(self, suffix: str, value: Any, timeout: Optional[int] = None):
+        cache.set(self.key(suffix), value, self.timeout if timeout is None else timeout)
+
+    def get_or_set(self, suffix: str, compute: Callable[[], Any], timeout: Optional[int] = None) -> Any:
+        key = self.key(suffix)
+        value = cache.get(key)
+        if value is not None:
+            self._record('hits')
+            return value
+        self._record('misses')
+        value = compute()
+        cache.set(key, value, self.timeout if timeout is None else timeout)
+        return value
+
+    def delete(self, suffix: str):
+        cache.delete(self.key(suffix))
+
+    def invalidate(self):
+        """使命名空间（或作用域）下的所有键失效：一次原子递增"""
+        key = self.GENERATION_KEY.format(self.name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # 代数不存在（未使用过或已淘汰），重新起始同样使旧键失效
+            cache.set(key, time.time_ns(), None)
+        self._record('invalidations')
+        logger.debug(f"缓存命名空间已失效: {self.name}")
+
+
+user_cache = CacheNamespace.register('user', timeout=1800)
+work_order_cache = CacheNamespace.register('work_order')
+department_cache = CacheNamespace.register('department')
+dashboard_cache = CacheNamespace.register('dashboard')
@@ -0,0 +1,259 @@
+"""
+通知发件箱
+
+业务代码产生的站内通知先记入发件箱，不再逐条 INSERT + 逐条推送：
+- 事务内：按事务（保存点）收集，提交时一次处理；事务回滚时通知随回调一起丢弃，
+  不会通知已回滚的操作
+- 事务外、请求内：按请求收集，由 NotificationOutboxMiddleware 在响应时一次处理
+- 其他情况（管理命令、脚本）：立即处理
+
+处理一批通知时：
+- 去重：同一接收人、同一通知类型、同一关联对象（任务/工序/施工单）只保留最后一条，
+  例如自动分派和分派信号对同一任务的两条分派通知
+- 合并：同一接收人在一批中收到超过 DIGEST_THRESHOLD 条通知时合并为一条摘要通知
+- 写入：一次 bulk_create 写入所有通知，再通过 ChannelFanout 一次批量推送
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .channel_fanout import ChannelFanout, user_group_name
+from .transaction_buffer import get_transaction_batch
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_ORDER = ['low', 'normal', 'high', 'urgent']
+
+
+class NotificationOutbox:
+    """通知发件箱"""
+
+    _local = threading.local()
+
+    # ==================== 配置 ====================
+
+    @staticmethod
+    def _config() -> Dict:
+        return getattr(settings, 'NOTIFICATION_OUTBOX', {})
+
+    @classmethod
+    def digest_threshold(cls) -> int:
+        return cls._config().get('DIGEST_THRESHOLD', 5)
+
+    # ==================== 收集 ====================
+
+    @classmethod
+    def add(
+        cls,
+        recipient,
+        notification_type: str,
+        title: str,
+        content: str,
+        priority: str = 'normal',
+        work_order=None,
+        work_order_process=None,
+        task=None,
+        work_order_id: Optional[int] = None,
+        task_id: Optional[int] = None,
+        expires_at=None,
+        data: Optional[Dict] = None,
+        push: bool = True,
+    ):
+        """
+        记录一条通知，按当前上下文决定缓冲方式
+
+        Args:
+            recipient: 接收人
+            notification_type: 通知类型（Notification.NOTIFICATION_TYPE_CHOICES）
+            title, content, priority: 通知内容
+            work_order, work_order_process, task: 关联对象（也可只传 work_order_id / task_id）
+            expires_at: 过期时间
+            data: 扩展数据，同时作为 WebSocket 推送内容
+            push: 是否通过 WebSocket 推送（广播公告已单独推送时为 False）
+        """
+        from ..models.system import Notification
+
+        if recipient is None:
+            return
+
+        if data is not None:
+            # 扩展数据可能包含 Decimal/datetime，转换为 JSON 安全的值，避免整批写入失败
+            data = json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+
+        notification = Notification(
+            recipient=recipient,
+            notification_type=notification_type,
+            title=title[:200],
+            content=content,
+            priority=priority,
+            work_order=work_order,
+            work_order_process=work_order_process,
+            task=task,
+            expires_at=expires_at,
+            data=data,
+        )
+        if work_order is None and work_order_id:
+            notification.work_order_id = work_order_id
+        if task is None and task_id:
+            notification.task_id = task_id
+        # 未持久化的附加属性，flush 时使用
+        notification._push = push
+
+        connection = transaction.get_connection()
+        if connection.in_atomic_block:
+            get_transaction_batch(cls._local, connection, cls.flush).records.append(notification)
+            return
+
+        request_buffer = getattr(cls._local, 'request_buffer', None)
+        if request_buffer is not None:
+            request_buffer.append(notification)
+            return
+
+        cls.flush([notification])
+
+    @classmethod
+    def start_request(cls):
+        """开始按请求收集（由 NotificationOutboxMiddleware 调用）"""
+        cls._local.request_buffer = []
+
+    @classmethod
+    def finish_request(cls):
+        """处理本次请求收集的通知"""
+        notifications = getattr(cls._local, 'request_buffer', None)
+        cls._local.request_buffer = None
+        if notifications:
+            cls.flush(notifications)
+
+    # ==================== 处理 ====================
+
+    @staticmethod
+    def dedup_key(notification):
+        """(接收人, 类型, 关联对象)，关联对象取最具体的一个：任务 > 工序 > 施工单"""
+        if notification.task_id:
+            target = ('task', notification.task_id)
+        elif notification.work_order_process_id:
+            target = ('process', notification.work_order_process_id)
+        elif notification.work_order_id:
+            target = ('work_order', notification.work_order_id)
+        else:
+            # 无关联对象的通知按标题区分
+            target = ('title', notification.title)
+        return notification.recipient_id, notification.notification_type, target
+
+    @classmethod
+    def dedupe(cls, notifications: List) -> List:
+        """同一接收人、类型、关联对象只保留最后一条（保持首次出现的顺序）"""
+        unique = OrderedDict()
+        for notification in notifications:
+            unique[cls.dedup_key(notification)] = notification
+        return list(unique.values())
+
+    @classmethod
+    def coalesce(cls, notifications: List) -> List:
+        """同一接收人超过阈值的通知合并为一条摘要"""
+        threshold = cls.digest_threshold()
+        by_recipient = OrderedDict()
+        for notification in notifications:
+            by_recipient.setdefault(notification.recipient_id, []).append(notification)
+
+        result = []
+        for items in by_recipient.values():
+            if threshold and len(items) > threshold:
+                result.append(cls.build_digest(items))
+            else:
+                result.extend(items)
+        return result
+
+    @staticmethod
+    def build_digest(items: List):
+        """把同一接收人的多条通知合并为一条摘要通知"""
+        from ..models.system import Notification
+
+        first = items[0]
+        priority = max(
+            (item.priority for item in items),
+            key=lambda value: PRIORITY_ORDER.index(value) if value in PRIORITY_ORDER else 1,
+        )
+        work_order_ids = {item.work_order_id for item in items}
+        lines = [f'- {item.title}' for item in items[:10]]
+        if len(items) > 10:
+            lines.append(f'等共 {len(items)} 条')
+
+        digest = Notification(
+            recipient_id=first.recipient_id,
+            notification_type='system',
+            title=f'您有 {len(items)} 条新通知',
+            content='\n'.join(lines),
+            priority=priority,
+            # 全部属于同一施工单时保留关联，便于跳转
+            work_order_id=first.work_order_id if len(work_order_ids) == 1 else None,
+            data={
+                'digest': True,
+                'items': [
+                    {
+                        'notification_type': item.notification_type,
+                        'title': item.title,
+                        'work_order_id': item.work_order_id,
+                        'task_id': item.task_id,
+                    }
+                    for item in items
+                ],
+            },
+        )
+        digest._push = any(getattr(item, '_push', True) for item in items)
+        return digest
+
+    @classmethod
+    def flush(cls, notifications: List):
+        """去重、合并后一次写入并批量推送"""
+        from ..models.system import Notification
+
+        if not notifications:
+            return
+        notifications = cls.coalesce(cls.dedupe(notifications))
+
+        try:
+            Notification.objects.bulk_create(notifications)
+        except Exception as e:
+            logger.error(f"批量保存通知失败（{len(notifications)} 条）: {e}", exc_info=True)
+            return
+
+        messages = [
+            (user_group_name(notification.recipient_id), {
+                'type': 'notification_message',
+                'notification': cls.build_payload(notification),
+            })
+            for notification in notifications
+            if getattr(notification, '_push', True)
+        ]
+        try:
+            ChannelFanout.send(messages)
+        except Exception as e:
+            logger.error(f"发送WebSocket通知失败: {e}")
+
+    @staticmethod
+    def build_payload(notification) -> Dict:
+        """WebSocket 推送内容（与 RealtimeNotificationService 的通知格式一致）"""
+        data = dict(notification.data or {})
+        # send_notification 产生的通知 data 即完整推送内容
+        if 'event_type' in data and 'data' in data:
+            return data
+        data.setdefault('title', notification.title)
+        data.setdefault('message', notification.content)
+        data.setdefault('notification_id', notification.pk)
+        data.setdefault('workorder_id', notification.work_order_id)
+        data.setdefault('task_id', notification.task_id)
+        return {
+            'event_type': notification.notification_type,
+            'priority': notification.priority,
+            'data': data,
+            'timestamp': timezone.now().isoformat(),
+            'channels': ['websocket', 'in_app'],
+        }
@@ -40,9 +40,11 @@ def workorder_created_handler(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=WorkOrderTask)
 def task_assigned_handler(sender, instance, created, **kwargs):
-    """任务分配时触发通知"""
-    # Check if operator was assigned (not just department)
-    if instance.assigned_operator:
+    """任务分配时触发通知（仅在操作员变化时，只改数量等字段的保存不再重复通知）"""
+    operator_id = instance.assigned_operator_id
+    # 字段追踪快照在保存完成后才刷新，这里读到的是保存前的操作员；没有快照时按未分派处理
+    previous_operator_id = None if created else instance.previous('assigned_operator')
+    if operator_id and operator_id != previous_operator_id:
         notification_service.notify_task_assigned(
             task=instance,
             assigned_operator=instance.assigned_operator,
@@ -52,40 +54,40 @@ def task_assigned_handler(sender, instance, created, **kwargs):
 
 @receiver(pre_save, sender=WorkOrderTask)
 def task_status_change_handler(sender, instance, **kwargs):
-    """任务状态变更时触发通知"""
-    if instance.pk:
-        try:
-            old_instance = WorkOrderTask.objects.get(pk=instance.pk)
-            old_status = old_instance.status
-            new_status = instance.status
-            
-            if old_status != new_status:
-                if new_status == 'in_progress' and old_status == 'pending':
-                    # 任务开始
-                    notification_service.send_notification(
-                        event_type=NotificationEvent.TASK_STARTED,
-                        recipients=[instance.assigned_operator, instance.work_order_process.work_order.created_by] if instance.assigned_operator else [instance.work_order_process.work_order.created_by],
-                        data={
-                            'title': '任务开始执行',
-                            'message': f'任务 {instance.work_content} 已开始执行',
-                            'task_id': instance.id,
-                            'task_name': instance.work_content,
-                            'workorder_id': instance.work_order_process.work_order.id,
-                            'workorder_number': instance.work_order_process.work_order.order_number,
-                            'assigned_to': instance.assigned_operator.username if instance.assigned_operator else ''
-                        },
-                        priority=NotificationPriority.NORMAL
-                    )
-                
-                elif new_status == 'completed':
-                    # 任务完成 - 通知主管和创建者
-                    notification_service.notify_task_completed(
-                        task=instance,
-                        completed_by=instance.assigned_operator
-                    )
-                    
-        except WorkOrderTask.DoesNotExist:
-            pass
+    """任务状态变更时触发通知（通过字段追踪快照比较，不重新查询任务）"""
+    if instance.pk and instance.is_tracked('status') and instance.has_changed('status'):
+        notify_task_status_change(instance, instance.previous('status'), instance.status)
+
+
+def notify_task_status_change(task, old_status, new_status):
+    """任务状态变更通知（保存信号和批量更新共用）"""
+    if old_status == new_status:
+        return
+
+    if new_status == 'in_progress' and old_status == 'pending':
+        # 任务开始
+        work_order = task.work_order_process.work_order
+        notification_service.send_notification(
+            event_type=NotificationEvent.TASK_STARTED,
+            recipients=[task.assigned_operator, work_order.created_by] if task.assigned_operator else [work_order.created_by],
+            data={
+                'title': '任务开始执行',
+                'message': f'任务 {task.work_content} 已开始执行',
+                'task_id': task.id,
+                'task_name': task.work_content,
+                'workorder_id': work_order.id,
+                'workorder_number': work_order.order_number,
+                'assigned_to': task.assigned_operator.username if task.assigned_operator else ''
+            },
+            priority=NotificationPriority.NORMAL
+        )
+
+    elif new_status == 'completed':
+        # 任务完成 - 通知主管和创建者
+        notification_service.notify_task_completed(
+            task=task,
+            completed_by=task.assigned_operator
+        )
 
 
 @receiver(post_save, sender=WorkOrderApprovalLog)
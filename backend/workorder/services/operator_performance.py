@@ -0,0 +1,274 @@
+"""
+操作员绩效统计
+
+按操作员 + 任务类型保存累计统计（OperatorPerformance），供智能分派评分使用：
+- 任务首次完成（记录完成时间）时由保存信号或批量更新路径记录，
+  重新打开后再次完成不会重复计入
+- 每次记录是一条带 F 表达式的 UPDATE，在数据库中原子累加，不加锁、不读后写，
+  多个进程（gunicorn worker）共享同一份数据
+- 完成耗时的均值和离差平方和按 Welford 并行合并公式增量维护：
+    n' = n + k
+    mean' = mean + (m - mean) * k / n'
+    M2' = M2 + M2_batch + (m - mean)^2 * n * k / n'
+  其中 k、m、M2_batch 为本批样本的数量、均值和离差平方和
+- 分派评分一次查询读取一组操作员的统计
+
+完成耗时取任务创建到首次完成（completed_at）的小时数（任务没有单独的开始时间）。
+"""
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from ..models.core import WorkOrderTask
+from ..models.system import OperatorPerformance
+
+logger = logging.getLogger(__name__)
+
+
+class PerformanceBatch:
+    """同一操作员、同一任务类型的一批完成记录"""
+
+    __slots__ = (
+        'task_count', 'success_count', 'durations', 'quantity_completed', 'quantity_defective',
+    )
+
+    def __init__(self):
+        self.task_count = 0
+        self.success_count = 0
+        self.durations: List[float] = []
+        self.quantity_completed = 0
+        self.quantity_defective = 0
+
+    def add(self, success: bool, duration_hours: Optional[float] = None,
+            quantity_completed: int = 0, quantity_defective: int = 0):
+        self.task_count += 1
+        self.success_count += int(bool(success))
+        if duration_hours is not None:
+            self.durations.append(float(duration_hours))
+        self.quantity_completed += quantity_completed or 0
+        self.quantity_defective += quantity_defective or 0
+
+    def duration_stats(self):
+        """(样本数, 均值, 离差平方和)"""
+        count = len(self.durations)
+        if not count:
+            return 0, 0.0, 0.0
+        mean = sum(self.durations) / count
+        m2 = sum((value - mean) ** 2 for value in self.durations)
+        return count, mean, m2
+
+
+class OperatorPerformanceStore:
+    """操作员绩效统计存取"""
+
+    # ==================== 记录 ====================
+
+    @classmethod
+    def record(cls, operator_id: int, task_type: str, success: bool,
+               duration_hours: Optional[float] = None,
+               quantity_completed: int = 0, quantity_defective: int = 0):
+        """记录一次任务完成"""
+        batch = PerformanceBatch()
+        batch.add(success, duration_hours, quantity_completed, quantity_defective)
+        cls.apply(operator_id, task_type, batch)
+
+    @classmethod
+    def record_tasks(cls, tasks: Iterable[WorkOrderTask]):
+        """记录一批首次完成的任务（按操作员 + 任务类型合并，每组一条 UPDATE）"""
+        batches: Dict[tuple, PerformanceBatch] = defaultdict(PerformanceBatch)
+        for task in tasks:
+            if not task.assigned_operator_id:
+                continue
+            batches[(task.assigned_operator_id, task.task_type or '')].add(
+                success=not task.quantity_defective,
+                duration_hours=cls.duration_hours(task.created_at, task.completed_at),
+                quantity_completed=task.quantity_completed,
+                quantity_defective=task.quantity_defective,
+            )
+
+        for (operator_id, task_type), batch in batches.items():
+            cls.apply(operator_id, task_type, batch)
+
+    @staticmethod
+    def duration_hours(created_at, completed_at) -> Optional[float]:
+        """创建到首次完成的小时数，缺少任一时间时为 None"""
+        if created_at is None or completed_at is None:
+            return None
+        return max((completed_at - created_at).total_seconds() / 3600, 0)
+
+    @classmethod
+    def apply(cls, operator_id: int, task_type: str, batch: PerformanceBatch):
+        """把一批记录原子合并到统计行，统计行不存在时创建"""
+        if not batch.task_count:
+            return
+
+        duration_count, duration_mean, duration_m2 = batch.duration_stats()
+        updates = {
+            'task_count': F('task_count') + batch.task_count,
+            'success_count': F('success_count') + batch.success_count,
+            'quantity_completed': F('quantity_completed') + batch.quantity_completed,
+            'quantity_defective': F('quantity_defective') + batch.quantity_defective,
+            'updated_at': timezone.now(),
+        }
+        if duration_count:
+            # 右侧的列引用都是更新前的值
+            count = F('duration_count')
+            total = count + duration_count
+            delta = Value(duration_mean) - F('duration_mean')
+            updates.update(
+                duration_count=total,
+                duration_mean=F('duration_mean') + delta * duration_count / total,
+                duration_m2=(
+                    F('duration_m2') + Value(duration_m2)
+                    + delta * delta * count * duration_count / total
+                ),
+            )
+
+        rows = OperatorPerformance.objects.filter(operator_id=operator_id, task_type=task_type)
+        if rows.update(**updates):
+            return
+
+        try:
+            with transaction.atomic():
+                OperatorPerformance.objects.create(
+                    operator_id=operator_id,
+                    task_type=task_type,
+                    task_count=batch.task_count,
+                    success_count=batch.success_count,
+                    duration_count=duration_count,
+                    duration_mean=duration_mean,
+                    duration_m2=duration_m2,
+                    quantity_completed=batch.quantity_completed,
+                    quantity_defective=batch.quantity_defective,
+                )
+        except IntegrityError:
+            # 并发请求已创建该行
+            rows.update(**updates)
+
+    # ==================== 读取 ====================
+
+    @staticmethod
+    def get_stats(operator_ids: Iterable[int], task_types: Optional[Iterable[str]] = None) -> Dict:
+        """
+        一次查询读取一组操作员的统计
+
+        Returns:
+            dict: (操作员ID, 任务类型) -> OperatorPerformance
+        """
+        queryset = OperatorPerformance.objects.filter(operator_id__in=list(operator_ids))
+        if task_types is not None:
+            queryset = queryset.filter(task_type__in=list(task_types))
+        return {(row.operator_id, row.task_type): row for row in queryset}
+
+    @staticmethod
+    def summarize(rows: Iterable[OperatorPerformance]) -> Dict:
+        """合并一个操作员各任务类型的统计（耗时方差按并行公式合并）"""
+        task_count = success_count = quantity_completed = quantity_defective = 0
+        duration_count, duration_mean, duration_m2 = 0, 0.0, 0.0
+        skills = {}
+        for row in rows:
+            task_count += row.task_count
+            success_count += row.success_count
+            quantity_completed += row.quantity_completed
+            quantity_defective += row.quantity_defective
+            skills[row.task_type] = {
+                'task_count': row.task_count,
+                'success_rate': (
+                    round(row.success_count / row.task_count, 4) if row.task_count else 0
+                ),
+            }
+            if row.duration_count:
+                total = duration_count + row.duration_count
+                delta = row.duration_mean - duration_mean
+                duration_m2 += (
+                    row.duration_m2
+                    + delta * delta * duration_count * row.duration_count / total
+                )
+                duration_mean += delta * row.duration_count / total
+                duration_count = total
+
+        variance = duration_m2 / duration_count if duration_count else 0
+        return {
+            'total_tasks': task_count,
+            'success_rate': round(success_count / task_count, 4) if task_count else 0,
+            'avg_completion_time': round(duration_mean, 2),
+            'completion_time_std': round(variance ** 0.5, 2),
+            'defect_rate': (
+                round(quantity_defective / quantity_completed, 4) if quantity_completed else 0
+            ),
+            'skills': skills,
+        }
+
+    @classmethod
+    def get_summary(cls, operator_id: int) -> Dict:
+        """操作员绩效汇总（一次查询）"""
+        return cls.summarize(OperatorPerformance.objects.filter(operator_id=operator_id))
+
+    # ==================== 重建 ====================
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """
+        按历史已完成任务重建全部统计（上线或数据修正后执行）
+
+        耗时取创建到首次完成时间（completed_at），没有完成时间的任务只计数、不计耗时。
+
+        Returns:
+            int: 统计行数
+        """
+        batches: Dict[tuple, PerformanceBatch] = defaultdict(PerformanceBatch)
+        completed = (
+            WorkOrderTask.objects.filter(status='completed', assigned_operator__isnull=False)
+            .values_list(
+                'assigned_operator_id', 'task_type', 'created_at', 'completed_at',
+                'quantity_completed', 'quantity_defective',
+            )
+            .iterator(chunk_size=2000)
+        )
+        for (operator_id, task_type, created_at, completed_at,
+             completed_qty, defective_qty) in completed:
+            batches[(operator_id, task_type or '')].add(
+                success=not defective_qty,
+                duration_hours=cls.duration_hours(created_at, completed_at),
+                quantity_completed=completed_qty,
+                quantity_defective=defective_qty,
+            )
+
+        rows = []
+        for (operator_id, task_type), batch in batches.items():
+            duration_count, duration_mean, duration_m2 = batch.duration_stats()
+            rows.append(OperatorPerformance(
+                operator_id=operator_id,
+                task_type=task_type,
+                task_count=batch.task_count,
+                success_count=batch.success_count,
+                duration_count=duration_count,
+                duration_mean=duration_mean,
+                duration_m2=duration_m2,
+                quantity_completed=batch.quantity_completed,
+                quantity_defective=batch.quantity_defective,
+            ))
+
+        with transaction.atomic():
+            OperatorPerformance.objects.all().delete()
+            OperatorPerformance.objects.bulk_create(rows, batch_size=500)
+        logger.info(f"操作员绩效统计已重建：{len(rows)} 行")
+        return len(rows)
+
+
+@receiver(post_save, sender=WorkOrderTask)
+def record_task_completion(sender, instance, created, **kwargs):
+    """任务首次完成时记录操作员绩效
+
+    完成时间只写一次，本次保存写入了完成时间即为首次完成（字段追踪快照判断，不额外查询）。
+    """
+    if created or not instance.assigned_operator_id or instance.status != 'completed':
+        return
+    if instance.has_changed('completed_at'):
+        OperatorPerformanceStore.record_tasks([instance])
@@ -0,0 +1,139 @@
+"""
+操作员选择服务
+
+为任务分派批量选择操作员：
+- 部门候选操作员和各操作员的在办任务数（pending + in_progress）各用一次查询加载，
+  在同一批次内常驻内存
+- 每分派一个任务即在内存中累加对应操作员的负载，保证同一批次内的 least_tasks 均衡
+- round_robin 使用缓存记录每个部门上一次分派的操作员，按 ID 顺序轮转
+
+典型用法（同一批任务共用一个选择器）::
+
+    selector = OperatorSelector()
+    for task in tasks:
+        operator = selector.select(department, selector.get_strategy(process, department))
+        selector.record_assignment(operator)
+"""
+import logging
+import random
+from typing import Dict, List, Optional
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count
+
+from ..models.core import WorkOrderTask
+from ..models.system import TaskAssignmentRule
+
+logger = logging.getLogger(__name__)
+
+
+class OperatorSelector:
+    """批次内复用的操作员选择器"""
+
+    DEFAULT_STRATEGY = 'least_tasks'
+    ACTIVE_TASK_STATUSES = ('pending', 'in_progress')
+    ROUND_ROBIN_CACHE_KEY = 'operator_rr_{department_id}'
+
+    def __init__(self):
+        # 部门ID -> 按 ID 排序的候选操作员
+        self._operators: Dict[int, List[User]] = {}
+        # 操作员ID -> 在办任务数
+        self._loads: Dict[int, int] = {}
+        # (工序ID, 部门ID) -> 操作员选择策略
+        self._strategies: Dict[tuple, str] = {}
+
+    def get_operators(self, department) -> List[User]:
+        """获取部门候选操作员，首次访问时一并加载其在办任务数"""
+        operators = self._operators.get(department.id)
+        if operators is not None:
+            return operators
+
+        operators = list(
+            User.objects.filter(profile__departments=department, is_active=True)
+            .exclude(is_superuser=True)  # 排除超级管理员
+            .order_by('id')
+        )
+        self._operators[department.id] = operators
+
+        pending_ids = [user.id for user in operators if user.id not in self._loads]
+        if pending_ids:
+            counts = dict(
+                WorkOrderTask.objects.filter(
+                    assigned_operator_id__in=pending_ids,
+                    status__in=self.ACTIVE_TASK_STATUSES,
+                )
+                .values('assigned_operator_id')
+                .annotate(task_count=Count('id'))
+                .values_list('assigned_operator_id', 'task_count')
+            )
+            for user_id in pending_ids:
+                self._loads[user_id] = counts.get(user_id, 0)
+
+        return operators
+
+    def get_strategy(self, process, department) -> str:
+        """获取工序在部门下配置的操作员选择策略（无规则时使用 least_tasks）"""
+        key = (process.id, department.id)
+        strategy = self._strategies.get(key)
+        if strategy is None:
+            assignment_rule = (
+                TaskAssignmentRule.objects.filter(
+                    process=process,
+                    department=department,
+                    is_active=True,
+                )
+                .order_by('-priority')
+                .only('operator_selection_strategy')
+                .first()
+            )
+            strategy = (
+                assignment_rule.operator_selection_strategy
+                if assignment_rule
+                else self.DEFAULT_STRATEGY
+            )
+            self._strategies[key] = strategy
+        return strategy
+
+    def get_load(self, user) -> int:
+        return self._loads.get(user.id, 0)
+
+    def select(self, department, strategy: str) -> Optional[User]:
+        """根据策略从部门中选择操作员"""
+        operators = self.get_operators(department)
+        if not operators:
+            return None
+
+        if strategy == 'random':
+            return random.choice(operators)
+        if strategy == 'round_robin':
+            return self._select_round_robin(department, operators)
+        if strategy == 'first_available':
+            return operators[0]
+
+        # least_tasks 及未知策略：优先选择在办任务最少的操作员，负载相同时取 ID 较小者
+        return min(operators, key=lambda user: (self._loads.get(user.id, 0), user.id))
+
+    def record_assignment(self, operator: Optional[User]):
+        """记录一次分派，更新内存中的操作员负载"""
+        if operator is not None:
+            self._loads[operator.id] = self._loads.get(operator.id, 0) + 1
+
+    def _select_round_robin(self, department, operators: List[User]) -> User:
+        """轮询分配：选择上一次分派操作员之后的下一位（按 ID 顺序循环）
+
+        记录的是操作员 ID 而非下标，部门人员增减后轮转顺序依然连续。
+        """
+        cache_key = self.ROUND_ROBIN_CACHE_KEY.format(department_id=department.id)
+        last_operator_id = cache.get(cache_key)
+
+        selected = operators[0]
+        if last_operator_id is not None:
+            for user in operators:
+                if user.id > last_operator_id:
+                    selected = user
+                    break
+
+        cache.set(cache_key, selected.id, timeout=None)
+        logger.debug(f"轮询选择：部门 {department.name}，选择操作员 {selected.username}")
+        return selected
@@ -9,7 +9,8 @@
 """
 
 from django.db import models
-from django.db.models import Prefetch, Q, Count, Sum, Avg, Max, Min
+from django.db.models import Prefetch, Q, Count, Sum, Avg, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.core.cache import cache
 from django.conf import settings
 from django.utils import timezone
@@ -17,6 +18,8 @@ from typing import List, Dict, Any, Optional, Union
 import logging
 import time
 
+from .namespaced_cache import work_order_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -100,7 +103,71 @@ class QueryOptimizer:
             )
         
         return queryset
-    
+
+    @staticmethod
+    def optimize_workorder_list_queryset(queryset):
+        """
+        施工单列表模式：用注解和一次 prefetch 预计算列表序列化器所需的汇总字段
+
+        每个统计值都使用相关子查询，避免多表 JOIN 导致的行数膨胀：
+        - list_total_processes / list_completed_processes: 工序总数/已完成数（进度）
+        - list_total_tasks / list_draft_tasks: 任务总数/草稿任务数
+        - list_product_quantity: 产品数量合计
+        - products: 预取产品明细（含 product），用于产品款数、首个产品名称和单位
+
+        Args:
+            queryset: 施工单查询集（已完成权限过滤）
+
+        Returns:
+            带注解的查询集，配合 WorkOrderListSerializer 使用时每行不再产生额外查询
+        """
+        from ..models.core import WorkOrderProcess, WorkOrderProduct, WorkOrderTask
+
+        def count_of(related_qs, key):
+            return Coalesce(
+                Subquery(
+                    related_qs.filter(**{key: OuterRef('pk')})
+                    .order_by()
+                    .values(key)
+                    .annotate(c=Count('pk'))
+                    .values('c')[:1],
+                    output_field=models.IntegerField(),
+                ),
+                0,
+            )
+
+        product_quantity = Coalesce(
+            Subquery(
+                WorkOrderProduct.objects.filter(work_order=OuterRef('pk'))
+                .order_by()
+                .values('work_order')
+                .annotate(total=Sum('quantity'))
+                .values('total')[:1],
+                output_field=models.IntegerField(),
+            ),
+            0,
+        )
+
+        return queryset.annotate(
+            list_total_processes=count_of(WorkOrderProcess.objects.all(), 'work_order'),
+            list_completed_processes=count_of(
+                WorkOrderProcess.objects.filter(status='completed'), 'work_order'
+            ),
+            list_total_tasks=count_of(
+                WorkOrderTask.objects.all(), 'work_order_process__work_order'
+            ),
+            list_draft_tasks=count_of(
+                WorkOrderTask.objects.filter(status='draft'),
+                'work_order_process__work_order',
+            ),
+            list_product_quantity=product_quantity,
+        ).prefetch_related(
+            Prefetch(
+                'products',
+                queryset=WorkOrderProduct.objects.select_related('product'),
+            )
+        )
+
     @staticmethod
     def optimize_task_queryset(queryset=None, include_work_order=False):
         """
@@ -239,25 +306,28 @@ class QueryCache:
     def invalidate_cache(cls, pattern: str):
         """
         根据模式失效缓存
-        
+
+        只有提供 delete_pattern 的后端（django-redis）支持，其他后端上记录警告后跳过；
+        施工单缓存请使用 invalidate_workorder。
+
         Args:
             pattern: 缓存键模式
         """
-        # 这里需要根据具体缓存后端实现
-        # 对于Redis，可以使用通配符删除
-        # 对于默认缓存，需要维护一个缓存键列表
-        try:
-            cache.delete_pattern(pattern)
-        except AttributeError:
-            # 默认缓存不支持模式删除，使用键列表
-            keys = cache.keys(pattern)
-            if keys:
-                cache.delete_many(keys)
+        delete_pattern = getattr(cache, 'delete_pattern', None)
+        if delete_pattern is None:
+            logger.warning(f"当前缓存后端不支持按模式删除，已跳过: {pattern}")
+            return
+        delete_pattern(pattern)
     
     @classmethod
     def get_workorder_cache_key(cls, order_id: int, suffix: str = '') -> str:
-        """生成施工单缓存键"""
-        return f'workorder:{order_id}:{suffix}' if suffix else f'workorder:{order_id}'
+        """生成施工单缓存键（work_order 命名空间下的施工单作用域）"""
+        return work_order_cache.scope(order_id).key(suffix or 'query')
+    
+    @classmethod
+    def invalidate_workorder(cls, order_id: int):
+        """使施工单的所有查询缓存失效"""
+        work_order_cache.scope(order_id).invalidate()
     
     @classmethod
     def get_task_cache_key(cls, task_id: int, suffix: str = '') -> str:
@@ -11,13 +11,16 @@ from typing import Dict, List, Optional, Any
 from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.sync import sync_to_async
+from django.db import transaction
 from django.db.models import Q
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.conf import settings
 import logging
 
+from .channel_fanout import BROADCAST_GROUP, ChannelFanout, user_group_name
+
 logger = logging.getLogger(__name__)
 
 
@@ -81,7 +84,7 @@ class RealtimeNotificationService:
         
     def send_notification(self, event_type: str, recipients: List[User], 
                         data: Dict[str, Any], priority: str = NotificationPriority.NORMAL,
-                        channels: List[str] = None):
+                        channels: List[str] = None, broadcast: bool = False):
         """
         发送通知
         
@@ -91,6 +94,7 @@ class RealtimeNotificationService:
             data: 通知数据
             priority: 优先级
             channels: 通知渠道列表
+            broadcast: 面向所有用户的消息，WebSocket 只向广播组发送一次
         """
         if channels is None:
             channels = [NotificationChannel.WEBSOCKET, NotificationChannel.IN_APP]
@@ -103,22 +107,27 @@ class RealtimeNotificationService:
             'channels': channels
         }
         
-        # 保存到数据库
-        self._save_notification_to_db(recipients, notification_data)
+        # 保存到数据库并推送：记入通知发件箱，提交后去重合并、一次写入、批量推送
+        push = NotificationChannel.WEBSOCKET in channels
+        self._save_notification_to_db(recipients, notification_data, push=push and not broadcast)
         
-        # 发送WebSocket通知
-        if NotificationChannel.WEBSOCKET in channels:
-            self._send_websocket_notification(recipients, notification_data)
+        # 广播消息：提交后向广播组发送一次
+        if push and broadcast:
+            transaction.on_commit(
+                lambda: self._send_websocket_notification(recipients, notification_data, broadcast=True)
+            )
         
         # 发送邮件通知（如果是高优先级或紧急）
         if (NotificationChannel.EMAIL in channels and 
             priority in [NotificationPriority.HIGH, NotificationPriority.URGENT]):
             self._send_email_notification(recipients, notification_data)
     
-    def _save_notification_to_db(self, recipients: List[User], data: Dict[str, Any]):
-        """保存通知到数据库"""
+    def _save_notification_to_db(self, recipients: List[User], data: Dict[str, Any],
+                                 push: bool = False):
+        """保存通知到数据库（经由 NotificationOutbox，push 为真时同时推送 WebSocket）"""
         try:
             from ..models.system import Notification
+            from .notification_outbox import NotificationOutbox
 
             valid_types = {choice[0] for choice in Notification.NOTIFICATION_TYPE_CHOICES}
             event_type = data.get("event_type")
@@ -134,38 +143,37 @@ class RealtimeNotificationService:
                 }
                 notification_type = mapping.get(event_type, "system")
 
-            notifications = []
+            payload = data.get("data", {})
             for recipient in recipients:
-                notifications.append(
-                    Notification(
-                        recipient=recipient,
-                        notification_type=notification_type,
-                        priority=data.get("priority", NotificationPriority.NORMAL),
-                        title=data.get("data", {}).get("title", ""),
-                        content=data.get("data", {}).get("message", ""),
-                        data=data,
-                        is_read=False,
-                    )
+                NotificationOutbox.add(
+                    recipient=recipient,
+                    notification_type=notification_type,
+                    priority=data.get("priority", NotificationPriority.NORMAL),
+                    title=payload.get("title", ""),
+                    content=payload.get("message", ""),
+                    # 关联对象参与去重：同一任务的同类通知只保留一条
+                    work_order_id=payload.get("workorder_id"),
+                    task_id=payload.get("task_id"),
+                    data=data,
+                    push=push,
                 )
 
-            Notification.objects.bulk_create(notifications)
-
         except Exception as e:
             logger.error(f"保存通知到数据库失败: {e}")
     
-    def _send_websocket_notification(self, recipients: List[User], data: Dict[str, Any]):
-        """发送WebSocket通知"""
+    def _send_websocket_notification(self, recipients: List[User], data: Dict[str, Any],
+                                     broadcast: bool = False):
+        """发送WebSocket通知：整批接收者在一个异步上下文中并发推送（见 ChannelFanout）"""
+        message = {
+            'type': 'notification_message',
+            'notification': data
+        }
         try:
-            for recipient in recipients:
-                group_name = f"user_{recipient.id}_notifications"
-                
-                async_to_sync(self.channel_layer.group_send)(
-                    group_name,
-                    {
-                        'type': 'notification_message',
-                        'notification': data
-                    }
-                )
+            if broadcast:
+                messages = [(BROADCAST_GROUP, message)]
+            else:
+                messages = [(user_group_name(recipient.id), message) for recipient in recipients]
+            ChannelFanout.send(messages, self.channel_layer)
         except Exception as e:
             logger.error(f"发送WebSocket通知失败: {e}")
     
@@ -196,14 +204,20 @@ class RealtimeNotificationService:
         except Exception as e:
             logger.error(f"发送邮件通知失败: {e}")
     
-    def notify_task_assigned(self, task, assigned_operator, assigned_by=None):
-        """通知任务分配 - 发送给操作员和部门成员"""
+    def notify_task_assigned(self, task, assigned_operator, assigned_by=None,
+                             department_members=None):
+        """通知任务分配 - 发送给操作员和部门成员
+
+        Args:
+            department_members: 已查询的部门成员（批量通知时复用，为空时查询）
+        """
         recipients = [assigned_operator]
 
         # 通知分配者所在部门的其他成员（根据上下文：部门成员可见）
         if task.assigned_department:
-            dept_members = self._get_department_members(task.assigned_department)
-            recipients.extend(dept_members)
+            if department_members is None:
+                department_members = self._get_department_members(task.assigned_department)
+            recipients.extend(department_members)
 
         # 去重
         recipients = list(set(recipients))
@@ -235,15 +249,23 @@ class RealtimeNotificationService:
             channels=[NotificationChannel.WEBSOCKET, NotificationChannel.IN_APP]
         )
 
-        # WebSocket broadcast to connected users
-        self._send_websocket_notification(recipients, {
-            'type': 'task_assigned',
-            'title': '新任务分配',
-            'message': f'您有新的任务: {task.work_content}',
-            'task_id': task.id,
-            'workorder_number': task.work_order_process.work_order.order_number if task.work_order_process else '',
-            'priority': task.work_order_process.work_order.priority if task.work_order_process else 'normal',
-        })
+    def notify_tasks_assigned(self, tasks, assigned_by=None):
+        """批量通知任务分配（每个部门的成员只查询一次）"""
+        members_by_department = {}
+        for task in tasks:
+            if not task.assigned_operator:
+                continue
+            department_members = None
+            if task.assigned_department:
+                department_id = task.assigned_department.id
+                if department_id not in members_by_department:
+                    members_by_department[department_id] = list(
+                        self._get_department_members(task.assigned_department)
+                    )
+                department_members = members_by_department[department_id]
+            self.notify_task_assigned(
+                task, task.assigned_operator, assigned_by, department_members=department_members
+            )
 
     def notify_task_completed(self, task, completed_by):
         """通知任务完成 - 发送给主管和施工单创建者"""
@@ -281,16 +303,6 @@ class RealtimeNotificationService:
             channels=[NotificationChannel.WEBSOCKET, NotificationChannel.IN_APP]
         )
 
-        # WebSocket broadcast
-        self._send_websocket_notification(recipients, {
-            'type': 'task_completed',
-            'title': '任务完成',
-            'message': f'任务 "{task.work_content}" 已完成',
-            'task_id': task.id,
-            'workorder_number': work_order.order_number if work_order else '',
-            'completed_by': completed_by.username if completed_by else '系统',
-        })
-
     def _get_department_members(self, department):
         """获取部门成员"""
         try:
@@ -531,13 +543,17 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         # 设置用户信息到 scope（供后续使用）
         self.scope["user"] = user
         self.user_id = user.id
-        self.group_name = f"user_{self.user_id}_notifications"
+        self.group_name = user_group_name(self.user_id)
 
-        # 加入用户通知组
+        # 加入用户通知组和广播组
         await self.channel_layer.group_add(
             self.group_name,
             self.channel_name
         )
+        await self.channel_layer.group_add(
+            BROADCAST_GROUP,
+            self.channel_name
+        )
 
         await self.accept()
 
@@ -557,6 +573,10 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                 self.group_name,
                 self.channel_name
             )
+            await self.channel_layer.group_discard(
+                BROADCAST_GROUP,
+                self.channel_name
+            )
             logger.info(f"WebSocket连接断开: user_id={self.user_id}, code={close_code}")
 
     async def notification_message(self, event):
@@ -599,7 +619,9 @@ class NotificationManager:
                     'type': 'system_announcement'
                 },
                 priority=priority,
-                channels=[NotificationChannel.WEBSOCKET, NotificationChannel.IN_APP]
+                channels=[NotificationChannel.WEBSOCKET, NotificationChannel.IN_APP],
+                # 在线用户通过广播组一次推送，站内通知仍按用户保存
+                broadcast=True
             )
             
         except Exception as e:
@@ -0,0 +1,149 @@
+"""
+单据编号分配
+
+所有单据编号（施工单、销售/采购订单、出入库单、发货单、质检单、发票、收款单、对账单、
+图稿与版材编码）共用一张计数器表 DocumentSequence，每个“前缀 + 周期”一行：
+- 分配时对计数器行执行 UPDATE last_value = last_value + n 原子递增，不再锁定单据表的
+  最新一行并按前缀扫描；计数器行首次创建时以单据表中已有的最大序号为起点
+- 可按前缀开启进程内号段预分配（settings.DOCUMENT_SEQUENCE_BLOCK_SIZES），一次递增
+  领取 n 个序号后在进程内依次发放，计数器行每 n 个单号才更新一次；号段按
+  （单据模型, 前缀, 周期格式）区分，同一前缀的不同单据（如版材与发票都用 FP）互不淘汰
+
+号段只在自动提交模式下领取（领取后立即提交，不会随调用方事务回滚而重复发放）；
+事务内号段用完时回退为单个序号递增，随调用方事务一起提交或回滚。预分配的号段
+未用完时进程退出会留下空号，且多进程下单号不再严格按创建时间递增。
+"""
+import logging
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from ..models.system import DocumentSequence
+
+logger = logging.getLogger(__name__)
+
+
+class SequenceService:
+    """单据编号分配服务"""
+
+    # 进程内预分配号段：(单据模型, 前缀, 周期位数) -> [周期, 下一个序号, 号段最后一个序号]
+    # 周期位数区分 yyyymm / yyyymmdd 等格式；周期切换时旧周期的剩余号段直接被替换
+    _blocks: Dict[Tuple[str, str, int], List] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_block_size(prefix: str) -> int:
+        block_sizes = getattr(settings, "DOCUMENT_SEQUENCE_BLOCK_SIZES", {})
+        return max(int(block_sizes.get(prefix, 1)), 1)
+
+    @classmethod
+    def next_number(
+        cls,
+        prefix: str,
+        period: str,
+        width: int,
+        model: Optional[type] = None,
+        field: Optional[str] = None,
+    ) -> str:
+        """
+        生成单据编号：前缀 + 周期 + 定宽序号
+
+        Args:
+            prefix: 单号前缀（如 RK）
+            period: 周期（如 yyyymmdd）
+            width: 序号位数（超出时自然进位，不截断）
+            model, field: 单据模型与编号字段，计数器行首次创建时用于读取已有最大序号
+        """
+        seed = (
+            (lambda: cls.get_existing_max(model, field, f"{prefix}{period}"))
+            if model is not None and field is not None
+            else None
+        )
+
+        value = cls.next_value(prefix, period, seed, model)
+        return f"{prefix}{period}{value:0{width}d}"
+
+    @classmethod
+    def next_value(
+        cls,
+        prefix: str,
+        period: str,
+        seed: Optional[Callable[[], int]] = None,
+        model: Optional[type] = None,
+    ) -> int:
+        """分配下一个序号"""
+        block_size = cls.get_block_size(prefix)
+        if block_size == 1:
+            return cls.reserve(prefix, period, 1, seed)
+
+        key = (model._meta.label if model is not None else "", prefix, len(period))
+        with cls._lock:
+            block = cls._blocks.get(key)
+            if block is not None and block[0] == period and block[1] <= block[2]:
+                value = block[1]
+                block[1] += 1
+                return value
+
+        if connection.in_atomic_block:
+            return cls.reserve(prefix, period, 1, seed)
+
+        last_value = cls.reserve(prefix, period, block_size, seed)
+        first_value = last_value - block_size + 1
+        with cls._lock:
+            cls._blocks[key] = [period, first_value + 1, last_value]
+        return first_value
+
+    @staticmethod
+    def reserve(
+        prefix: str,
+        period: str,
+        count: int = 1,
+        seed: Optional[Callable[[], int]] = None,
+    ) -> int:
+        """原子领取 count 个序号，返回其中最大的一个"""
+        sequences = DocumentSequence.objects.filter(prefix=prefix, period=period)
+        with transaction.atomic():
+            updated = sequences.update(
+                last_value=F("last_value") + count, updated_at=timezone.now()
+            )
+            if not updated:
+                initial = seed() if seed is not None else 0
+                try:
+                    with transaction.atomic():
+                        DocumentSequence.objects.create(
+                            prefix=prefix, period=period, last_value=initial + count
+                        )
+                    return initial + count
+                except IntegrityError:
+                    # 并发创建了同一计数器行，改为递增
+                    sequences.update(
+                        last_value=F("last_value") + count, updated_at=timezone.now()
+                    )
+            return sequences.values_list("last_value", flat=True).get()
+
+    @staticmethod
+    def get_existing_max(model: type, field: str, number_prefix: str) -> int:
+        """读取单据表中该前缀下已有的最大序号（只看纯数字序号，超出位数时按长度优先比较）"""
+        latest = (
+            model._default_manager.filter(
+                **{f"{field}__regex": rf"^{re.escape(number_prefix)}[0-9]+$"}
+            )
+            .order_by(Length(field).desc(), f"-{field}")
+            .values_list(field, flat=True)
+            .first()
+        )
+        if not latest:
+            return 0
+        return int(latest[len(number_prefix):])
+
+    @classmethod
+    def reset_blocks(cls):
+        """丢弃进程内预分配号段（测试或配置变更时使用）"""
+        with cls._lock:
+            cls._blocks.clear()
@@ -7,6 +7,8 @@
 3. 历史绩效考虑
 4. 动态优先级调整
 5. 学习型算法优化
+
+评分只用到少量标量统计，使用标准库 statistics，不导入 NumPy，避免拖慢进程启动和管理命令。
 """
 
 from django.db.models import Count, Q, Avg, Max, Min
@@ -14,72 +16,16 @@ from django.utils import timezone
 from django.contrib.auth import get_user_model
 from typing import List, Dict, Optional, Tuple, Any
 import logging
-import numpy as np
+import statistics
 from datetime import timedelta, datetime
-from collections import defaultdict
 import json
 
+from .operator_performance import OperatorPerformanceStore
+
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
 
-class TaskPerformanceData:
-    """任务性能数据"""
-    
-    def __init__(self):
-        self.completion_times = []
-        self.error_counts = defaultdict(int)
-        self.quality_scores = []
-        self.task_counts = defaultdict(int)
-    
-    def add_completion_time(self, duration_hours: float, quality_score: float):
-        self.completion_times.append(duration_hours)
-        
-    def add_error(self, error_type: str):
-        self.error_counts[error_type] += 1
-    
-    def add_quality_score(self, quality_score: float):
-        self.quality_scores.append(quality_score)
-    
-    def add_task_count(self):
-        self.task_counts['total'] += 1
-    
-    def get_avg_completion_time(self) -> float:
-        return np.mean(self.completion_times) if self.completion_times else 0
-    
-    def get_error_rate(self) -> float:
-        total_tasks = sum(self.task_counts.values())
-        total_errors = sum(self.error_counts.values())
-        return total_errors / total_tasks if total_tasks > 0 else 0
-    
-    def get_quality_score(self) -> float:
-        return np.mean(self.quality_scores) if self.quality_scores else 0
-    
-    def get_performance_score(self) -> float:
-        # 综合多个指标计算性能评分
-        completion_rate = self.get_completion_rate()
-        error_rate = self.get_error_rate()
-        quality_score = self.get_quality_score()
-        avg_completion_time = self.get_avg_completion_time()
-        
-        # 权重指标
-        weights = {
-            'completion_rate': 0.4,    # 完成率最重要
-            'error_rate': 0.3,    # 错误率第二重要
-            'quality_score': 0.2,    # 质量评分第三重要
-            'avg_completion_time': 0.1,    # 平均时间也要考虑
-        }
-        
-        score = (
-            weights['completion_rate'] * completion_rate +
-            weights['error_rate'] * (1 - error_rate) +
-            weights['quality_score'] * quality_score +
-            weights['avg_completion_time'] * (1 / max(avg_completion_time, 1))
-        )
-        
-        return min(max(score, 0.1))
-
-
 class SmartAssignmentService:
     """智能任务分派服务"""
     
@@ -142,34 +88,48 @@ class SmartAssignmentService:
         """计算工作负载因子"""
         return 1.0  # 技能画像已禁用，返回默认负载
     
+    # 基础优先级评分
+    PRIORITY_SCORES = {
+        'urgent': 1.0,
+        'high': 0.8,
+        'normal': 0.6,
+        'low': 0.4,
+    }
+    DEFAULT_PRIORITY_SCORE = 0.6
+
+    # 交货日期紧急度：(剩余天数上限, 紧急系数)，超过最后一档为 0.8
+    DEADLINE_URGENCY = ((1, 1.5), (3, 1.2), (7, 1.0))
+    DEFAULT_URGENCY = 0.8
+
+    @classmethod
+    def deadline_urgency(cls, deadline_days: Optional[int]) -> float:
+        """交货日期紧急系数（无交货日期时为 1.0）"""
+        if deadline_days is None:
+            return 1.0
+        for max_days, factor in cls.DEADLINE_URGENCY:
+            if deadline_days <= max_days:
+                return factor
+        return cls.DEFAULT_URGENCY
+
     @staticmethod
     def calculate_priority_score(user, task_priority: str, deadline_days: int = None) -> float:
         """计算优先级评分"""
-        # 基础优先级评分
-        priority_scores = {
-            'urgent': 1.0,
-            'high': 0.8,
-            'normal': 0.6,
-            'low': 0.4,
-        }
-        
-        base_score = priority_scores.get(task_priority, 0.6)
-        
+        base_score = SmartAssignmentService.PRIORITY_SCORES.get(
+            task_priority, SmartAssignmentService.DEFAULT_PRIORITY_SCORE
+        )
+
         # 交货日期紧急度
-        if deadline_days:
-            if deadline_days <= 1:
-                urgency_factor = 1.5
-            elif deadline_days <= 3:
-                urgency_factor = 1.2
-            elif deadline_days <= 7:
-                urgency_factor = 1.0
-            else:
-                urgency_factor = 0.8
-        
+        urgency_factor = SmartAssignmentService.deadline_urgency(deadline_days)
+
         # 技能画像已禁用，只返回基础评分
         total_score = base_score + urgency_factor
         return min(total_score, 2.0)
     
+    @staticmethod
+    def get_user_performance_summary(user) -> Dict[str, Any]:
+        """获取用户历史绩效汇总（完成数、成功率、平均耗时等）"""
+        return OperatorPerformanceStore.get_summary(getattr(user, 'id', user))
+
     @staticmethod
     def get_optimal_operator(user, task_requirements: Dict[str, None]) -> Optional[User]:
         """获取最佳操作员选择"""
@@ -188,8 +148,8 @@ class SmartAssignmentService:
         skill_diversity = 0
         
         # 平衡度计算
-        avg_skill_level = float(np.mean(skill_levels)) if skill_levels else 1.0
-        capacity_variance = float(np.var(work_capacities)) if work_capacities else 1.0
+        avg_skill_level = statistics.fmean(skill_levels) if skill_levels else 1.0
+        capacity_variance = statistics.pvariance(work_capacities) if work_capacities else 1.0
         
         # 平衡度评分：技能多样性 + 容量平衡
         diversity_score = (skill_diversity / len(skill_levels)) * 0.4
@@ -205,72 +165,33 @@ class SmartAssignmentService:
 
 
 class LearningSystem:
-    """学习系统，用于优化分派算法"""
-    
-    def __init__(self):
-        self.performance_data = TaskPerformanceData()
-        self.user_performance = {}  # 用户ID -> 性能数据
-        self.skill_success_rates = {}  # 用户ID -> 技能成功率
-    
-    def record_performance(self, user_id: int, task_id: str, success: bool, 
-                    completion_time: float = None, quality_score: float = None):
+    """
+    学习系统，用于优化分派算法
+
+    绩效数据保存在 OperatorPerformance 表中（由 OperatorPerformanceStore 增量维护），
+    进程重启后不丢失，各进程共享。
+    """
+
+    def record_performance(self, user_id: int, task_id: str, success: bool,
+                           completion_time: float = None, task_type: str = '',
+                           quantity_completed: int = 0, quantity_defective: int = 0):
         """记录任务性能数据"""
-        if user_id not in self.user_performance:
-            self.user_performance[user_id] = TaskPerformanceData()
-        
-        performance_data = self.user_performance[user_id]
-        
-        if success and completion_time:
-            performance_data.add_completion_time(completion_time)
-        if quality_score:
-            performance_data.add_quality_score(quality_score)
-        performance_data.add_task_count()
-        performance_data.add_error_count(not success)
-        performance_data.add_success()
-        
-        performance_data.update_avg_completion_time()
-        performance_data.update_error_rate()
-        performance_data.update_quality_score()
-        
+        OperatorPerformanceStore.record(
+            user_id,
+            task_type,
+            success=success,
+            duration_hours=completion_time,
+            quantity_completed=quantity_completed,
+            quantity_defective=quantity_defective,
+        )
+
         logger.info(f"记录用户 {user_id} 的任务 {task_id} 性能数据: "
                    f"成功={success}, "
-                   f"耗时={completion_time}h, "
-                   f"质量评分={quality_score}")
+                   f"耗时={completion_time}h")
 
     def get_user_performance_summary(self, user_id: int) -> Dict[str, Any]:
         """获取用户性能汇总"""
-        performance_data = self.user_performance.get(user_id)
-        
-        if not performance_data:
-            return {
-                'total_tasks': 0,
-                'success_rate': 0,
-                'avg_completion_time': 0,
-                'error_rate': 0,
-                'quality_score': 0
-            }
-        
-        return {
-            'total_tasks': performance_data.task_count,
-            'success_rate': performance_data.get_success_rate(),
-            'avg_completion_time': performance_data.get_avg_completion_time(),
-            'error_rate': performance_data.get_error_rate(),
-            'quality_score': performance_data.get_quality_score(),
-            'skill_level': performance_data.get_skill_level(),
-        }
-
-    def update_skill_success_rate(self, user_id: int, skill_type: str, success_rate: float):
-        """更新技能成功率"""
-        if user_id not in self.user_performance:
-            self.user_performance[user_id] = TaskPerformanceData()
-        
-        if skill_type in self.user_performance[user_id].skill_success_rates:
-            self.user_performance[user_id].skill_success_rates[skill_type] = success_rate
-        
-        self.user_performance[user_id].update_avg_completion_time()
-        self.user_performance[user_id].update_error_rate()
-        self.user_performance[user_id].update_quality_score()
-        logger.info(f"用户 {user_id} 的 {skill_type} 技能成功率更新为 {success_rate}")
+        return OperatorPerformanceStore.get_summary(user_id)
 
     def update_skill_level(self, user_id: int, new_level: int):
         """更新用户技能等级"""
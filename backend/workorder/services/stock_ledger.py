@@ -0,0 +1,320 @@
+"""
+库存台账
+
+产品、物料、成品批次的库存变动原实现为"读取 -> 内存中加减 -> save"，并发入库和
+销售审核扣减时会丢失更新，每次变动还要单独保存一次、写入一条日志。本模块统一库存变动：
+- 变动按项目汇总后用一条 UPDATE ... SET qty = qty + CASE id ... END 原子加减；
+  扣减带非负条件（WHERE qty + 变动 >= 0），影响行数不足说明有项目库存不足，整批回滚
+- 产品变动更新后批量写入库存日志（ProductStockLog），按变动顺序计算变更前后数量，
+  并补记审计日志、检查库存预警
+- 台账快照（ProductStockSnapshot）记录截至某条日志的台账余额，一致性检查按
+  "快照余额 + 之后的日志" 计算预期库存，不再逐个产品汇总全部日志
+
+物料暂无库存日志表，物料变动只做原子加减和审计记录。
+"""
+import logging
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..exceptions import InsufficientStockError
+
+logger = logging.getLogger(__name__)
+
+
+class _PartialUpdate(Exception):
+    """原子更新影响行数不足，回滚后加锁重试"""
+
+
+class StockMovement(NamedTuple):
+    """一笔库存变动：quantity 为正数入库，负数出库"""
+
+    item_id: int
+    quantity: object
+    reason: str = ''
+
+
+class StockLedger:
+    """库存台账"""
+
+    # 快照只汇总早于该时长的日志：尚未提交的事务可能持有较小的日志ID，
+    # 若汇总到更大的ID，这些日志提交后将不会被计入
+    SNAPSHOT_LAG = timedelta(minutes=5)
+
+    # ==================== 原子加减 ====================
+
+    @staticmethod
+    def _sum_deltas(movements: Iterable[StockMovement]) -> Dict[int, object]:
+        """按项目汇总净变动量（净变动为0的项目保留，用于记录日志）"""
+        deltas = OrderedDict()
+        for movement in movements:
+            deltas[movement.item_id] = deltas.get(movement.item_id, 0) + movement.quantity
+        return deltas
+
+    @staticmethod
+    def apply_deltas(model, field: str, deltas: Dict[int, object],
+                     allow_negative: bool = False, **extra_updates) -> int:
+        """
+        用一条 UPDATE 按变动量加减多个项目的库存字段
+
+        Args:
+            model: 库存模型（Product / Material / ProductStock）
+            field: 库存数量字段
+            deltas: 项目ID -> 变动量
+            allow_negative: 是否允许扣减后小于0
+            extra_updates: 同一语句中一并更新的其他字段
+
+        Returns:
+            int: 更新的行数（不存在的项目被跳过）
+
+        Raises:
+            InsufficientStockError: 有项目库存不足，本次变动全部不生效
+        """
+        deltas = {pk: delta for pk, delta in deltas.items() if delta}
+        if not deltas:
+            return 0
+
+        output_field = model._meta.get_field(field)
+        delta = Case(
+            *[When(pk=pk, then=Value(value)) for pk, value in deltas.items()],
+            default=Value(0),
+            output_field=output_field,
+        )
+        stock_after = Coalesce(F(field), Value(0), output_field=output_field) + delta
+
+        queryset = model._default_manager.filter(pk__in=list(deltas))
+        if not allow_negative:
+            # 只约束扣减的项目：入库不因历史负库存失败
+            increments = [pk for pk, value in deltas.items() if value > 0]
+            queryset = queryset.alias(stock_after=stock_after).filter(
+                Q(pk__in=increments) | Q(stock_after__gte=0)
+            )
+
+        try:
+            with transaction.atomic():
+                rows = queryset.update(**{field: stock_after}, **extra_updates)
+                if rows == len(deltas) or allow_negative:
+                    return rows
+                # 有行被跳过：可能是库存不足、项目不存在，也可能是并发变动在
+                # 更新和复查之间提交。回滚本次更新，锁定后重新判断
+                raise _PartialUpdate()
+        except _PartialUpdate:
+            pass
+
+        with transaction.atomic():
+            current = dict(
+                model._default_manager.select_for_update()
+                .filter(pk__in=list(deltas)).values_list('pk', field)
+            )
+            shortages = {
+                pk: (current[pk] or 0, -value)
+                for pk, value in deltas.items()
+                if pk in current and (current[pk] or 0) + value < 0
+            }
+            if shortages:
+                details = '；'.join(
+                    f"ID {pk} 当前库存 {stock}，需要 {needed}"
+                    for pk, (stock, needed) in shortages.items()
+                )
+                raise InsufficientStockError(f"库存不足：{details}", shortages=shortages)
+
+            # 行已锁定且库存充足，存在的项目都应被更新
+            rows = queryset.update(**{field: stock_after}, **extra_updates)
+            if rows != len(current):
+                raise InsufficientStockError("库存并发变动，本次变动未生效，请重试")
+
+        missing = set(deltas) - set(current)
+        if missing:
+            logger.warning(f"{model.__name__} {sorted(missing)} 不存在，跳过库存变动")
+        return rows
+
+    @classmethod
+    def _apply_and_load(cls, model, field: str, deltas: Dict[int, object],
+                        allow_negative: bool) -> Dict[int, object]:
+        """原子加减后加载最新实例，补记审计日志"""
+        from .audit_log_service import capture_bulk_changes
+
+        cls.apply_deltas(model, field, deltas, allow_negative=allow_negative)
+        # 更新语句已锁定这些行，事务结束前读取到的就是本次变动后的数量
+        items = model._default_manager.in_bulk(list(deltas))
+        capture_bulk_changes(
+            list(items.values()),
+            {pk: {field: getattr(item, field) - deltas[pk]} for pk, item in items.items()},
+        )
+        return items
+
+    @classmethod
+    def apply_product_movements(cls, movements: Iterable[StockMovement], user=None,
+                                allow_negative: bool = False) -> Dict[int, object]:
+        """
+        批量变动产品库存并写入库存日志
+
+        Args:
+            movements: 库存变动，同一产品可有多笔，按顺序记录日志
+            user: 操作人
+            allow_negative: 是否允许扣减后小于0
+
+        Returns:
+            Dict[int, Product]: 产品ID -> 变动后的产品
+
+        Raises:
+            InsufficientStockError: 有产品净变动后库存小于0，本批变动全部不生效
+        """
+        from ..models.products import Product, ProductStockLog
+
+        movements = [movement for movement in movements if movement.quantity]
+        deltas = cls._sum_deltas(movements)
+        if not deltas:
+            return {}
+
+        with transaction.atomic():
+            products = cls._apply_and_load(Product, 'stock_quantity', deltas, allow_negative)
+
+            running = {
+                pk: product.stock_quantity - deltas[pk] for pk, product in products.items()
+            }
+            logs = []
+            for movement in movements:
+                if movement.item_id not in products:
+                    continue
+                old_quantity = running[movement.item_id]
+                new_quantity = old_quantity + movement.quantity
+                running[movement.item_id] = new_quantity
+                logs.append(ProductStockLog(
+                    product_id=movement.item_id,
+                    change_type='add' if movement.quantity > 0 else 'reduce',
+                    quantity=movement.quantity,
+                    old_quantity=old_quantity,
+                    new_quantity=new_quantity,
+                    reason=movement.reason,
+                    created_by=user,
+                ))
+            ProductStockLog.objects.bulk_create(logs)
+
+            for product in products.values():
+                if product.is_low_stock():
+                    product._send_low_stock_warning()
+
+        return products
+
+    @classmethod
+    def apply_material_movements(cls, movements: Iterable[StockMovement],
+                                 allow_negative: bool = False) -> Dict[int, object]:
+        """
+        批量变动物料库存
+
+        Returns:
+            Dict[int, Material]: 物料ID -> 变动后的物料
+
+        Raises:
+            InsufficientStockError: 有物料库存不足，本批变动全部不生效
+        """
+        from ..models.materials import Material
+
+        deltas = cls._sum_deltas(movements)
+        if not deltas:
+            return {}
+        return cls._apply_and_load(Material, 'stock_quantity', deltas, allow_negative)
+
+    # ==================== 台账快照 ====================
+
+    @staticmethod
+    def _logs_after_snapshot(product_ids: Optional[List[int]] = None):
+        """快照之后（无快照时为全部）的库存日志"""
+        from ..models.products import ProductStockLog, ProductStockSnapshot
+
+        last_log_id = ProductStockSnapshot.objects.filter(
+            product_id=OuterRef('product_id')
+        ).values('last_log_id')[:1]
+        logs = ProductStockLog.objects.filter(id__gt=Coalesce(Subquery(last_log_id), Value(0)))
+        if product_ids is not None:
+            logs = logs.filter(product_id__in=product_ids)
+        return logs.order_by()
+
+    @classmethod
+    def ledger_balances(cls, product_ids: Optional[List[int]] = None) -> Dict[int, Tuple[int, int]]:
+        """
+        台账余额（快照余额 + 快照之后的日志，两次查询）
+
+        Args:
+            product_ids: 只计算这些产品，为空时计算全部
+
+        Returns:
+            Dict[int, Tuple[int, int]]: 产品ID -> (台账余额, 日志数)；没有日志的产品不在结果中
+        """
+        from ..models.products import ProductStockSnapshot
+
+        snapshots = ProductStockSnapshot.objects.all()
+        if product_ids is not None:
+            snapshots = snapshots.filter(product_id__in=product_ids)
+        balances = {
+            product_id: (balance, log_count)
+            for product_id, balance, log_count in snapshots.values_list(
+                'product_id', 'balance', 'log_count'
+            )
+        }
+
+        rows = cls._logs_after_snapshot(product_ids).values('product_id').annotate(
+            total=Sum('quantity'), count=Count('id')
+        )
+        for row in rows:
+            balance, log_count = balances.get(row['product_id'], (0, 0))
+            balances[row['product_id']] = (balance + row['total'], log_count + row['count'])
+        return balances
+
+    @classmethod
+    def take_snapshots(cls, product_ids: Optional[List[int]] = None) -> int:
+        """
+        把早于 SNAPSHOT_LAG 的库存日志汇总进快照
+
+        Returns:
+            int: 新建或推进的快照数
+        """
+        from ..models.products import ProductStockLog, ProductStockSnapshot
+
+        cutoff = timezone.now() - cls.SNAPSHOT_LAG
+        boundary = ProductStockLog.objects.filter(created_at__lt=cutoff).aggregate(
+            last_id=Max('id')
+        )['last_id']
+        if boundary is None:
+            return 0
+
+        with transaction.atomic():
+            snapshots = ProductStockSnapshot.objects.select_for_update()
+            if product_ids is not None:
+                snapshots = snapshots.filter(product_id__in=product_ids)
+            # 先锁定快照再汇总，并发执行时不会重复累加
+            existing = {snapshot.product_id: snapshot for snapshot in snapshots}
+
+            rows = cls._logs_after_snapshot(product_ids).filter(id__lte=boundary).values(
+                'product_id'
+            ).annotate(total=Sum('quantity'), count=Count('id'), last_id=Max('id'))
+
+            to_create, to_update = [], []
+            for row in rows:
+                snapshot = existing.get(row['product_id'])
+                if snapshot is None:
+                    to_create.append(ProductStockSnapshot(
+                        product_id=row['product_id'],
+                        balance=row['total'],
+                        log_count=row['count'],
+                        last_log_id=row['last_id'],
+                    ))
+                    continue
+                snapshot.balance += row['total']
+                snapshot.log_count += row['count']
+                snapshot.last_log_id = row['last_id']
+                snapshot.taken_at = timezone.now()
+                to_update.append(snapshot)
+
+            # 其他进程同时创建的快照以先写入的为准，本次的汇总留到下次
+            ProductStockSnapshot.objects.bulk_create(to_create, ignore_conflicts=True)
+            ProductStockSnapshot.objects.bulk_update(
+                to_update, ['balance', 'log_count', 'last_log_id', 'taken_at']
+            )
+        return len(to_create) + len(to_update)
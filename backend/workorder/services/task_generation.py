@@ -1,12 +1,19 @@
 """
-草稿任务生成服务
+任务生成服务
 
-在施工单创建时自动生成草稿任务，使用 bulk_create 优化性能。
-草稿任务不分配部门和操作员，状态为 'draft'，允许在审核前编辑和删除。
+- DraftTaskGenerationService：在施工单创建时自动生成草稿任务，使用 bulk_create 优化性能。
+  草稿任务不分配部门和操作员，状态为 'draft'，允许在审核前编辑和删除。
+- TaskGenerationService：工序开始时生成正式任务。整批构建任务对象，部门和操作员
+  整批确定，任务一次 bulk_create 写入，保存信号的副作用（审计日志、部门负载、
+  可见性索引、完成计数、分派通知）按批补充，查询数与任务数量无关。
 """
+from collections import Counter
+from typing import List
+
 from django.db import transaction
 from ..models import WorkOrderTask, WorkOrderProcess
 from ..process_codes import ProcessCodes
+from .completion_progress import CompletionProgress
 
 
 class DraftTaskGenerationService:
@@ -40,12 +47,13 @@ class DraftTaskGenerationService:
                 batch_size=100,
                 ignore_conflicts=False
             )
+            CompletionProgress.record_created(created_tasks)
             return list(created_tasks)
 
         return []
 
     @staticmethod
-    def build_task_objects(work_order_process):
+    def build_task_objects(work_order_process, status='draft'):
         """为工序构建草稿任务对象（不保存到数据库）
 
         返回未保存的 WorkOrderTask 实例列表，用于批量创建。
@@ -55,8 +63,11 @@ class DraftTaskGenerationService:
         - 不分配部门（assigned_department=None）
         - 不调用 _auto_assign_task（避免额外的数据库查询）
 
+        正式任务生成（TaskGenerationService）使用同一套规则，status 传 'pending'。
+
         Args:
             work_order_process: WorkOrderProcess 实例
+            status: 任务状态，默认 'draft'
 
         Returns:
             list: 未保存的 WorkOrderTask 对象列表
@@ -81,7 +92,7 @@ class DraftTaskGenerationService:
                     work_content=f'{order_number}制版审核',
                     production_quantity=1,
                     quantity_completed=0,
-                    status='draft',
+                    status=status,
                     auto_calculate_quantity=True
                 ))
             # 刀模任务
@@ -93,7 +104,7 @@ class DraftTaskGenerationService:
                     work_content=f'{order_number}制版审核',
                     production_quantity=1,
                     quantity_completed=0,
-                    status='draft',
+                    status=status,
                     auto_calculate_quantity=True
                 ))
             # 烫金版任务
@@ -105,7 +116,7 @@ class DraftTaskGenerationService:
                     work_content=f'{order_number}制版审核',
                     production_quantity=1,
                     quantity_completed=0,
-                    status='draft',
+                    status=status,
                     auto_calculate_quantity=True
                 ))
             # 压凸版任务
@@ -117,13 +128,13 @@ class DraftTaskGenerationService:
                     work_content=f'{order_number}制版审核',
                     production_quantity=1,
                     quantity_completed=0,
-                    status='draft',
+                    status=status,
                     auto_calculate_quantity=True
                 ))
 
         elif process_code == ProcessCodes.CUT:
             # 开料工序：为需要开料的物料每个生成一个任务
-            for material_item in work_order.materials.all():
+            for material_item in work_order.materials.select_related('material'):
                 if material_item.need_cutting:
                     quantity = DraftTaskGenerationService._parse_material_usage(
                         material_item.material_usage
@@ -135,7 +146,7 @@ class DraftTaskGenerationService:
                         work_content=f'{order_number}开料',
                         production_quantity=quantity,
                         quantity_completed=0,
-                        status='draft',
+                        status=status,
                         auto_calculate_quantity=True
                     ))
 
@@ -149,7 +160,7 @@ class DraftTaskGenerationService:
                     work_content=f'{order_number}印刷',
                     production_quantity=production_quantity,
                     quantity_completed=0,
-                    status='draft',
+                    status=status,
                     auto_calculate_quantity=False
                 ))
 
@@ -163,7 +174,7 @@ class DraftTaskGenerationService:
                     work_content=f'{order_number}烫金',
                     production_quantity=production_quantity,
                     quantity_completed=0,
-                    status='draft',
+                    status=status,
                     auto_calculate_quantity=False
                 ))
 
@@ -177,7 +188,7 @@ class DraftTaskGenerationService:
                     work_content=f'{order_number}压凸',
                     production_quantity=production_quantity,
                     quantity_completed=0,
-                    status='draft',
+                    status=status,
                     auto_calculate_quantity=False
                 ))
 
@@ -191,13 +202,13 @@ class DraftTaskGenerationService:
                     work_content=f'{order_number}模切',
                     production_quantity=production_quantity,
                     quantity_completed=0,
-                    status='draft',
+                    status=status,
                     auto_calculate_quantity=False
                 ))
 
         elif process_code == ProcessCodes.PACK:
             # 包装工序：为每个产品生成一个任务
-            for product_item in work_order.products.all():
+            for product_item in work_order.products.select_related('product'):
                 tasks.append(WorkOrderTask(
                     work_order_process=work_order_process,
                     task_type='packaging',
@@ -205,7 +216,7 @@ class DraftTaskGenerationService:
                     work_content=f'{product_item.product.name}包装',
                     production_quantity=product_item.quantity,
                     quantity_completed=0,
-                    status='draft',
+                    status=status,
                     auto_calculate_quantity=False
                 ))
 
@@ -217,7 +228,7 @@ class DraftTaskGenerationService:
                 work_content=f'{process.name}：{order_number}',
                 production_quantity=production_quantity,
                 quantity_completed=0,
-                status='draft',
+                status=status,
                 auto_calculate_quantity=False
             ))
 
@@ -266,5 +277,136 @@ class DraftTaskGenerationService:
             batch_size=100,
             ignore_conflicts=False
         )
+        CompletionProgress.record_created(created_tasks)
 
         return list(created_tasks)
+
+
+class TaskGenerationService:
+    """正式任务生成服务（工序开始时调用，见 WorkOrderProcess.generate_tasks）"""
+
+    @classmethod
+    def generate_tasks(cls, work_order_process, operator_selector=None) -> List[WorkOrderTask]:
+        """
+        为工序批量生成并分派正式任务
+
+        Args:
+            work_order_process: WorkOrderProcess 实例
+            operator_selector: 多个工序共用的 OperatorSelector（为空时单独创建）
+
+        Returns:
+            list: 创建的任务列表
+        """
+        tasks = DraftTaskGenerationService.build_task_objects(work_order_process, status='pending')
+        if not tasks:
+            return []
+
+        with transaction.atomic():
+            cls.assign(work_order_process, tasks, operator_selector)
+            created_tasks = WorkOrderTask.objects.bulk_create(tasks, batch_size=500)
+            cls._after_bulk_create(work_order_process, created_tasks)
+        return created_tasks
+
+    @staticmethod
+    def assign(work_order_process, tasks: List[WorkOrderTask], operator_selector=None):
+        """
+        整批确定任务的部门和操作员（只修改内存中的任务对象）
+
+        规则与 WorkOrderProcess._auto_assign_task 相同：
+        1. 工序指定了部门则使用该部门，否则按分派规则批量分派（AutoDispatchService）
+        2. 分派规则未命中时使用工序第一个可用部门
+        3. 工序指定了操作员则使用该操作员，否则按部门的选择策略选择，负载在批内累加
+        """
+        from ..models.base import Department
+        from .dispatch_service import AutoDispatchService
+        from .operator_selection import OperatorSelector
+
+        process = work_order_process.process
+        if work_order_process.department_id:
+            for task in tasks:
+                task.assigned_department = work_order_process.department
+        else:
+            AutoDispatchService.assign_departments(tasks)
+            unassigned = [task for task in tasks if task.assigned_department_id is None]
+            if unassigned:
+                fallback = (
+                    Department.objects.filter(processes=process, is_active=True)
+                    .order_by('sort_order')
+                    .first()
+                )
+                for task in unassigned:
+                    task.assigned_department = fallback
+
+        if work_order_process.operator_id:
+            for task in tasks:
+                task.assigned_operator = work_order_process.operator
+            return
+
+        selector = operator_selector or OperatorSelector()
+        for task in tasks:
+            department = task.assigned_department
+            if department is None:
+                continue
+            operator = selector.select(department, selector.get_strategy(process, department))
+            task.assigned_operator = operator
+            selector.record_assignment(operator)
+
+    @staticmethod
+    def _after_bulk_create(work_order_process, tasks: List[WorkOrderTask]):
+        """补充 bulk_create 跳过的保存信号副作用"""
+        from ..performance.cache_invalidation import (
+            invalidate_department_stats,
+            invalidate_operator_stats,
+        )
+        from .audit_log_service import capture_bulk_created
+        from .department_load import DepartmentLoadStore
+        from .notification_outbox import NotificationOutbox
+        from .realtime_notification import notification_service
+        from .visibility_index import WorkOrderVisibilityIndex
+        from .work_order_statistics import WorkOrderStatisticsService
+
+        work_order = work_order_process.work_order
+        load_deltas = Counter()
+        department_ids = set()
+        operator_ids = set()
+        for task in tasks:
+            department_id = task.assigned_department_id
+            if department_id:
+                department_ids.add(department_id)
+                if DepartmentLoadStore.is_active(task.status):
+                    load_deltas[department_id] += 1
+            if task.assigned_operator_id:
+                operator_ids.add(task.assigned_operator_id)
+            # 同步字段追踪快照，之后再次保存时按已保存的值比较
+            task.reset_field_tracking()
+
+        capture_bulk_created(tasks)
+        CompletionProgress.record_created(tasks)
+        DepartmentLoadStore.apply_on_commit(load_deltas)
+
+        # 分派通知：与逐个保存时的分派信号、_auto_assign_task 的通知相同，发件箱按任务去重后批量写入
+        notification_service.notify_tasks_assigned(tasks)
+        for task in tasks:
+            if task.assigned_operator:
+                NotificationOutbox.add(
+                    recipient=task.assigned_operator,
+                    notification_type="task_assigned",
+                    title=f"新任务分派：{task.work_content}",
+                    content=f"您有一个新任务：{task.work_content}（施工单：{work_order.order_number}）",
+                    priority="normal",
+                    work_order=work_order,
+                    work_order_process=work_order_process,
+                    task=task,
+                )
+
+        def on_commit():
+            for department_id in department_ids:
+                WorkOrderVisibilityIndex.invalidate(
+                    WorkOrderVisibilityIndex.SCOPE_DEPARTMENT, department_id
+                )
+                invalidate_department_stats(department_id)
+            for operator_id in operator_ids:
+                invalidate_operator_stats(operator_id)
+            WorkOrderStatisticsService.bump_generation()
+
+        transaction.on_commit(on_commit)
@@ -0,0 +1,279 @@
+"""
+任务数量批量更新
+
+扫码枪等场景一次提交上百个任务的完成数量，逐个 save() 会为每个任务触发保存信号、
+审计日志、缓存失效、日志插入和工序完成检查。本服务按集合处理整批任务：
+- 一次查询锁定目标任务（连同工序、施工单），权限和版本号在内存中校验
+- 任务更新用一次 bulk_update 写入，操作日志用一次 bulk_create 插入
+- 每个受影响的工序只检查一次是否完成
+- bulk_update 跳过的信号副作用（部门负载计数、统计缓存、审计日志、状态通知）在此补充
+"""
+import logging
+from collections import Counter
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models.core import TaskLog, WorkOrderTask, stamp_completed_at
+from .department_load import DepartmentLoadStore
+from .service_errors import ServiceError
+
+logger = logging.getLogger(__name__)
+
+
+class TaskQuantityService:
+    """任务数量批量更新"""
+
+    UPDATE_FIELDS = [
+        "quantity_completed",
+        "quantity_defective",
+        "production_requirements",
+        "status",
+        "completed_at",
+        "version",
+        "updated_at",
+    ]
+
+    @staticmethod
+    def can_update(user, task, has_change_perm: bool) -> bool:
+        """生产主管、任务分派的操作员、施工单创建人可以更新"""
+        return (
+            has_change_perm
+            or task.assigned_operator_id == user.id
+            or task.work_order_process.work_order.created_by_id == user.id
+        )
+
+    @staticmethod
+    def _to_int(value, default=None) -> Optional[int]:
+        """请求中的数量转换为整数，无法转换时返回 None"""
+        if value is None or value == "":
+            return default
+        if isinstance(value, bool):
+            return None
+        try:
+            number = float(value) if isinstance(value, str) else value
+            if number != int(number):
+                return None
+            return int(number)
+        except (TypeError, ValueError, OverflowError):
+            return None
+
+    @classmethod
+    def batch_update_quantity(
+        cls,
+        user,
+        task_ids: List[int],
+        increments: List,
+        defectives: List,
+        notes: str = "",
+        versions: Optional[Dict[str, int]] = None,
+    ) -> Dict:
+        """
+        批量增量更新任务完成数量
+
+        Args:
+            user: 操作人
+            task_ids: 任务ID列表
+            increments: 与 task_ids 一一对应的完成数量增量（请求原值，逐个校验，无效的任务更新失败）
+            defectives: 与 task_ids 一一对应的不良品数量增量（同上，为空视为 0）
+            notes: 备注（写入生产要求）
+            versions: 任务ID（字符串）-> 客户端持有的版本号，不匹配的任务更新失败
+
+        Returns:
+            Dict: updated_task_ids / failed_tasks
+
+        Raises:
+            ServiceError: 任务ID无效或重复（400）、无权限（403）
+        """
+        versions = versions or {}
+
+        # 客户端可能以字符串传递任务ID
+        parsed_ids = [cls._to_int(task_id) for task_id in task_ids]
+        invalid_ids = [
+            task_id for task_id, parsed in zip(task_ids, parsed_ids) if parsed is None
+        ]
+        if invalid_ids:
+            raise ServiceError(f"任务ID格式无效：{invalid_ids}", code=400)
+        task_ids = parsed_ids
+        if len(set(task_ids)) != len(task_ids):
+            raise ServiceError("任务ID列表中存在重复的任务", code=400)
+
+        with transaction.atomic():
+            tasks = {
+                task.id: task
+                for task in WorkOrderTask.objects.select_for_update(of=("self",))
+                # 工序名称用于审计日志的对象描述
+                .select_related("work_order_process__work_order", "work_order_process__process")
+                .filter(id__in=task_ids)
+                .order_by("id")
+            }
+
+            has_change_perm = user.has_perm("workorder.change_workorder")
+            unauthorized_tasks = [
+                task_id for task_id, task in tasks.items()
+                if not cls.can_update(user, task, has_change_perm)
+            ]
+            if unauthorized_tasks:
+                raise ServiceError(f"您没有权限更新以下任务：{unauthorized_tasks}", code=403)
+
+            now = timezone.now()
+            updated: List[WorkOrderTask] = []
+            logs: List[TaskLog] = []
+            old_values = {}
+            failed_tasks = []
+
+            for task_id, increment, defective in zip(task_ids, increments, defectives):
+                task = tasks.get(task_id)
+                if task is None:
+                    failed_tasks.append({"task_id": task_id, "error": "任务不存在"})
+                    continue
+
+                # 请求数据逐个校验，单个任务的数量无效不影响其他任务
+                increment = cls._to_int(increment)
+                if increment is None:
+                    failed_tasks.append({"task_id": task_id, "error": "完成数量增量必须为整数"})
+                    continue
+                defective = cls._to_int(defective, default=0)
+                if defective is None:
+                    failed_tasks.append({"task_id": task_id, "error": "不良品数量必须为整数"})
+                    continue
+
+                # 并发控制：检查版本号
+                expected_version = versions.get(str(task_id))
+                if expected_version is not None and task.version != expected_version:
+                    failed_tasks.append(
+                        {"task_id": task_id, "error": "任务已被其他操作员更新，请刷新后重试"}
+                    )
+                    continue
+
+                # 计算并验证新的完成数量
+                quantity_before = task.quantity_completed
+                new_quantity_completed = quantity_before + increment
+                if new_quantity_completed < 0:
+                    failed_tasks.append({"task_id": task_id, "error": "更新后完成数量不能小于0"})
+                    continue
+                if task.production_quantity and new_quantity_completed > task.production_quantity:
+                    failed_tasks.append(
+                        {
+                            "task_id": task_id,
+                            "error": f"更新后完成数量（{new_quantity_completed}）不能超过生产数量（{task.production_quantity}）",
+                        }
+                    )
+                    continue
+
+                status_before = task.status
+                old_values[task_id] = {
+                    "quantity_completed": quantity_before,
+                    "quantity_defective": task.quantity_defective,
+                    "production_requirements": task.production_requirements,
+                    "status": status_before,
+                    "completed_at": task.completed_at,
+                }
+
+                task.quantity_completed = new_quantity_completed
+                if defective:
+                    task.quantity_defective = (task.quantity_defective or 0) + defective
+                if notes:
+                    task.production_requirements = notes
+                task.status = cls.resolve_status(task)
+                stamp_completed_at(task, now)
+                task.version += 1
+                task.updated_at = now
+                updated.append(task)
+
+                logs.append(
+                    TaskLog(
+                        task=task,
+                        log_type="update_quantity",
+                        content=f"批量更新完成数量：{quantity_before} → {new_quantity_completed}，本次完成：{increment}，不良品：{defective}"
+                        + (f"，备注：{notes}" if notes else ""),
+                        quantity_before=quantity_before,
+                        quantity_after=new_quantity_completed,
+                        quantity_increment=increment,
+                        quantity_defective_increment=defective,
+                        status_before=status_before,
+                        status_after=task.status,
+                        operator=user,
+                    )
+                )
+
+            if updated:
+                WorkOrderTask.objects.bulk_update(updated, cls.UPDATE_FIELDS, batch_size=500)
+                for task in updated:
+                    # bulk_update 不经过 save()，手动刷新字段追踪快照
+                    task.reset_field_tracking(cls.UPDATE_FIELDS)
+                TaskLog.objects.bulk_create(logs, batch_size=500)
+                cls._after_bulk_update(updated, old_values)
+
+        return {
+            "updated_task_ids": [task.id for task in updated],
+            "failed_tasks": failed_tasks,
+        }
+
+    @staticmethod
+    def resolve_status(task) -> str:
+        """根据完成数量自动判断任务状态"""
+        if task.production_quantity and task.quantity_completed >= task.production_quantity:
+            return "completed"
+        if task.status == "pending":
+            return "in_progress"
+        if (
+            task.status == "completed"
+            and task.production_quantity
+            and task.quantity_completed < task.production_quantity
+        ):
+            return "in_progress"
+        return task.status
+
+    @staticmethod
+    def _after_bulk_update(tasks: List[WorkOrderTask], old_values: Dict[int, Dict]):
+        """工序完成检查，并补充 bulk_update 跳过的保存信号副作用"""
+        from ..performance.cache_invalidation import (
+            invalidate_department_stats,
+            invalidate_operator_stats,
+        )
+        from .audit_log_service import capture_bulk_changes
+        from .completion_progress import CompletionProgress
+        from .notification_triggers import notify_task_status_change
+        from .operator_performance import OperatorPerformanceStore
+        from .work_order_statistics import WorkOrderStatisticsService
+
+        load_deltas = Counter()
+        completed_processes = {}
+        newly_completed = []
+        for task in tasks:
+            old_status = old_values[task.id]["status"]
+            if old_status != task.status:
+                if task.assigned_department_id:
+                    load_deltas[task.assigned_department_id] += (
+                        DepartmentLoadStore.is_active(task.status)
+                        - DepartmentLoadStore.is_active(old_status)
+                    )
+                notify_task_status_change(task, old_status, task.status)
+                # 完成时间只写一次：重新打开后再次完成不重复计入绩效
+                if task.status == "completed" and old_values[task.id]["completed_at"] is None:
+                    newly_completed.append(task)
+            if task.status == "completed":
+                completed_processes.setdefault(task.work_order_process_id, task.work_order_process)
+
+        capture_bulk_changes(tasks, old_values)
+        DepartmentLoadStore.apply_on_commit(load_deltas)
+        OperatorPerformanceStore.record_tasks(newly_completed)
+        CompletionProgress.record_updates(tasks, old_values)
+
+        department_ids = {task.assigned_department_id for task in tasks} - {None}
+        operator_ids = {task.assigned_operator_id for task in tasks} - {None}
+
+        def on_commit():
+            for department_id in department_ids:
+                invalidate_department_stats(department_id)
+            for operator_id in operator_ids:
+                invalidate_operator_stats(operator_id)
+            WorkOrderStatisticsService.bump_generation()
+
+        transaction.on_commit(on_commit)
+
+        # 每个受影响的工序只检查一次是否完成
+        for work_order_process in completed_processes.values():
+            work_order_process.check_and_update_status()
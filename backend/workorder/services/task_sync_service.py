@@ -6,6 +6,7 @@
 """
 from django.db import transaction
 from ..models import WorkOrder, WorkOrderProcess, WorkOrderTask
+from .completion_progress import CompletionProgress
 from .task_generation import DraftTaskGenerationService
 
 
@@ -127,6 +128,7 @@ class TaskSyncService:
                     batch_size=100,
                     ignore_conflicts=False
                 )
+                CompletionProgress.record_created(created_tasks)
                 added_count = len(created_tasks)
 
         message = f'同步完成：已删除 {deleted_count} 个草稿任务，新增 {added_count} 个草稿任务'
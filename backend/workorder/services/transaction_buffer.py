@@ -0,0 +1,69 @@
+"""
+按事务缓冲
+
+审计日志、通知等副作用在事务内只收集不写入，提交时通过 transaction.on_commit 批量处理；
+事务（保存点）回滚时缓冲随回调一起丢弃。每个保存点对应一个缓冲批次，批次本身就是
+注册的 on_commit 回调。
+"""
+import threading
+from typing import Callable, List
+
+from django.db import transaction
+
+
+class PendingBatch:
+    """单个事务（保存点）内待处理的记录，自身即 on_commit 回调"""
+
+    __slots__ = ('records', 'registry', 'done', 'flush')
+
+    def __init__(self, registry, flush: Callable[[List], None]):
+        self.records: List = []
+        # 注册时的 connection.run_on_commit 列表；回滚会替换该列表，借此判断回调是否仍有效
+        self.registry = registry
+        self.done = False
+        self.flush = flush
+
+    def __call__(self):
+        self.done = True
+        records, self.records = self.records, []
+        self.flush(records)
+
+
+def get_transaction_batch(
+    local: threading.local, connection, flush: Callable[[List], None]
+) -> PendingBatch:
+    """
+    获取当前事务（保存点）的缓冲批次，不存在时创建并注册 on_commit 回调
+
+    Args:
+        local: 调用方的线程本地存储（批次索引保存在 local.pending）
+        connection: 当前数据库连接（必须处于事务中）
+        flush: 提交后处理整批记录的函数
+    """
+    pending = getattr(local, 'pending', None)
+    if pending is None:
+        pending = local.pending = {}
+
+    key = (connection.alias, tuple(connection.savepoint_ids))
+    batch = pending.get(key)
+    if batch is not None and not batch.done:
+        if batch.registry is connection.run_on_commit:
+            return batch
+        # 回调列表被替换（回滚或内层保存点回滚），确认回调是否仍在
+        if any(entry[1] is batch for entry in connection.run_on_commit):
+            batch.registry = connection.run_on_commit
+            return batch
+
+    # 只保留当前保存点栈上的缓冲：已释放/回滚的保存点不会再收到记录，
+    # 其缓冲若仍有效会照常随回调处理，这里仅移除索引
+    alias, savepoint_ids = key
+    for stale_key in [
+        k for k in pending
+        if k[0] == alias and k[1] != savepoint_ids[:len(k[1])]
+    ]:
+        del pending[stale_key]
+
+    batch = PendingBatch(connection.run_on_commit, flush)
+    pending[key] = batch
+    transaction.on_commit(batch, using=connection.alias)
+    return batch
@@ -0,0 +1,185 @@
+"""
+施工单可见性索引
+
+按作用域缓存用户可见的施工单 ID（有序整数列表），替代按用户缓存的惰性查询集：
+- dept:{id}: 分派到该部门的任务所属施工单
+- sales:{id}: 该业务员负责客户的施工单
+- creator:{id}: 该用户创建的施工单
+
+用户的可见集合在读取时由其所属作用域合并得到，列表/统计接口直接按主键过滤，
+不再每次执行部门子查询。索引由信号在事务提交后维护（见 performance/cache_invalidation.py）：
+- 施工单创建：创建人和业务员索引失效
+- 任务分派部门变化：新旧部门索引失效
+- 客户业务员变化：新旧业务员索引失效
+
+索引放在 visibility 缓存命名空间下，每个作用域的键带代数。维护时只递增代数，
+不在缓存上读改写列表：并发分派不会互相覆盖；重建前先取得键，
+与失效并发的重建写入旧代数的键，不会把过期列表发布为最新。
+"""
+import heapq
+import logging
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection
+
+from ..permission_utils import AuthzProfile
+from .namespaced_cache import CacheNamespace
+
+logger = logging.getLogger(__name__)
+
+
+class WorkOrderVisibilityIndex:
+    """施工单可见性索引"""
+
+    TIMEOUT = settings.CACHE_TIMEOUTS['HOUR']
+    # 可见 ID 过多时回退到子查询，避免 IN 参数超过数据库限制
+    INLINE_ID_LIMIT = 5000
+
+    SCOPE_DEPARTMENT = 'dept'
+    SCOPE_SALESPERSON = 'sales'
+    SCOPE_CREATOR = 'creator'
+
+    @classmethod
+    def _scope_cache(cls, scope: str, scope_id: int) -> CacheNamespace:
+        return visibility_cache.scope(f'{scope}:{scope_id}')
+
+    # ==================== 构建 ====================
+
+    @classmethod
+    def _build_scope(cls, scope: str, scope_id: int) -> List[int]:
+        """从数据库构建单个作用域的可见 ID 列表"""
+        from ..models.core import WorkOrder, WorkOrderTask
+
+        if scope == cls.SCOPE_DEPARTMENT:
+            ids = WorkOrderTask.objects.filter(
+                assigned_department_id=scope_id
+            ).values_list('work_order_process__work_order_id', flat=True)
+        elif scope == cls.SCOPE_SALESPERSON:
+            ids = WorkOrder.objects.filter(
+                customer__salesperson_id=scope_id
+            ).values_list('id', flat=True)
+        elif scope == cls.SCOPE_CREATOR:
+            ids = WorkOrder.objects.filter(created_by_id=scope_id).values_list(
+                'id', flat=True
+            )
+        else:
+            raise ValueError(f'未知的可见性作用域: {scope}')
+
+        return sorted(set(ids))
+
+    @classmethod
+    def get_scope_ids(cls, scope: str, scope_id: int) -> List[int]:
+        """获取作用域的可见 ID 列表（缓存未命中时重建）
+
+        事务内直接查询数据库：既能读到本事务的修改，也不会把未提交的状态发布到共享缓存。
+        """
+        if connection.in_atomic_block:
+            return cls._build_scope(scope, scope_id)
+
+        # get_or_set 先取得带代数的键再重建
+        return cls._scope_cache(scope, scope_id).get_or_set(
+            'ids', lambda: cls._build_scope(scope, scope_id), cls.TIMEOUT
+        )
+
+    @classmethod
+    def get_visible_ids(cls, user) -> Optional[List[int]]:
+        """获取用户可见的施工单 ID 列表
+
+        Returns:
+            有序 ID 列表；超级管理员返回 None（不限制）
+        """
+        if user.is_superuser:
+            return None
+        if not user.is_authenticated:
+            return []
+
+        authz = AuthzProfile.for_user(user)
+        if authz.is_salesperson:
+            return cls.get_scope_ids(cls.SCOPE_SALESPERSON, user.id)
+
+        if authz.has_perm('workorder.change_workorder'):
+            department_ids = authz.department_ids
+            if department_ids:
+                return cls._merge(
+                    cls.get_scope_ids(cls.SCOPE_DEPARTMENT, department_id)
+                    for department_id in department_ids
+                )
+
+        return cls.get_scope_ids(cls.SCOPE_CREATOR, user.id)
+
+    @classmethod
+    def filter_queryset(cls, queryset, user):
+        """按可见性索引过滤施工单查询集"""
+        ids = cls.get_visible_ids(user)
+        if ids is None:
+            return queryset
+        if len(ids) > cls.INLINE_ID_LIMIT:
+            logger.debug(f'用户 {user.id} 可见施工单 {len(ids)} 个，回退到子查询过滤')
+            return cls._filter_by_subquery(queryset, user)
+        return queryset.filter(pk__in=ids)
+
+    @classmethod
+    def _filter_by_subquery(cls, queryset, user):
+        """不经索引、直接用子查询过滤（大集合回退路径）"""
+        from ..models.core import WorkOrderTask
+
+        authz = AuthzProfile.for_user(user)
+        if authz.is_salesperson:
+            return queryset.filter(customer__salesperson=user)
+        department_ids = authz.department_ids
+        if authz.has_perm('workorder.change_workorder') and department_ids:
+            work_order_ids = WorkOrderTask.objects.filter(
+                assigned_department_id__in=department_ids
+            ).values_list('work_order_process__work_order_id', flat=True)
+            return queryset.filter(id__in=work_order_ids)
+        return queryset.filter(created_by=user)
+
+    @staticmethod
+    def _merge(id_lists: Iterable[List[int]]) -> List[int]:
+        """合并多个有序 ID 列表并去重"""
+        merged = []
+        for work_order_id in heapq.merge(*id_lists):
+            if not merged or merged[-1] != work_order_id:
+                merged.append(work_order_id)
+        return merged
+
+    # ==================== 维护 ====================
+
+    @classmethod
+    def invalidate(cls, scope: str, scope_id: Optional[int]):
+        """使作用域索引失效（一次原子递增），下次读取时重建"""
+        if scope_id:
+            cls._scope_cache(scope, scope_id).invalidate()
+
+    @classmethod
+    def on_work_order_created(cls, work_order):
+        cls.invalidate(cls.SCOPE_CREATOR, work_order.created_by_id)
+        salesperson_id = (
+            work_order.customer.salesperson_id if work_order.customer_id else None
+        )
+        cls.invalidate(cls.SCOPE_SALESPERSON, salesperson_id)
+
+    @classmethod
+    def on_work_order_customer_changed(cls, work_order, old_customer_id):
+        from ..models.base import Customer
+
+        salesperson_ids = Customer.objects.filter(
+            id__in=[old_customer_id, work_order.customer_id]
+        ).values_list('salesperson_id', flat=True)
+        for salesperson_id in set(salesperson_ids):
+            cls.invalidate(cls.SCOPE_SALESPERSON, salesperson_id)
+
+    @classmethod
+    def on_task_department_changed(cls, task, old_department_id):
+        """任务分派部门变化：旧部门可能仍有该施工单的其他任务，新旧部门均失效重建"""
+        cls.invalidate(cls.SCOPE_DEPARTMENT, old_department_id)
+        cls.invalidate(cls.SCOPE_DEPARTMENT, task.assigned_department_id)
+
+    @classmethod
+    def on_salesperson_changed(cls, customer, old_salesperson_id):
+        cls.invalidate(cls.SCOPE_SALESPERSON, old_salesperson_id)
+        cls.invalidate(cls.SCOPE_SALESPERSON, customer.salesperson_id)
+
+
+visibility_cache = CacheNamespace.register('visibility', timeout=WorkOrderVisibilityIndex.TIMEOUT)
@@ -46,9 +46,11 @@ from ..models.system import (
 )
 from ..models.base import Customer, Department
 from .service_errors import ServiceError
+from .completion_progress import CompletionProgress
 from .work_order_service import WorkOrderService
 from .task_generation import DraftTaskGenerationService
 from .dispatch_service import AutoDispatchService
+from .sequence_service import SequenceService
 from .notification_triggers_flow import NotificationTriggers
 
 logger = logging.getLogger(__name__)
@@ -454,14 +456,9 @@ class WorkOrderFlowService:
         if work_order.status != "in_progress":
             return False
 
-        # 检查是否所有任务都已完成
-        total_tasks = WorkOrderTask.objects.filter(work_order_process__work_order=work_order).count()
-        completed_tasks = WorkOrderTask.objects.filter(
-            work_order_process__work_order=work_order,
-            status="completed"
-        ).count()
-
-        if total_tasks == completed_tasks and total_tasks > 0:
+        # 检查是否所有任务都已完成：读取完成计数，显示未完成时重新统计一次
+        # （手动检查入口，顺带修正绕过信号的批量修改造成的计数偏差）
+        if CompletionProgress.work_order_tasks_completed(work_order, recount=True):
             work_order.status = "completed"
             work_order.save()
 
@@ -486,22 +483,7 @@ class WorkOrderFlowService:
     def _generate_order_number() -> str:
         """生成施工单号（格式：WO20260303001）"""
         today = timezone.now().strftime("%Y%m%d")
-        prefix = f"WO{today}"
-
-        # 查找今天最大的序号
-        last_order = (
-            WorkOrder.objects.filter(order_number__startswith=prefix)
-            .order_by("-order_number")
-            .first()
-        )
-
-        if last_order:
-            last_seq = int(last_order.order_number[-3:])
-            new_seq = last_seq + 1
-        else:
-            new_seq = 1
-
-        return f"{prefix}{new_seq:03d}"
+        return SequenceService.next_number("WO", today, 3, WorkOrder, "order_number")
 
     @staticmethod
     def _copy_sales_order_products(
@@ -664,35 +646,30 @@ class WorkOrderFlowService:
             }
         """
         # 获取所有未分派的正式任务
-        tasks = WorkOrderTask.objects.filter(
-            work_order_process__work_order=work_order,
-            status="pending",
-            assigned_department__isnull=True,
+        tasks = list(
+            WorkOrderTask.objects.filter(
+                work_order_process__work_order=work_order,
+                status="pending",
+                assigned_department__isnull=True,
+            ).select_related("work_order_process")
         )
 
-        dispatched_count = 0
+        # 批量分派：规则和部门负载只加载一次，结果一次写入
+        dispatched = AutoDispatchService.dispatch_batch(tasks)
+
         notified_operators = set()
         operator_tasks = {}
-
-        # 遍历任务并自动分派
         for task in tasks:
-            department = AutoDispatchService.dispatch_task(task)
-
-            if department:
-                task.assigned_department = department
-                task.save()
-                dispatched_count += 1
-
-                # 如果指定了操作员，记录
-                if task.assigned_operator:
-                    notified_operators.add(task.assigned_operator.id)
-                    operator_tasks[task.assigned_operator.id] = (
-                        operator_tasks.get(task.assigned_operator.id, 0) + 1
-                    )
+            # 如果指定了操作员，记录
+            if task.id in dispatched and task.assigned_operator_id:
+                notified_operators.add(task.assigned_operator_id)
+                operator_tasks[task.assigned_operator_id] = (
+                    operator_tasks.get(task.assigned_operator_id, 0) + 1
+                )
 
         return {
-            'dispatched_count': dispatched_count,
-            'total_count': tasks.count(),
+            'dispatched_count': len(dispatched),
+            'total_count': len(tasks),
             'notified_operators': list(notified_operators),
             'operator_tasks': operator_tasks,
         }
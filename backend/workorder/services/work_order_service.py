@@ -17,6 +17,7 @@ from ..models.base import Process
 from ..models.core import WorkOrder, WorkOrderMaterial, WorkOrderProcess
 from ..models.materials import Material
 from ..models.system import Notification, WorkOrderApprovalLog
+from ..permission_utils import AuthzProfile
 from .service_errors import ServiceError
 
 logger = logging.getLogger(__name__)
@@ -113,7 +114,7 @@ class WorkOrderService:
                 code=status.HTTP_400_BAD_REQUEST,
             )
 
-        if not user.groups.filter(name="业务员").exists():
+        if not AuthzProfile.for_user(user).is_salesperson:
             raise ServiceError(
                 "只有业务员可以审核施工单",
                 code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,293 @@
+"""
+施工单统计快照
+
+WorkOrderViewSet.statistics 的计算与缓存：
+- 计算合并为少量聚合查询，平均工序完成时间在数据库中计算（Avg(结束时间 - 开始时间)）
+- 无筛选参数时按可见范围缓存快照：global（超级管理员）、sales:{用户ID}（业务员）、
+  dept:{部门ID列表}（部门成员）、creator:{用户ID}
+- 施工单/工序/任务/产品/客户变更提交后递增全局代数（generation），快照随之过期；
+  过期快照在 max_staleness 秒内仍可直接返回（有界陈旧），超过后重新计算
+"""
+import logging
+import time
+from typing import Callable, Dict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+
+from ..permission_utils import AuthzProfile
+
+logger = logging.getLogger(__name__)
+
+
+class WorkOrderStatisticsService:
+    """施工单统计"""
+
+    KEY_PREFIX = 'workorder_stats'
+    GENERATION_KEY = 'workorder_stats:generation'
+    TIMEOUT = settings.CACHE_TIMEOUTS['HOUR']
+    # 数据变更后快照仍可使用的秒数
+    DEFAULT_MAX_STALENESS = 30
+
+    ALL_STATUSES = ["pending", "in_progress", "paused", "completed", "cancelled"]
+    ALL_PRIORITIES = ["low", "normal", "high", "urgent"]
+    ALL_TASK_STATUSES = ["pending", "in_progress", "completed", "cancelled"]
+
+    # ==================== 快照 ====================
+
+    @staticmethod
+    def is_salesperson(user) -> bool:
+        return AuthzProfile.for_user(user).is_salesperson
+
+    @classmethod
+    def get_scope(cls, user) -> str:
+        """按可见范围确定快照作用域（与 WorkOrderVisibilityIndex 的规则一致）"""
+        if user.is_superuser:
+            return 'global'
+        authz = AuthzProfile.for_user(user)
+        if authz.is_salesperson:
+            return f'sales:{user.id}'
+        if authz.has_perm('workorder.change_workorder'):
+            department_ids = authz.department_ids
+            if department_ids:
+                return 'dept:' + ','.join(str(department_id) for department_id in sorted(department_ids))
+        return f'creator:{user.id}'
+
+    @classmethod
+    def get_generation(cls) -> int:
+        return cache.get(cls.GENERATION_KEY, 0)
+
+    @classmethod
+    def bump_generation(cls):
+        """数据变更：使所有统计快照过期"""
+        cache.add(cls.GENERATION_KEY, 0, None)
+        try:
+            cache.incr(cls.GENERATION_KEY)
+        except ValueError:
+            cache.set(cls.GENERATION_KEY, 1, None)
+
+    @classmethod
+    def get_snapshot(cls, user, compute: Callable[[], Dict], max_staleness: int = None) -> Dict:
+        """
+        获取统计快照
+
+        Args:
+            user: 当前用户
+            compute: 快照缺失或过期时的计算函数
+            max_staleness: 数据变更后仍可返回旧快照的秒数（0 表示总是最新）
+        """
+        if max_staleness is None:
+            max_staleness = cls.DEFAULT_MAX_STALENESS
+
+        # 事务内直接计算：不读取也不发布可能包含未提交数据的快照
+        if connection.in_atomic_block:
+            return compute()
+
+        key = f'{cls.KEY_PREFIX}:{cls.get_scope(user)}'
+        generation = cls.get_generation()
+        snapshot = cache.get(key)
+        now = time.time()
+        if snapshot is not None:
+            if snapshot['generation'] == generation or now - snapshot['computed_at'] <= max_staleness:
+                return snapshot['data']
+
+        data = compute()
+        cache.set(
+            key,
+            {'generation': generation, 'computed_at': now, 'data': data},
+            cls.TIMEOUT,
+        )
+        return data
+
+    # ==================== 计算 ====================
+
+    @staticmethod
+    def _rate(part, total):
+        return round(part / total * 100, 2) if total > 0 else 0
+
+    @classmethod
+    def compute(cls, queryset, user) -> Dict:
+        """计算统计数据（增强版：包含任务统计和生产效率分析）"""
+        from datetime import timedelta
+
+        from ..models.core import WorkOrderProcess, WorkOrderProduct, WorkOrderTask
+
+        # 基础计数合并为一次聚合
+        base_aggregates = {
+            "total_count": Count("id"),
+            # 即将到期的订单（7天内）
+            "upcoming_deadline": Count(
+                "id",
+                filter=Q(
+                    delivery_date__lte=timezone.now().date() + timedelta(days=7),
+                    status__in=["pending", "in_progress"],
+                ),
+            ),
+        }
+        # 未审核施工单数量（仅业务员可见，只统计自己负责的）
+        if cls.is_salesperson(user):
+            base_aggregates["pending_approval_count"] = Count(
+                "id", filter=Q(approval_status="pending", customer__salesperson=user)
+            )
+        base = queryset.order_by().aggregate(**base_aggregates)
+
+        # 状态统计：确保所有状态都有数据，即使数量为0
+        status_dict = dict(
+            queryset.order_by().values_list("status").annotate(count=Count("id"))
+        )
+        status_statistics = [
+            {"status": status, "count": status_dict.get(status, 0)}
+            for status in cls.ALL_STATUSES
+        ]
+
+        # 优先级统计：确保所有优先级都有数据，即使数量为0
+        priority_dict = dict(
+            queryset.order_by().values_list("priority").annotate(count=Count("id"))
+        )
+        priority_statistics = [
+            {"priority": priority, "count": priority_dict.get(priority, 0)}
+            for priority in cls.ALL_PRIORITIES
+        ]
+
+        # ========== 任务统计 ==========
+        work_order_ids = queryset.order_by().values("id")
+        all_tasks = WorkOrderTask.objects.filter(
+            work_order_process__work_order__in=work_order_ids
+        )
+        completed_filter = Q(status="completed")
+        task_totals = all_tasks.aggregate(
+            total=Count("id"),
+            completed=Count("id", filter=completed_filter),
+            # 不良品率统计（已完成任务）
+            production=Sum("production_quantity", filter=completed_filter, default=0),
+            defective=Sum("quantity_defective", filter=completed_filter, default=0),
+        )
+
+        task_status_dict = dict(
+            all_tasks.order_by().values_list("status").annotate(count=Count("id"))
+        )
+        task_status_statistics = [
+            {"status": status, "count": task_status_dict.get(status, 0)}
+            for status in cls.ALL_TASK_STATUSES
+        ]
+
+        task_type_statistics = [
+            {"task_type": item["task_type"], "count": item["count"]}
+            for item in all_tasks.values("task_type")
+            .annotate(count=Count("id"))
+            .order_by("task_type")
+        ]
+
+        task_department_statistics = [
+            {
+                "department": item["assigned_department__name"],
+                "total": item["count"],
+                "completed": item["completed"],
+                "completion_rate": cls._rate(item["completed"], item["count"]),
+            }
+            for item in all_tasks.filter(assigned_department__isnull=False)
+            .values("assigned_department__name")
+            .annotate(count=Count("id"), completed=Count("id", filter=completed_filter))
+            .order_by("-count")
+        ]
+
+        # ========== 生产效率分析 ==========
+        # 工序完成率与平均完成时间（数据库内计算）
+        process_totals = WorkOrderProcess.objects.filter(
+            work_order__in=work_order_ids
+        ).aggregate(
+            total=Count("id"),
+            completed=Count("id", filter=completed_filter),
+            avg_duration=Avg(
+                ExpressionWrapper(
+                    F("actual_end_time") - F("actual_start_time"),
+                    output_field=DurationField(),
+                ),
+                filter=Q(
+                    status="completed",
+                    actual_start_time__isnull=False,
+                    actual_end_time__isnull=False,
+                ),
+            ),
+        )
+        avg_duration = process_totals["avg_duration"]
+        avg_completion_time = (
+            round(avg_duration.total_seconds() / 3600, 2)
+            if avg_duration is not None
+            else None
+        )
+
+        task_total_count = task_totals["total"]
+        task_completion_rate = cls._rate(task_totals["completed"], task_total_count)
+        total_production_quantity = task_totals["production"]
+        total_defective_quantity = task_totals["defective"]
+
+        # 按客户统计（前10个客户）
+        customer_statistics = [
+            {
+                "customer": item["customer__name"],
+                "total": item["count"],
+                "completed": item["completed"],
+                "completion_rate": cls._rate(item["completed"], item["count"]),
+            }
+            for item in queryset.values("customer__name")
+            .annotate(count=Count("id"), completed=Count("id", filter=completed_filter))
+            .order_by("-count")[:10]
+        ]
+
+        # 按产品统计（前10个产品）
+        product_statistics = [
+            {
+                "product_name": item["product__name"],
+                "product_code": item["product__code"],
+                "order_count": item["count"],
+                "total_quantity": item["total_quantity"],
+            }
+            for item in WorkOrderProduct.objects.filter(work_order__in=work_order_ids)
+            .values("product__name", "product__code")
+            .annotate(
+                count=Count("work_order", distinct=True), total_quantity=Sum("quantity")
+            )
+            .order_by("-count")[:10]
+        ]
+
+        return {
+            # 基础统计
+            "total_count": base["total_count"],
+            "status_statistics": status_statistics,
+            "priority_statistics": priority_statistics,
+            "upcoming_deadline_count": base["upcoming_deadline"],
+            "pending_approval_count": base.get("pending_approval_count", 0),
+            # 任务统计
+            "task_statistics": {
+                "total_count": task_total_count,
+                "status_statistics": task_status_statistics,
+                "type_statistics": task_type_statistics,
+                "department_statistics": task_department_statistics,
+                "completion_rate": task_completion_rate,
+            },
+            # 生产效率分析
+            "efficiency_analysis": {
+                "process_completion_rate": cls._rate(
+                    process_totals["completed"], process_totals["total"]
+                ),
+                "process_total": process_totals["total"],
+                "process_completed": process_totals["completed"],
+                "avg_completion_time_hours": avg_completion_time,
+                "task_completion_rate": task_completion_rate,
+                "defective_rate": cls._rate(
+                    total_defective_quantity, total_production_quantity
+                ),
+                "total_production_quantity": total_production_quantity,
+                "total_defective_quantity": total_defective_quantity,
+            },
+            # 业务分析
+            "business_analysis": {
+                "customer_statistics": customer_statistics,
+                "product_statistics": product_statistics,
+            },
+            "generated_at": timezone.now().isoformat(),
+        }
@@ -4,7 +4,7 @@
 当物料状态或版型确认状态变化时，自动更新相关任务的完成数量
 """
 from django.db import transaction
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils import timezone
 from .models import (
@@ -12,18 +12,7 @@ from .models import (
     FoilingPlate, EmbossingPlate
 )
 
-# 使用实例属性缓存保存前的状态，避免全局缓存带来的并发问题
-
-
-@receiver(pre_save, sender=WorkOrderMaterial)
-def cache_material_status(sender, instance, **kwargs):
-    """保存前缓存物料状态"""
-    if instance.pk:
-        try:
-            old_instance = WorkOrderMaterial.objects.get(pk=instance.pk)
-            instance._previous_purchase_status = old_instance.purchase_status
-        except WorkOrderMaterial.DoesNotExist:
-            pass
+# 保存前的状态取自模型的字段追踪快照（FieldTrackingMixin），不再在 pre_save 中重新查询
 
 
 @receiver(post_save, sender=WorkOrderMaterial)
@@ -34,8 +23,7 @@ def update_cutting_task_on_material_status_change(sender, instance, created, **k
         return
     
     # 检查状态是否真的变化了（从非'cut'变为'cut'）
-    old_status = getattr(instance, "_previous_purchase_status", None)
-    if old_status == instance.purchase_status:
+    if not instance.has_changed("purchase_status"):
         # 状态未变化，不处理
         return
     
@@ -55,17 +43,6 @@ def update_cutting_task_on_material_status_change(sender, instance, created, **k
                 # )
 
 
-@receiver(pre_save, sender=Artwork)
-def cache_artwork_confirmation(sender, instance, **kwargs):
-    """保存前缓存图稿确认状态"""
-    if instance.pk:
-        try:
-            old_instance = Artwork.objects.get(pk=instance.pk)
-            instance._previous_confirmed = old_instance.confirmed
-        except Artwork.DoesNotExist:
-            pass
-
-
 @receiver(post_save, sender=Artwork)
 def update_plate_making_task_on_artwork_confirmation(sender, instance, created, **kwargs):
     """图稿确认时，自动更新相关制版任务的完成数量"""
@@ -74,8 +51,7 @@ def update_plate_making_task_on_artwork_confirmation(sender, instance, created,
         return
     
     # 检查确认状态是否真的变化了（从False变为True）
-    old_confirmed = getattr(instance, "_previous_confirmed", False)
-    if old_confirmed == instance.confirmed:
+    if not instance.has_changed("confirmed"):
         # 状态未变化，不处理
         return
     
@@ -84,17 +60,6 @@ def update_plate_making_task_on_artwork_confirmation(sender, instance, created,
         transaction.on_commit(lambda: _complete_plate_tasks(artwork=instance))
 
 
-@receiver(pre_save, sender=Die)
-def cache_die_confirmation(sender, instance, **kwargs):
-    """保存前缓存刀模确认状态"""
-    if instance.pk:
-        try:
-            old_instance = Die.objects.get(pk=instance.pk)
-            instance._previous_confirmed = old_instance.confirmed
-        except Die.DoesNotExist:
-            pass
-
-
 @receiver(post_save, sender=Die)
 def update_plate_making_task_on_die_confirmation(sender, instance, created, **kwargs):
     """刀模确认时，自动更新相关制版任务的完成数量"""
@@ -102,25 +67,13 @@ def update_plate_making_task_on_die_confirmation(sender, instance, created, **kw
         return
     
     # 检查确认状态是否真的变化了
-    old_confirmed = getattr(instance, "_previous_confirmed", False)
-    if old_confirmed == instance.confirmed:
+    if not instance.has_changed("confirmed"):
         return
     
     if instance.confirmed:
         transaction.on_commit(lambda: _complete_plate_tasks(die=instance))
 
 
-@receiver(pre_save, sender=FoilingPlate)
-def cache_foiling_plate_confirmation(sender, instance, **kwargs):
-    """保存前缓存烫金版确认状态"""
-    if instance.pk:
-        try:
-            old_instance = FoilingPlate.objects.get(pk=instance.pk)
-            instance._previous_confirmed = old_instance.confirmed
-        except FoilingPlate.DoesNotExist:
-            pass
-
-
 @receiver(post_save, sender=FoilingPlate)
 def update_plate_making_task_on_foiling_plate_confirmation(sender, instance, created, **kwargs):
     """烫金版确认时，自动更新相关制版任务的完成数量"""
@@ -128,25 +81,13 @@ def update_plate_making_task_on_foiling_plate_confirmation(sender, instance, cre
         return
     
     # 检查确认状态是否真的变化了
-    old_confirmed = getattr(instance, "_previous_confirmed", False)
-    if old_confirmed == instance.confirmed:
+    if not instance.has_changed("confirmed"):
         return
     
     if instance.confirmed:
         transaction.on_commit(lambda: _complete_plate_tasks(foiling_plate=instance))
 
 
-@receiver(pre_save, sender=EmbossingPlate)
-def cache_embossing_plate_confirmation(sender, instance, **kwargs):
-    """保存前缓存压凸版确认状态"""
-    if instance.pk:
-        try:
-            old_instance = EmbossingPlate.objects.get(pk=instance.pk)
-            instance._previous_confirmed = old_instance.confirmed
-        except EmbossingPlate.DoesNotExist:
-            pass
-
-
 @receiver(post_save, sender=EmbossingPlate)
 def update_plate_making_task_on_embossing_plate_confirmation(sender, instance, created, **kwargs):
     """压凸版确认时，自动更新相关制版任务的完成数量"""
@@ -154,8 +95,7 @@ def update_plate_making_task_on_embossing_plate_confirmation(sender, instance, c
         return
     
     # 检查确认状态是否真的变化了
-    old_confirmed = getattr(instance, "_previous_confirmed", False)
-    if old_confirmed == instance.confirmed:
+    if not instance.has_changed("confirmed"):
         return
     
     if instance.confirmed:
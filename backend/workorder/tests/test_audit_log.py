@@ -1,11 +1,22 @@
+import csv
+import gzip
+import json
+import queue
+from datetime import timedelta
+
 import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from workorder.models.audit import AuditLog, AuditLogSettings
+from workorder.models.audit import AuditLog, AuditLogExport, AuditLogSettings
+from workorder.services.audit_export_service import AuditExportService, AuditLogExportWriter
+from workorder.services.audit_writer import AuditLogWriter, AuditSettingsCache
 from workorder.tests.conftest import TestDataFactory
 
 
 @pytest.mark.django_db
-def test_audit_log_records_update_changes():
+def test_audit_log_records_update_changes(django_capture_on_commit_callbacks):
     settings = AuditLogSettings.get_settings()
     settings.enabled = True
     settings.audited_models = ['workorder.customer']
@@ -14,13 +25,15 @@ def test_audit_log_records_update_changes():
 
     AuditLog.objects.all().delete()
 
-    customer = TestDataFactory.create_customer(name='客户A')
+    with django_capture_on_commit_callbacks(execute=True):
+        customer = TestDataFactory.create_customer(name='客户A')
 
     # 清理创建日志，只验证更新日志
     AuditLog.objects.all().delete()
 
-    customer.name = '客户B'
-    customer.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        customer.name = '客户B'
+        customer.save()
 
     log = AuditLog.objects.filter(
         action_type=AuditLog.ACTION_UPDATE,
@@ -30,3 +43,150 @@ def test_audit_log_records_update_changes():
     assert 'name' in log.changed_fields
     assert log.changes['old']['name'] == '客户A'
     assert log.changes['new']['name'] == '客户B'
+
+
+def _audit_inserts(ctx):
+    return [
+        query for query in ctx.captured_queries
+        if query['sql'].startswith('INSERT INTO "audit_log"')
+    ]
+
+
+@pytest.mark.django_db
+def test_audit_logs_flushed_with_single_bulk_insert_on_commit(django_capture_on_commit_callbacks):
+    AuditLog.objects.all().delete()
+
+    with CaptureQueriesContext(connection) as ctx:
+        with django_capture_on_commit_callbacks(execute=True):
+            for index in range(5):
+                TestDataFactory.create_customer(name=f'批量客户{index}')
+            # 提交前不写入
+            assert AuditLog.objects.count() == 0
+
+    assert len(_audit_inserts(ctx)) == 1
+    assert AuditLog.objects.filter(action_type=AuditLog.ACTION_CREATE).count() == 5
+
+
+@pytest.mark.django_db
+def test_audit_logs_discarded_with_rolled_back_savepoint(django_capture_on_commit_callbacks):
+    AuditLog.objects.all().delete()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        TestDataFactory.create_customer(name='保留客户')
+        try:
+            with transaction.atomic():
+                TestDataFactory.create_customer(name='回滚客户')
+                raise RuntimeError('rollback')
+        except RuntimeError:
+            pass
+
+    reprs = list(AuditLog.objects.values_list('object_repr', flat=True))
+    assert any('保留客户' in value for value in reprs)
+    assert not any('回滚客户' in value for value in reprs)
+
+
+@pytest.mark.django_db
+def test_audit_settings_cache_invalidated_on_save():
+    settings = AuditLogSettings.get_settings()
+    AuditSettingsCache._settings = settings
+    AuditSettingsCache._loaded_at = float('inf')
+
+    settings.retention_days = 30
+    settings.save()
+
+    assert AuditSettingsCache._settings is None
+
+
+def test_background_queue_overflow_falls_back_to_sync(monkeypatch):
+    bounded = queue.Queue(maxsize=2)
+    monkeypatch.setattr(AuditLogWriter, '_ensure_worker', classmethod(lambda cls: bounded))
+    before = AuditLogWriter.get_stats()['overflow']
+
+    overflow = AuditLogWriter._enqueue([AuditLog() for _ in range(5)])
+
+    assert len(overflow) == 3
+    assert bounded.qsize() == 2
+    assert AuditLogWriter.get_stats()['overflow'] == before + 3
+
+
+def _create_export_logs(count):
+    base = timezone.now() - timedelta(hours=1)
+    AuditLog.objects.bulk_create([
+        AuditLog(
+            action_type=AuditLog.ACTION_UPDATE,
+            object_id=str(index),
+            object_repr=f'对象{index}',
+            changed_fields=['name'],
+            # 每两条共用一个时间戳，验证 (created_at, id) 键集分页不丢不重
+            created_at=base + timedelta(seconds=index // 2),
+        )
+        for index in range(count)
+    ])
+
+
+def _create_export(**kwargs):
+    return AuditExportService().create_export_task(
+        user=None,
+        start_date=timezone.now() - timedelta(days=1),
+        end_date=timezone.now(),
+        **kwargs,
+    )
+
+
+@pytest.mark.django_db
+def test_audit_export_streams_csv_in_chunks(settings, tmp_path, monkeypatch):
+    settings.AUDIT_LOG_EXPORT_DIR = str(tmp_path)
+    monkeypatch.setattr(AuditExportService, 'CHUNK_SIZE', 3)
+    AuditLog.objects.all().delete()
+    _create_export_logs(10)
+    export = _create_export()
+
+    AuditExportService().perform_export(export.id)
+
+    export.refresh_from_db()
+    assert export.status == AuditLogExport.STATUS_COMPLETED
+    assert export.record_count == export.processed_count == 10
+    with open(export.file_path, encoding='utf-8') as exported:
+        rows = list(csv.reader(exported))
+    assert rows[0][0] == 'ID'
+    assert sorted(row[4] for row in rows[1:]) == sorted(str(index) for index in range(10))
+
+
+@pytest.mark.django_db
+def test_audit_export_gzip_ndjson_resumes_after_failure(settings, tmp_path, monkeypatch):
+    settings.AUDIT_LOG_EXPORT_DIR = str(tmp_path)
+    monkeypatch.setattr(AuditExportService, 'CHUNK_SIZE', 4)
+    AuditLog.objects.all().delete()
+    _create_export_logs(10)
+    export = _create_export(file_format=AuditLogExport.FORMAT_NDJSON, compressed=True)
+
+    write_rows = AuditLogExportWriter.write_rows
+    calls = {'count': 0}
+
+    def crash_on_second_chunk(writer, rows):
+        calls['count'] += 1
+        if calls['count'] == 2:
+            # 模拟写了半个块后中断
+            writer.file.write(b'partial')
+            raise OSError('disk error')
+        write_rows(writer, rows)
+
+    monkeypatch.setattr(AuditLogExportWriter, 'write_rows', crash_on_second_chunk)
+    AuditExportService().perform_export(export.id)
+
+    export.refresh_from_db()
+    assert export.status == AuditLogExport.STATUS_FAILED
+    assert export.processed_count == 4
+    assert export.cursor
+
+    monkeypatch.setattr(AuditLogExportWriter, 'write_rows', write_rows)
+    AuditExportService().perform_export(export.id)
+
+    export.refresh_from_db()
+    assert export.status == AuditLogExport.STATUS_COMPLETED
+    assert export.processed_count == 10
+    with gzip.open(export.file_path, 'rt', encoding='utf-8') as exported:
+        records = [json.loads(line) for line in exported]
+    assert sorted(record['object_id'] for record in records) == sorted(
+        str(index) for index in range(10)
+    )
@@ -0,0 +1,104 @@
+"""
+用户授权画像测试
+"""
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from workorder.models.base import Department
+from workorder.models.system import UserProfile
+from workorder.permission_utils import AuthzProfile
+from workorder.services.namespaced_cache import user_cache
+
+
+def _auth_queries(ctx):
+    return [
+        query['sql'] for query in ctx.captured_queries
+        if '"auth_group"' in query['sql'] or '"auth_permission"' in query['sql']
+        or 'userprofile_departments' in query['sql']
+    ]
+
+
+class AuthzProfileTest(TestCase):
+    """画像缓存、m2m 变更失效、登录与当前用户接口"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='authz_user', password='pass12345')
+        self.group = Group.objects.create(name='授权测试组')
+        self.view_customer = Permission.objects.get(codename='view_customer')
+        self.change_customer = Permission.objects.get(codename='change_customer')
+        self.department = Department.objects.create(code='authz_dept', name='授权测试部门')
+
+    def _profile(self):
+        return AuthzProfile.for_user(User.objects.get(pk=self.user.pk))
+
+    def test_profile_is_cached_until_m2m_changes(self):
+        AuthzProfile.for_user(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            profile = AuthzProfile.for_user(self.user)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertFalse(profile.has_perm('workorder.view_customer'))
+
+        # 用户权限、组成员、组权限
+        self.user.user_permissions.add(self.change_customer)
+        self.assertTrue(self._profile().has_perm('workorder.change_customer'))
+        self.group.user_set.add(self.user)
+        self.group.permissions.add(self.view_customer)
+        profile = self._profile()
+        self.assertEqual(profile.groups, ('授权测试组',))
+        self.assertTrue(profile.has_perms(['workorder.view_customer', 'workorder.change_customer']))
+
+        Group.objects.get_or_create(name='业务员')[0].user_set.add(self.user)
+        self.assertTrue(self._profile().is_salesperson)
+
+        # 部门：正向、反向
+        user_profile = UserProfile.objects.create(user=self.user)
+        user_profile.departments.add(self.department)
+        self.assertEqual(self._profile().department_ids, (self.department.pk,))
+        self.department.userprofile_set.remove(user_profile)
+        self.assertEqual(self._profile().department_ids, ())
+
+        self.group.delete()
+        self.assertEqual(self._profile().groups, ('业务员',))
+
+    def test_login_and_current_user_share_cached_profile(self):
+        self.group.user_set.add(self.user)
+        self.group.permissions.add(self.view_customer)
+        client = APIClient()
+
+        response = client.post(
+            '/api/v1/auth/login/', {'username': 'authz_user', 'password': 'pass12345'}, format='json'
+        )
+        data = response.json()['data']
+        self.assertEqual(data['groups'], ['授权测试组'])
+        self.assertEqual(data['permissions'], ['workorder.view_customer'])
+        self.assertFalse(data['is_salesperson'])
+
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {data['access']}")
+        with CaptureQueriesContext(connection) as ctx:
+            current = client.get('/api/v1/auth/user/').json()['data']
+            client.get('/api/v1/customers/')
+        self.assertEqual(current['permissions'], ['workorder.view_customer'])
+        self.assertEqual(_auth_queries(ctx), [])
+
+    def test_invalidation_repeats_after_commit_and_on_group_rename(self):
+        self.user.user_permissions.add(self.view_customer)
+        stale = AuthzProfile.for_user(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_permissions.remove(self.view_customer)
+            # 提交前并发请求按旧数据重建并缓存了画像
+            user_cache.scope(self.user.pk).set(AuthzProfile.CACHE_SUFFIX, stale._to_cache())
+            self.assertTrue(AuthzProfile.for_user(self.user).has_perm('workorder.view_customer'))
+        self.assertFalse(self._profile().has_perm('workorder.view_customer'))
+
+        salesperson_group = Group.objects.get_or_create(name='业务员')[0]
+        salesperson_group.user_set.add(self.user)
+        self.assertTrue(self._profile().is_salesperson)
+        salesperson_group.name = '前业务员'
+        salesperson_group.save()
+        self.assertFalse(self._profile().is_salesperson)
@@ -0,0 +1,100 @@
+"""
+WebSocket 批量推送测试
+"""
+import asyncio
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from workorder.services.channel_fanout import BROADCAST_GROUP, ChannelFanout
+from workorder.services.realtime_notification import (
+    NotificationChannel,
+    NotificationEvent,
+    RealtimeNotificationService,
+)
+
+
+class RecordingChannelLayer:
+    """记录 group_send 调用和最大并发数的 channel layer"""
+
+    def __init__(self, fail_groups=()):
+        self.sent = []
+        self.active = 0
+        self.max_active = 0
+        self.fail_groups = set(fail_groups)
+
+    async def group_send(self, group, message):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0)
+            if group in self.fail_groups:
+                raise ConnectionError('channel layer unavailable')
+            self.sent.append((group, message))
+        finally:
+            self.active -= 1
+
+
+@override_settings(REALTIME_NOTIFICATION_FANOUT={'BACKGROUND': False, 'CONCURRENCY': 10})
+class ChannelFanoutTest(TestCase):
+    """整批接收者并发推送，公告走广播组"""
+
+    def setUp(self):
+        self.users = User.objects.bulk_create(
+            [User(username=f'fanout_{index}') for index in range(60)]
+        )
+        self.layer = RecordingChannelLayer()
+        self.service = RealtimeNotificationService()
+        self.service.channel_layer = self.layer
+        # 通知发件箱提交后使用默认 channel layer 推送
+        patcher = mock.patch(
+            'workorder.services.channel_fanout.get_channel_layer', lambda: self.layer
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _notify(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.send_notification(
+                event_type=NotificationEvent.SYSTEM_ANNOUNCEMENT,
+                recipients=self.users,
+                data={'title': '公告', 'message': '内容'},
+                channels=[NotificationChannel.WEBSOCKET],
+                **kwargs,
+            )
+
+    def test_recipients_are_sent_concurrently_with_bounded_concurrency(self):
+        self._notify()
+
+        self.assertEqual(
+            {group for group, _ in self.layer.sent},
+            {f'user_{user.id}_notifications' for user in self.users},
+        )
+        self.assertGreater(self.layer.max_active, 1)
+        self.assertLessEqual(self.layer.max_active, 10)
+
+    def test_broadcast_sends_once(self):
+        self._notify(broadcast=True)
+
+        self.assertEqual(len(self.layer.sent), 1)
+        group, message = self.layer.sent[0]
+        self.assertEqual(group, BROADCAST_GROUP)
+        self.assertEqual(message['type'], 'notification_message')
+
+    def test_failed_send_does_not_block_others(self):
+        failed_group = f'user_{self.users[0].id}_notifications'
+        self.layer = RecordingChannelLayer(fail_groups=[failed_group])
+        failed_before = ChannelFanout.get_stats()['failed']
+
+        self._notify()
+
+        self.assertEqual(len(self.layer.sent), len(self.users) - 1)
+        self.assertEqual(ChannelFanout.get_stats()['failed'], failed_before + 1)
+
+    @override_settings(REALTIME_NOTIFICATION_FANOUT={'BACKGROUND': True, 'CONCURRENCY': 10})
+    def test_background_dispatch(self):
+        self._notify()
+        ChannelFanout.drain()
+
+        self.assertEqual(len(self.layer.sent), len(self.users))
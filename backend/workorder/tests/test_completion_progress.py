@@ -0,0 +1,119 @@
+"""
+工序 / 施工单完成计数测试
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from workorder.models.assets import Artwork
+from workorder.models.base import Customer, Process
+from workorder.models.core import WorkOrder, WorkOrderProcess, WorkOrderTask
+from workorder.models.system import WorkOrderProcessProgress, WorkOrderProgress
+from workorder.services.completion_progress import CompletionProgress
+
+
+class CompletionProgressTest(TestCase):
+    """任务状态变化增量维护计数，工序完成判断不再加载全部任务"""
+
+    def setUp(self):
+        cache.clear()
+        self.work_order = WorkOrder.objects.create(
+            customer=Customer.objects.create(name='计数客户'),
+            status='in_progress',
+            delivery_date=timezone.localdate() + timedelta(days=3),
+        )
+        self.process = WorkOrderProcess.objects.create(
+            work_order=self.work_order,
+            process=Process.objects.create(name='计数工序', code='PROGRESS'),
+        )
+
+    def _task(self, **kwargs):
+        defaults = {
+            'work_order_process': self.process,
+            'work_content': '计数任务',
+            'production_quantity': 100,
+            'status': 'in_progress',
+        }
+        defaults.update(kwargs)
+        return WorkOrderTask.objects.create(**defaults)
+
+    def _counts(self):
+        process = WorkOrderProcessProgress.objects.get(work_order_process=self.process)
+        order = WorkOrderProgress.objects.get(work_order=self.work_order)
+        return (process.tasks_total, process.tasks_done, order.tasks_total, order.tasks_completed)
+
+    def test_transitions_maintain_counters(self):
+        tasks = [self._task() for _ in range(3)]
+        self.assertEqual(self._counts(), (3, 0, 3, 0))
+
+        # 状态已完成但数量未达标：施工单计数已完成，工序计数未完成
+        tasks[0].status = 'completed'
+        tasks[0].save()
+        self.assertEqual(self._counts(), (3, 0, 3, 1))
+
+        tasks[0].quantity_completed = 100
+        tasks[0].save()
+        tasks[1].status = 'completed'
+        tasks[1].production_quantity = 0
+        tasks[1].save()
+        self.assertEqual(self._counts(), (3, 2, 3, 2))
+
+        tasks[1].delete()
+        self.assertEqual(self._counts(), (2, 1, 2, 1))
+
+        # 与重新统计的结果一致
+        CompletionProgress.rebuild()
+        self.assertEqual(self._counts(), (2, 1, 2, 1))
+
+    def test_unfinished_process_check_reads_one_row(self):
+        tasks = [self._task() for _ in range(20)]
+        for task in tasks[:-1]:
+            task.status = 'completed'
+            task.quantity_completed = 100
+            task.save()
+
+        with self.assertNumQueries(1):
+            self.assertFalse(self.process.check_and_update_status())
+
+        tasks[-1].status = 'completed'
+        tasks[-1].quantity_completed = 100
+        tasks[-1].quantity_defective = 3
+        tasks[-1].save()
+
+        self.assertTrue(self.process.check_and_update_status())
+        self.process.refresh_from_db()
+        self.assertEqual(self.process.status, 'completed')
+        self.assertEqual(self.process.quantity_completed, 2000)
+        self.assertEqual(self.process.quantity_defective, 3)
+
+    def test_unconfirmed_artwork_blocks_completion(self):
+        artwork = Artwork.objects.create(name='计数图稿')
+        task = self._task(
+            task_type='plate_making',
+            artwork=artwork,
+            production_quantity=1,
+            quantity_completed=1,
+            status='completed',
+        )
+
+        self.assertEqual(CompletionProgress.count_blocking_prerequisites(self.process), 1)
+        self.assertFalse(self.process.check_and_update_status())
+
+        artwork.confirmed = True
+        artwork.save()
+        self.assertEqual(CompletionProgress.count_blocking_prerequisites(self.process), 0)
+        self.assertTrue(task.work_order_process.check_and_update_status())
+
+    def test_missing_counters_are_recounted(self):
+        self._task(status='completed', quantity_completed=100)
+        self._task()
+        WorkOrderProcessProgress.objects.all().delete()
+        WorkOrderProgress.objects.all().delete()
+
+        progress = CompletionProgress.get_process_progress(self.process.pk)
+
+        self.assertEqual((progress.tasks_total, progress.tasks_done), (2, 1))
+        self.assertFalse(CompletionProgress.work_order_tasks_completed(self.work_order))
+        self.assertEqual(self._counts(), (2, 1, 2, 1))
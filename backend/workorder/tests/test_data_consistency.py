@@ -0,0 +1,140 @@
+"""
+数据一致性检查测试
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from workorder.models.base import Customer, Process
+from workorder.models.core import (
+    WorkOrder,
+    WorkOrderMaterial,
+    WorkOrderProcess,
+    WorkOrderProduct,
+    WorkOrderTask,
+)
+from workorder.models.materials import Material
+from workorder.models.products import Product
+from workorder.services.data_consistency import (
+    DataConsistencyManager,
+    MaterialStockService,
+    WorkOrderQuantityService,
+)
+
+
+class DataConsistencyManagerTest(TestCase):
+    """分组聚合检查、增量模式、耗时报告"""
+
+    def setUp(self):
+        cache.clear()
+        self.customer = Customer.objects.create(name='一致性客户')
+        self.process, _ = Process.objects.get_or_create(code='CUT', defaults={'name': '开料'})
+        self.product = Product.objects.create(code='CONSIST-P', name='一致性产品')
+        self.material = Material.objects.create(code='CONSIST-M', name='一致性物料', stock_quantity=5)
+
+    def _order(self, quantity=100, completed=100, product_quantity=100):
+        work_order = WorkOrder.objects.create(
+            customer=self.customer,
+            production_quantity=quantity,
+            status='in_progress',
+            delivery_date=timezone.localdate() + timedelta(days=3),
+        )
+        WorkOrderProduct.objects.create(
+            work_order=work_order, product=self.product, quantity=product_quantity
+        )
+        process = WorkOrderProcess.objects.create(
+            work_order=work_order, process=self.process, quantity_completed=completed
+        )
+        WorkOrderTask.objects.create(
+            work_order_process=process,
+            work_content='开料',
+            material=self.material,
+            production_quantity=completed,
+            quantity_completed=completed,
+            status='completed',
+        )
+        WorkOrderMaterial.objects.create(
+            work_order=work_order, material=self.material, purchase_status='cut'
+        )
+        return work_order
+
+    def _check_queries(self, check_type):
+        with CaptureQueriesContext(connection) as ctx:
+            result = DataConsistencyManager.run_consistency_check(check_type)
+        return result, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_orders(self):
+        self._order()
+        # 首次运行会创建检查记录，先运行一次再计数
+        DataConsistencyManager.run_consistency_check('all')
+        _, few = self._check_queries('quantity')
+        _, few_materials = self._check_queries('material')
+        for _ in range(5):
+            self._order()
+
+        result, many = self._check_queries('quantity')
+        _, many_materials = self._check_queries('material')
+
+        self.assertEqual(few, many)
+        self.assertEqual(few_materials, many_materials)
+        self.assertEqual(result['results']['quantity']['total_orders'], 6)
+        self.assertIn('quantity', result['timings'])
+
+    def test_set_based_results_match_per_order_validation(self):
+        consistent = self._order()
+        mismatched = self._order(quantity=120, completed=90, product_quantity=110)
+
+        result = DataConsistencyManager.run_consistency_check('all')['results']
+
+        quantity = result['quantity']
+        self.assertEqual(
+            [item['work_order'] for item in quantity['inconsistent_orders']], [mismatched]
+        )
+        self.assertEqual(
+            quantity['inconsistent_orders'][0]['validation']['issues'],
+            WorkOrderQuantityService.validate_quantity_consistency(mismatched)['issues'],
+        )
+        self.assertTrue(
+            WorkOrderQuantityService.validate_quantity_consistency(consistent)['is_consistent']
+        )
+
+        # 两个施工单各开料 100 / 90，库存 5 不足
+        material = result['material']
+        self.assertEqual(material['orders_with_issues'], 2)
+        self.assertEqual(
+            material['material_issues'][1]['issues'],
+            MaterialStockService.check_material_availability(mismatched)['issues'],
+        )
+
+    def test_incremental_run_checks_touched_orders_only(self):
+        self._order()
+        touched = self._order()
+        DataConsistencyManager.run_consistency_check('quantity', incremental=True)
+        # 上次运行时间记录在数据库中，缓存清空后仍按增量检查
+        cache.clear()
+
+        touched.production_quantity = 150
+        touched.save()
+        result = DataConsistencyManager.run_consistency_check('quantity', incremental=True)
+
+        quantity = result['results']['quantity']
+        self.assertIsNotNone(quantity['since'])
+        self.assertEqual(quantity['total_orders'], 1)
+        self.assertEqual(
+            [item['work_order'] for item in quantity['inconsistent_orders']], [touched]
+        )
+
+    def test_command_reports_timing(self):
+        self._order()
+        out = StringIO()
+
+        call_command('check_data_consistency', '--check-type', 'quantity', '--incremental', stdout=out)
+
+        self.assertIn('模式: 增量', out.getvalue())
+        self.assertIn('耗时:', out.getvalue())
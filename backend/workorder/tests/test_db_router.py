@@ -0,0 +1,81 @@
+"""
+只读副本路由测试
+"""
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.test import SimpleTestCase, override_settings
+from rest_framework import viewsets
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from workorder.db_router import ReplicaRouter
+from workorder.middleware.db_routing import ReplicaRoutingMiddleware
+from workorder.mixins import ReplicaReadMixin
+from workorder.models.audit import AuditLog
+
+
+class _StatsViewSet(ReplicaReadMixin, viewsets.GenericViewSet):
+    permission_classes = []
+    replica_actions = ('stats',)
+
+    def stats(self, request):
+        return Response({'alias': router.db_for_read(AuditLog)})
+
+    def save(self, request):
+        # 模拟写入后立即读取
+        router.db_for_write(AuditLog)
+        return Response({'alias': router.db_for_read(AuditLog)})
+
+
+class ReplicaRouterTest(SimpleTestCase):
+    """副本读取范围、读己之写、跨请求粘滞"""
+
+    def setUp(self):
+        cache.clear()
+        ReplicaRouter.start_request()
+        self.addCleanup(ReplicaRouter.start_request)
+        self.factory = APIRequestFactory()
+
+    def _call(self, user, method='get', action='stats'):
+        view = _StatsViewSet.as_view({method: action})
+        request = getattr(self.factory, method)('/stats/')
+        force_authenticate(request, user=user)
+        response = ReplicaRoutingMiddleware(view)(request)
+        return response.data['alias']
+
+    def test_without_replica_reads_use_primary(self):
+        with ReplicaRouter.replica_reads():
+            self.assertEqual(router.db_for_read(AuditLog), DEFAULT_DB_ALIAS)
+        self.assertEqual(ReplicaRouter.read_alias(), DEFAULT_DB_ALIAS)
+
+    @override_settings(DATABASE_REPLICA_ALIAS='replica')
+    def test_replica_scope_and_read_your_writes(self):
+        self.assertEqual(router.db_for_read(AuditLog), DEFAULT_DB_ALIAS)
+
+        with ReplicaRouter.replica_reads():
+            self.assertEqual(router.db_for_read(AuditLog), 'replica')
+            with mock.patch.object(connections[DEFAULT_DB_ALIAS], 'in_atomic_block', True):
+                self.assertEqual(router.db_for_read(AuditLog), DEFAULT_DB_ALIAS)
+
+            self.assertEqual(router.db_for_write(AuditLog), DEFAULT_DB_ALIAS)
+            self.assertEqual(router.db_for_read(AuditLog), DEFAULT_DB_ALIAS)
+
+        self.assertFalse(router.allow_migrate('replica', 'workorder'))
+
+    @override_settings(DATABASE_REPLICA_ALIAS='replica', DATABASE_REPLICA_STICKY_SECONDS=30)
+    def test_requests_stick_to_primary_after_write(self):
+        writer = SimpleNamespace(pk=1, is_authenticated=True)
+        other = SimpleNamespace(pk=2, is_authenticated=True)
+
+        self.assertEqual(self._call(writer), 'replica')
+        # 未声明的动作不读副本
+        self.assertEqual(self._call(writer, action='save'), DEFAULT_DB_ALIAS)
+
+        self.assertEqual(self._call(writer), DEFAULT_DB_ALIAS)
+        self.assertEqual(self._call(other), 'replica')
+
+        cache.delete(ReplicaRouter.STICKY_KEY.format(writer.pk))
+        self.assertEqual(self._call(writer), 'replica')
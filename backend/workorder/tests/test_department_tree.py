@@ -0,0 +1,115 @@
+"""
+部门层级快照测试
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from workorder.models.base import Customer, Department, Process
+from workorder.models.core import WorkOrder, WorkOrderProcess, WorkOrderTask
+from workorder.services.department_tree import DepartmentHierarchy, DepartmentTree
+from workorder.views.work_order_tasks.task_filters import WorkOrderTaskFilterSet
+
+
+class DepartmentHierarchyTest(SimpleTestCase):
+    """嵌套集合快照的查找"""
+
+    def setUp(self):
+        # 1 ─┬─ 2 ── 4
+        #    └─ 3
+        # 5；6 <-> 7 循环引用
+        self.tree = DepartmentHierarchy(
+            0, [(1, None), (2, 1), (3, 1), (4, 2), (5, None), (6, 7), (7, 6)]
+        )
+
+    def test_lookups(self):
+        self.assertEqual(self.tree.ancestor_ids(4), (2, 1))
+        self.assertEqual(self.tree.descendant_ids(1), [2, 4, 3])
+        self.assertEqual(self.tree.subtree_ids(2), [2, 4])
+        self.assertEqual(self.tree.descendant_ids(5), [])
+        self.assertEqual([self.tree.level(pk) for pk in (1, 2, 4)], [0, 1, 2])
+        self.assertTrue(self.tree.is_descendant(4, 1))
+        self.assertFalse(self.tree.is_descendant(1, 4))
+        self.assertFalse(self.tree.is_descendant(3, 2))
+        self.assertFalse(self.tree.is_descendant(1, 1))
+
+    def test_cycle_is_excluded(self):
+        self.assertNotIn(6, self.tree)
+        self.assertEqual(self.tree.subtree_ids(7), [])
+
+
+class DepartmentTreeTest(TestCase):
+    """快照复用、信号失效、子树筛选"""
+
+    def setUp(self):
+        cache.clear()
+        DepartmentTree.invalidate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.root = Department.objects.create(name='层级总部', code='tree_root')
+            self.child = Department.objects.create(
+                name='层级车间', code='tree_child', parent=self.root
+            )
+            self.leaf = Department.objects.create(
+                name='层级班组', code='tree_leaf', parent=self.child
+            )
+            self.other = Department.objects.create(name='层级其他', code='tree_other')
+
+    def test_lookups_reuse_snapshot(self):
+        DepartmentTree.get()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.leaf.get_level(), 2)
+            self.assertTrue(DepartmentTree.get().is_descendant(self.leaf.pk, self.root.pk))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.leaf.get_ancestors(), [self.child, self.root])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.root.get_descendants(), [self.child, self.leaf])
+
+    def test_save_invalidates_snapshot(self):
+        DepartmentTree.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.leaf.parent = self.other
+            self.leaf.save()
+
+        self.assertEqual(self.leaf.get_level(), 1)
+        self.assertEqual(self.root.get_descendants(), [self.child])
+        self.assertEqual(self.other.get_descendants(), [self.leaf])
+
+    def test_uncommitted_change_is_not_published(self):
+        snapshot = DepartmentTree.get()
+
+        self.leaf.parent = None
+        self.leaf.save()
+
+        # 本线程读取到事务内的修改，但快照不发布给其他线程
+        self.assertEqual(DepartmentTree.get().level(self.leaf.pk), 0)
+        self.assertIsNone(DepartmentTree._snapshot)
+        self.assertEqual(snapshot.level(self.leaf.pk), 2)
+
+    def test_subtree_task_filter(self):
+        process = WorkOrderProcess.objects.create(
+            work_order=WorkOrder.objects.create(
+                customer=Customer.objects.create(name='层级客户'),
+                delivery_date=timezone.localdate() + timedelta(days=3),
+            ),
+            process=Process.objects.create(name='层级工序', code='TREE'),
+        )
+        tasks = {
+            department.pk: WorkOrderTask.objects.create(
+                work_order_process=process,
+                work_content=department.name,
+                assigned_department=department,
+            )
+            for department in (self.root, self.child, self.leaf, self.other)
+        }
+
+        filterset = WorkOrderTaskFilterSet(
+            {'department_subtree': self.child.pk}, queryset=WorkOrderTask.objects.all()
+        )
+
+        self.assertEqual(
+            set(filterset.qs), {tasks[self.child.pk], tasks[self.leaf.pk]}
+        )
@@ -0,0 +1,120 @@
+"""
+批量分派与部门负载计数测试
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from workorder.models.base import Customer, Department, Process
+from workorder.models.core import WorkOrder, WorkOrderProcess, WorkOrderTask
+from workorder.models.system import TaskAssignmentRule
+from workorder.services.department_load import DepartmentLoadStore
+from workorder.services.dispatch_service import AutoDispatchService
+
+
+class DispatchTestBase(TestCase):
+    """分派测试公共数据"""
+
+    def setUp(self):
+        cache.clear()
+        AutoDispatchService.set_global_dispatch_enabled(True)
+        self.process = Process.objects.create(name='批量分派工序', code='BATCH')
+        self.departments = []
+        for index in range(2):
+            department = Department.objects.create(name=f'印刷{index}部', code=f'batch_{index}')
+            department.processes.add(self.process)
+            TaskAssignmentRule.objects.create(
+                process=self.process, department=department, priority=10
+            )
+            self.departments.append(department)
+
+        customer = Customer.objects.create(name='分派客户')
+        order = WorkOrder.objects.create(
+            customer=customer,
+            delivery_date=timezone.localdate() + timedelta(days=3),
+        )
+        self.work_order_process = WorkOrderProcess.objects.create(
+            work_order=order, process=self.process
+        )
+
+    def _create_task(self, department=None, status='pending'):
+        return WorkOrderTask.objects.create(
+            work_order_process=self.work_order_process,
+            work_content='分派任务',
+            assigned_department=department,
+            status=status,
+        )
+
+
+class DispatchBatchTest(DispatchTestBase):
+    """按内存负载批量分派"""
+
+    def test_dispatch_batch_balances_with_constant_queries(self):
+        self._create_task(self.departments[0])
+        self._create_task(self.departments[0])
+        tasks = [self._create_task() for _ in range(6)]
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = AutoDispatchService.dispatch_batch(tasks)
+
+        # 可用部门、规则、负载聚合、bulk_update、审计配置，与任务数量无关
+        self.assertEqual(len(ctx.captured_queries), 5)
+        self.assertEqual(len(result), 6)
+        # 初始负载 2/0，分派 6 个后为 4/4
+        self.assertEqual(
+            DepartmentLoadStore.get_loads(d.id for d in self.departments),
+            {self.departments[0].id: 4, self.departments[1].id: 4},
+        )
+        self.assertFalse(
+            WorkOrderTask.objects.filter(
+                id__in=[task.id for task in tasks], assigned_department__isnull=True
+            ).exists()
+        )
+
+    def test_dispatch_batch_skips_unavailable_departments(self):
+        self.departments[1].processes.remove(self.process)
+        tasks = [self._create_task() for _ in range(3)]
+
+        result = AutoDispatchService.dispatch_batch(tasks)
+
+        self.assertEqual(set(result.values()), {self.departments[0]})
+
+    def test_dispatch_batch_disabled(self):
+        AutoDispatchService.set_global_dispatch_enabled(False)
+        self.assertEqual(AutoDispatchService.dispatch_batch([self._create_task()]), {})
+
+
+class DepartmentLoadStoreTest(DispatchTestBase):
+    """任务信号维护部门负载计数"""
+
+    def test_counter_follows_task_changes(self):
+        department = self.departments[0]
+        key = DepartmentLoadStore._key(department.id)
+        cache.set(key, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task = self._create_task(department)
+        self.assertEqual(cache.get(key), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.status = 'completed'
+            task.save()
+        self.assertEqual(cache.get(key), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks = [self._create_task() for _ in range(2)]
+            AutoDispatchService.dispatch_batch(tasks, strategy='first_available')
+        self.assertEqual(cache.get(key), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks[0].delete()
+        self.assertEqual(cache.get(key), 1)
+
+        # 缓存中的计数直接返回，不再查询
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(DepartmentLoadStore.get_load(department.id), 1)
+        self.assertEqual(len(ctx.captured_queries), 0)
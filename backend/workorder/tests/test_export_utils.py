@@ -0,0 +1,110 @@
+"""
+Excel 导出测试
+"""
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from openpyxl import load_workbook
+from rest_framework.test import APIClient
+
+from workorder.export_utils import ExcelExportJob, WORK_ORDER_EXPORT
+from workorder.models.base import Customer
+from workorder.models.core import WorkOrder
+
+
+class ExcelExportTest(TestCase):
+    """只写模式流式导出与后台导出任务"""
+
+    def setUp(self):
+        cache.clear()
+        self.export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_dir, ignore_errors=True)
+
+        self.admin = User.objects.create_superuser(
+            username='export_admin', password='pass', email='export@example.com'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+        customer = Customer.objects.create(name='导出客户', salesperson=self.admin)
+        for _ in range(3):
+            WorkOrder.objects.create(
+                customer=customer,
+                created_by=self.admin,
+                delivery_date=timezone.localdate() + timedelta(days=7),
+            )
+
+    def _load_rows(self, content):
+        workbook = load_workbook(io.BytesIO(content))
+        sheet = workbook.active
+        return sheet, list(sheet.iter_rows(values_only=True))
+
+    def test_export_streams_write_only_workbook(self):
+        response = self.client.get('/api/v1/workorders/export/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        sheet, rows = self._load_rows(b''.join(response.streaming_content))
+        self.assertEqual(sheet.title, '施工单列表')
+        self.assertEqual(list(rows[0]), WORK_ORDER_EXPORT.headers)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row[1] for row in rows[1:]}, {'导出客户'})
+        self.assertEqual(sheet['A1'].font.b, True)
+        self.assertEqual(sheet.freeze_panes, 'A2')
+
+    @override_settings(EXCEL_EXPORT_BACKGROUND_THRESHOLD=2)
+    def test_large_export_returns_background_job_handle(self):
+        response = self.client.get('/api/v1/workorders/export/')
+
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['data']['job_id']
+        self.assertEqual(
+            ExcelExportJob.get_status(job_id)['status'], ExcelExportJob.STATUS_PENDING
+        )
+
+    def test_background_job_download(self):
+        with override_settings(EXPORT_FILE_DIR=self.export_dir):
+            job = ExcelExportJob(
+                job_id='job123',
+                spec_name='work_orders',
+                queryset=WorkOrder.objects.all(),
+                filename='施工单.xlsx',
+                user_id=self.admin.id,
+            )
+            job.run()
+
+        status_response = self.client.get('/api/v1/export-jobs/job123/')
+        self.assertEqual(status_response.data['data']['status'], ExcelExportJob.STATUS_COMPLETED)
+        self.assertNotIn('file_path', status_response.data['data'])
+
+        response = self.client.get('/api/v1/export-jobs/job123/download/')
+        self.assertEqual(response.status_code, 200)
+        _, rows = self._load_rows(b''.join(response.streaming_content))
+        self.assertEqual(len(rows), 4)
+
+        other = User.objects.create_user(username='export_other', password='pass')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get('/api/v1/export-jobs/job123/').status_code, 404)
+
+    def test_expired_export_files_are_removed(self):
+        expired = os.path.join(self.export_dir, 'old.xlsx')
+        recent = os.path.join(self.export_dir, 'new.xlsx')
+        for path in (expired, recent):
+            with open(path, 'wb') as handle:
+                handle.write(b'x')
+        stale_time = (timezone.now() - timedelta(seconds=ExcelExportJob.TIMEOUT + 60)).timestamp()
+        os.utime(expired, (stale_time, stale_time))
+
+        with override_settings(EXPORT_FILE_DIR=self.export_dir):
+            call_command('cleanup_export_files', stdout=io.StringIO())
+
+        self.assertFalse(os.path.exists(expired))
+        self.assertTrue(os.path.exists(recent))
@@ -0,0 +1,82 @@
+"""
+字段变更追踪测试
+"""
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from workorder.models.audit import AuditLog, AuditLogSettings
+from workorder.models.core import WorkOrderTask
+from workorder.services.audit_writer import AuditSettingsCache
+from workorder.tests.factories import WorkOrderTaskFactory
+
+
+class FieldTrackingTest(TestCase):
+    """has_changed / previous 基于加载时的快照"""
+
+    def setUp(self):
+        self.task = WorkOrderTaskFactory(status='pending')
+
+    def test_loaded_instance_reports_changes(self):
+        task = WorkOrderTask.objects.get(pk=self.task.pk)
+        self.assertFalse(task.has_changed('status'))
+
+        task.status = 'in_progress'
+        self.assertTrue(task.has_changed('status'))
+        self.assertEqual(task.previous('status'), 'pending')
+
+    def test_snapshot_is_reset_after_save(self):
+        task = WorkOrderTask.objects.get(pk=self.task.pk)
+        task.status = 'in_progress'
+        task.save()
+
+        self.assertFalse(task.has_changed('status'))
+        self.assertEqual(task.previous('status'), 'in_progress')
+
+    def test_deferred_field_is_not_tracked(self):
+        task = WorkOrderTask.objects.only('id', 'status').get(pk=self.task.pk)
+
+        self.assertFalse(task.is_tracked('quantity_completed'))
+        self.assertTrue(task.has_changed('quantity_completed'))
+        self.assertIsNone(task.get_loaded_values())
+
+
+class SaveWithoutRefetchTest(TestCase):
+    """保存信号处理器读取快照，不重新查询被保存的行"""
+
+    def setUp(self):
+        settings = AuditLogSettings.get_settings()
+        settings.enabled = True
+        settings.audited_models = ['workorder.workordertask']
+        settings.excluded_fields = []
+        settings.save()
+        AuditSettingsCache.invalidate()
+        # 创建日志在此写入，避免与更新日志落在同一个未执行的提交回调中
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task = WorkOrderTaskFactory(status='pending')
+
+    def test_task_save_does_not_select_task_row(self):
+        task = WorkOrderTask.objects.get(pk=self.task.pk)
+        table = WorkOrderTask._meta.db_table
+        with mock.patch(
+            'workorder.services.notification_triggers.notify_task_status_change'
+        ) as notify:
+            with self.captureOnCommitCallbacks(execute=True):
+                with CaptureQueriesContext(connection) as ctx:
+                    task.status = 'in_progress'
+                    task.save()
+
+        selects = [
+            query['sql'] for query in ctx.captured_queries
+            if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']
+        ]
+        self.assertEqual(selects, [])
+        notify.assert_called_once_with(task, 'pending', 'in_progress')
+
+        log = AuditLog.objects.get(
+            action_type=AuditLog.ACTION_UPDATE, object_id=str(task.pk)
+        )
+        self.assertEqual(log.changed_fields, ['status'])
+        self.assertEqual(log.changes['old']['status'], 'pending')
@@ -0,0 +1,77 @@
+"""
+业务指标时间序列测试
+"""
+from datetime import datetime, time, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from workorder.models.core import TaskLog, WorkOrderTask
+from workorder.models.system import DailyMetricsRollup
+from workorder.services.metrics_timeseries import TimeSeriesMetrics
+from workorder.tests.factories import WorkOrderTaskFactory
+
+
+class TimeSeriesMetricsTest(TestCase):
+    """分组统计、日汇总增量补齐"""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.yesterday = self.today - timedelta(days=1)
+        yesterday_noon = timezone.make_aware(datetime.combine(self.yesterday, time(12)))
+
+        task = WorkOrderTaskFactory(status='completed')
+        self.assertIsNotNone(task.completed_at)
+        WorkOrderTask.objects.filter(pk=task.pk).update(completed_at=yesterday_noon)
+        self.task = task
+        log = TaskLog.objects.create(
+            task=task,
+            log_type='update_quantity',
+            content='报工',
+            quantity_increment=50,
+            quantity_defective_increment=5,
+        )
+        TaskLog.objects.filter(pk=log.pk).update(created_at=yesterday_noon)
+        TaskLog.objects.create(
+            task=task, log_type='update_quantity', content='报工', quantity_increment=10
+        )
+
+    def test_daily_series_fills_rollups_for_closed_days(self):
+        series = TimeSeriesMetrics.daily(self.today - timedelta(days=6))
+
+        self.assertEqual([point['date'] for point in series][-2:], [self.yesterday, self.today])
+        self.assertEqual(len(series), 7)
+        yesterday = series[-2]
+        self.assertEqual(yesterday['completed_tasks'], 1)
+        self.assertEqual(yesterday['completed_quantity'], 50)
+        self.assertEqual(yesterday['defective_quantity'], 5)
+        self.assertEqual(yesterday['defect_tasks'], 1)
+        self.assertEqual(series[-1]['completed_quantity'], 10)
+
+        # 只汇总已结束的日期，当天实时统计
+        self.assertEqual(DailyMetricsRollup.objects.count(), 6)
+        self.assertFalse(DailyMetricsRollup.objects.filter(date=self.today).exists())
+
+        # 完成后再次保存不改变完成时间，不会在当天重复计数
+        task = WorkOrderTask.objects.get(pk=self.task.pk)
+        task.production_requirements = '补充备注'
+        task.save()
+        series = TimeSeriesMetrics.daily(self.today - timedelta(days=6))
+        self.assertEqual((series[-2]['completed_tasks'], series[-1]['completed_tasks']), (1, 0))
+
+    def test_long_window_reads_rollups_with_constant_queries(self):
+        start_date = self.today - timedelta(days=364)
+        TimeSeriesMetrics.daily(start_date)
+
+        # 1 次读取日汇总 + 当天 4 个数据源各一次分组查询
+        with self.assertNumQueries(5):
+            series = TimeSeriesMetrics.daily(start_date)
+        self.assertEqual(len(series), 365)
+        self.assertEqual(TimeSeriesMetrics.summarize(series)['completed_quantity'], 60)
+
+    def test_hourly_series_covers_window(self):
+        series = TimeSeriesMetrics.hourly(timezone.now() - timedelta(hours=23))
+
+        self.assertEqual(len(series), 24)
+        # 刚写入的日志落在最后一个小时
+        self.assertEqual(series[-1]['completed_quantity'], 10)
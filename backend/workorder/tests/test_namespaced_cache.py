@@ -0,0 +1,63 @@
+"""
+命名空间缓存测试
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from workorder.permission_utils import AuthzProfile, PermissionCache
+from workorder.services.namespaced_cache import CacheNamespace, dashboard_cache, department_cache
+from workorder.tests.factories import DepartmentFactory, WorkOrderTaskFactory
+
+
+class CacheNamespaceTest(TestCase):
+    """代数失效、作用域、命中统计"""
+
+    def setUp(self):
+        cache.clear()
+        self.namespace = CacheNamespace('test_ns')
+
+    def test_scope_and_namespace_invalidation(self):
+        first, second = self.namespace.scope(1), self.namespace.scope(2)
+        first.set('a', 'first')
+        second.set('a', 'second')
+
+        first.invalidate()
+        self.assertIsNone(first.get('a'))
+        self.assertEqual(second.get('a'), 'second')
+
+        first.set('a', 'first')
+        self.namespace.invalidate()
+        self.assertIsNone(first.get('a'))
+        self.assertIsNone(second.get('a'))
+
+        # 代数被淘汰后重新起始，旧键不再命中
+        second.set('a', 'second')
+        cache.delete(CacheNamespace.GENERATION_KEY.format('test_ns'))
+        self.assertIsNone(second.get('a'))
+
+        self.assertEqual(self.namespace.get_or_set('b', lambda: 'computed'), 'computed')
+        self.assertEqual(self.namespace.get_or_set('b', lambda: 'again'), 'computed')
+        stats = self.namespace.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['invalidations']), (2, 5, 2))
+        self.assertIn('dashboard', CacheNamespace.all_stats())
+
+    def test_clear_all_user_cache_without_pattern_support(self):
+        user = User.objects.create_user(username='ns_user', password='pass12345')
+        AuthzProfile.for_user(user)
+
+        PermissionCache.clear_all_user_cache()
+        with CaptureQueriesContext(connection) as ctx:
+            AuthzProfile.for_user(user)
+        self.assertGreater(len(ctx.captured_queries), 0)
+
+    def test_task_change_invalidates_department_and_dashboard(self):
+        department = DepartmentFactory()
+        department_cache.scope(department.pk).set('workload', {'total': 0})
+        dashboard_cache.set('collab_stats:all', {'total': 0})
+
+        WorkOrderTaskFactory(assigned_department=department)
+        self.assertIsNone(department_cache.scope(department.pk).get('workload'))
+        self.assertIsNone(dashboard_cache.get('collab_stats:all'))
@@ -0,0 +1,120 @@
+"""
+通知发件箱测试
+"""
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from workorder.models.core import WorkOrderTask
+from workorder.models.system import Notification
+from workorder.services.notification_outbox import NotificationOutbox
+from workorder.tests.factories import UserFactory, WorkOrderFactory, WorkOrderTaskFactory
+
+
+@override_settings(NOTIFICATION_OUTBOX={'DIGEST_THRESHOLD': 5})
+class NotificationOutboxTest(TestCase):
+    """去重、合并、提交后批量写入"""
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.task = WorkOrderTaskFactory()
+
+    def test_same_recipient_type_and_object_is_deduplicated(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            # 自动分派（关联任务和工序）与分派信号（只带任务ID）各产生一条
+            NotificationOutbox.add(
+                recipient=self.user,
+                notification_type='task_assigned',
+                title='新任务分派',
+                content='自动分派',
+                work_order_process=self.task.work_order_process,
+                task=self.task,
+            )
+            NotificationOutbox.add(
+                recipient=self.user,
+                notification_type='task_assigned',
+                title='新任务分配',
+                content='分派信号',
+                task_id=self.task.id,
+            )
+
+        notifications = Notification.objects.filter(recipient=self.user)
+        self.assertEqual(notifications.count(), 1)
+        self.assertEqual(notifications.get().content, '分派信号')
+
+    def test_burst_for_one_recipient_is_coalesced_into_digest(self):
+        work_orders = WorkOrderFactory.create_batch(7, processes=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            for work_order in work_orders:
+                NotificationOutbox.add(
+                    recipient=self.user,
+                    notification_type='workorder_completed',
+                    title=f'施工单完成：{work_order.order_number}',
+                    content='已完成',
+                    priority='high',
+                    work_order=work_order,
+                )
+
+        digest = Notification.objects.get(recipient=self.user)
+        self.assertEqual(digest.title, '您有 7 条新通知')
+        self.assertEqual(digest.priority, 'high')
+        self.assertEqual(len(digest.data['items']), 7)
+
+    def test_rolled_back_notifications_are_discarded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    NotificationOutbox.add(
+                        recipient=self.user,
+                        notification_type='system',
+                        title='回滚',
+                        content='不应写入',
+                    )
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+
+        self.assertFalse(Notification.objects.filter(recipient=self.user).exists())
+
+    def test_flush_writes_batch_with_one_insert(self):
+        users = UserFactory.create_batch(20)
+        with self.captureOnCommitCallbacks() as callbacks:
+            for user in users:
+                NotificationOutbox.add(
+                    recipient=user, notification_type='system', title='公告', content='内容'
+                )
+        self.assertFalse(Notification.objects.filter(recipient__in=users).exists())
+
+        with self.assertNumQueries(1):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(Notification.objects.filter(recipient__in=users).count(), 20)
+
+
+class TaskAssignedNotificationTest(TestCase):
+    """任务保存只在操作员变化时发送分派通知"""
+
+    def setUp(self):
+        self.operator = UserFactory()
+        self.task = WorkOrderTaskFactory(assigned_operator=self.operator)
+
+    def test_quantity_only_save_does_not_renotify(self):
+        task = WorkOrderTask.objects.get(pk=self.task.pk)
+        with mock.patch(
+            'workorder.services.notification_triggers.notification_service.notify_task_assigned'
+        ) as notify:
+            task.quantity_completed = 10
+            task.save()
+        notify.assert_not_called()
+
+    def test_operator_change_notifies(self):
+        task = WorkOrderTask.objects.get(pk=self.task.pk)
+        other = UserFactory()
+        with mock.patch(
+            'workorder.services.notification_triggers.notification_service.notify_task_assigned'
+        ) as notify:
+            task.assigned_operator = other
+            task.save()
+        notify.assert_called_once()
+        self.assertEqual(notify.call_args.kwargs['assigned_operator'], other)
@@ -0,0 +1,133 @@
+"""
+操作员绩效统计测试
+"""
+import statistics
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from workorder.models.base import Customer, Process
+from workorder.models.core import WorkOrder, WorkOrderProcess, WorkOrderTask
+from workorder.models.system import OperatorPerformance
+from workorder.services.operator_performance import OperatorPerformanceStore, PerformanceBatch
+from workorder.services.task_quantity_service import TaskQuantityService
+
+
+class OperatorPerformanceStoreTest(TestCase):
+    """增量合并、完成信号、批量更新路径"""
+
+    def setUp(self):
+        cache.clear()
+        self.operator = User.objects.create_user(username='perf_op', password='pass')
+        self.admin = User.objects.create_superuser(
+            username='perf_admin', password='pass', email='perf@example.com'
+        )
+        self.process = WorkOrderProcess.objects.create(
+            work_order=WorkOrder.objects.create(
+                customer=Customer.objects.create(name='绩效客户'),
+                delivery_date=timezone.localdate() + timedelta(days=3),
+            ),
+            process=Process.objects.create(name='绩效工序', code='PERF'),
+        )
+
+    def _task(self, **kwargs):
+        defaults = {
+            'work_order_process': self.process,
+            'work_content': '绩效任务',
+            'task_type': 'printing',
+            'production_quantity': 100,
+            'assigned_operator': self.operator,
+        }
+        defaults.update(kwargs)
+        return WorkOrderTask.objects.create(**defaults)
+
+    def test_incremental_merge_matches_full_statistics(self):
+        durations = [1.5, 2.0, 4.25, 8.0, 3.5, 0.75, 6.0]
+        # 分三批合并，结果应与一次性统计全部样本相同
+        for chunk in (durations[:1], durations[1:4], durations[4:]):
+            batch = PerformanceBatch()
+            for value in chunk:
+                batch.add(success=value < 5, duration_hours=value, quantity_completed=10)
+            OperatorPerformanceStore.apply(self.operator.id, 'printing', batch)
+
+        row = OperatorPerformance.objects.get(operator=self.operator, task_type='printing')
+        self.assertEqual(row.task_count, 7)
+        self.assertEqual(row.success_count, 5)
+        self.assertEqual(row.duration_count, 7)
+        self.assertEqual(row.quantity_completed, 70)
+        self.assertAlmostEqual(row.duration_mean, statistics.fmean(durations))
+        self.assertAlmostEqual(row.duration_m2 / row.duration_count, statistics.pvariance(durations))
+
+        summary = OperatorPerformanceStore.get_summary(self.operator.id)
+        self.assertEqual(summary['total_tasks'], 7)
+        self.assertEqual(summary['completion_time_std'], round(statistics.pstdev(durations), 2))
+
+    def test_completion_transition_is_recorded_once(self):
+        task = self._task(status='in_progress')
+        task.quantity_completed = 100
+        task.quantity_defective = 2
+        task.status = 'completed'
+        task.save()
+        # 已完成任务再次保存、重新打开后再次完成都不重复记录
+        task.notes = '复核'
+        task.save()
+        task.status = 'in_progress'
+        task.save()
+        task.status = 'completed'
+        task.save()
+
+        row = OperatorPerformance.objects.get(operator=self.operator, task_type='printing')
+        self.assertEqual(row.task_count, 1)
+        self.assertEqual(row.success_count, 0)
+        self.assertEqual(row.quantity_defective, 2)
+
+    def test_batch_quantity_update_records_completions(self):
+        tasks = [self._task(status='in_progress', quantity_completed=90) for _ in range(3)]
+
+        TaskQuantityService.batch_update_quantity(
+            self.admin, [task.id for task in tasks], [10, 10, 5], [0, 0, 0]
+        )
+
+        row = OperatorPerformance.objects.get(operator=self.operator, task_type='printing')
+        self.assertEqual(row.task_count, 2)
+        self.assertEqual(row.success_count, 2)
+
+        # 重新打开的任务再次完成不重复计入
+        WorkOrderTask.objects.filter(pk=tasks[0].pk).update(
+            status='in_progress', quantity_completed=90
+        )
+        TaskQuantityService.batch_update_quantity(self.admin, [tasks[0].id], [10], [0])
+        row.refresh_from_db()
+        self.assertEqual(row.task_count, 2)
+
+    def test_rebuild_uses_completion_time(self):
+        task = self._task(status='completed', quantity_completed=100)
+        completed_at = task.created_at + timedelta(hours=3)
+        WorkOrderTask.objects.filter(pk=task.pk).update(
+            completed_at=completed_at, updated_at=completed_at + timedelta(days=2)
+        )
+        self._task(status='completed', task_type='cutting')
+        WorkOrderTask.objects.filter(task_type='cutting').update(completed_at=None)
+
+        self.assertEqual(OperatorPerformanceStore.rebuild(), 2)
+
+        row = OperatorPerformance.objects.get(operator=self.operator, task_type='printing')
+        self.assertEqual((row.task_count, row.duration_count), (1, 1))
+        self.assertAlmostEqual(row.duration_mean, 3.0)
+        row = OperatorPerformance.objects.get(operator=self.operator, task_type='cutting')
+        self.assertEqual((row.task_count, row.duration_count), (1, 0))
+
+    def test_get_stats_reads_operators_in_one_query(self):
+        other = User.objects.create_user(username='perf_op2', password='pass')
+        OperatorPerformanceStore.record(self.operator.id, 'printing', success=True)
+        OperatorPerformanceStore.record(other.id, 'cutting', success=True)
+        OperatorPerformanceStore.record(other.id, 'printing', success=False)
+
+        with self.assertNumQueries(1):
+            stats = OperatorPerformanceStore.get_stats([self.operator.id, other.id], ['printing'])
+
+        self.assertEqual(set(stats), {(self.operator.id, 'printing'), (other.id, 'printing')})
+        self.assertEqual(stats[(other.id, 'printing')].success_count, 0)
@@ -0,0 +1,99 @@
+"""
+操作员选择器测试
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from workorder.models.base import Customer, Department, Process
+from workorder.models.core import WorkOrder, WorkOrderProcess, WorkOrderTask
+from workorder.models.system import UserProfile
+from workorder.services.operator_selection import OperatorSelector
+
+
+class OperatorSelectorTest(TestCase):
+    """批量选择操作员"""
+
+    def setUp(self):
+        cache.clear()
+        self.department = Department.objects.create(name='制版部', code='sel_ctp')
+        self.process = Process.objects.create(name='选择器工序', code='SEL')
+        self.operators = []
+        for index in range(3):
+            user = User.objects.create_user(username=f'sel_op_{index}', password='pass')
+            UserProfile.objects.create(user=user).departments.add(self.department)
+            self.operators.append(user)
+
+        customer = Customer.objects.create(name='选择器客户')
+        order = WorkOrder.objects.create(
+            customer=customer,
+            delivery_date=timezone.localdate() + timedelta(days=3),
+        )
+        self.work_order_process = WorkOrderProcess.objects.create(
+            work_order=order, process=self.process
+        )
+
+    def _add_open_tasks(self, operator, count):
+        for _ in range(count):
+            WorkOrderTask.objects.create(
+                work_order_process=self.work_order_process,
+                work_content='已有任务',
+                assigned_department=self.department,
+                assigned_operator=operator,
+                status='pending',
+            )
+
+    def test_least_tasks_balances_batch_with_constant_queries(self):
+        self._add_open_tasks(self.operators[0], 2)
+        selector = OperatorSelector()
+
+        with CaptureQueriesContext(connection) as ctx:
+            picks = []
+            for _ in range(6):
+                operator = selector.select(self.department, 'least_tasks')
+                selector.record_assignment(operator)
+                picks.append(operator)
+
+        # 候选操作员 + 负载聚合，各一次
+        self.assertEqual(len(ctx.captured_queries), 2)
+        # 初始负载 2/0/0，分派 6 个后为 3/3/2 一类的均衡分布
+        loads = [selector.get_load(user) for user in self.operators]
+        self.assertEqual(sum(loads), 8)
+        self.assertLessEqual(max(loads) - min(loads), 1)
+        self.assertEqual(picks[0], self.operators[1])
+
+    def test_round_robin_rotates_across_selectors(self):
+        picks = [
+            OperatorSelector().select(self.department, 'round_robin') for _ in range(4)
+        ]
+
+        self.assertEqual(
+            picks,
+            [self.operators[0], self.operators[1], self.operators[2], self.operators[0]],
+        )
+
+    def test_auto_assign_spreads_batch_across_operators(self):
+        self.work_order_process.department = self.department
+        self.work_order_process.save()
+
+        selector = OperatorSelector()
+        for index in range(3):
+            task = WorkOrderTask.objects.create(
+                work_order_process=self.work_order_process,
+                work_content=f'批量任务{index}',
+                status='pending',
+            )
+            self.work_order_process._auto_assign_task(task, selector)
+
+        assigned = set(
+            WorkOrderTask.objects.filter(
+                work_order_process=self.work_order_process
+            ).values_list('assigned_operator_id', flat=True)
+        )
+        self.assertEqual(assigned, {user.id for user in self.operators})
+
@@ -0,0 +1,100 @@
+"""
+游标分页测试
+"""
+import io
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from workorder.models.system import Notification
+
+
+class KeysetCursorPaginationTest(TestCase):
+    """?pagination=cursor 按 (created_at, id) 游标翻页"""
+
+    URL = '/api/v1/notifications/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cursor_user', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        now = timezone.now()
+        notifications = Notification.objects.bulk_create(
+            [
+                Notification(
+                    recipient=self.user,
+                    notification_type='system',
+                    title=f'通知{index}',
+                    content='内容',
+                )
+                for index in range(7)
+            ]
+        )
+        # 前三条创建时间相同，验证 id 作为第二排序键
+        for index, notification in enumerate(notifications):
+            created_at = now - timedelta(minutes=max(index, 2))
+            Notification.objects.filter(pk=notification.pk).update(created_at=created_at)
+        self.expected_ids = list(
+            Notification.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def _get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['success'])
+        return response.data['data']
+
+    def test_walks_all_pages_without_duplicates(self):
+        page = self._get(self.URL, pagination='cursor', page_size=3)
+        self.assertIsNone(page['count'])
+        self.assertIsNone(page['previous'])
+
+        seen = [item['id'] for item in page['results']]
+        while page['next']:
+            page = self._get(page['next'])
+            seen.extend(item['id'] for item in page['results'])
+        self.assertEqual(seen, self.expected_ids)
+
+    def test_previous_link_returns_preceding_page(self):
+        first = self._get(self.URL, pagination='cursor', page_size=3)
+        second = self._get(first['next'])
+        back = self._get(second['previous'])
+        self.assertEqual(
+            [item['id'] for item in back['results']],
+            [item['id'] for item in first['results']],
+        )
+
+    def test_count_options(self):
+        exact = self._get(self.URL, pagination='cursor', count='exact')
+        self.assertEqual(exact['count'], 7)
+        self.assertFalse(exact['count_is_approximate'])
+
+        # SQLite 没有统计信息估计值，回退为精确计数
+        approx = self._get(self.URL, pagination='cursor', count='approx')
+        self.assertEqual(approx['count'], 7)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(self.URL, {'pagination': 'cursor', 'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_mode_is_default(self):
+        page = self._get(self.URL, page=2, page_size=3)
+        self.assertEqual(page['count'], 7)
+        self.assertEqual([item['id'] for item in page['results']], self.expected_ids[3:6])
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command(
+            'benchmark_pagination', model='notification', page=3, page_size=3,
+            repeat=1, format='json', stdout=out,
+        )
+        result = json.loads(out.getvalue())
+        self.assertEqual(result['page_number']['row_count'], 1)
+        self.assertEqual(result['cursor']['row_count'], 1)
+        self.assertEqual(result['cursor']['query_count'], 1)
@@ -261,3 +261,171 @@ class PerformanceTestCase(TestCase):
 
         # Verify we got data for all operators
         self.assertGreaterEqual(len(response.data['data']['results']), 6)
+
+
+class WorkOrderListQueryCountTestCase(TestCase):
+    """施工单列表模式：查询数量不随每页行数增长"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from workorder.models.base import Customer
+        from workorder.models.core import WorkOrderProduct
+        from workorder.models.products import Product
+
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            username='list_admin', password='pass', email='admin@example.com'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+        self.customer = Customer.objects.create(
+            name='List Customer', salesperson=self.admin
+        )
+        self.process = Process.objects.create(name='List Process', code='LIST_P')
+        self.products = [
+            Product.objects.create(name=f'List Product {i}', code=f'LIST{i:03d}')
+            for i in range(2)
+        ]
+        self._product_model = WorkOrderProduct
+
+    def _create_orders(self, count):
+        for _ in range(count):
+            order = WorkOrder.objects.create(
+                customer=self.customer,
+                created_by=self.admin,
+                manager=self.admin,
+                delivery_date=timezone.localdate() + timedelta(days=7),
+            )
+            for index, product in enumerate(self.products):
+                self._product_model.objects.create(
+                    work_order=order, product=product, quantity=10, sort_order=index
+                )
+            for sequence, process_status in enumerate(['completed', 'pending']):
+                wop = WorkOrderProcess.objects.create(
+                    work_order=order,
+                    process=self.process,
+                    sequence=sequence,
+                    status=process_status,
+                )
+                WorkOrderTask.objects.create(
+                    work_order_process=wop,
+                    work_content='draft task',
+                    status='draft',
+                )
+
+    def _list_query_count(self, page_size):
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/v1/workorders/?page_size={page_size}')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.data['data']['results']
+
+    def test_list_query_count_is_constant(self):
+        """每页 2 行与每页 12 行的查询数量相同"""
+        self._create_orders(2)
+        small_count, small_results = self._list_query_count(page_size=2)
+
+        self._create_orders(10)
+        large_count, large_results = self._list_query_count(page_size=12)
+
+        self.assertEqual(len(small_results), 2)
+        self.assertEqual(len(large_results), 12)
+        self.assertEqual(
+            small_count,
+            large_count,
+            f'List query count grows with page size: {small_count} -> {large_count}',
+        )
+        # 计数 + 列表 + 产品 prefetch
+        self.assertLessEqual(large_count, 3)
+
+    def test_list_annotations_match_model_values(self):
+        """注解结果与逐行计算结果一致"""
+        self._create_orders(1)
+        _, results = self._list_query_count(page_size=10)
+        row = results[0]
+        order = WorkOrder.objects.get(pk=row['id'])
+
+        self.assertEqual(row['progress_percentage'], order.get_progress_percentage())
+        self.assertEqual(row['product_name'], '2款拼版')
+        self.assertEqual(row['quantity'], 20)
+        self.assertEqual(row['unit'], '件')
+        self.assertEqual(row['draft_task_count'], 2)
+        self.assertEqual(row['total_task_count'], 2)
+
+
+class WorkOrderStatisticsTestCase(TestCase):
+    """施工单统计：数据库内计算与快照"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from workorder.models.base import Customer
+
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            username='stats_admin', password='pass', email='stats@example.com'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+        customer = Customer.objects.create(name='Stats Customer')
+        process = Process.objects.create(name='Stats Process', code='STATS_P')
+        start = timezone.now() - timedelta(hours=10)
+        for hours in (2, 4):
+            order = WorkOrder.objects.create(
+                customer=customer,
+                created_by=self.admin,
+                delivery_date=timezone.localdate() + timedelta(days=3),
+            )
+            WorkOrderProcess.objects.create(
+                work_order=order,
+                process=process,
+                status='completed',
+                actual_start_time=start,
+                actual_end_time=start + timedelta(hours=hours),
+            )
+
+    def test_statistics_computes_average_duration_in_database(self):
+        from django.test.utils import CaptureQueriesContext
+        from workorder.permission_utils import AuthzProfile
+
+        # 业务员判断读取缓存的授权画像（登录时已构建）
+        AuthzProfile.for_user(self.admin)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/v1/workorders/statistics/')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.data['data']
+        self.assertEqual(data['total_count'], 2)
+        self.assertEqual(data['upcoming_deadline_count'], 2)
+        self.assertEqual(data['efficiency_analysis']['process_completed'], 2)
+        self.assertEqual(data['efficiency_analysis']['avg_completion_time_hours'], 3.0)
+        # 10 个聚合查询，不再逐条加载已完成工序，也不再查询业务员组
+        self.assertLessEqual(len(ctx.captured_queries), 10)
+
+    def test_snapshot_served_within_staleness_bound(self):
+        from unittest import mock
+
+        from workorder.services import work_order_statistics
+        from workorder.services.work_order_statistics import WorkOrderStatisticsService
+
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {'total_count': len(calls)}
+
+        with mock.patch.object(work_order_statistics, 'connection', mock.Mock(in_atomic_block=False)):
+            first = WorkOrderStatisticsService.get_snapshot(self.admin, compute)
+            WorkOrderStatisticsService.bump_generation()
+            # 数据已变更，但仍在有界陈旧窗口内
+            stale = WorkOrderStatisticsService.get_snapshot(self.admin, compute, max_staleness=60)
+            fresh = WorkOrderStatisticsService.get_snapshot(self.admin, compute, max_staleness=0)
+            cached = WorkOrderStatisticsService.get_snapshot(self.admin, compute, max_staleness=0)
+
+        self.assertEqual(first, {'total_count': 1})
+        self.assertEqual(stale, {'total_count': 1})
+        self.assertEqual(fresh, {'total_count': 2})
+        self.assertEqual(cached, {'total_count': 2})
+        self.assertEqual(len(calls), 2)
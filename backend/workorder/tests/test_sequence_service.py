@@ -0,0 +1,109 @@
+"""
+单据编号分配测试
+"""
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from workorder.models.assets import FoilingPlate
+from workorder.models.base import Customer
+from workorder.models.core import WorkOrder
+from workorder.models.finance import Invoice
+from workorder.models.system import DocumentSequence
+from workorder.services import sequence_service
+from workorder.services.sequence_service import SequenceService
+from workorder.services.work_order_flow_service import WorkOrderFlowService
+
+
+class SequenceServiceTest(TestCase):
+    """计数器表原子分配与号段预分配"""
+
+    def setUp(self):
+        SequenceService.reset_blocks()
+        self.addCleanup(SequenceService.reset_blocks)
+        self.user = User.objects.create_user(username='seq_user', password='pass')
+        self.customer = Customer.objects.create(name='编号客户', salesperson=self.user)
+
+    def _create_work_order(self, **kwargs):
+        return WorkOrder.objects.create(
+            customer=self.customer,
+            created_by=self.user,
+            delivery_date=timezone.localdate() + timedelta(days=7),
+            **kwargs,
+        )
+
+    def test_counter_seeded_from_existing_numbers(self):
+        period = datetime.now().strftime('%Y%m')
+        self._create_work_order(order_number=f'{period}041')
+        self._create_work_order(order_number=f'{period}007-补')
+
+        self.assertEqual(self._create_work_order().order_number, f'{period}042')
+
+        with CaptureQueriesContext(connection) as queries:
+            order_number = WorkOrder.generate_order_number()
+        self.assertEqual(order_number, f'{period}043')
+        self.assertFalse(any('FOR UPDATE' in q['sql'] for q in queries.captured_queries))
+        self.assertFalse(
+            any('"workorder_workorder"' in q['sql'] for q in queries.captured_queries)
+        )
+        self.assertEqual(
+            DocumentSequence.objects.get(prefix='', period=period).last_value, 43
+        )
+
+    def test_flow_service_numbers_do_not_collide(self):
+        today = timezone.now().strftime('%Y%m%d')
+        first = WorkOrderFlowService._generate_order_number()
+        second = WorkOrderFlowService._generate_order_number()
+
+        self.assertEqual(first, f'WO{today}001')
+        self.assertEqual(second, f'WO{today}002')
+
+    @override_settings(DOCUMENT_SEQUENCE_BLOCK_SIZES={'TST': 5})
+    def test_block_preallocation(self):
+        with mock.patch.object(
+            sequence_service, 'connection', mock.Mock(in_atomic_block=False)
+        ):
+            first = SequenceService.next_number('TST', '202601', 3)
+            with CaptureQueriesContext(connection) as queries:
+                rest = [SequenceService.next_number('TST', '202601', 3) for _ in range(4)]
+            sixth = SequenceService.next_number('TST', '202601', 3)
+
+        self.assertEqual(first, 'TST202601001')
+        self.assertEqual(rest, [f'TST202601{n:03d}' for n in range(2, 6)])
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(sixth, 'TST202601006')
+        self.assertEqual(
+            DocumentSequence.objects.get(prefix='TST', period='202601').last_value, 10
+        )
+
+        # 事务内号段用完时不领取新号段，只递增一个序号
+        SequenceService.reset_blocks()
+        self.assertEqual(SequenceService.next_number('TST', '202601', 3), 'TST202601011')
+        self.assertEqual(
+            DocumentSequence.objects.get(prefix='TST', period='202601').last_value, 11
+        )
+
+    @override_settings(DOCUMENT_SEQUENCE_BLOCK_SIZES={'FP': 5})
+    def test_shared_prefix_blocks_do_not_evict_each_other(self):
+        with mock.patch.object(
+            sequence_service, 'connection', mock.Mock(in_atomic_block=False)
+        ), mock.patch.object(SequenceService, 'get_existing_max', return_value=0):
+            first_plate = SequenceService.next_number('FP', '202601', 3, FoilingPlate, 'code')
+            first_invoice = SequenceService.next_number(
+                'FP', '20260115', 4, Invoice, 'invoice_number'
+            )
+            # 交替分配时各自的号段都还在，不再领取新号段
+            with CaptureQueriesContext(connection) as queries:
+                second_plate = SequenceService.next_number('FP', '202601', 3, FoilingPlate, 'code')
+                second_invoice = SequenceService.next_number(
+                    'FP', '20260115', 4, Invoice, 'invoice_number'
+                )
+
+        self.assertEqual((first_plate, second_plate), ('FP202601001', 'FP202601002'))
+        self.assertEqual((first_invoice, second_invoice), ('FP202601150001', 'FP202601150002'))
+        self.assertEqual(len(queries), 0)
@@ -0,0 +1,44 @@
+"""
+智能分派评分测试
+"""
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from workorder.services.smart_assignment import SmartAssignmentService
+
+
+class LazyNumpyImportTest(SimpleTestCase):
+    """导入模块不加载 NumPy"""
+
+    def test_module_import_does_not_load_numpy(self):
+        code = (
+            "import sys, django; django.setup(); "
+            "import workorder.services.smart_assignment; "
+            "print('numpy' in sys.modules)"
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [sys.executable, '-c', code],
+            capture_output=True,
+            text=True,
+            env=env,
+            cwd=settings.BASE_DIR,
+            check=True,
+        )
+        self.assertEqual(result.stdout.strip().splitlines()[-1], 'False')
+
+
+class PriorityScoreTest(SimpleTestCase):
+    """优先级与交期紧急度评分"""
+
+    def test_priority_score_with_and_without_deadline(self):
+        score = SmartAssignmentService.calculate_priority_score
+        self.assertEqual(score(None, 'urgent', 1), 2.0)
+        self.assertAlmostEqual(score(None, 'low', 30), 1.2)
+        # 没有交货日期时紧急系数为 1.0
+        self.assertAlmostEqual(score(None, 'normal'), 1.6)
+        self.assertAlmostEqual(score(None, 'unknown', 5), 1.6)
@@ -0,0 +1,145 @@
+"""
+库存台账测试
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from workorder.exceptions import InsufficientStockError
+from workorder.models.inventory import ProductStock
+from workorder.models.materials import Material
+from workorder.models.products import Product, ProductStockLog, ProductStockSnapshot
+from workorder.services.data_consistency import DataConsistencyManager
+from workorder.services.inventory_service import InventoryService
+from workorder.services.stock_ledger import StockLedger, StockMovement
+
+
+class StockLedgerTest(TestCase):
+    """原子加减、批量日志、台账快照"""
+
+    def setUp(self):
+        cache.clear()
+        self.first = Product.objects.create(code='LEDGER-1', name='台账产品1', stock_quantity=100)
+        self.second = Product.objects.create(code='LEDGER-2', name='台账产品2', stock_quantity=10)
+
+    def _stock(self, product):
+        return Product.objects.values_list('stock_quantity', flat=True).get(pk=product.pk)
+
+    def test_batch_is_one_update_with_ordered_logs(self):
+        movements = [
+            StockMovement(self.first.pk, 20, '入库'),
+            StockMovement(self.second.pk, -4, '出库'),
+            StockMovement(self.first.pk, -50, '出库'),
+        ]
+
+        with CaptureQueriesContext(connection) as ctx:
+            products = StockLedger.apply_product_movements(movements)
+
+        updates = [
+            query for query in ctx.captured_queries
+            if query['sql'].startswith('UPDATE "workorder_product"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(products[self.first.pk].stock_quantity, 70)
+        self.assertEqual(self._stock(self.second), 6)
+        logs = ProductStockLog.objects.filter(product=self.first).order_by('id')
+        self.assertEqual(
+            [(log.change_type, log.quantity, log.old_quantity, log.new_quantity) for log in logs],
+            [('add', 20, 100, 120), ('reduce', -50, 120, 70)],
+        )
+
+    def test_shortage_rolls_back_whole_batch(self):
+        with self.assertRaises(InsufficientStockError) as context:
+            StockLedger.apply_product_movements([
+                StockMovement(self.first.pk, -30),
+                StockMovement(self.second.pk, -11),
+            ])
+
+        self.assertEqual(context.exception.shortages, {self.second.pk: (10, 11)})
+        self.assertEqual(self._stock(self.first), 100)
+        self.assertFalse(ProductStockLog.objects.exists())
+
+    def test_skipped_row_without_shortage_is_retried_under_lock(self):
+        real_update = QuerySet.update
+        calls = []
+
+        def skipped_once(queryset, **kwargs):
+            calls.append(queryset.model)
+            if len(calls) == 1:
+                # 模拟扣减条件检查时被并发变动跳过，复查时库存已充足
+                return 0
+            return real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', skipped_once), \
+                self.assertNoLogs('workorder.services.stock_ledger', level='WARNING'):
+            StockLedger.apply_product_movements([StockMovement(self.second.pk, -4)])
+
+        self.assertEqual(self._stock(self.second), 6)
+        self.assertEqual(
+            list(ProductStockLog.objects.values_list('old_quantity', 'new_quantity')), [(10, 6)]
+        )
+
+    def test_stale_instances_do_not_lose_updates(self):
+        stale = Product.objects.get(pk=self.first.pk)
+        self.first.add_stock(10)
+        stale.add_stock(5)
+        stale.reduce_stock(3)
+
+        self.assertEqual(self._stock(self.first), 112)
+        self.assertEqual(stale.stock_quantity, 112)
+        with self.assertRaisesMessage(ValueError, '库存不足：当前库存112，需要500'):
+            self.first.reduce_stock(500)
+
+    def test_inventory_service_and_reserve(self):
+        material = Material.objects.create(code='LEDGER-M', name='台账物料', stock_quantity=5)
+        InventoryService.add_stock(material, 2)
+        with self.assertRaises(InsufficientStockError):
+            InventoryService.reduce_stock(material, 8)
+        material.refresh_from_db()
+        self.assertEqual(material.stock_quantity, 7)
+
+        stock = ProductStock.objects.create(product=self.first, quantity=10, batch_no='LEDGER-B1')
+        self.assertFalse(stock.reserve(11))
+        self.assertTrue(stock.reserve(4))
+        self.assertEqual((stock.quantity, stock.status), (6, 'reserved'))
+
+    def test_consistency_check_uses_snapshot_and_later_logs(self):
+        StockLedger.apply_product_movements([
+            StockMovement(self.first.pk, -100),
+            StockMovement(self.first.pk, 100),
+            StockMovement(self.second.pk, 5),
+        ])
+        ProductStockLog.objects.create(
+            product=self.first, change_type='add', quantity=100, old_quantity=0, new_quantity=100
+        )
+        ProductStockLog.objects.create(
+            product=self.second, change_type='add', quantity=10, old_quantity=0, new_quantity=10
+        )
+
+        with mock.patch.object(StockLedger, 'SNAPSHOT_LAG', timedelta(0)):
+            # 默认只读，不写快照
+            DataConsistencyManager.run_consistency_check('stock')
+            self.assertFalse(ProductStockSnapshot.objects.exists())
+            result = DataConsistencyManager._check_stock_consistency(take_snapshots=True)
+        self.assertEqual(result['inconsistent_count'], 0)
+        snapshot = ProductStockSnapshot.objects.get(product=self.first)
+        self.assertEqual((snapshot.balance, snapshot.log_count), (100, 3))
+
+        # 快照之后的变动与被绕过台账的修改
+        self.first.reduce_stock(40)
+        Product.objects.filter(pk=self.second.pk).update(stock_quantity=99)
+
+        self.assertEqual(
+            StockLedger.ledger_balances(),
+            {self.first.pk: (60, 4), self.second.pk: (15, 2)},
+        )
+        result = DataConsistencyManager._check_stock_consistency()
+        self.assertEqual(
+            [item['product'] for item in result['inconsistent_products']], [self.second]
+        )
+
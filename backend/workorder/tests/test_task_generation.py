@@ -0,0 +1,119 @@
+"""
+正式任务批量生成测试
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from workorder.models.assets import Artwork, Die, EmbossingPlate, FoilingPlate
+from workorder.models.base import Customer, Department, Process
+from workorder.models.core import WorkOrder, WorkOrderProcess, WorkOrderProduct
+from workorder.models.products import Product
+from workorder.models.system import Notification, UserProfile, WorkOrderProcessProgress
+
+# 生成 200 个任务的查询预算：与任务数量无关
+QUERY_BUDGET = 40
+
+
+class TaskGenerationTest(TestCase):
+    """整批构建、分派、写入任务"""
+
+    def setUp(self):
+        cache.clear()
+        self.ctp, _ = Process.objects.get_or_create(code='CTP', defaults={'name': '制版'})
+        self.pack, _ = Process.objects.get_or_create(code='PACK', defaults={'name': '包装'})
+        self.department = Department.objects.create(name='批量生成部', code='gen_prod')
+        self.department.processes.add(self.ctp, self.pack)
+        self.operators = []
+        for index in range(4):
+            user = User.objects.create_user(username=f'gen_op_{index}', password='pass')
+            UserProfile.objects.create(user=user).departments.add(self.department)
+            self.operators.append(user)
+
+        self.work_order = WorkOrder.objects.create(
+            customer=Customer.objects.create(name='生成客户'),
+            production_quantity=1000,
+            delivery_date=timezone.localdate() + timedelta(days=5),
+        )
+
+    def _generate(self, process):
+        work_order_process = WorkOrderProcess.objects.create(
+            work_order=self.work_order, process=process, department=self.department
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            tasks = work_order_process.generate_tasks()
+        return work_order_process, tasks, len(ctx.captured_queries)
+
+    def test_large_ctp_order_uses_fixed_query_budget(self):
+        self.work_order.artworks.set(
+            Artwork.objects.bulk_create(
+                Artwork(base_code=f'GEN{index:03d}', name=f'图稿{index}') for index in range(50)
+            )
+        )
+        self.work_order.dies.set(
+            Die.objects.bulk_create(
+                Die(code=f'GEN-D{index:03d}', name=f'刀模{index}') for index in range(50)
+            )
+        )
+        self.work_order.foiling_plates.set(
+            FoilingPlate.objects.bulk_create(
+                FoilingPlate(code=f'GEN-F{index:03d}', name=f'烫金版{index}') for index in range(50)
+            )
+        )
+        self.work_order.embossing_plates.set(
+            EmbossingPlate.objects.bulk_create(
+                EmbossingPlate(code=f'GEN-E{index:03d}', name=f'压凸版{index}')
+                for index in range(50)
+            )
+        )
+
+        work_order_process, tasks, queries = self._generate(self.ctp)
+
+        self.assertEqual(len(tasks), 200)
+        self.assertLessEqual(queries, QUERY_BUDGET)
+        self.assertEqual({task.task_type for task in tasks}, {'plate_making'})
+        self.assertEqual(work_order_process.tasks.filter(status='pending').count(), 200)
+        # 操作员负载在批内累加：least_tasks 平均分摊
+        loads = Counter(task.assigned_operator_id for task in work_order_process.tasks.all())
+        self.assertEqual(loads, {operator.id: 50 for operator in self.operators})
+        self.assertEqual(
+            WorkOrderProcessProgress.objects.get(work_order_process=work_order_process).tasks_total,
+            200,
+        )
+
+    def test_large_pack_order_uses_fixed_query_budget(self):
+        products = Product.objects.bulk_create(
+            Product(name=f'产品{index}', code=f'GEN-P{index:03d}') for index in range(200)
+        )
+        WorkOrderProduct.objects.bulk_create(
+            WorkOrderProduct(work_order=self.work_order, product=product, quantity=index + 1)
+            for index, product in enumerate(products)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            work_order_process, tasks, queries = self._generate(self.pack)
+
+        self.assertEqual(len(tasks), 200)
+        self.assertLessEqual(queries, QUERY_BUDGET)
+        task = work_order_process.tasks.get(product=products[9])
+        self.assertEqual(task.work_content, '产品9包装')
+        self.assertEqual(task.production_quantity, 10)
+        self.assertEqual(task.assigned_department, self.department)
+        # 分派通知在提交时批量写入；部门成员收到全部 200 个任务的通知，合并为一条摘要
+        notification = Notification.objects.get(recipient=task.assigned_operator)
+        self.assertTrue(notification.data['digest'])
+        self.assertEqual(notification.title, '您有 200 条新通知')
+
+    def test_existing_tasks_are_not_regenerated(self):
+        other = Process.objects.create(name='其他', code='GEN_OTHER')
+        work_order_process, tasks, _ = self._generate(other)
+
+        self.assertEqual(len(tasks), 1)
+        self.assertEqual(work_order_process.generate_tasks(), [])
+        self.assertEqual(work_order_process.tasks.count(), 1)
@@ -0,0 +1,184 @@
+"""
+任务数量批量更新测试
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from workorder.models.base import Customer, Process
+from workorder.models.core import TaskLog, WorkOrder, WorkOrderProcess, WorkOrderTask
+
+URL = '/api/v1/workorder-tasks/batch_update_quantity/'
+
+
+class BatchUpdateQuantityTest(TestCase):
+    """按集合批量更新任务数量"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            username='qty_admin', password='pass', email='qty@example.com'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+        customer = Customer.objects.create(name='扫码客户')
+        self.work_order = WorkOrder.objects.create(
+            customer=customer,
+            created_by=self.admin,
+            delivery_date=timezone.localdate() + timedelta(days=3),
+        )
+        self.processes = [
+            WorkOrderProcess.objects.create(
+                work_order=self.work_order,
+                process=Process.objects.create(name=f'扫码工序{index}', code=f'SCAN{index}'),
+                sequence=index,
+            )
+            for index in range(2)
+        ]
+
+    def _create_tasks(self, count, process=None, **kwargs):
+        defaults = {
+            'work_content': '扫码任务',
+            'production_quantity': 100,
+            'quantity_completed': 10,
+            'status': 'in_progress',
+        }
+        defaults.update(kwargs)
+        WorkOrderTask.objects.bulk_create(
+            WorkOrderTask(work_order_process=process or self.processes[0], **defaults)
+            for _ in range(count)
+        )
+        return list(
+            WorkOrderTask.objects.filter(
+                work_order_process=process or self.processes[0]
+            ).order_by('id')
+        )
+
+    def test_200_task_scan_uses_constant_queries(self):
+        tasks = self._create_tasks(200)
+        task_ids = [task.id for task in tasks]
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                URL,
+                {'task_ids': task_ids, 'quantity_increment': 5, 'quantity_defective': 1},
+                format='json',
+            )
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['data']['updated_count'], 200)
+        # 锁定读取、bulk_update、bulk_create（SQLite 按参数上限分批）、审计配置与保存点，
+        # 与任务数量无关
+        self.assertLessEqual(len(ctx.captured_queries), 10)
+        self.assertEqual(
+            set(
+                WorkOrderTask.objects.filter(id__in=task_ids).values_list(
+                    'quantity_completed', 'quantity_defective', 'version'
+                )
+            ),
+            {(15, 1, 2)},
+        )
+        self.assertEqual(TaskLog.objects.filter(task_id__in=task_ids).count(), 200)
+
+    def test_completion_checks_each_process_once(self):
+        first = self._create_tasks(2, self.processes[0], quantity_completed=90)
+        second = self._create_tasks(1, self.processes[1], quantity_completed=90)
+        task_ids = [task.id for task in first + second]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                URL,
+                {'task_ids': task_ids, 'quantity_increment': {str(i): 10 for i in task_ids}},
+                format='json',
+            )
+
+        self.assertEqual(response.data['data']['updated_count'], 3)
+        self.assertEqual(
+            set(WorkOrderTask.objects.filter(id__in=task_ids).values_list('status', flat=True)),
+            {'completed'},
+        )
+        for process in self.processes:
+            process.refresh_from_db()
+            self.assertEqual(process.status, 'completed')
+
+    def test_version_conflict_and_overflow_fail_per_task(self):
+        tasks = self._create_tasks(3)
+        task_ids = [task.id for task in tasks]
+
+        response = self.client.post(
+            URL,
+            {
+                'task_ids': task_ids,
+                'quantity_increment': [5, 5, 500],
+                'versions': {str(task_ids[0]): 99},
+            },
+            format='json',
+        )
+
+        data = response.data['data']
+        self.assertEqual(data['updated_task_ids'], [task_ids[1]])
+        self.assertEqual([item['task_id'] for item in data['failed_tasks']], [task_ids[0], task_ids[2]])
+
+    def test_invalid_quantities_fail_per_task(self):
+        tasks = self._create_tasks(4)
+        task_ids = [task.id for task in tasks]
+
+        response = self.client.post(
+            URL,
+            {
+                'task_ids': task_ids,
+                'quantity_increment': ['abc', None, '5', 5],
+                'quantity_defective': [0, 0, 0, 'x'],
+            },
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.data['data']
+        self.assertEqual(data['updated_task_ids'], [task_ids[2]])
+        self.assertEqual(
+            [item['task_id'] for item in data['failed_tasks']],
+            [task_ids[0], task_ids[1], task_ids[3]],
+        )
+        self.assertEqual(WorkOrderTask.objects.get(id=task_ids[2]).quantity_completed, 15)
+
+    def test_string_ids_and_missing_tasks(self):
+        tasks = self._create_tasks(2)
+        missing_id = tasks[-1].id + 1000
+
+        response = self.client.post(
+            URL,
+            {
+                'task_ids': [str(tasks[0].id), tasks[1].id, missing_id],
+                'quantity_increment': {str(tasks[0].id): 1, str(tasks[1].id): 2, str(missing_id): 3},
+            },
+            format='json',
+        )
+
+        data = response.data['data']
+        self.assertEqual(data['updated_task_ids'], [tasks[0].id, tasks[1].id])
+        self.assertEqual(data['failed_tasks'], [{'task_id': missing_id, 'error': '任务不存在'}])
+
+        response = self.client.post(
+            URL, {'task_ids': ['abc'], 'quantity_increment': 1}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_unauthorized_user_is_rejected(self):
+        tasks = self._create_tasks(1)
+        other = User.objects.create_user(username='qty_other', password='pass')
+        self.client.force_authenticate(user=other)
+
+        response = self.client.post(
+            URL, {'task_ids': [tasks[0].id], 'quantity_increment': 1}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(WorkOrderTask.objects.get(id=tasks[0].id).quantity_completed, 10)
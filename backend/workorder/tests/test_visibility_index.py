@@ -0,0 +1,124 @@
+"""
+施工单可见性索引测试
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from workorder.models.base import Customer, Department, Process
+from workorder.models.core import WorkOrder, WorkOrderProcess, WorkOrderTask
+from workorder.models.system import UserProfile
+from workorder.services.visibility_index import WorkOrderVisibilityIndex
+
+
+class WorkOrderVisibilityIndexTest(TestCase):
+    """可见性索引的构建与增量维护"""
+
+    def setUp(self):
+        cache.clear()
+        self.department = Department.objects.create(name='印刷部', code='vis_print')
+        self.other_department = Department.objects.create(name='模切部', code='vis_die')
+
+        self.member = User.objects.create_user(username='vis_member', password='pass')
+        profile = UserProfile.objects.create(user=self.member)
+        profile.departments.add(self.department)
+        ct = ContentType.objects.get_for_model(WorkOrder)
+        self.member.user_permissions.add(
+            Permission.objects.get(codename='change_workorder', content_type=ct)
+        )
+
+        self.creator = User.objects.create_user(username='vis_creator', password='pass')
+        self.customer = Customer.objects.create(name='可见性客户')
+        self.process = Process.objects.create(name='可见性工序', code='VIS')
+
+    def _create_order_with_task(self, department):
+        order = WorkOrder.objects.create(
+            customer=self.customer,
+            created_by=self.creator,
+            delivery_date=timezone.localdate() + timedelta(days=3),
+        )
+        wop = WorkOrderProcess.objects.create(work_order=order, process=self.process)
+        task = WorkOrderTask.objects.create(
+            work_order_process=wop,
+            work_content='任务',
+            assigned_department=department,
+        )
+        return order, task
+
+    def test_department_member_sees_assigned_orders(self):
+        visible, _ = self._create_order_with_task(self.department)
+        hidden, _ = self._create_order_with_task(self.other_department)
+
+        ids = WorkOrderVisibilityIndex.get_visible_ids(self.member)
+
+        self.assertIn(visible.id, ids)
+        self.assertNotIn(hidden.id, ids)
+
+    def test_creator_scope(self):
+        order, _ = self._create_order_with_task(None)
+
+        self.assertEqual(
+            WorkOrderVisibilityIndex.get_visible_ids(self.creator), [order.id]
+        )
+
+    def _scope_ids(self, scope, scope_id):
+        # TestCase 的测试都在事务内，模拟事务外读取以经过缓存
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            return WorkOrderVisibilityIndex.get_scope_ids(scope, scope_id)
+
+    def test_task_reassignment_updates_cached_index(self):
+        order, task = self._create_order_with_task(self.other_department)
+        dept = WorkOrderVisibilityIndex.SCOPE_DEPARTMENT
+        self.assertEqual(self._scope_ids(dept, self.department.id), [])
+        self.assertEqual(self._scope_ids(dept, self.other_department.id), [order.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.assigned_department = self.department
+            task.save()
+
+        self.assertEqual(self._scope_ids(dept, self.department.id), [order.id])
+        self.assertEqual(self._scope_ids(dept, self.other_department.id), [])
+
+    def test_rebuild_racing_invalidation_is_not_published(self):
+        order, task = self._create_order_with_task(None)
+        dept = WorkOrderVisibilityIndex.SCOPE_DEPARTMENT
+        scope_cache = WorkOrderVisibilityIndex._scope_cache(dept, self.department.id)
+        # 提交前开始的重建：先取得键，写入时失效已经发生
+        stale_key = scope_cache.key('ids')
+        with self.captureOnCommitCallbacks(execute=True):
+            task.assigned_department = self.department
+            task.save()
+        cache.set(stale_key, [])
+
+        self.assertEqual(self._scope_ids(dept, self.department.id), [order.id])
+
+    def test_salesperson_change_moves_orders(self):
+        order, _ = self._create_order_with_task(None)
+        old_salesperson = User.objects.create_user(username='vis_sales_old')
+        new_salesperson = User.objects.create_user(username='vis_sales_new')
+        self.customer.salesperson = old_salesperson
+        self.customer.save()
+        customer = Customer.objects.get(pk=self.customer.pk)
+
+        sales = WorkOrderVisibilityIndex.SCOPE_SALESPERSON
+        self.assertEqual(self._scope_ids(sales, old_salesperson.id), [order.id])
+        self.assertEqual(self._scope_ids(sales, new_salesperson.id), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            customer.salesperson = new_salesperson
+            customer.save()
+
+        self.assertEqual(self._scope_ids(sales, old_salesperson.id), [])
+        self.assertEqual(self._scope_ids(sales, new_salesperson.id), [order.id])
+
+    def test_merge_deduplicates_sorted_lists(self):
+        self.assertEqual(
+            WorkOrderVisibilityIndex._merge([[1, 3, 5], [2, 3, 6]]),
+            [1, 2, 3, 5, 6],
+        )
@@ -32,6 +32,7 @@ from .views.notification import (
     NotificationViewSet, SystemNotificationViewSet,
     UserNotificationSettingsViewSet, NotificationTemplateViewSet
 )
+from .views.export_jobs import ExportJobViewSet
 from .auth_views import (
     LoginView, LogoutView, TokenRefreshViewWithDocs, get_current_user, register_view,
     get_salespersons, get_users_by_department, change_password, update_profile
@@ -72,6 +73,7 @@ router.register(r'foiling-plate-products', FoilingPlateProductViewSet)
 router.register(r'embossing-plates', EmbossingPlateViewSet)
 router.register(r'embossing-plate-products', EmbossingPlateProductViewSet)
 router.register(r'audit-logs', AuditLogViewSet, basename='audit-log')
+router.register(r'export-jobs', ExportJobViewSet, basename='export-job')
 
 # 财务路由
 router.register(r'cost-centers', CostCenterViewSet, basename='cost-center')
@@ -3,6 +3,8 @@
 """
 from django.contrib.auth.models import User
 
+from .permission_utils import AuthzProfile
+
 
 def is_salesperson(user):
     """
@@ -24,7 +26,7 @@ def is_salesperson(user):
         except User.DoesNotExist:
             return False
     
-    return user.groups.filter(name='业务员').exists()
+    return AuthzProfile.for_user(user).is_salesperson
 
 
 def get_user_role(user):
@@ -15,6 +15,7 @@ from workorder.response import APIResponse
 from rest_framework.decorators import action
 from django.http import FileResponse
 
+from ..mixins import ReplicaReadMixin
 from ..models.audit import AuditLog, AuditLogExport
 from ..serializers.audit import (
     AuditLogSerializer,
@@ -27,7 +28,7 @@ from .base_viewsets import ReadOnlyBaseViewSet
 logger = logging.getLogger(__name__)
 
 
-class AuditLogViewSet(ReadOnlyBaseViewSet):
+class AuditLogViewSet(ReplicaReadMixin, ReadOnlyBaseViewSet):
     """
     审计日志视图集
 
@@ -46,6 +47,7 @@ class AuditLogViewSet(ReadOnlyBaseViewSet):
     search_fields = ['object_repr', 'username', 'ip_address']
     ordering_fields = ['created_at', 'action_type']
     ordering = ['-created_at']
+    replica_actions = ('list', 'statistics')
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -206,7 +208,9 @@ class AuditLogViewSet(ReadOnlyBaseViewSet):
         {
             "start_date": "2026-01-01",
             "end_date": "2026-01-31",
-            "filters": {...}
+            "filters": {...},
+            "file_format": "csv",   // csv 或 ndjson，默认 csv
+            "compressed": false     // 是否 gzip 压缩
         }
 
         返回：
@@ -223,6 +227,10 @@ class AuditLogViewSet(ReadOnlyBaseViewSet):
         start_date = request.data.get('start_date')
         end_date = request.data.get('end_date')
         filters = request.data.get('filters', {})
+        file_format = request.data.get('file_format', AuditLogExport.FORMAT_CSV)
+        if file_format not in dict(AuditLogExport.FORMAT_CHOICES):
+            return APIResponse.error(message='不支持的导出格式', code=status.HTTP_400_BAD_REQUEST)
+        compressed = str(request.data.get('compressed', False)).lower() in ('1', 'true')
 
         # 创建导出任务
         export_service = AuditExportService()
@@ -230,7 +238,9 @@ class AuditLogViewSet(ReadOnlyBaseViewSet):
             user=request.user,
             start_date=start_date,
             end_date=end_date,
-            filters=filters
+            filters=filters,
+            file_format=file_format,
+            compressed=compressed,
         )
         export_service.perform_export(str(export.id))
 
@@ -21,6 +21,7 @@ from workorder.docs.base import (
 )
 
 from ..models.base import Customer, Department, Process
+from ..permission_utils import AuthzProfile
 from ..serializers.base import CustomerSerializer, DepartmentSerializer, ProcessSerializer
 from .base_viewsets import BaseViewSet
 
@@ -43,19 +44,20 @@ class CustomerViewSet(BaseViewSet):
         - 如果有 view_customer 权限，返回所有客户（只读）
         """
         queryset = super().get_queryset()
+        authz = AuthzProfile.for_request(self.request)
 
         # 如果有编辑客户权限，返回所有客户
-        if self.request.user.has_perm("workorder.change_customer"):
+        if authz.has_perm("workorder.change_customer"):
             return queryset.select_related("salesperson")
 
         # 如果是业务员，只返回自己负责的客户
-        if self.request.user.groups.filter(name="业务员").exists():
+        if authz.is_salesperson:
             return queryset.filter(salesperson=self.request.user).select_related(
                 "salesperson"
             )
 
         # 如果有查看客户权限，返回所有客户（只读）
-        if self.request.user.has_perm("workorder.view_customer"):
+        if authz.has_perm("workorder.view_customer"):
             return queryset.select_related("salesperson")
 
         # 否则返回空查询集
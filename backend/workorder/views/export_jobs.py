@@ -0,0 +1,62 @@
+"""
+后台导出任务视图集
+
+大数据量 Excel 导出转为后台任务后，通过本视图集查询状态和下载文件：
+- GET /export-jobs/{job_id}/           查询任务状态
+- GET /export-jobs/{job_id}/download/  下载已完成的文件
+"""
+
+import os
+
+from django.http import FileResponse
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+
+from workorder.response import APIResponse
+
+from ..export_utils import EXCEL_CONTENT_TYPE, ExcelExportJob
+
+
+class ExportJobViewSet(viewsets.ViewSet):
+    """后台导出任务视图集"""
+
+    permission_classes = [IsAuthenticated]
+
+    def _get_job(self, request, pk):
+        job = ExcelExportJob.get_status(pk)
+        if job is None:
+            return None
+        if not request.user.is_superuser and job.get('user_id') != request.user.id:
+            return None
+        return job
+
+    def retrieve(self, request, pk=None):
+        job = self._get_job(request, pk)
+        if job is None:
+            return APIResponse.error(message='导出任务不存在或已过期', code=status.HTTP_404_NOT_FOUND)
+
+        data = {key: value for key, value in job.items() if key not in ('file_path', 'user_id')}
+        if job['status'] == ExcelExportJob.STATUS_COMPLETED:
+            data['download_url'] = f'/api/v1/export-jobs/{pk}/download/'
+        return APIResponse.success(data=data)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self._get_job(request, pk)
+        if job is None:
+            return APIResponse.error(message='导出任务不存在或已过期', code=status.HTTP_404_NOT_FOUND)
+
+        if job['status'] != ExcelExportJob.STATUS_COMPLETED:
+            return APIResponse.error(message='导出文件尚未就绪', code=status.HTTP_400_BAD_REQUEST)
+
+        file_path = job.get('file_path') or ''
+        if not os.path.exists(file_path):
+            return APIResponse.error(message='导出文件不存在', code=status.HTTP_404_NOT_FOUND)
+
+        return FileResponse(
+            open(file_path, 'rb'),
+            as_attachment=True,
+            filename=job['filename'],
+            content_type=EXCEL_CONTENT_TYPE,
+        )
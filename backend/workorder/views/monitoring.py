@@ -4,13 +4,16 @@
 提供性能监控、业务指标、系统健康检查等API
 """
 
+from datetime import timedelta
+
 from django.contrib.auth.models import User
-from django.db.models import Avg, Count, F, Sum
+from django.db.models import Count, Q, Sum
 from django.utils import timezone
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 
+from ..mixins import ReplicaReadMixin
 from ..response import APIResponse
 from workorder.docs.monitoring import (
     alert_settings_docs,
@@ -31,6 +34,7 @@ from workorder.docs.monitoring import (
     user_performance_docs,
     workorder_metrics_docs,
 )
+from ..services.metrics_timeseries import TimeSeriesMetrics
 from ..services.monitoring import (
     BusinessMetrics,
     PerformanceMonitor,
@@ -38,6 +42,26 @@ from ..services.monitoring import (
 )
 
 
+def _int_param(request, name, default, maximum):
+    """读取正整数查询参数，无效时使用默认值，超出上限时取上限"""
+    try:
+        value = int(request.query_params.get(name, default))
+    except (TypeError, ValueError):
+        return default
+    return min(max(value, 1), maximum)
+
+
+def _serialize_point(point):
+    """时间序列数据点转换为 JSON 友好格式"""
+    data = dict(point)
+    if "date" in data:
+        data["date"] = data["date"].isoformat()
+    if "hour" in data:
+        data["hour"] = data["hour"].isoformat()
+    data["process_hours"] = float(data["process_hours"])
+    return data
+
+
 class PerformanceMonitoringViewSet(viewsets.GenericViewSet):
     """性能监控视图集"""
 
@@ -104,10 +128,17 @@ class PerformanceMonitoringViewSet(viewsets.GenericViewSet):
         return APIResponse.success(data=endpoint_list, message="执行时间统计获取成功")
 
 
-class BusinessMetricsViewSet(viewsets.GenericViewSet):
+class BusinessMetricsViewSet(ReplicaReadMixin, viewsets.GenericViewSet):
     """业务指标视图集"""
 
     permission_classes = [IsAuthenticated]
+    replica_actions = (
+        "workorder_metrics",
+        "task_metrics",
+        "user_performance",
+        "productivity_trends",
+        "quality_metrics",
+    )
 
     @action(detail=False, methods=["get"])
     @workorder_metrics_docs
@@ -128,26 +159,25 @@ class BusinessMetricsViewSet(viewsets.GenericViewSet):
     @action(detail=False, methods=["get"])
     @user_performance_docs
     def user_performance(self, request):
-        """获取用户绩效指标"""
-        from datetime import timedelta
-
-        # 获取最近30天的用户绩效
-        end_date = timezone.now()
-        start_date = end_date - timedelta(days=30)
-
+        """获取用户绩效指标（一次分组查询）"""
         from ..models.core import WorkOrderTask
 
+        days = _int_param(request, "days", 30, TimeSeriesMetrics.MAX_DAYS)
+        start_date = timezone.now() - timedelta(days=days)
+
         user_stats = (
             WorkOrderTask.objects.filter(
-                created_at__gte=start_date, created_at__lte=end_date
+                created_at__gte=start_date,
+                assigned_operator__isnull=False,
+                assigned_operator__is_active=True,
             )
-            .values("assigned_to__username")
+            .values("assigned_operator__username")
             .annotate(
                 total_tasks=Count("id"),
-                completed_tasks=Count("id", filter=models.Q(status="completed")),
-                avg_completion_time=Avg(F("completed_at") - F("started_at")),
+                completed_tasks=Count("id", filter=Q(status="completed")),
+                completed_quantity=Sum("quantity_completed"),
+                defective_quantity=Sum("quantity_defective"),
             )
-            .filter(assigned_to__is_active=True)
             .order_by("-completed_tasks")[:20]
         )
 
@@ -158,62 +188,31 @@ class BusinessMetricsViewSet(viewsets.GenericViewSet):
     @action(detail=False, methods=["get"])
     @productivity_trends_docs
     def productivity_trends(self, request):
-        """获取生产力趋势"""
-        from datetime import timedelta
-
-        # 获取最近7天的每日数据
-        daily_data = []
-        for i in range(7):
-            date = (timezone.now() - timedelta(days=i)).date()
-
-            # 当天的施工单完成数
-            from ..models.core import WorkOrder
-
-            completed_orders = WorkOrder.objects.filter(completed_at__date=date).count()
-
-            # 当天的任务完成数
-            from ..models.core import WorkOrderTask
-
-            completed_tasks = WorkOrderTask.objects.filter(
-                completed_at__date=date
-            ).count()
-
-            daily_data.append(
-                {
-                    "date": date.isoformat(),
-                    "completed_orders": completed_orders,
-                    "completed_tasks": completed_tasks,
-                }
-            )
+        """获取生产力趋势（按天读取日汇总，按小时实时分组统计）"""
+        if request.query_params.get("granularity") == "hour":
+            hours = _int_param(request, "hours", 24, TimeSeriesMetrics.MAX_HOURS)
+            series = TimeSeriesMetrics.hourly(timezone.now() - timedelta(hours=hours - 1))
+        else:
+            days = _int_param(request, "days", 7, TimeSeriesMetrics.MAX_DAYS)
+            series = TimeSeriesMetrics.daily(timezone.localdate() - timedelta(days=days - 1))
 
         return APIResponse.success(
-            data=reversed(daily_data), message="生产力趋势获取成功"
+            data=[_serialize_point(point) for point in series],
+            message="生产力趋势获取成功",
         )
 
     @action(detail=False, methods=["get"])
     @quality_metrics_docs
     def quality_metrics(self, request):
-        """获取质量指标"""
-        from datetime import timedelta
-
-        from ..models.core import WorkOrderTask
+        """获取质量指标（基于日汇总）"""
+        days = _int_param(request, "days", 30, TimeSeriesMetrics.MAX_DAYS)
+        end_date = timezone.localdate()
+        start_date = end_date - timedelta(days=days - 1)
 
-        # 获取最近30天的质量数据
-        end_date = timezone.now()
-        start_date = end_date - timedelta(days=30)
-
-        # 不良品统计
-        tasks_with_defects = WorkOrderTask.objects.filter(
-            created_at__gte=start_date, defective_quantity__gt=0
-        ).aggregate(
-            total_tasks=Count("id"),
-            total_defects=Sum("defective_quantity"),
-            total_completed=Sum("completed_quantity"),
-        )
-
-        total_tasks = tasks_with_defects["total_tasks"] or 0
-        total_defects = tasks_with_defects["total_defects"] or 0
-        total_completed = tasks_with_defects["total_completed"] or 0
+        series = TimeSeriesMetrics.daily(start_date, end_date)
+        totals = TimeSeriesMetrics.summarize(series)
+        total_defects = totals["defective_quantity"]
+        total_completed = totals["completed_quantity"]
 
         # 计算质量指标
         defect_rate = (
@@ -223,12 +222,21 @@ class BusinessMetricsViewSet(viewsets.GenericViewSet):
         quality_metrics = {
             "period": {"start": start_date.isoformat(), "end": end_date.isoformat()},
             "defect_stats": {
-                "total_tasks_with_defects": total_tasks,
+                # 按日去重后累加（同一任务在不同日期报告不良品分别计数）
+                "total_tasks_with_defects": totals["defect_tasks"],
                 "total_defects": total_defects,
                 "total_completed": total_completed,
                 "defect_rate": round(defect_rate, 2),
             },
             "quality_score": round(100 - defect_rate, 2),  # 质量分数
+            "daily": [
+                {
+                    "date": point["date"].isoformat(),
+                    "defective_quantity": point["defective_quantity"],
+                    "completed_quantity": point["completed_quantity"],
+                }
+                for point in series
+            ],
         }
 
         return APIResponse.success(data=quality_metrics, message="质量指标获取成功")
@@ -430,7 +438,3 @@ class DashboardMonitoringViewSet(viewsets.GenericViewSet):
             )
 
         return APIResponse.success(data=alerts, message="告警列表获取成功")
-
-
-# 导入必要的模型
-from django.db import models
@@ -14,7 +14,6 @@ from django.utils import timezone
 from drf_spectacular.utils import OpenApiResponse, extend_schema, extend_schema_view
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
 from rest_framework import serializers
 from workorder.response import APIResponse
 from workorder.schema import standard_error_response, standard_success_response
@@ -25,6 +24,7 @@ from workorder.docs.notification_extra import (
 )
 
 from ..models.system import Notification
+from ..pagination import CustomPagination
 
 # 暂时注释掉可能导致阻塞的导入
 # from ..services.realtime_notification import (
@@ -33,8 +33,8 @@ from ..models.system import Notification
 # )
 
 
-class NotificationPagination(PageNumberPagination):
-    """通知分页器"""
+class NotificationPagination(CustomPagination):
+    """通知分页器（支持 ?pagination=cursor 游标分页）"""
 
     page_size = 20
     page_size_query_param = "page_size"
@@ -4,8 +4,10 @@
 包含销售订单的视图集。
 """
 
+import logging
 from decimal import Decimal
 
+from django.db import transaction
 from django.db.models import Count, Q, Sum
 from django.utils import timezone
 from rest_framework import status
@@ -30,8 +32,11 @@ from ..serializers.sales import (
     SalesOrderItemSerializer,
     SalesOrderListSerializer,
 )
+from ..services.stock_ledger import StockLedger, StockMovement
 from .base_viewsets import BaseViewSet
 
+logger = logging.getLogger(__name__)
+
 
 @sales_order_docs
 class SalesOrderViewSet(BaseViewSet):
@@ -104,15 +109,15 @@ class SalesOrderViewSet(BaseViewSet):
         if errors:
             return APIResponse.error("订单数据验证失败", code=status.HTTP_400_BAD_REQUEST, errors=errors)
 
-        # 更新订单状态
-        sales_order.status = "approved"
-        sales_order.approved_by = request.user
-        sales_order.approved_at = timezone.now()
-        sales_order.approval_comment = request.data.get("approval_comment", "")
-        sales_order.save()
+        # 更新订单状态并扣减库存（库存不足的产品只记录警告，不阻止审核）
+        with transaction.atomic():
+            sales_order.status = "approved"
+            sales_order.approved_by = request.user
+            sales_order.approved_at = timezone.now()
+            sales_order.approval_comment = request.data.get("approval_comment", "")
+            sales_order.save()
 
-        # 审核通过后，减少产品库存数量
-        self._reduce_product_stock(sales_order)
+            self._reduce_product_stock(sales_order)
 
         serializer = self.get_serializer(sales_order)
         return APIResponse.success(data=serializer.data)
@@ -154,112 +159,74 @@ class SalesOrderViewSet(BaseViewSet):
         serializer = self.get_serializer(sales_order)
         return APIResponse.success(data=serializer.data)
 
-    def _check_stock_availability(self, sales_order):
-        """检查库存是否充足
-
-        Returns:
-            tuple: (is_available, error_messages)
-        """
-        errors = []
-        items = sales_order.items.all()
-
-        for item in items:
-            try:
-                product = item.product
-                if hasattr(product, "stock") and product.stock < item.quantity:
-                    errors.append(
-                        f"{product.name}库存不足（需要{item.quantity}，当前{product.stock}）"
-                    )
-            except Exception:
-                pass
-
-        return len(errors) == 0, errors
+    @staticmethod
+    def _product_quantities(sales_order):
+        """按产品汇总订单明细数量"""
+        product_quantities = {}
+        for item in sales_order.items.all():
+            product_quantities[item.product_id] = (
+                product_quantities.get(item.product_id, 0) + item.quantity
+            )
+        return product_quantities
 
     def _reduce_product_stock(self, sales_order):
         """销售订单审核通过后，减少产品库存数量
 
         规则：
-        - 遍历订单明细，减少对应产品的库存数量
-        - 减少数量 = 订单明细的 quantity
-        - 使用事务保证原子性
+        - 按产品汇总订单明细的 quantity，通过库存台账一次原子扣减并批量记录日志
+        - 库存不足的产品记录警告但不阻止流程（已审核订单进入生产，包装完成时入库），
+          其他产品照常扣减
         """
-        from django.db import transaction
-
-        items = sales_order.items.all()
-
-        # 按产品汇总数量
-        product_quantities = {}
-        for item in items:
-            product_id = item.product.id
-            if product_id not in product_quantities:
-                product_quantities[product_id] = 0
-            product_quantities[product_id] += item.quantity
-
-        # 在事务中减少产品库存
+        product_quantities = self._product_quantities(sales_order)
         with transaction.atomic():
+            # 锁定产品后按当前库存拆分，扣减时不会再出现库存不足
+            products = (
+                Product.objects.select_for_update()
+                .only("id", "name", "unit", "stock_quantity")
+                .in_bulk(list(product_quantities))
+            )
+            movements = []
             for product_id, quantity in product_quantities.items():
-                try:
-                    product = Product.objects.select_for_update().get(id=product_id)
-                    if hasattr(product, "reduce_stock"):
-                        product.reduce_stock(
-                            quantity=quantity,
-                            user=None,
-                            reason=f"销售订单{sales_order.order_number}审核通过，出库{quantity}{product.unit}",
-                        )
-                    elif hasattr(product, "stock"):
-                        product.stock = max(0, product.stock - quantity)
-                        product.save(update_fields=["stock"])
-                except Product.DoesNotExist:
-                    pass
-                except ValueError as e:
-                    # 记录库存不足警告但不阻止流程
-                    import logging
-
-                    logging.warning(f"库存扣减警告：{e}")
+                product = products.get(product_id)
+                if product is None:
+                    continue
+                if product.stock_quantity < quantity:
+                    logger.warning(
+                        f"库存扣减警告：销售订单{sales_order.order_number} {product.name}"
+                        f"库存不足（当前库存{product.stock_quantity}，需要{quantity}），跳过出库"
+                    )
+                    continue
+                movements.append(StockMovement(
+                    product_id,
+                    -quantity,
+                    f"销售订单{sales_order.order_number}审核通过，出库{quantity}{product.unit}",
+                ))
+            StockLedger.apply_product_movements(movements)
 
     def _restore_product_stock(self, sales_order):
         """取消已审核订单时恢复产品库存
 
         规则：
         - 仅当订单已经扣减过库存时才恢复
-        - 使用事务保证原子性
+        - 通过库存台账一次原子入库并批量记录日志
         """
-        from django.db import transaction
-
         # 只有已审核、生产中状态的订单才需要恢复库存
         if sales_order.status not in ["approved", "in_production"]:
             return
 
-        items = sales_order.items.all()
-
-        # 按产品汇总数量
-        product_quantities = {}
-        for item in items:
-            product_id = item.product.id
-            if product_id not in product_quantities:
-                product_quantities[product_id] = 0
-            product_quantities[product_id] += item.quantity
-
-        # 在事务中恢复产品库存
-        with transaction.atomic():
-            for product_id, quantity in product_quantities.items():
-                try:
-                    product = Product.objects.select_for_update().get(id=product_id)
-                    if hasattr(product, "add_stock"):
-                        product.add_stock(
-                            quantity=quantity,
-                            user=None,
-                            reason=f"销售订单{sales_order.order_number}取消，库存回滚{quantity}{product.unit}",
-                        )
-                    elif hasattr(product, "stock"):
-                        product.stock = product.stock + quantity
-                        product.save(update_fields=["stock"])
-                except Product.DoesNotExist:
-                    pass
-                except Exception as e:
-                    import logging
-
-                    logging.warning(f"库存恢复警告：{e}")
+        product_quantities = self._product_quantities(sales_order)
+        units = dict(
+            Product.objects.filter(pk__in=list(product_quantities)).values_list("pk", "unit")
+        )
+        StockLedger.apply_product_movements([
+            StockMovement(
+                product_id,
+                quantity,
+                f"销售订单{sales_order.order_number}取消，库存回滚{quantity}{units[product_id]}",
+            )
+            for product_id, quantity in product_quantities.items()
+            if product_id in units
+        ])
 
     @action(detail=True, methods=["post"])
     @sales_order_complete_docs
@@ -284,13 +251,14 @@ class SalesOrderViewSet(BaseViewSet):
         if sales_order.status in ["completed", "cancelled", "rejected"]:
             return APIResponse.error("已完成、已取消或已拒绝的订单不能再次取消", code=status.HTTP_400_BAD_REQUEST)
 
-        # 如果订单已审核或生产中，需要恢复库存
-        self._restore_product_stock(sales_order)
+        with transaction.atomic():
+            # 如果订单已审核或生产中，需要恢复库存
+            self._restore_product_stock(sales_order)
 
-        reason = request.data.get("reason", "")
-        sales_order.status = "cancelled"
-        sales_order.rejection_reason = reason
-        sales_order.save()
+            reason = request.data.get("reason", "")
+            sales_order.status = "cancelled"
+            sales_order.rejection_reason = reason
+            sales_order.save()
 
         serializer = self.get_serializer(sales_order)
         return APIResponse.success(data=serializer.data)
@@ -11,6 +11,7 @@
 - task_export.py: Excel 导出功能
 """
 
+from ...mixins import ReplicaReadMixin
 from .task_actions import TaskActionsMixin
 from .task_bulk import TaskBulkMixin
 from .task_export import TaskExportMixin
@@ -27,8 +28,13 @@ from .task_stats import TaskStatsMixin
 # 2. TaskActionsMixin - 单个任务操作
 # 3. TaskBulkMixin - 批量操作
 # 4. TaskStatsMixin - 统计和导出
+# 5. ReplicaReadMixin - 统计和导出读取只读副本
 class WorkOrderTaskViewSet(
-    TaskStatsMixin, TaskBulkMixin, TaskActionsMixin, BaseWorkOrderTaskViewSet
+    ReplicaReadMixin,
+    TaskStatsMixin,
+    TaskBulkMixin,
+    TaskActionsMixin,
+    BaseWorkOrderTaskViewSet,
 ):
     """
     完整的施工单任务视图集
@@ -38,12 +44,13 @@ class WorkOrderTaskViewSet(
     - TaskActionsMixin: 单个任务的操作（更新数量、完成、拆分、分派、取消）
     - TaskBulkMixin: 批量操作（批量更新、批量完成、批量取消、批量分派）
     - TaskStatsMixin: 统计查询和导出功能
+    - ReplicaReadMixin: 统计和导出的读取发往只读副本（见 workorder/db_router.py）
 
     MRO (Method Resolution Order):
-    WorkOrderTaskViewSet -> TaskStatsMixin -> TaskBulkMixin -> TaskActionsMixin -> BaseWorkOrderTaskViewSet -> TaskExportMixin
+    WorkOrderTaskViewSet -> ReplicaReadMixin -> TaskStatsMixin -> TaskBulkMixin -> TaskActionsMixin -> BaseWorkOrderTaskViewSet -> TaskExportMixin
     """
 
-    pass
+    replica_actions = ("export", "export_excel", "collaboration_stats", "department_workload")
 
 
 # 保持向后兼容：导出相同的类名
@@ -14,6 +14,8 @@ from workorder.docs.work_order_tasks_bulk import (
 
 from workorder.models.core import TaskLog, WorkOrderTask
 from workorder.models.system import Notification
+from workorder.services.service_errors import ServiceError
+from workorder.services.task_quantity_service import TaskQuantityService
 
 
 class TaskBulkMixin:
@@ -26,17 +28,18 @@ class TaskBulkMixin:
     @action(detail=False, methods=["post"])
     @batch_update_quantity_docs
     def batch_update_quantity(self, request):
-        """批量更新任务数量"""
         """批量更新任务完成数量
-        
+
         请求参数：
         - task_ids: 任务ID列表（必填）
-        - quantity_increment: 每个任务的增量数量（可以是列表，对应每个任务；也可以是单个值，应用到所有任务）
+        - quantity_increment: 每个任务的增量数量（可以是列表，对应每个任务；可以是任务ID -> 增量的映射；
+          也可以是单个值，应用到所有任务）
         - quantity_defective: 不良品数量（可选，同上）
+        - versions: 任务ID -> 版本号（可选，用于并发控制）
         - notes: 备注（可选）
-        """
-        from workorder.models.core import TaskLog
 
+        整批任务按集合处理（见 TaskQuantityService），查询次数与任务数量无关。
+        """
         task_ids = request.data.get("task_ids", [])
         quantity_increment = request.data.get("quantity_increment")
         quantity_defective = request.data.get("quantity_defective", 0)
@@ -48,38 +51,16 @@ class TaskBulkMixin:
         if quantity_increment is None:
             return APIResponse.error("请提供完成数量增量", code=status.HTTP_400_BAD_REQUEST)
 
-        # 获取任务
-        tasks = WorkOrderTask.objects.filter(id__in=task_ids)
-        if tasks.count() != len(task_ids):
-            return APIResponse.error("部分任务不存在", code=status.HTTP_400_BAD_REQUEST)
-
-        # 检查权限：操作员只能更新自己分派的任务
-        user = request.user
-        unauthorized_tasks = []
-        for task in tasks:
-            # 检查权限：生产主管、任务分派的操作员、施工单创建人可以更新
-            can_update = False
-            if user.has_perm("workorder.change_workorder"):
-                can_update = True
-            elif task.assigned_operator == user:
-                can_update = True
-            elif task.work_order_process.work_order.created_by == user:
-                can_update = True
-
-            if not can_update:
-                unauthorized_tasks.append(task.id)
-
-        if unauthorized_tasks:
-            return APIResponse.error(
-                f"您没有权限更新以下任务：{unauthorized_tasks}",
-                code=status.HTTP_403_FORBIDDEN,
-            )
-
-        # 处理数量增量（支持列表或单个值）
+        # 处理数量增量（支持列表、任务ID映射或单个值）
         if isinstance(quantity_increment, list):
             if len(quantity_increment) != len(task_ids):
                 return APIResponse.error("数量增量列表长度必须与任务ID列表长度相同", code=status.HTTP_400_BAD_REQUEST)
             increments = quantity_increment
+        elif isinstance(quantity_increment, dict):
+            missing = [task_id for task_id in task_ids if str(task_id) not in quantity_increment]
+            if missing:
+                return APIResponse.error(f"缺少以下任务的完成数量增量：{missing}", code=status.HTTP_400_BAD_REQUEST)
+            increments = [quantity_increment[str(task_id)] for task_id in task_ids]
         else:
             increments = [quantity_increment] * len(task_ids)
 
@@ -88,98 +69,26 @@ class TaskBulkMixin:
             if len(quantity_defective) != len(task_ids):
                 return APIResponse.error("不良品数量列表长度必须与任务ID列表长度相同", code=status.HTTP_400_BAD_REQUEST)
             defectives = quantity_defective
+        elif isinstance(quantity_defective, dict):
+            defectives = [quantity_defective.get(str(task_id), 0) for task_id in task_ids]
         else:
             defectives = [quantity_defective] * len(task_ids)
 
-        # 批量更新任务
-        updated_tasks = []
-        failed_tasks = []
-
-        for task, increment, defective in zip(tasks, increments, defectives):
-            try:
-                # 并发控制：检查版本号
-                expected_version = request.data.get("versions", {}).get(str(task.id))
-                if expected_version is not None and task.version != expected_version:
-                    failed_tasks.append(
-                        {
-                            "task_id": task.id,
-                            "error": "任务已被其他操作员更新，请刷新后重试",
-                        }
-                    )
-                    continue
-
-                # 计算新的完成数量
-                quantity_before = task.quantity_completed
-                new_quantity_completed = quantity_before + increment
-
-                # 验证数量
-                if new_quantity_completed < 0:
-                    failed_tasks.append(
-                        {"task_id": task.id, "error": "更新后完成数量不能小于0"}
-                    )
-                    continue
-
-                if (
-                    task.production_quantity
-                    and new_quantity_completed > task.production_quantity
-                ):
-                    failed_tasks.append(
-                        {
-                            "task_id": task.id,
-                            "error": f"更新后完成数量（{new_quantity_completed}）不能超过生产数量（{task.production_quantity}）",
-                        }
-                    )
-                    continue
-
-                # 更新任务
-                task.quantity_completed = new_quantity_completed
-                if defective:
-                    task.quantity_defective = (task.quantity_defective or 0) + defective
-
-                if notes:
-                    task.production_requirements = notes
-
-                # 根据数量自动判断状态
-                if (
-                    task.production_quantity
-                    and new_quantity_completed >= task.production_quantity
-                ):
-                    task.status = "completed"
-                elif task.status == "pending":
-                    task.status = "in_progress"
-                elif (
-                    task.status == "completed"
-                    and new_quantity_completed < task.production_quantity
-                ):
-                    task.status = "in_progress"
-
-                # 更新版本号
-                task.version += 1
-                task.save()
-
-                # 记录操作日志
-                TaskLog.objects.create(
-                    task=task,
-                    log_type="update_quantity",
-                    content=f"批量更新完成数量：{quantity_before} → {new_quantity_completed}，本次完成：{increment}，不良品：{defective}"
-                    + (f"，备注：{notes}" if notes else ""),
-                    quantity_before=quantity_before,
-                    quantity_after=new_quantity_completed,
-                    quantity_increment=increment,
-                    quantity_defective_increment=defective,
-                    operator=user,
-                )
-
-                # 如果任务完成，检查工序是否完成
-                if task.status == "completed":
-                    task.work_order_process.check_and_update_status()
-
-                updated_tasks.append(task.id)
-
-            except Exception as e:
-                failed_tasks.append({"task_id": task.id, "error": str(e)})
+        try:
+            result = TaskQuantityService.batch_update_quantity(
+                user=request.user,
+                task_ids=task_ids,
+                increments=increments,
+                defectives=defectives,
+                notes=notes,
+                versions=request.data.get("versions") or {},
+            )
+        except ServiceError as exc:
+            return APIResponse.error(exc.message, code=exc.code, data=exc.data)
 
-        return APIResponse.error("请提供任务ID列表", code=status.HTTP_400_BAD_REQUEST, data={
+        updated_tasks = result["updated_task_ids"]
+        failed_tasks = result["failed_tasks"]
+        return APIResponse.success(data={
                 "message": f"成功更新 {len(updated_tasks)} 个任务，失败 {len(failed_tasks)} 个",
                 "updated_count": len(updated_tasks),
                 "failed_count": len(failed_tasks),
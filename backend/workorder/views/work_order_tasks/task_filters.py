@@ -7,6 +7,7 @@ from django.db.models import Q
 from django_filters import CharFilter, FilterSet, NumberFilter
 
 from workorder.models.core import WorkOrderTask
+from workorder.services.department_tree import DepartmentTree
 
 
 class WorkOrderTaskFilterSet(FilterSet):
@@ -17,6 +18,7 @@ class WorkOrderTaskFilterSet(FilterSet):
     - 状态 (status)
     - 任务类型 (task_type)
     - 分派部门 (assigned_department)
+    - 部门及其下级部门 (department_subtree)
     - 分派操作员 (assigned_operator)
     - 工序 (work_order_process)
     - 施工单号 (work_order_number) - 自定义筛选
@@ -31,6 +33,9 @@ class WorkOrderTaskFilterSet(FilterSet):
     assigned_operator = NumberFilter(field_name="assigned_operator")
     work_order_process = NumberFilter(field_name="work_order_process")
 
+    # 自定义筛选：分派到该部门及其全部下级部门的任务
+    department_subtree = NumberFilter(method="filter_department_subtree")
+
     # 自定义筛选：按施工单号搜索
     work_order_number = CharFilter(method="filter_work_order_number")
 
@@ -57,6 +62,7 @@ class WorkOrderTaskFilterSet(FilterSet):
             "status",
             "task_type",
             "assigned_department",
+            "department_subtree",
             "assigned_operator",
             "work_order_process",
             "work_order_number",
@@ -73,6 +79,12 @@ class WorkOrderTaskFilterSet(FilterSet):
             work_order_process__work_order__order_number__icontains=value
         )
 
+    def filter_department_subtree(self, queryset, name, value):
+        """按部门子树筛选（子树取自部门层级快照）"""
+        if not value:
+            return queryset
+        return DepartmentTree.filter_subtree(queryset, int(value))
+
     def filter_operator_name(self, queryset, name, value):
         """按操作员姓名搜索"""
         if not value:
@@ -6,7 +6,6 @@
 
 import logging
 
-from django.core.cache import cache
 from django.db.models import Avg, Count, F, Sum
 from django.utils import timezone
 from rest_framework import status
@@ -22,6 +21,7 @@ from workorder.docs.work_order_tasks_stats import (
 
 from workorder.export_utils import export_tasks
 from workorder.models import WorkOrderTask
+from workorder.services.namespaced_cache import dashboard_cache, department_cache
 from workorder.throttling import ExportRateThrottle
 
 logger = logging.getLogger(__name__)
@@ -34,8 +34,8 @@ class TaskStatsMixin:
     提供统计查询和导出方法。
     """
 
-    # Cache configuration
-    DEPT_WORKLOAD_CACHE_PREFIX = "dept_workload"
+    # Cache configuration (dashboard / department namespaces, invalidated on task changes)
+    DEPT_WORKLOAD_CACHE_SUFFIX = "workload"
     COLLAB_STATS_CACHE_PREFIX = "collab_stats"
     CACHE_TIMEOUT = 300  # 5 minutes
 
@@ -64,7 +64,7 @@ class TaskStatsMixin:
 
         # 导出 Excel
         filename = request.query_params.get("filename")
-        return export_tasks(queryset, filename)
+        return export_tasks(queryset, filename, user=request.user)
 
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
     @task_assignment_history_docs
@@ -220,7 +220,7 @@ class TaskStatsMixin:
         cache_key = self._get_collaboration_stats_cache_key(
             start_date, end_date, department_id
         )
-        cached_data = cache.get(cache_key)
+        cached_data = dashboard_cache.get(cache_key)
 
         if cached_data is not None:
             logger.info(f"Cache HIT for collaboration stats (key: {cache_key})")
@@ -433,7 +433,7 @@ class TaskStatsMixin:
         }
 
         # Cache the result
-        cache.set(cache_key, response_data, self.CACHE_TIMEOUT)
+        dashboard_cache.set(cache_key, response_data, self.CACHE_TIMEOUT)
         logger.info(f"Cached collaboration stats (key: {cache_key})")
 
         return APIResponse.success(data=response_data)
@@ -487,8 +487,8 @@ class TaskStatsMixin:
             return APIResponse.error("部门不存在", code=status.HTTP_404_NOT_FOUND)
 
         # Check cache first
-        cache_key = f"{self.DEPT_WORKLOAD_CACHE_PREFIX}:{department_id}"
-        cached_data = cache.get(cache_key)
+        workload_cache = department_cache.scope(department_id)
+        cached_data = workload_cache.get(self.DEPT_WORKLOAD_CACHE_SUFFIX)
 
         if cached_data is not None:
             logger.info(f"Cache HIT for department {department_id} workload")
@@ -607,7 +607,7 @@ class TaskStatsMixin:
         }
 
         # Cache the result
-        cache.set(cache_key, response_data, self.CACHE_TIMEOUT)
+        workload_cache.set(self.DEPT_WORKLOAD_CACHE_SUFFIX, response_data, self.CACHE_TIMEOUT)
         logger.info(f"Cached department workload data for department {department_id}")
 
         return APIResponse.success(data=response_data)
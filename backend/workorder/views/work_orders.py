@@ -12,8 +12,7 @@ import logging
 from decimal import Decimal
 
 from django.db import models
-from django.db.models import Avg, Count, F, Max, Q, Sum
-from django.utils import timezone
+from django.db.models import Avg, F, Max
 from django_filters import CharFilter, FilterSet, NumberFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.types import OpenApiTypes
@@ -48,6 +47,7 @@ from workorder.schema import standard_error_response, standard_success_response
 logger = logging.getLogger(__name__)
 
 from ..export_utils import export_tasks, export_work_orders
+from ..mixins import ReplicaReadMixin
 from ..models.assets import Artwork, Die
 from ..models.base import Customer, Department, Process
 from ..models.core import (
@@ -60,6 +60,7 @@ from ..models.core import (
 )
 from ..models.materials import Material
 from ..models.products import Product, ProductMaterial
+from ..permission_utils import AuthzProfile
 from ..permissions import (
     SuperuserFriendlyModelPermissions,
     WorkOrderDataPermission,
@@ -273,10 +274,11 @@ from .base_viewsets import BaseViewSet
     ),
 )
 @work_order_docs
-class WorkOrderViewSet(BaseViewSet):
+class WorkOrderViewSet(ReplicaReadMixin, BaseViewSet):
     """施工单视图集"""
 
     queryset = WorkOrder.objects.all()
+    replica_actions = ("statistics", "export")
     permission_classes = [WorkOrderDataPermission]  # 使用细粒度数据权限
     filterset_fields = ["status", "priority", "customer", "manager", "approval_status"]
     search_fields = [
@@ -308,54 +310,30 @@ class WorkOrderViewSet(BaseViewSet):
             raise
 
     def get_queryset(self):
-        """根据用户权限过滤查询集，使用查询优化器提升性能"""
-        from ..services.query_optimizer import QueryCache, QueryOptimizer
+        """根据用户权限过滤查询集，使用查询优化器提升性能
+
+        权限过滤使用施工单可见性索引（按主键过滤），不再每次执行部门子查询。
+        """
+        from ..services.query_optimizer import QueryOptimizer
+        from ..services.visibility_index import WorkOrderVisibilityIndex
 
         # 使用查询优化器获取基础查询集
         queryset = QueryOptimizer.optimize_workorder_queryset(
             super().get_queryset(), include_details=False  # 列表视图不需要详细信息
         )
 
-        user = self.request.user
-        cache_key = f"workorder_queryset_{user.id}_{user.is_superuser}"
-
-        # 管理员可以查看所有数据
-        if user.is_superuser:
-            return queryset
-
-        # 使用缓存优化权限查询
-        def get_filtered_queryset():
-            if user.groups.filter(name="业务员").exists():
-                return queryset.filter(customer__salesperson=user)
-
-            elif user.has_perm("workorder.change_workorder"):
-                user_departments = (
-                    user.profile.departments.all() if hasattr(user, "profile") else []
-                )
-                if user_departments:
-                    # 使用优化的子查询，添加 select_related 优化跨表查询性能
-                    from ..models.core import WorkOrderTask
-
-                    work_order_ids = (
-                        WorkOrderTask.objects.filter(
-                            assigned_department__in=user_departments
-                        )
-                        .select_related(
-                            "work_order_process"  # 优化跨表查询，避免N+1问题
-                        )
-                        .values_list("work_order_process__work_order_id", flat=True)
-                        .distinct()
-                    )
-                    return queryset.filter(id__in=work_order_ids)
-                else:
-                    return queryset.filter(created_by=user)
+        queryset = WorkOrderVisibilityIndex.filter_queryset(
+            queryset, self.request.user
+        )
+        return self._apply_list_mode(queryset)
 
-            else:
-                return queryset.filter(created_by=user)
+    def _apply_list_mode(self, queryset):
+        """列表模式：预计算进度、产品汇总和任务统计，序列化时不再逐行查询"""
+        from ..services.query_optimizer import QueryOptimizer
 
-        return QueryCache.get_cached_queryset(
-            cache_key, get_filtered_queryset, timeout=300
-        )
+        if self.action == "list":
+            return QueryOptimizer.optimize_workorder_list_queryset(queryset)
+        return queryset
 
     def perform_create(self, serializer):
         # 自动设置创建人和制表人为当前用户
@@ -544,240 +522,44 @@ class WorkOrderViewSet(BaseViewSet):
     @action(detail=False, methods=["get"])
     @work_order_statistics_docs
     def statistics(self, request):
-        """统计数据（增强版：包含任务统计和生产效率分析）"""
-        from datetime import timedelta
-
-        queryset = self.filter_queryset(self.get_queryset())
-
-        total_count = queryset.count()
-
-        # 状态统计：确保所有状态都有数据，即使数量为0
-        status_stats = list(
-            queryset.values("status").annotate(count=Count("id")).order_by("status")
-        )
-        # 确保所有状态都包含在内
-        all_statuses = ["pending", "in_progress", "paused", "completed", "cancelled"]
-        status_dict = {item["status"]: item["count"] for item in status_stats}
-        status_statistics = [
-            {"status": status, "count": status_dict.get(status, 0)}
-            for status in all_statuses
-        ]
-
-        # 优先级统计：确保所有优先级都有数据，即使数量为0
-        priority_stats = list(
-            queryset.values("priority").annotate(count=Count("id")).order_by("priority")
-        )
-        # 确保所有优先级都包含在内
-        all_priorities = ["low", "normal", "high", "urgent"]
-        priority_dict = {item["priority"]: item["count"] for item in priority_stats}
-        priority_statistics = [
-            {"priority": priority, "count": priority_dict.get(priority, 0)}
-            for priority in all_priorities
-        ]
-
-        # 即将到期的订单（7天内）
-        upcoming_deadline = queryset.filter(
-            delivery_date__lte=timezone.now().date() + timedelta(days=7),
-            status__in=["pending", "in_progress"],
-        ).count()
-
-        # 未审核施工单数量（仅业务员可见，只统计自己负责的）
-        pending_approval_count = 0
-        if request.user.groups.filter(name="业务员").exists():
-            pending_approval_count = queryset.filter(
-                approval_status="pending", customer__salesperson=request.user
-            ).count()
-
-        # ========== 新增：任务统计 ==========
-        from ..models.core import WorkOrderProcess, WorkOrderTask
-
-        # 任务总数统计
-        all_tasks = WorkOrderTask.objects.filter(
-            work_order_process__work_order__in=queryset
-        )
-        task_total_count = all_tasks.count()
-
-        # 任务状态统计
-        task_status_stats = list(
-            all_tasks.values("status").annotate(count=Count("id")).order_by("status")
-        )
-        all_task_statuses = ["pending", "in_progress", "completed", "cancelled"]
-        task_status_dict = {item["status"]: item["count"] for item in task_status_stats}
-        task_status_statistics = [
-            {"status": status, "count": task_status_dict.get(status, 0)}
-            for status in all_task_statuses
-        ]
-
-        # 任务类型统计
-        task_type_stats = list(
-            all_tasks.values("task_type")
-            .annotate(count=Count("id"))
-            .order_by("task_type")
-        )
-        task_type_statistics = [
-            {"task_type": item["task_type"], "count": item["count"]}
-            for item in task_type_stats
-        ]
-
-        # 按部门统计任务
-        task_dept_stats = list(
-            all_tasks.filter(assigned_department__isnull=False)
-            .values("assigned_department__name")
-            .annotate(
-                count=Count("id"), completed=Count("id", filter=Q(status="completed"))
-            )
-            .order_by("-count")
-        )
-        task_department_statistics = [
-            {
-                "department": item["assigned_department__name"],
-                "total": item["count"],
-                "completed": item["completed"],
-                "completion_rate": (
-                    round(item["completed"] / item["count"] * 100, 2)
-                    if item["count"] > 0
-                    else 0
-                ),
-            }
-            for item in task_dept_stats
-        ]
-
-        # ========== 新增：生产效率分析 ==========
-
-        # 工序完成率统计
-        all_processes = WorkOrderProcess.objects.filter(work_order__in=queryset)
-        process_total = all_processes.count()
-        process_completed = all_processes.filter(status="completed").count()
-        process_completion_rate = (
-            round(process_completed / process_total * 100, 2)
-            if process_total > 0
-            else 0
-        )
+        """统计数据（增强版：包含任务统计和生产效率分析）
 
-        # 平均完成时间（已完成工序）
-        completed_processes = all_processes.filter(
-            status="completed",
-            actual_start_time__isnull=False,
-            actual_end_time__isnull=False,
-        )
-        avg_completion_time = None
-        if completed_processes.exists():
-            # 计算平均完成时间（小时）
-            completion_times = []
-            for process in completed_processes:
-                if process.actual_start_time and process.actual_end_time:
-                    delta = process.actual_end_time - process.actual_start_time
-                    completion_times.append(delta.total_seconds() / 3600)  # 转换为小时
-
-            if completion_times:
-                avg_completion_time = round(
-                    sum(completion_times) / len(completion_times), 2
+        无筛选参数时返回按可见范围缓存的统计快照；
+        max_staleness（秒）控制数据变更后仍可返回旧快照的时长，0 表示总是最新。
+        """
+        from ..services.work_order_statistics import WorkOrderStatisticsService
+
+        params = request.query_params
+        max_staleness = None
+        if params.get("max_staleness") not in (None, ""):
+            try:
+                max_staleness = max(int(params["max_staleness"]), 0)
+            except ValueError:
+                return APIResponse.error(
+                    "max_staleness 必须为整数（秒）", code=status.HTTP_400_BAD_REQUEST
                 )
 
-        # 任务完成率统计
-        task_completed = all_tasks.filter(status="completed").count()
-        task_completion_rate = (
-            round(task_completed / task_total_count * 100, 2)
-            if task_total_count > 0
-            else 0
-        )
-
-        # 不良品率统计（已完成任务）
-        completed_tasks = all_tasks.filter(status="completed")
-        total_production_quantity = completed_tasks.aggregate(
-            total=Sum("production_quantity", default=0)
-        )["total"]
-        total_defective_quantity = completed_tasks.aggregate(
-            total=Sum("quantity_defective", default=0)
-        )["total"]
-        defective_rate = (
-            round(total_defective_quantity / total_production_quantity * 100, 2)
-            if total_production_quantity > 0
-            else 0
-        )
-
-        # 按客户统计
-        customer_stats = list(
-            queryset.values("customer__name")
-            .annotate(
-                count=Count("id"), completed=Count("id", filter=Q(status="completed"))
+        def compute():
+            return WorkOrderStatisticsService.compute(
+                self.filter_queryset(self.get_queryset()), request.user
             )
-            .order_by("-count")[:10]  # 前10个客户
-        )
-        customer_statistics = [
-            {
-                "customer": item["customer__name"],
-                "total": item["count"],
-                "completed": item["completed"],
-                "completion_rate": (
-                    round(item["completed"] / item["count"] * 100, 2)
-                    if item["count"] > 0
-                    else 0
-                ),
-            }
-            for item in customer_stats
-        ]
 
-        # 按产品统计
-        from ..models.core import WorkOrderProduct
+        # 带筛选条件的统计按请求实时计算
+        if set(params.keys()) - {"max_staleness"}:
+            return APIResponse.success(data=compute())
 
-        product_stats = list(
-            WorkOrderProduct.objects.filter(work_order__in=queryset)
-            .values("product__name", "product__code")
-            .annotate(
-                count=Count("work_order", distinct=True), total_quantity=Sum("quantity")
+        return APIResponse.success(
+            data=WorkOrderStatisticsService.get_snapshot(
+                request.user, compute, max_staleness=max_staleness
             )
-            .order_by("-count")[:10]  # 前10个产品
         )
-        product_statistics = [
-            {
-                "product_name": item["product__name"],
-                "product_code": item["product__code"],
-                "order_count": item["count"],
-                "total_quantity": item["total_quantity"],
-            }
-            for item in product_stats
-        ]
-
-        return APIResponse.success(data={
-                # 基础统计
-                "total_count": total_count,
-                "status_statistics": status_statistics,
-                "priority_statistics": priority_statistics,
-                "upcoming_deadline_count": upcoming_deadline,
-                "pending_approval_count": pending_approval_count,
-                # 任务统计
-                "task_statistics": {
-                    "total_count": task_total_count,
-                    "status_statistics": task_status_statistics,
-                    "type_statistics": task_type_statistics,
-                    "department_statistics": task_department_statistics,
-                    "completion_rate": task_completion_rate,
-                },
-                # 生产效率分析
-                "efficiency_analysis": {
-                    "process_completion_rate": process_completion_rate,
-                    "process_total": process_total,
-                    "process_completed": process_completed,
-                    "avg_completion_time_hours": avg_completion_time,
-                    "task_completion_rate": task_completion_rate,
-                    "defective_rate": defective_rate,
-                    "total_production_quantity": total_production_quantity,
-                    "total_defective_quantity": total_defective_quantity,
-                },
-                # 业务分析
-                "business_analysis": {
-                    "customer_statistics": customer_statistics,
-                    "product_statistics": product_statistics,
-                },
-            })
 
     @action(detail=False, methods=["get"], throttle_classes=[ExportRateThrottle])
     @work_order_export_docs
     def export(self, request):
         """导出施工单列表到 Excel（P1 优化：添加速率限制）"""
         # 权限检查：需要查看权限
-        if not request.user.has_perm("workorder.view_workorder"):
+        if not AuthzProfile.for_request(request).has_perm("workorder.view_workorder"):
             return APIResponse.error("您没有权限导出施工单数据", code=status.HTTP_400_BAD_REQUEST)
 
         # 获取过滤后的查询集（使用 get_queryset 确保权限过滤）
@@ -788,7 +570,7 @@ class WorkOrderViewSet(BaseViewSet):
 
         # 导出 Excel
         filename = request.query_params.get("filename")
-        return export_work_orders(queryset, filename)
+        return export_work_orders(queryset, filename, user=request.user)
 
     @action(detail=True, methods=["post"])
     @work_order_sync_preview_docs
@@ -970,7 +752,7 @@ class DraftTaskViewSet(BaseViewSet):
         # 权限过滤：基于施工单的数据权限
         if not user.is_superuser:
             # 管理员可以看到所有草稿任务
-            if not user.has_perm("workorder.manage_all_workorders"):
+            if not AuthzProfile.for_request(self.request).has_perm("workorder.manage_all_workorders"):
                 # 普通用户只能看到自己创建的施工单的草稿任务
                 queryset = queryset.filter(
                     work_order_process__work_order__created_by=user